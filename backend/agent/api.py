@@ -14,6 +14,7 @@ import os
 from agentpress.thread_manager import ThreadManager
 from services.supabase import DBConnection
 from services import redis
+from services import response_transport
 from utils.auth_utils import get_current_user_id_from_jwt, get_user_id_from_stream_auth, verify_thread_access
 from utils.logger import logger, structlog
 from services.billing import check_billing_status, can_use_model
@@ -23,6 +24,7 @@ from services.llm import make_llm_api_call
 from run_agent_background import run_agent_background, _cleanup_redis_response_list, update_agent_run_status
 from utils.constants import MODEL_NAME_ALIASES
 from flags.flags import is_enabled
+from mcp_service.tool_catalog import tool_catalog
 
 from .config_helper import extract_agent_config, build_unified_config, extract_tools_for_agent_run, get_mcp_configs
 from .versioning.facade import version_manager
@@ -188,11 +190,9 @@ async def stop_agent_run(agent_run_id: str, error_message: Optional[str] = None)
     final_status = "failed" if error_message else "stopped"
 
     # Attempt to fetch final responses from Redis
-    response_list_key = f"agent_run:{agent_run_id}:responses"
     all_responses = []
     try:
-        all_responses_json = await redis.lrange(response_list_key, 0, -1)
-        all_responses = [json.loads(r) for r in all_responses_json]
+        all_responses = await response_transport.fetch_all_responses(agent_run_id)
         logger.info(f"Fetched {len(all_responses)} responses from Redis for DB update on stop/fail: {agent_run_id}")
     except Exception as e:
         logger.error(f"Failed to fetch responses from Redis for {agent_run_id} during stop/fail: {e}")
@@ -214,6 +214,13 @@ async def stop_agent_run(agent_run_id: str, error_message: Optional[str] = None)
     except Exception as e:
         logger.error(f"Failed to publish STOP signal to global channel {global_control_channel}: {str(e)}")
 
+    if response_transport.streams_enabled():
+        # Stream readers don't listen on the control channel; end their stream in-band
+        try:
+            await response_transport.append_response(agent_run_id, {"type": "status", "status": final_status, "message": error_message or "Agent run stopped"})
+        except Exception as e:
+            logger.error(f"Failed to append {final_status} status to response stream for {agent_run_id}: {str(e)}")
+
     # Find all instances handling this agent run and send STOP to instance-specific channels
     try:
         instance_keys = await redis.keys(f"active_run:*:{agent_run_id}")
@@ -659,13 +666,81 @@ async def get_thread_agent(thread_id: str, user_id: str = Depends(get_current_us
         logger.error(f"Error fetching agent for thread {thread_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch thread agent: {str(e)}")
 
+async def _stream_from_response_stream(client, agent_run_id: str, last_id: str):
+    """Yield SSE events for an agent run read from its Redis Stream.
+
+    Every event carries its stream entry ID as the SSE `id`, so a reconnecting
+    client resumes after the last event it received instead of replaying the run.
+    """
+    logger.debug(f"Streaming responses for {agent_run_id} from Redis stream, resuming after {last_id}")
+    try:
+        # 1. Catch up on everything after the client's cursor without blocking
+        while True:
+            entries = await response_transport.read_stream_responses(agent_run_id, last_id)
+            for entry_id, response in entries:
+                last_id = entry_id
+                yield f"id: {entry_id}\ndata: {json.dumps(response)}\n\n"
+                if response.get('type') == 'status' and response.get('status') in ['completed', 'failed', 'stopped', 'error']:
+                    return
+            if len(entries) < response_transport.STREAM_READ_COUNT:
+                break
+
+        # 2. Check run status *after* yielding the backlog
+        run_status = await client.table('agent_runs').select('status', 'thread_id').eq("id", agent_run_id).maybe_single().execute()
+        current_status = run_status.data.get('status') if run_status.data else None
+        if current_status != 'running':
+            logger.info(f"Agent run {agent_run_id} is not running (status: {current_status}). Ending stream.")
+            yield f"data: {json.dumps({'type': 'status', 'status': 'completed'})}\n\n"
+            return
+
+        structlog.contextvars.bind_contextvars(
+            thread_id=run_status.data.get('thread_id'),
+        )
+
+        # 3. Block on XREAD for new entries; the final status entry ends the stream
+        while True:
+            entries = await response_transport.read_stream_responses(
+                agent_run_id, last_id, block_ms=response_transport.STREAM_READ_BLOCK_MS
+            )
+            if not entries:
+                # Idle: make sure the run did not die without writing a final status
+                run_status = await client.table('agent_runs').select('status').eq("id", agent_run_id).maybe_single().execute()
+                current_status = run_status.data.get('status') if run_status.data else None
+                if current_status != 'running':
+                    logger.info(f"Agent run {agent_run_id} ended (status: {current_status}) while stream was idle.")
+                    yield f"data: {json.dumps({'type': 'status', 'status': current_status or 'completed'})}\n\n"
+                    return
+                continue
+            for entry_id, response in entries:
+                last_id = entry_id
+                yield f"id: {entry_id}\ndata: {json.dumps(response)}\n\n"
+                if response.get('type') == 'status' and response.get('status') in ['completed', 'failed', 'stopped', 'error']:
+                    logger.info(f"Detected run completion via status message in stream: {response.get('status')}")
+                    return
+
+    except asyncio.CancelledError:
+        logger.info(f"Stream generator cancelled for {agent_run_id}")
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming agent run {agent_run_id} from Redis stream: {e}", exc_info=True)
+        yield f"data: {json.dumps({'type': 'status', 'status': 'error', 'message': f'Stream failed: {e}'})}\n\n"
+    finally:
+        logger.debug(f"Streaming cleanup complete for agent run: {agent_run_id}")
+
+
 @router.get("/agent-run/{agent_run_id}/stream")
 async def stream_agent_run(
     agent_run_id: str,
     token: Optional[str] = None,
+    last_event_id: Optional[str] = None,
     request: Request = None
 ):
-    """Stream the responses of an agent run using Redis Lists and Pub/Sub."""
+    """Stream the responses of an agent run using Redis Lists and Pub/Sub, or Redis Streams.
+
+    With the streams transport, clients can resume after an event via the
+    `Last-Event-ID` header (sent by EventSource on reconnect) or the
+    `last_event_id` query parameter.
+    """
     logger.info(f"Starting stream for agent run: {agent_run_id}")
     client = await db.client
 
@@ -677,6 +752,21 @@ async def stream_agent_run(
         user_id=user_id,
     )
 
+    sse_headers = {
+        "Cache-Control": "no-cache, no-transform", "Connection": "keep-alive",
+        "X-Accel-Buffering": "no", "Content-Type": "text/event-stream",
+        "Access-Control-Allow-Origin": "*"
+    }
+
+    if response_transport.streams_enabled():
+        resume_from = response_transport.parse_stream_id(
+            (request.headers.get("last-event-id") if request else None) or last_event_id
+        ) or response_transport.STREAM_START_ID
+        return StreamingResponse(
+            _stream_from_response_stream(client, agent_run_id, resume_from),
+            media_type="text/event-stream", headers=sse_headers,
+        )
+
     response_list_key = f"agent_run:{agent_run_id}:responses"
     response_channel = f"agent_run:{agent_run_id}:new_response"
     control_channel = f"agent_run:{agent_run_id}:control" # Global control channel
@@ -845,11 +935,7 @@ async def stream_agent_run(
             await asyncio.sleep(0.1)
             logger.debug(f"Streaming cleanup complete for agent run: {agent_run_id}")
 
-    return StreamingResponse(stream_generator(), media_type="text/event-stream", headers={
-        "Cache-Control": "no-cache, no-transform", "Connection": "keep-alive",
-        "X-Accel-Buffering": "no", "Content-Type": "text/event-stream",
-        "Access-Control-Allow-Origin": "*"
-    })
+    return StreamingResponse(stream_generator(), media_type="text/event-stream", headers=sse_headers)
 
 async def generate_and_update_project_name(project_id: str, prompt: str):
     """Generates a project name using an LLM and updates the database."""
@@ -1920,6 +2006,15 @@ async def update_agent(
                 logger.error(f"Error updating agent {agent_id}: {str(e)}")
                 raise HTTPException(status_code=500, detail=f"Failed to update agent: {str(e)}")
         
+        if 'configured_mcps' in version_changes or 'custom_mcps' in version_changes:
+            # Servers removed or reconfigured must be rediscovered on the next run
+            await tool_catalog.invalidate_mcp_configs(
+                current_version_data.get('configured_mcps', []),
+                current_version_data.get('custom_mcps', []),
+                current_configured_mcps,
+                current_custom_mcps
+            )
+        
         # Fetch the updated agent data
         updated_agent = await client.table('agents').select('*').eq("agent_id", agent_id).eq("account_id", user_id).maybe_single().execute()
         
@@ -470,7 +470,7 @@ async def run_agent(
                 else:
                     logger.warning(f"Image context found for '{file_path}' but missing base64 or mime_type.")
 
-                await client.table('messages').delete().eq('message_id', latest_image_context_msg.data[0]["message_id"]).execute()
+                await thread_manager.delete_message(thread_id, latest_image_context_msg.data[0]["message_id"])
             except Exception as e:
                 logger.error(f"Error parsing image context: {e}")
                 if trace:
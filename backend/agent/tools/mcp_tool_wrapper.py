@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any, Dict, List, Optional
 from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, ToolSchema, SchemaType
 from mcp_module import mcp_manager
@@ -35,20 +36,19 @@ class MCPToolWrapper(Tool):
         standard_configs = [cfg for cfg in self.mcp_configs if not cfg.get('isCustom', False)]
         custom_configs = [cfg for cfg in self.mcp_configs if cfg.get('isCustom', False)]
         
+        initializers = []
         if standard_configs:
-            await self._initialize_standard_servers(standard_configs)
+            initializers.append(self._initialize_standard_servers(standard_configs))
         
         if custom_configs:
-            await self.custom_handler.initialize_custom_mcps(custom_configs)
+            initializers.append(self.custom_handler.initialize_custom_mcps(custom_configs))
+        
+        await asyncio.gather(*initializers)
             
     async def _initialize_standard_servers(self, standard_configs: List[Dict[str, Any]]):
-        for config in standard_configs:
-            try:
-                logger.info(f"Attempting to connect to MCP server: {config['qualifiedName']}")
-                await self.mcp_manager.connect_server(config)
-                logger.info(f"Successfully connected to MCP server: {config['qualifiedName']}")
-            except Exception as e:
-                logger.error(f"Failed to connect to MCP server {config['qualifiedName']}: {e}")
+        logger.info(f"Connecting to {len(standard_configs)} MCP servers: {[cfg['qualifiedName'] for cfg in standard_configs]}")
+        # Connects concurrently, each server bounded by its own timeout
+        await self.mcp_manager.connect_all(standard_configs)
     
     async def _create_dynamic_tools(self):
         try:
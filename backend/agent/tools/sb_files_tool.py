@@ -1,10 +1,12 @@
 from agentpress.tool import ToolResult, openapi_schema, xml_schema
 from sandbox.tool_base import SandboxToolsBase    
+from sandbox.file_cache import file_cache, make_edit_payload, apply_edit_in_sandbox, SANDBOX_FILE_DOWNLOAD_CONCURRENCY
 from utils.files_utils import should_exclude_file, clean_path
 from agentpress.thread_manager import ThreadManager
 from utils.logger import logger
 import os
 import json
+import asyncio
 
 class SandboxFilesTool(SandboxToolsBase):
     """Tool for executing file system operations in a Daytona sandbox. All operations are performed relative to the /workspace directory."""
@@ -24,11 +26,37 @@ class SandboxFilesTool(SandboxToolsBase):
 
     async def _file_exists(self, path: str) -> bool:
         """Check if a file exists in the sandbox"""
+        return await self._get_file_info(path) is not None
+
+    async def _get_file_info(self, path: str):
+        """Get the info of a file in the sandbox, or None if it doesn't exist"""
+        try:
+            return await self.sandbox.fs.get_file_info(path)
+        except Exception:
+            return None
+
+    async def _read_file(self, path: str, file_info, use_cache: bool = True) -> str:
+        """Read a text file, from the content cache if it is still current"""
+        if use_cache:
+            content = file_cache.get(self.sandbox_id, path, file_info)
+            if content is not None:
+                return content
+        content = (await self.sandbox.fs.download_file(path)).decode()
+        file_cache.put(self.sandbox_id, path, content, file_info)
+        return content
+
+    async def _write_file(self, path: str, content: str) -> None:
+        """Upload a whole file and cache its new content"""
         try:
-            await self.sandbox.fs.get_file_info(path)
-            return True
+            await self.sandbox.fs.upload_file(content.encode(), path)
         except Exception:
-            return False
+            file_cache.invalidate(self.sandbox_id, path)
+            raise
+        await self._cache_written_file(path, content)
+
+    async def _cache_written_file(self, path: str, content: str) -> None:
+        """Cache content just written, keyed by the modification time the sandbox now reports"""
+        file_cache.put(self.sandbox_id, path, content, await self._get_file_info(path))
 
     async def get_workspace_state(self) -> dict:
         """Get the current workspace state by reading all files"""
@@ -38,16 +66,15 @@ class SandboxFilesTool(SandboxToolsBase):
             await self._ensure_sandbox()
             
             files = await self.sandbox.fs.list_files(self.workspace_path)
-            for file_info in files:
-                rel_path = file_info.name
-                
-                # Skip excluded files and directories
-                if self._should_exclude_file(rel_path) or file_info.is_dir:
-                    continue
+            # Unchanged files come from the content cache, the rest is downloaded concurrently
+            semaphore = asyncio.Semaphore(SANDBOX_FILE_DOWNLOAD_CONCURRENCY)
 
+            async def read_file_state(file_info):
+                rel_path = file_info.name
                 try:
                     full_path = f"{self.workspace_path}/{rel_path}"
-                    content = (await self.sandbox.fs.download_file(full_path)).decode()
+                    async with semaphore:
+                        content = await self._read_file(full_path, file_info)
                     files_state[rel_path] = {
                         "content": content,
                         "is_dir": file_info.is_dir,
@@ -59,6 +86,13 @@ class SandboxFilesTool(SandboxToolsBase):
                 except UnicodeDecodeError:
                     print(f"Skipping binary file: {rel_path}")
 
+            await asyncio.gather(*(
+                read_file_state(file_info)
+                for file_info in files
+                # Skip excluded files and directories
+                if not (self._should_exclude_file(file_info.name) or file_info.is_dir)
+            ))
+
             return files_state
         
         except Exception as e:
@@ -140,7 +174,7 @@ class SandboxFilesTool(SandboxToolsBase):
                 file_contents = json.dumps(file_contents, indent=4)
             
             # Write the file content
-            await self.sandbox.fs.upload_file(file_contents.encode(), full_path)
+            await self._write_file(full_path, file_contents)
             await self.sandbox.fs.set_file_permissions(full_path, permissions)
             
             message = f"File '{file_path}' created successfully."
@@ -208,23 +242,36 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not await self._file_exists(full_path):
+            file_info = await self._get_file_info(full_path)
+            if file_info is None:
                 return self.fail_response(f"File '{file_path}' does not exist")
             
-            content = (await self.sandbox.fs.download_file(full_path)).decode()
             old_str = old_str.expandtabs()
             new_str = new_str.expandtabs()
             
-            occurrences = content.count(old_str)
-            if occurrences == 0:
-                return self.fail_response(f"String '{old_str}' not found in file")
-            if occurrences > 1:
-                lines = [i+1 for i, line in enumerate(content.split('\n')) if old_str in line]
-                return self.fail_response(f"Multiple occurrences found in lines {lines}. Please ensure string is unique")
-            
-            # Perform replacement
-            new_content = content.replace(old_str, new_str)
-            await self.sandbox.fs.upload_file(new_content.encode(), full_path)
+            # A cached copy that turns out to be stale is replaced by a fresh download
+            for use_cache in (True, False):
+                content = await self._read_file(full_path, file_info, use_cache=use_cache)
+                
+                occurrences = content.count(old_str)
+                if occurrences == 0:
+                    return self.fail_response(f"String '{old_str}' not found in file")
+                if occurrences > 1:
+                    lines = [i+1 for i, line in enumerate(content.split('\n')) if old_str in line]
+                    return self.fail_response(f"Multiple occurrences found in lines {lines}. Please ensure string is unique")
+                
+                # Perform replacement, shipping only the changed range for large files
+                new_content = content.replace(old_str, new_str)
+                start = content.index(old_str)
+                payload = make_edit_payload(content, start, start + len(old_str), new_str)
+                if payload is None:
+                    await self._write_file(full_path, new_content)
+                    break
+                if await apply_edit_in_sandbox(self.sandbox, full_path, payload):
+                    await self._cache_written_file(full_path, new_content)
+                    break
+                if not use_cache:
+                    await self._write_file(full_path, new_content)
             
             # Show snippet around the edit
             replacement_line = content.split(old_str)[0].count('\n')
@@ -299,7 +346,7 @@ class SandboxFilesTool(SandboxToolsBase):
             if not await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' does not exist. Use create_file to create a new file.")
             
-            await self.sandbox.fs.upload_file(file_contents.encode(), full_path)
+            await self._write_file(full_path, file_contents)
             await self.sandbox.fs.set_file_permissions(full_path, permissions)
             
             message = f"File '{file_path}' completely rewritten successfully."
@@ -359,6 +406,7 @@ class SandboxFilesTool(SandboxToolsBase):
                 return self.fail_response(f"File '{file_path}' does not exist")
             
             await self.sandbox.fs.delete_file(full_path)
+            file_cache.invalidate(self.sandbox_id, full_path)
             return self.success_response(f"File '{file_path}' deleted successfully.")
         except Exception as e:
             return self.fail_response(f"Error deleting file: {str(e)}")
@@ -5,9 +5,12 @@ from mcp import ClientSession, StdioServerParameters
 from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
 from mcp.client.streamable_http import streamablehttp_client
+from mcp_service.tool_catalog import catalog_scope, tool_catalog
 from utils.logger import logger
 from .mcp_connection_manager import MCPConnectionManager
 
+CUSTOM_MCP_CONNECT_TIMEOUT = 20
+
 
 class CustomMCPHandler:
     def __init__(self, connection_manager: MCPConnectionManager):
@@ -15,13 +18,15 @@ class CustomMCPHandler:
         self.custom_tools: Dict[str, Dict[str, Any]] = {}
     
     async def initialize_custom_mcps(self, custom_configs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
-        for config in custom_configs:
+        async def initialize(config: Dict[str, Any]):
             try:
-                await self._initialize_single_custom_mcp(config)
+                await asyncio.wait_for(self._initialize_single_custom_mcp(config), timeout=CUSTOM_MCP_CONNECT_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error(f"Timed out initializing custom MCP {config.get('name', 'Unknown')} after {CUSTOM_MCP_CONNECT_TIMEOUT}s")
             except Exception as e:
                 logger.error(f"Failed to initialize custom MCP {config.get('name', 'Unknown')}: {e}")
-                continue
         
+        await asyncio.gather(*(initialize(config) for config in custom_configs))
         return self.custom_tools
     
     async def _initialize_single_custom_mcp(self, config: Dict[str, Any]):
@@ -32,16 +37,28 @@ class CustomMCPHandler:
         
         logger.info(f"Initializing custom MCP: {server_name} (type: {custom_type})")
         
+        # Keyed by the config as stored on the agent, before the initializers below add to it
+        scope = catalog_scope(config)
+        catalog_config = json.loads(json.dumps(server_config, default=str))
+        tools_info, generation = await tool_catalog.get(scope, catalog_config)
+        if tools_info is not None:
+            logger.info(f"Using cached tool catalog for custom MCP {server_name}")
+            self._register_custom_tools_from_info(tools_info, server_name, enabled_tools, custom_type, server_config)
+            return
+        
         if custom_type == 'pipedream':
-            await self._initialize_pipedream_mcp(server_name, server_config, enabled_tools)
+            tools_info = await self._initialize_pipedream_mcp(server_name, server_config, enabled_tools)
         elif custom_type == 'sse':
-            await self._initialize_sse_mcp(server_name, server_config, enabled_tools)
+            tools_info = await self._initialize_sse_mcp(server_name, server_config, enabled_tools)
         elif custom_type == 'http':
-            await self._initialize_http_mcp(server_name, server_config, enabled_tools)
+            tools_info = await self._initialize_http_mcp(server_name, server_config, enabled_tools)
         elif custom_type == 'json':
-            await self._initialize_json_mcp(server_name, server_config, enabled_tools)
+            tools_info = await self._initialize_json_mcp(server_name, server_config, enabled_tools)
         else:
             logger.error(f"Custom MCP {server_name}: Unsupported type '{custom_type}'")
+        
+        if tools_info is not None:
+            await tool_catalog.set(scope, catalog_config, tools_info, generation)
     
     async def _initialize_pipedream_mcp(self, server_name: str, server_config: Dict[str, Any], enabled_tools: List[str]):
         app_slug = server_config.get('app_slug')
@@ -96,6 +113,10 @@ class CustomMCPHandler:
                     tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
                     
                     self._register_custom_tools(tools, server_name, enabled_tools, 'pipedream', server_config)
+                    return [
+                        {"name": tool.name, "description": tool.description, "input_schema": tool.inputSchema}
+                        for tool in tools
+                    ]
                     
         except Exception as e:
             logger.error(f"Pipedream MCP {server_name}: Connection failed - {str(e)}")
@@ -110,6 +131,7 @@ class CustomMCPHandler:
         if server_info.get('status') == 'connected':
             tools_info = server_info.get('tools', [])
             self._register_custom_tools_from_info(tools_info, server_name, enabled_tools, 'sse', server_config)
+            return tools_info
         else:
             logger.error(f"Failed to connect to custom MCP {server_name}")
     
@@ -122,6 +144,7 @@ class CustomMCPHandler:
         if server_info.get('status') == 'connected':
             tools_info = server_info.get('tools', [])
             self._register_custom_tools_from_info(tools_info, server_name, enabled_tools, 'http', server_config)
+            return tools_info
         else:
             logger.error(f"Failed to connect to custom MCP {server_name}")
     
@@ -134,6 +157,7 @@ class CustomMCPHandler:
         if server_info.get('status') == 'connected':
             tools_info = server_info.get('tools', [])
             self._register_custom_tools_from_info(tools_info, server_name, enabled_tools, 'json', server_config)
+            return tools_info
         else:
             logger.error(f"Failed to connect to custom MCP {server_name}")
     
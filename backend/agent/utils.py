@@ -2,12 +2,12 @@ import json
 from typing import Optional
 from utils.logger import logger
 from services import redis
+from services import response_transport
 
 
 async def _cleanup_redis_response_list(agent_run_id: str):
     try:
-        response_list_key = f"agent_run:{agent_run_id}:responses"
-        await redis.delete(response_list_key)
+        await response_transport.delete_responses(agent_run_id)
         logger.debug(f"Cleaned up Redis response list for agent run {agent_run_id}")
     except Exception as e:
         logger.warning(f"Failed to clean up Redis response list for {agent_run_id}: {str(e)}")
@@ -29,11 +29,9 @@ async def stop_agent_run(db, agent_run_id: str, error_message: Optional[str] = N
     client = await db.client
     final_status = "failed" if error_message else "stopped"
 
-    response_list_key = f"agent_run:{agent_run_id}:responses"
     all_responses = []
     try:
-        all_responses_json = await redis.lrange(response_list_key, 0, -1)
-        all_responses = [json.loads(r) for r in all_responses_json]
+        all_responses = await response_transport.fetch_all_responses(agent_run_id)
         logger.info(f"Fetched {len(all_responses)} responses from Redis for DB update on stop/fail: {agent_run_id}")
     except Exception as e:
         logger.error(f"Failed to fetch responses from Redis for {agent_run_id} during stop/fail: {e}")
@@ -52,6 +50,13 @@ async def stop_agent_run(db, agent_run_id: str, error_message: Optional[str] = N
     except Exception as e:
         logger.error(f"Failed to publish STOP signal to global channel {global_control_channel}: {str(e)}")
 
+    if response_transport.streams_enabled():
+        # Stream readers don't listen on the control channel; end their stream in-band
+        try:
+            await response_transport.append_response(agent_run_id, {"type": "status", "status": final_status, "message": error_message or "Agent run stopped"})
+        except Exception as e:
+            logger.error(f"Failed to append {final_status} status to response stream for {agent_run_id}: {str(e)}")
+
     try:
         instance_keys = await redis.keys(f"active_run:*:{agent_run_id}")
         logger.debug(f"Found {len(instance_keys)} active instance keys for agent run {agent_run_id}")
@@ -6,25 +6,123 @@ reaching the context window limitations of LLM models.
 """
 
 import json
-from typing import List, Dict, Any, Optional, Union
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Union
 
 from litellm.utils import token_counter
 from services.supabase import DBConnection
 from utils.logger import logger
 
 DEFAULT_TOKEN_THRESHOLD = 120000
+DEFAULT_TOKEN_CACHE_SIZE = 50000
+MIDDLE_OUT_MAX_MESSAGES = 320
+
+
+class MessageTokenCache:
+    """Process-wide cache of per-message token counts.
+
+    Entries are keyed by (message_id, model). Because compression rewrites a
+    message's content, each entry keeps the counts of a few content versions,
+    identified by a fingerprint of role, content and tool calls. Messages
+    without a message_id (system prompt, temporary messages) are keyed by
+    their fingerprint alone.
+    """
+
+    VERSIONS_PER_MESSAGE = 4
+
+    def __init__(self, max_entries: int = DEFAULT_TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, str], Dict[Tuple[int, int], int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _fingerprint(msg: Dict[str, Any]) -> Tuple[int, int]:
+        content = msg.get('content')
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        tool_calls = msg.get('tool_calls')
+        if tool_calls is not None and not isinstance(tool_calls, str):
+            tool_calls = json.dumps(tool_calls, sort_keys=True, default=str)
+        return len(content), hash((msg.get('role'), content, tool_calls))
+
+    def count(self, msg: Dict[str, Any], llm_model: str) -> int:
+        """Return the token count of a single message, tokenizing it only on a miss."""
+        fingerprint = self._fingerprint(msg)
+        key = (msg.get('message_id') or fingerprint, llm_model)
+
+        versions = self._entries.get(key)
+        if versions is not None and fingerprint in versions:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return versions[fingerprint]
+
+        self.misses += 1
+        tokens = token_counter(model=llm_model, messages=[msg])
+
+        if versions is None:
+            versions = {}
+            self._entries[key] = versions
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        elif len(versions) >= self.VERSIONS_PER_MESSAGE:
+            versions.pop(next(iter(versions)))
+        versions[fingerprint] = tokens
+        self._entries.move_to_end(key)
+        return tokens
+
+    def invalidate(self, message_id: str) -> None:
+        """Drop every cached count for a message (all models)."""
+        for key in [key for key in self._entries if key[0] == message_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class TokenTally:
+    """Running token total for a message list.
+
+    Keeps one count per message so that replacing or removing a message
+    adjusts the total without recounting the rest of the list. The total is
+    the sum of per-message counts, which slightly over-estimates the count of
+    the whole list (per-request overhead is included once per message).
+    """
+
+    def __init__(self, cache: MessageTokenCache, messages: List[Dict[str, Any]], llm_model: str):
+        self.cache = cache
+        self.llm_model = llm_model
+        self.counts = [cache.count(msg, llm_model) for msg in messages]
+        self.total = sum(self.counts)
+
+    def recount(self, index: int, msg: Dict[str, Any]) -> int:
+        """Update the count of the message at `index` after its content changed."""
+        tokens = self.cache.count(msg, self.llm_model)
+        self.total += tokens - self.counts[index]
+        self.counts[index] = tokens
+        return self.total
+
+
+default_token_cache = MessageTokenCache()
+
 
 class ContextManager:
     """Manages thread context including token counting and summarization."""
     
-    def __init__(self, token_threshold: int = DEFAULT_TOKEN_THRESHOLD):
+    def __init__(self, token_threshold: int = DEFAULT_TOKEN_THRESHOLD, token_cache: Optional[MessageTokenCache] = None):
         """Initialize the ContextManager.
         
         Args:
             token_threshold: Token count threshold to trigger summarization
+            token_cache: Per-message token count cache (defaults to the process-wide cache)
         """
         self.db = DBConnection()
         self.token_threshold = token_threshold
+        self.token_cache = token_cache or default_token_cache
+
+    def count_tokens(self, messages: List[Dict[str, Any]], llm_model: str) -> int:
+        """Count the tokens of a message list using cached per-message counts."""
+        return sum(self.token_cache.count(msg, llm_model) for msg in messages)
 
     def is_tool_result_message(self, msg: Dict[str, Any]) -> bool:
         """Check if a message is a tool result message."""
@@ -92,70 +190,82 @@ class ContextManager:
             else:
                 return msg_content
   
-    def compress_tool_result_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000) -> List[Dict[str, Any]]:
+    def compress_tool_result_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000, tally: Optional[TokenTally] = None) -> List[Dict[str, Any]]:
         """Compress the tool result messages except the most recent one."""
-        uncompressed_total_token_count = token_counter(model=llm_model, messages=messages)
+        tally = tally or TokenTally(self.token_cache, messages, llm_model)
+        uncompressed_total_token_count = tally.total
         max_tokens_value = max_tokens or (100 * 1000)
 
         if uncompressed_total_token_count > max_tokens_value:
             _i = 0  # Count the number of ToolResult messages
-            for msg in reversed(messages):  # Start from the end and work backwards
+            for index in range(len(messages) - 1, -1, -1):  # Start from the end and work backwards
+                msg = messages[index]
                 if self.is_tool_result_message(msg):  # Only compress ToolResult messages
                     _i += 1  # Count the number of ToolResult messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = tally.counts[index]  # Cached token count of the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > 1:  # If this is not the most recent ToolResult message
                             message_id = msg.get('message_id')  # Get the message_id
                             if message_id:
                                 msg["content"] = self.compress_message(msg["content"], message_id, token_threshold * 3)
+                                tally.recount(index, msg)
                             else:
                                 logger.warning(f"UNEXPECTED: Message has no message_id {str(msg)[:100]}")
                         else:
                             msg["content"] = self.safe_truncate(msg["content"], int(max_tokens_value * 2))
+                            tally.recount(index, msg)
         return messages
 
-    def compress_user_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000) -> List[Dict[str, Any]]:
+    def compress_user_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000, tally: Optional[TokenTally] = None) -> List[Dict[str, Any]]:
         """Compress the user messages except the most recent one."""
-        uncompressed_total_token_count = token_counter(model=llm_model, messages=messages)
+        tally = tally or TokenTally(self.token_cache, messages, llm_model)
+        uncompressed_total_token_count = tally.total
         max_tokens_value = max_tokens or (100 * 1000)
 
         if uncompressed_total_token_count > max_tokens_value:
             _i = 0  # Count the number of User messages
-            for msg in reversed(messages):  # Start from the end and work backwards
+            for index in range(len(messages) - 1, -1, -1):  # Start from the end and work backwards
+                msg = messages[index]
                 if msg.get('role') == 'user':  # Only compress User messages
                     _i += 1  # Count the number of User messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = tally.counts[index]  # Cached token count of the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > 1:  # If this is not the most recent User message
                             message_id = msg.get('message_id')  # Get the message_id
                             if message_id:
                                 msg["content"] = self.compress_message(msg["content"], message_id, token_threshold * 3)
+                                tally.recount(index, msg)
                             else:
                                 logger.warning(f"UNEXPECTED: Message has no message_id {str(msg)[:100]}")
                         else:
                             msg["content"] = self.safe_truncate(msg["content"], int(max_tokens_value * 2))
+                            tally.recount(index, msg)
         return messages
 
-    def compress_assistant_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000) -> List[Dict[str, Any]]:
+    def compress_assistant_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int], token_threshold: int = 1000, tally: Optional[TokenTally] = None) -> List[Dict[str, Any]]:
         """Compress the assistant messages except the most recent one."""
-        uncompressed_total_token_count = token_counter(model=llm_model, messages=messages)
+        tally = tally or TokenTally(self.token_cache, messages, llm_model)
+        uncompressed_total_token_count = tally.total
         max_tokens_value = max_tokens or (100 * 1000)
         
         if uncompressed_total_token_count > max_tokens_value:
             _i = 0  # Count the number of Assistant messages
-            for msg in reversed(messages):  # Start from the end and work backwards
+            for index in range(len(messages) - 1, -1, -1):  # Start from the end and work backwards
+                msg = messages[index]
                 if msg.get('role') == 'assistant':  # Only compress Assistant messages
                     _i += 1  # Count the number of Assistant messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = tally.counts[index]  # Cached token count of the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > 1:  # If this is not the most recent Assistant message
                             message_id = msg.get('message_id')  # Get the message_id
                             if message_id:
                                 msg["content"] = self.compress_message(msg["content"], message_id, token_threshold * 3)
+                                tally.recount(index, msg)
                             else:
                                 logger.warning(f"UNEXPECTED: Message has no message_id {str(msg)[:100]}")
                         else:
                             msg["content"] = self.safe_truncate(msg["content"], int(max_tokens_value * 2))
+                            tally.recount(index, msg)
                             
         return messages
 
@@ -183,9 +293,49 @@ class ContextManager:
                 new_msg["content"] = json.dumps(msg_content_copy)
                 result.append(new_msg)
             else:
-                result.append(msg)
+                # Copy so that compression never rewrites the caller's message
+                result.append(msg.copy())
         return result
 
+    def get_model_max_tokens(self, llm_model: str) -> int:
+        """Return the prompt token budget used for compression for a model."""
+        if 'sonnet' in llm_model.lower():
+            return 200 * 1000 - 64000 - 28000
+        elif 'gpt' in llm_model.lower():
+            return 128 * 1000 - 28000
+        elif 'gemini' in llm_model.lower():
+            return 1000 * 1000 - 300000
+        elif 'deepseek' in llm_model.lower():
+            return 128 * 1000 - 28000
+        else:
+            return 41 * 1000 - 10000
+
+    def extend_compressed_messages(
+            self,
+            compressed_messages: List[Dict[str, Any]],
+            compressed_token_count: int,
+            new_messages: List[Dict[str, Any]],
+            llm_model: str
+        ) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """Append new messages to an already compressed prefix.
+
+        Only the new messages are processed. Returns None when the result would
+        exceed the model budget or the middle-out message limit, in which case
+        the caller has to run compress_messages over the full history.
+
+        Returns:
+            Tuple of (messages, token_count) or None
+        """
+        tail = self.remove_meta_messages(new_messages)
+        if len(compressed_messages) + len(tail) > MIDDLE_OUT_MAX_MESSAGES:
+            return None
+
+        token_count = compressed_token_count + self.count_tokens(tail, llm_model)
+        if token_count > self.get_model_max_tokens(llm_model):
+            return None
+
+        return compressed_messages + tail, token_count
+
     def compress_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int] = 41000, token_threshold: int = 4096, max_iterations: int = 5) -> List[Dict[str, Any]]:
         """Compress the messages.
         
@@ -197,27 +347,21 @@ class ContextManager:
             max_iterations: Maximum number of compression iterations
         """
         # Set model-specific token limits
-        if 'sonnet' in llm_model.lower():
-            max_tokens = 200 * 1000 - 64000 - 28000
-        elif 'gpt' in llm_model.lower():
-            max_tokens = 128 * 1000 - 28000
-        elif 'gemini' in llm_model.lower():
-            max_tokens = 1000 * 1000 - 300000
-        elif 'deepseek' in llm_model.lower():
-            max_tokens = 128 * 1000 - 28000
-        else:
-            max_tokens = 41 * 1000 - 10000
+        max_tokens = self.get_model_max_tokens(llm_model)
 
         result = messages
         result = self.remove_meta_messages(result)
 
-        uncompressed_total_token_count = token_counter(model=llm_model, messages=result)
+        # Per-message counts come from the cache, and every compression below
+        # adjusts the running total instead of recounting the whole list
+        tally = TokenTally(self.token_cache, result, llm_model)
+        uncompressed_total_token_count = tally.total
 
-        result = self.compress_tool_result_messages(result, llm_model, max_tokens, token_threshold)
-        result = self.compress_user_messages(result, llm_model, max_tokens, token_threshold)
-        result = self.compress_assistant_messages(result, llm_model, max_tokens, token_threshold)
+        result = self.compress_tool_result_messages(result, llm_model, max_tokens, token_threshold, tally)
+        result = self.compress_user_messages(result, llm_model, max_tokens, token_threshold, tally)
+        result = self.compress_assistant_messages(result, llm_model, max_tokens, token_threshold, tally)
 
-        compressed_token_count = token_counter(model=llm_model, messages=result)
+        compressed_token_count = tally.total
 
         logger.info(f"compress_messages: {uncompressed_total_token_count} -> {compressed_token_count}")  # Log the token compression for debugging later
 
@@ -256,7 +400,8 @@ class ContextManager:
         result = self.remove_meta_messages(result)
 
         # Early exit if no compression needed
-        initial_token_count = token_counter(model=llm_model, messages=result)
+        tally = TokenTally(self.token_cache, result, llm_model)
+        initial_token_count = tally.total
         max_allowed_tokens = max_tokens or (100 * 1000)
         
         if initial_token_count <= max_allowed_tokens:
@@ -265,10 +410,13 @@ class ContextManager:
         # Separate system message (assumed to be first) from conversation messages
         system_message = messages[0] if messages and messages[0].get('role') == 'system' else None
         conversation_messages = result[1:] if system_message else result
+        conversation_counts = tally.counts[1:] if system_message else tally.counts
         
         safety_limit = 500
         current_token_count = initial_token_count
         
+        # Removals only subtract the cached counts of the dropped messages, so the
+        # loop walks to the cut point without tokenizing anything
         while current_token_count > max_allowed_tokens and safety_limit > 0:
             safety_limit -= 1
             
@@ -281,29 +429,29 @@ class ContextManager:
                 # Remove from middle, keeping recent and early context
                 middle_start = len(conversation_messages) // 2 - (removal_batch_size // 2)
                 middle_end = middle_start + removal_batch_size
+                current_token_count -= sum(conversation_counts[middle_start:middle_end])
                 conversation_messages = conversation_messages[:middle_start] + conversation_messages[middle_end:]
+                conversation_counts = conversation_counts[:middle_start] + conversation_counts[middle_end:]
             else:
                 # Remove from earlier messages, preserving recent context
                 messages_to_remove = min(removal_batch_size, len(conversation_messages) // 2)
                 if messages_to_remove > 0:
+                    current_token_count -= sum(conversation_counts[:messages_to_remove])
                     conversation_messages = conversation_messages[messages_to_remove:]
+                    conversation_counts = conversation_counts[messages_to_remove:]
                 else:
                     # Can't remove any more messages
                     break
 
-            # Recalculate token count
-            messages_to_count = ([system_message] + conversation_messages) if system_message else conversation_messages
-            current_token_count = token_counter(model=llm_model, messages=messages_to_count)
-
         # Prepare final result
         final_messages = ([system_message] + conversation_messages) if system_message else conversation_messages
-        final_token_count = token_counter(model=llm_model, messages=final_messages)
+        final_token_count = current_token_count
         
         logger.info(f"compress_messages_by_omitting_messages: {initial_token_count} -> {final_token_count} tokens ({len(messages)} -> {len(final_messages)} messages)")
             
         return final_messages
     
-    def middle_out_messages(self, messages: List[Dict[str, Any]], max_messages: int = 320) -> List[Dict[str, Any]]:
+    def middle_out_messages(self, messages: List[Dict[str, Any]], max_messages: int = MIDDLE_OUT_MAX_MESSAGES) -> List[Dict[str, Any]]:
         """Remove messages from the middle of the list, keeping max_messages total."""
         if len(messages) <= max_messages:
             return messages
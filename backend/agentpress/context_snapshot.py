@@ -0,0 +1,91 @@
+"""
+Compressed-context snapshots for AgentPress threads.
+
+ThreadManager.run_thread rebuilds the LLM prompt on every turn, including each
+auto-continue. A snapshot keeps, per thread, the parsed LLM messages already
+loaded from the database and the compressed prompt built from them, together
+with a watermark of the last message included. The next turn only fetches the
+messages newer than the watermark and only compresses that tail.
+
+Before a snapshot is reused, one query confirms that the number of LLM messages
+up to the watermark and their latest updated_at are unchanged, so messages
+edited or deleted by any process cause a full rebuild. Snapshots live in the
+memory of the worker process; a run picked up by another worker starts with a
+full rebuild there.
+"""
+
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_SNAPSHOTS = 256
+
+
+@dataclass
+class ContextSnapshot:
+    """Compressed prompt state of a thread up to a watermark message.
+
+    Attributes:
+        thread_id: Thread the snapshot belongs to
+        llm_model: Model the compression and token counts were computed for
+        system_fingerprint: Fingerprint of the system prompt the snapshot was built with
+        last_message_id: message_id of the newest message included (the watermark)
+        last_created_at: created_at of the watermark message, used to fetch newer rows
+        row_count: Number of LLM message rows up to the watermark
+        last_updated_at: Latest updated_at of those rows
+        messages: Parsed LLM messages up to the watermark, uncompressed
+        token_count: Token count of the system prompt plus `messages`
+        compressed_messages: System prompt plus compressed messages, ready to send
+        compressed_token_count: Token count of `compressed_messages`
+    """
+    thread_id: str
+    llm_model: str
+    system_fingerprint: int
+    last_message_id: Optional[str]
+    last_created_at: Optional[str]
+    row_count: int
+    last_updated_at: Optional[str]
+    messages: List[Dict[str, Any]]
+    token_count: int
+    compressed_messages: List[Dict[str, Any]]
+    compressed_token_count: int
+
+
+class ContextSnapshotCache:
+    """Process-wide LRU of context snapshots, one per thread."""
+
+    def __init__(self, max_snapshots: int = DEFAULT_MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[str, ContextSnapshot]" = OrderedDict()
+
+    @staticmethod
+    def fingerprint(system_prompt: Dict[str, Any]) -> int:
+        """Fingerprint a system prompt so snapshots built with another prompt are not reused."""
+        return hash(json.dumps(system_prompt, sort_keys=True, default=str))
+
+    def get(self, thread_id: str, llm_model: str, system_fingerprint: int) -> Optional[ContextSnapshot]:
+        """Return the thread's snapshot if it was built for the same model and system prompt."""
+        snapshot = self._snapshots.get(thread_id)
+        if snapshot is None:
+            return None
+        if snapshot.llm_model != llm_model or snapshot.system_fingerprint != system_fingerprint:
+            return None
+        self._snapshots.move_to_end(thread_id)
+        return snapshot
+
+    def put(self, snapshot: ContextSnapshot) -> None:
+        self._snapshots[snapshot.thread_id] = snapshot
+        self._snapshots.move_to_end(snapshot.thread_id)
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+
+    def invalidate(self, thread_id: str) -> None:
+        """Drop a thread's snapshot, e.g. after its LLM messages were edited or deleted."""
+        self._snapshots.pop(thread_id, None)
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+
+default_snapshot_cache = ContextSnapshotCache()
@@ -16,6 +16,7 @@ from services.llm import make_llm_api_call
 from agentpress.tool import Tool
 from agentpress.tool_registry import ToolRegistry
 from agentpress.context_manager import ContextManager
+from agentpress.context_snapshot import ContextSnapshot, ContextSnapshotCache, default_snapshot_cache
 from agentpress.response_processor import (
     ResponseProcessor,
     ProcessorConfig
@@ -25,7 +26,6 @@ from utils.logger import logger
 from langfuse.client import StatefulGenerationClient, StatefulTraceClient
 from services.langfuse import langfuse
 import datetime
-from litellm.utils import token_counter
 
 # Type alias for tool choice
 ToolChoice = Literal["auto", "required", "none"]
@@ -64,6 +64,9 @@ class ThreadManager:
             agent_config=self.agent_config
         )
         self.context_manager = ContextManager()
+        self.snapshot_cache: ContextSnapshotCache = default_snapshot_cache
+        # thread_id -> (account_id, created_at), for billing usage as it is written
+        self._thread_billing_info: Dict[str, tuple] = {}
 
     def add_tool(self, tool_class: Type[Tool], function_names: Optional[List[str]] = None, **kwargs):
         """Add a tool to the ThreadManager."""
@@ -117,6 +120,8 @@ class ThreadManager:
             logger.info(f"Successfully added message to thread {thread_id}")
 
             if result.data and len(result.data) > 0 and isinstance(result.data[0], dict) and 'message_id' in result.data[0]:
+                if type == 'assistant_response_end':
+                    await self._record_usage(thread_id, content)
                 return result.data[0]
             else:
                 logger.error(f"Insert operation failed or did not return expected data structure for thread {thread_id}. Result data: {result.data}")
@@ -125,7 +130,47 @@ class ThreadManager:
             logger.error(f"Failed to add message to thread {thread_id}: {str(e)}", exc_info=True)
             raise
 
-    async def get_llm_messages(self, thread_id: str) -> List[Dict[str, Any]]:
+    async def delete_message(self, thread_id: str, message_id: str):
+        """Delete a message from the thread and drop the thread's context snapshot.
+
+        Args:
+            thread_id: The ID of the thread the message belongs to.
+            message_id: The ID of the message to delete.
+        """
+        client = await self.db.client
+        await client.table('messages').delete().eq('message_id', message_id).execute()
+        self.snapshot_cache.invalidate(thread_id)
+
+    async def _record_usage(self, thread_id: str, content: Any):
+        """Add the cost of a saved LLM response to the account's monthly usage counter."""
+        try:
+            from services.billing import record_usage
+
+            if not isinstance(content, dict):
+                content = content.model_dump() if hasattr(content, 'model_dump') else {}
+            usage = content.get('usage') or {}
+
+            if thread_id not in self._thread_billing_info:
+                client = await self.db.client
+                thread = await client.table('threads').select('account_id, created_at').eq('thread_id', thread_id).single().execute()
+                self._thread_billing_info[thread_id] = (
+                    thread.data['account_id'],
+                    datetime.datetime.fromisoformat(thread.data['created_at'])
+                )
+            account_id, thread_created_at = self._thread_billing_info[thread_id]
+
+            await record_usage(
+                account_id,
+                thread_created_at,
+                usage.get('prompt_tokens', 0),
+                usage.get('completion_tokens', 0),
+                content.get('model', 'unknown')
+            )
+        except Exception as e:
+            # The reconciliation job corrects counters that miss an update
+            logger.warning(f"Failed to record usage for thread {thread_id}: {str(e)}")
+
+    async def get_llm_messages(self, thread_id: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all messages for a thread.
 
         This method uses the SQL function which handles context truncation
@@ -133,62 +178,182 @@ class ThreadManager:
 
         Args:
             thread_id: The ID of the thread to get messages for.
+            since: Optional created_at watermark; only messages created at or after it are returned.
 
         Returns:
             List of message objects.
         """
-        logger.debug(f"Getting messages for thread {thread_id}")
+        try:
+            rows = await self._fetch_llm_message_rows(thread_id, since)
+            return self._parse_llm_message_rows(rows)
+        except Exception as e:
+            logger.error(f"Failed to get messages for thread {thread_id}: {str(e)}", exc_info=True)
+            return []
+
+    async def _fetch_llm_message_rows(self, thread_id: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Fetch raw LLM message rows (message_id, content, created_at, updated_at) in creation order."""
+        logger.debug(f"Getting messages for thread {thread_id}" + (f" since {since}" if since else ""))
         client = await self.db.client
 
-        try:
-            # result = await client.rpc('get_llm_formatted_messages', {'p_thread_id': thread_id}).execute()
-            
-            # Fetch messages in batches of 1000 to avoid overloading the database
-            all_messages = []
-            batch_size = 1000
-            offset = 0
-            
-            while True:
-                result = await client.table('messages').select('message_id, content').eq('thread_id', thread_id).eq('is_llm_message', True).order('created_at').range(offset, offset + batch_size - 1).execute()
-                
-                if not result.data or len(result.data) == 0:
-                    break
-                    
-                all_messages.extend(result.data)
-                
-                # If we got fewer than batch_size records, we've reached the end
-                if len(result.data) < batch_size:
-                    break
-                    
-                offset += batch_size
-            
-            # Use all_messages instead of result.data in the rest of the method
-            result_data = all_messages
-
-            # Parse the returned data which might be stringified JSON
-            if not result_data:
-                return []
-
-            # Return properly parsed JSON objects
-            messages = []
-            for item in result_data:
-                if isinstance(item['content'], str):
-                    try:
-                        parsed_item = json.loads(item['content'])
-                        parsed_item['message_id'] = item['message_id']
-                        messages.append(parsed_item)
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to parse message: {item['content']}")
-                else:
-                    content = item['content']
-                    content['message_id'] = item['message_id']
-                    messages.append(content)
+        # result = await client.rpc('get_llm_formatted_messages', {'p_thread_id': thread_id}).execute()
+
+        # Fetch messages in batches of 1000 to avoid overloading the database
+        all_messages = []
+        batch_size = 1000
+        offset = 0
+
+        while True:
+            query = client.table('messages').select('message_id, content, created_at, updated_at').eq('thread_id', thread_id).eq('is_llm_message', True)
+            if since:
+                # Rows sharing the watermark timestamp may have been committed after the
+                # previous read, so the watermark itself is included and callers de-duplicate
+                query = query.gte('created_at', since)
+            result = await query.order('created_at').range(offset, offset + batch_size - 1).execute()
+
+            if not result.data or len(result.data) == 0:
+                break
+
+            all_messages.extend(result.data)
+
+            # If we got fewer than batch_size records, we've reached the end
+            if len(result.data) < batch_size:
+                break
+
+            offset += batch_size
+
+        return all_messages
 
-            return messages
+    async def _snapshot_is_current(self, snapshot: ContextSnapshot) -> bool:
+        """Check that no LLM message up to the snapshot's watermark was edited or deleted since it was built.
 
+        A single query returns the number of rows up to the watermark and the latest
+        updated_at among them; both have to match what the snapshot was built from.
+        """
+        if snapshot.last_created_at is None:
+            return snapshot.row_count == 0
+        try:
+            client = await self.db.client
+            result = await client.table('messages').select('updated_at', count='exact') \
+                .eq('thread_id', snapshot.thread_id) \
+                .eq('is_llm_message', True) \
+                .lte('created_at', snapshot.last_created_at) \
+                .order('updated_at', desc=True) \
+                .limit(1) \
+                .execute()
         except Exception as e:
-            logger.error(f"Failed to get messages for thread {thread_id}: {str(e)}", exc_info=True)
-            return []
+            logger.warning(f"Failed to validate context snapshot of thread {snapshot.thread_id}: {str(e)}")
+            return False
+
+        last_updated_at = result.data[0]['updated_at'] if result.data else None
+        return result.count == snapshot.row_count and self._parse_timestamp(last_updated_at) == self._parse_timestamp(snapshot.last_updated_at)
+
+    @staticmethod
+    def _parse_timestamp(value: Optional[str]) -> Optional[datetime.datetime]:
+        """Parse an ISO timestamp; its string form may vary, e.g. in fractional digits."""
+        return datetime.datetime.fromisoformat(value) if value else None
+
+    def _parse_llm_message_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Parse message rows, whose content might be stringified JSON, into LLM messages."""
+        messages = []
+        for item in rows:
+            if isinstance(item['content'], str):
+                try:
+                    parsed_item = json.loads(item['content'])
+                    parsed_item['message_id'] = item['message_id']
+                    messages.append(parsed_item)
+                except json.JSONDecodeError:
+                    logger.error(f"Failed to parse message: {item['content']}")
+            else:
+                content = item['content']
+                content['message_id'] = item['message_id']
+                messages.append(content)
+
+        return messages
+
+    async def _build_context(
+        self,
+        thread_id: str,
+        system_prompt: Dict[str, Any],
+        llm_model: str
+    ) -> ContextSnapshot:
+        """Load and compress the thread history, reusing the thread's snapshot.
+
+        With a snapshot for the same model and system prompt whose messages
+        are unchanged, only messages from its watermark on are fetched, and
+        those not already in the snapshot are compressed. Otherwise, or when
+        the new messages no longer fit on top of the compressed prefix, the
+        whole history is compressed again. Either way the result becomes the
+        thread's new snapshot.
+        """
+        system_fingerprint = self.snapshot_cache.fingerprint(system_prompt)
+        snapshot = self.snapshot_cache.get(thread_id, llm_model, system_fingerprint)
+        if snapshot and not await self._snapshot_is_current(snapshot):
+            logger.debug(f"Thread {thread_id}: messages changed since the context snapshot at {snapshot.last_message_id}, rebuilding")
+            self.snapshot_cache.invalidate(thread_id)
+            snapshot = None
+
+        rows = await self._fetch_llm_message_rows(thread_id, snapshot.last_created_at if snapshot else None)
+        if snapshot:
+            known_ids = {msg.get('message_id') for msg in snapshot.messages}
+            rows = [row for row in rows if row['message_id'] not in known_ids]
+        new_messages = self._parse_llm_message_rows(rows)
+
+        if rows:
+            last_message_id, last_created_at = rows[-1]['message_id'], rows[-1]['created_at']
+        elif snapshot:
+            last_message_id, last_created_at = snapshot.last_message_id, snapshot.last_created_at
+        else:
+            last_message_id, last_created_at = None, None
+        row_count = (snapshot.row_count if snapshot else 0) + len(rows)
+        updated_ats = [row['updated_at'] for row in rows if row.get('updated_at')]
+        if snapshot and snapshot.last_updated_at:
+            updated_ats.append(snapshot.last_updated_at)
+        last_updated_at = max(updated_ats, key=self._parse_timestamp, default=None)
+
+        if snapshot:
+            logger.debug(f"Thread {thread_id}: reusing context snapshot at {snapshot.last_message_id}, {len(new_messages)} new messages")
+            messages = snapshot.messages + new_messages
+            token_count = snapshot.token_count + self.context_manager.count_tokens(new_messages, llm_model)
+            extended = self.context_manager.extend_compressed_messages(
+                snapshot.compressed_messages, snapshot.compressed_token_count, new_messages, llm_model
+            )
+        else:
+            messages = new_messages
+            token_count = self.context_manager.count_tokens([system_prompt] + messages, llm_model)
+            extended = None
+
+        if extended:
+            compressed_messages, compressed_token_count = extended
+        else:
+            compressed_messages = self.context_manager.compress_messages([system_prompt] + messages, llm_model)
+            compressed_token_count = self.context_manager.count_tokens(compressed_messages, llm_model)
+
+        snapshot = ContextSnapshot(
+            thread_id=thread_id,
+            llm_model=llm_model,
+            system_fingerprint=system_fingerprint,
+            last_message_id=last_message_id,
+            last_created_at=last_created_at,
+            row_count=row_count,
+            last_updated_at=last_updated_at,
+            messages=messages,
+            token_count=token_count,
+            compressed_messages=compressed_messages,
+            compressed_token_count=compressed_token_count,
+        )
+        self.snapshot_cache.put(snapshot)
+        return snapshot
+
+    @staticmethod
+    def _copy_for_request(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copy messages so request preparation (e.g. cache_control) can't modify the snapshot."""
+        copied = []
+        for msg in messages:
+            msg = msg.copy()
+            if isinstance(msg.get('content'), list):
+                msg['content'] = [item.copy() if isinstance(item, dict) else item for item in msg['content']]
+            copied.append(msg)
+        return copied
 
     async def run_thread(
         self,
@@ -305,42 +470,33 @@ Here are the XML tools available with examples:
                 nonlocal config
                 # Note: config is now guaranteed to exist due to check above
 
-                # 1. Get messages from thread for LLM call
-                messages = await self.get_llm_messages(thread_id)
+                # 1. Get messages from thread for LLM call and compress them
+                # Only messages newer than the thread's context snapshot are fetched and compressed
+                # Use the working_system_prompt which may contain the XML examples
+                context = await self._build_context(thread_id, working_system_prompt, llm_model)
 
                 # 2. Check token count before proceeding
-                token_count = 0
-                try:
-                    # Use the potentially modified working_system_prompt for token counting
-                    token_count = token_counter(model=llm_model, messages=[working_system_prompt] + messages)
-                    token_threshold = self.context_manager.token_threshold
-                    logger.info(f"Thread {thread_id} token count: {token_count}/{token_threshold} ({(token_count/token_threshold)*100:.1f}%)")
-
-                except Exception as e:
-                    logger.error(f"Error counting tokens or summarizing: {str(e)}")
+                token_count = context.token_count
+                token_threshold = self.context_manager.token_threshold
+                logger.info(f"Thread {thread_id} token count: {token_count}/{token_threshold} ({(token_count/token_threshold)*100:.1f}%)")
 
                 # 3. Prepare messages for LLM call + add temporary message if it exists
-                # Use the working_system_prompt which may contain the XML examples
-                prepared_messages = [working_system_prompt]
+                prepared_messages = self._copy_for_request(context.compressed_messages)
 
                 # Find the last user message index
                 last_user_index = -1
-                for i, msg in enumerate(messages):
+                for i, msg in enumerate(prepared_messages):
                     if msg.get('role') == 'user':
                         last_user_index = i
 
                 # Insert temporary message before the last user message if it exists
                 if temp_msg and last_user_index >= 0:
-                    prepared_messages.extend(messages[:last_user_index])
-                    prepared_messages.append(temp_msg)
-                    prepared_messages.extend(messages[last_user_index:])
+                    prepared_messages.insert(last_user_index, temp_msg)
                     logger.debug("Added temporary message before the last user message")
-                else:
-                    # If no user message or no temporary message, just add all messages
-                    prepared_messages.extend(messages)
-                    if temp_msg:
-                        prepared_messages.append(temp_msg)
-                        logger.debug("Added temporary message to the end of prepared messages")
+                elif temp_msg:
+                    # If no user message, add it to the end
+                    prepared_messages.append(temp_msg)
+                    logger.debug("Added temporary message to the end of prepared messages")
 
                 # 4. Prepare tools for LLM call
                 openapi_tool_schemas = None
@@ -348,8 +504,6 @@ Here are the XML tools available with examples:
                     openapi_tool_schemas = self.tool_registry.get_openapi_schemas()
                     logger.debug(f"Retrieved {len(openapi_tool_schemas) if openapi_tool_schemas else 0} OpenAPI tool schemas")
 
-                prepared_messages = self.context_manager.compress_messages(prepared_messages, llm_model)
-
                 # 5. Make LLM API call
                 logger.debug("Making LLM API call")
                 try:
@@ -0,0 +1,235 @@
+"""
+Incremental XML tool call scanner for streaming responses.
+
+The scanner is fed content deltas as they arrive from the LLM and keeps its
+cursor between calls, so every character of the stream is inspected a bounded
+number of times regardless of how long the assistant turn gets. It recognises
+the Cursor-style format (<function_calls>/<invoke>/<parameter>) as well as the
+legacy per-tool tags registered in the ToolRegistry, and emits every completed
+tool call exactly once.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Pattern, Tuple
+
+
+@dataclass
+class XMLStreamChunk:
+    """A completed tool call found in the stream.
+
+    Attributes:
+        xml: Self-contained XML for the call, ready for ResponseProcessor._parse_xml_tool_call
+        raw: The exact text of the call as it appeared in the stream
+        closing: Text needed to close the enclosing block if the content is cut right after `raw`
+    """
+    xml: str
+    raw: str
+    closing: str = ""
+
+
+class XMLStreamScanner:
+    """
+    Resumable scanner for XML tool calls in streamed content.
+
+    States:
+        outside       - plain text, looking for <function_calls> or a legacy tag
+        function_calls - inside a <function_calls> block, looking for <invoke>
+        invoke        - inside an <invoke>, looking for <parameter> or </invoke>
+        parameter     - inside a <parameter>, looking for </parameter>
+        legacy        - inside a legacy tool tag, tracking nesting of the same tag
+
+    Only the text of the call currently being captured is retained; everything
+    the scanner has moved past is dropped, so memory stays bounded by the size
+    of a single tool call.
+    """
+
+    OUTSIDE = "outside"
+    FUNCTION_CALLS = "function_calls"
+    INVOKE = "invoke"
+    PARAMETER = "parameter"
+    LEGACY = "legacy"
+
+    FUNCTION_CALLS_OPEN = re.compile(r'<function_calls>')
+    FUNCTION_CALLS_CLOSE = re.compile(r'</function_calls>')
+    INVOKE_OPEN = re.compile(r'<invoke(?=[\s>])')
+    INVOKE_CLOSE = re.compile(r'</invoke>')
+    PARAMETER_OPEN = re.compile(r'<parameter(?=[\s>])')
+    PARAMETER_CLOSE = re.compile(r'</parameter>')
+
+    # Longest literal that a pattern above can match, including the lookahead character
+    _TOKEN_HOLD = len('</function_calls>')
+
+    def __init__(self, legacy_tags: Optional[Iterable[str]] = None):
+        """
+        Initialize the scanner.
+
+        Args:
+            legacy_tags: XML tag names of legacy tools (e.g. ToolRegistry.xml_tools keys).
+                         Tags of the Cursor-style format itself are ignored.
+        """
+        tags = sorted(
+            {tag for tag in (legacy_tags or []) if tag not in ('function_calls', 'invoke', 'parameter')},
+            key=len,
+            reverse=True,
+        )
+        self._legacy_open: Optional[Pattern[str]] = (
+            re.compile('<(' + '|'.join(re.escape(tag) for tag in tags) + r')(?=[\s>/])')
+            if tags else None
+        )
+        self._hold = max([self._TOKEN_HOLD] + [len(tag) + 3 for tag in tags])
+
+        self._state = self.OUTSIDE
+        self._buffer = ""
+        self._cursor = 0
+        self._capture_start: Optional[int] = None
+        self._captured: List[str] = []
+        self._legacy_tag: Optional[str] = None
+        self._legacy_open_tag: Optional[Pattern[str]] = None
+        self._legacy_close_tag: Optional[Pattern[str]] = None
+        self._legacy_depth = 0
+
+    @property
+    def state(self) -> str:
+        """Current scanner state."""
+        return self._state
+
+    def feed(self, text: str) -> List[XMLStreamChunk]:
+        """
+        Consume a content delta and return the tool calls it completed.
+
+        Args:
+            text: The next piece of streamed content
+
+        Returns:
+            Completed tool calls, in stream order
+        """
+        if not text:
+            return []
+
+        self._buffer += text
+        chunks: List[XMLStreamChunk] = []
+        while self._step(chunks):
+            pass
+        self._compact()
+        return chunks
+
+    def _find_first(self, patterns: List[Tuple[str, Pattern[str]]]) -> Optional[Tuple[str, re.Match]]:
+        """Find the earliest match of any pattern at or after the cursor.
+
+        When nothing matches, the cursor advances to just before the tail that
+        could still hold the start of a token split across deltas.
+        """
+        best: Optional[Tuple[str, re.Match]] = None
+        for name, pattern in patterns:
+            match = pattern.search(self._buffer, self._cursor)
+            if match and (best is None or match.start() < best[1].start()):
+                best = (name, match)
+
+        if best is None:
+            self._cursor = max(self._cursor, len(self._buffer) - self._hold)
+        return best
+
+    def _step(self, chunks: List[XMLStreamChunk]) -> bool:
+        """Advance the state machine by one token. Returns False when more input is needed."""
+        if self._state == self.OUTSIDE:
+            patterns = [(self.FUNCTION_CALLS, self.FUNCTION_CALLS_OPEN)]
+            if self._legacy_open:
+                patterns.append((self.LEGACY, self._legacy_open))
+            found = self._find_first(patterns)
+            if not found:
+                return False
+            name, match = found
+            if name == self.FUNCTION_CALLS:
+                self._state = self.FUNCTION_CALLS
+            else:
+                tag = match.group(1)
+                self._state = self.LEGACY
+                self._legacy_tag = tag
+                self._legacy_open_tag = re.compile('<' + re.escape(tag) + r'(?=[\s>/])')
+                self._legacy_close_tag = re.compile('</' + re.escape(tag) + '>')
+                self._legacy_depth = 1
+                self._capture_start = match.start()
+            self._cursor = match.end()
+            return True
+
+        if self._state == self.FUNCTION_CALLS:
+            found = self._find_first([
+                (self.INVOKE, self.INVOKE_OPEN),
+                (self.OUTSIDE, self.FUNCTION_CALLS_CLOSE),
+            ])
+            if not found:
+                return False
+            name, match = found
+            if name == self.INVOKE:
+                self._capture_start = match.start()
+            self._state = name
+            self._cursor = match.end()
+            return True
+
+        if self._state == self.INVOKE:
+            found = self._find_first([
+                (self.PARAMETER, self.PARAMETER_OPEN),
+                (self.FUNCTION_CALLS, self.INVOKE_CLOSE),
+            ])
+            if not found:
+                return False
+            name, match = found
+            self._state = name
+            self._cursor = match.end()
+            if name == self.FUNCTION_CALLS:
+                raw = self._take_capture(match.end())
+                chunks.append(XMLStreamChunk(
+                    xml=f"<function_calls>\n{raw}\n</function_calls>",
+                    raw=raw,
+                    closing="\n</function_calls>",
+                ))
+            return True
+
+        if self._state == self.PARAMETER:
+            found = self._find_first([(self.INVOKE, self.PARAMETER_CLOSE)])
+            if not found:
+                return False
+            self._state = self.INVOKE
+            self._cursor = found[1].end()
+            return True
+
+        # LEGACY
+        found = self._find_first([
+            ("open", self._legacy_open_tag),
+            ("close", self._legacy_close_tag),
+        ])
+        if not found:
+            return False
+        name, match = found
+        self._cursor = match.end()
+        if name == "open":
+            self._legacy_depth += 1
+            return True
+
+        self._legacy_depth -= 1
+        if self._legacy_depth == 0:
+            raw = self._take_capture(match.end())
+            chunks.append(XMLStreamChunk(xml=raw, raw=raw))
+            self._state = self.OUTSIDE
+            self._legacy_tag = None
+            self._legacy_open_tag = None
+            self._legacy_close_tag = None
+        return True
+
+    def _take_capture(self, end: int) -> str:
+        """Return the captured call text up to `end` and stop capturing."""
+        raw = "".join(self._captured) + self._buffer[self._capture_start:end]
+        self._captured = []
+        self._capture_start = None
+        return raw
+
+    def _compact(self) -> None:
+        """Drop scanned text, keeping only what an open capture still needs."""
+        if self._cursor == 0:
+            return
+        if self._capture_start is not None:
+            self._captured.append(self._buffer[self._capture_start:self._cursor])
+            self._capture_start = 0
+        self._buffer = self._buffer[self._cursor:]
+        self._cursor = 0
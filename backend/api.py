@@ -81,6 +81,11 @@ async def lifespan(app: FastAPI):
         
         # Initialize triggers API
         triggers_api.initialize(db)
+        triggers_api.start_cron_scheduler()
+
+        # Periodically correct drift in the monthly usage counters used by billing checks
+        from run_agent_background import reconcile_billing_usage
+        billing_api.start_usage_reconciliation(reconcile_billing_usage.send)
         
         # Initialize workflows API (part of triggers module)
         from triggers.endpoints.workflows import set_db_connection
@@ -99,6 +104,13 @@ async def lifespan(app: FastAPI):
         logger.info("Cleaning up agent resources")
         await agent_api.cleanup()
         
+        await triggers_api.stop_cron_scheduler()
+        await billing_api.stop_usage_reconciliation()
+        
+        # Stop the feature flag refresher and change listener before Redis goes away
+        from flags.flags import close_flag_manager
+        await close_flag_manager()
+        
         # Clean up Redis connection
         try:
             logger.info("Closing Redis connection")
@@ -0,0 +1,145 @@
+"""
+Benchmark for MCP tool call latency with and without pooled sessions.
+
+Starts a local streamable-HTTP MCP server with an `echo` tool and measures the
+latency of MCPManager.execute_tool:
+
+    per-call  - a new streamablehttp_client + ClientSession + initialize() for
+                every call (the previous MCPManager behaviour)
+    pooled    - calls reuse the session opened by connect_server
+
+Every HTTP request to the local server is delayed by --latency-ms to stand in
+for the network round trip to a hosted MCP server.
+
+Usage:
+    python benchmarks/mcp_session_pool_benchmark.py [--calls 50] [--latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("LOGGING_LEVEL", "WARNING")
+logging.basicConfig(level=logging.WARNING)
+
+import uvicorn  # noqa: E402
+from mcp import ClientSession  # noqa: E402
+from mcp.client.streamable_http import streamablehttp_client  # noqa: E402
+from mcp.server.fastmcp import FastMCP  # noqa: E402
+
+from mcp_service.client import MCPManager  # noqa: E402
+from mcp_service.mcp_providers import MCPProviderFactory  # noqa: E402
+from mcp_service.session_pool import MCPSessionPool  # noqa: E402
+
+QUALIFIED_NAME = "local"
+
+
+class DelayMiddleware:
+    """Delays every HTTP request, standing in for network latency."""
+
+    def __init__(self, app, delay: float):
+        self.app = app
+        self.delay = delay
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.delay:
+            await asyncio.sleep(self.delay)
+        await self.app(scope, receive, send)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, latency: float) -> uvicorn.Server:
+    server = FastMCP("benchmark")
+
+    @server.tool()
+    def echo(text: str) -> str:
+        """Return the text unchanged."""
+        return text
+
+    app = DelayMiddleware(server.streamable_http_app(), latency)
+    uvicorn_server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=uvicorn_server.run, daemon=True).start()
+    while not uvicorn_server.started:
+        time.sleep(0.05)
+    return uvicorn_server
+
+
+def register_local_provider(url: str) -> None:
+    class LocalProvider:
+        def get_server_url(self, qualified_name: str, config: Dict[str, Any]) -> str:
+            return url
+
+        def get_headers(self, qualified_name: str, config: Dict[str, Any], external_user_id: Optional[str] = None) -> Dict[str, str]:
+            return {}
+
+    MCPProviderFactory._providers[QUALIFIED_NAME] = LocalProvider
+
+
+async def call_per_session(url: str, arguments: Dict[str, Any]) -> None:
+    """The previous execute_tool: a full connection and handshake per call."""
+    async with streamablehttp_client(url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            await session.call_tool("echo", arguments)
+
+
+def report(label: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    print(f"{label:<9} p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms  "
+          f"mean {statistics.mean(latencies) * 1000:7.1f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50, help="Tool calls per mode")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Delay added to every HTTP request")
+    args = parser.parse_args()
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    server = start_server(port, args.latency_ms / 1000)
+    register_local_provider(url)
+    arguments = {"text": "hello"}
+
+    print(f"{args.calls} calls, {args.latency_ms:.0f} ms added per HTTP request")
+
+    latencies = []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        await call_per_session(url, arguments)
+        latencies.append(time.perf_counter() - start)
+    report("per-call", latencies)
+
+    pool = MCPSessionPool()
+    manager = MCPManager(session_pool=pool)
+    await manager.connect_server({"qualifiedName": QUALIFIED_NAME, "name": "Local", "provider": QUALIFIED_NAME})
+    latencies = []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        result = await manager.execute_tool(f"mcp_{QUALIFIED_NAME}_echo", arguments)
+        latencies.append(time.perf_counter() - start)
+        assert not result["isError"], result
+    report("pooled", latencies)
+
+    await manager.disconnect_all(close_sessions=True)
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""
+Benchmark for the agent response transports.
+
+Simulates one agent run written by BatchedResponseWriter and read by several
+SSE clients, once with the list + pub/sub transport and once with Redis
+Streams. Readers follow the same protocol as stream_agent_run. Halfway through
+the run each reader disconnects and reconnects: list readers replay the whole
+list, stream readers resume from their last entry ID.
+
+Runs against fakeredis by default, or a real server with --redis-url.
+
+Usage:
+    python benchmarks/response_transport_benchmark.py [--responses 2000] [--readers 10]
+    python benchmarks/response_transport_benchmark.py --redis-url redis://localhost:6379/0
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services import redis  # noqa: E402
+from services import response_transport  # noqa: E402
+
+FINAL_STATUSES = ('completed', 'failed', 'stopped', 'error')
+
+
+class ReaderStats:
+    def __init__(self):
+        self.received = 0
+        self.latencies: List[float] = []
+
+
+def is_final(response: Dict) -> bool:
+    return response.get('type') == 'status' and response.get('status') in FINAL_STATUSES
+
+
+async def list_reader(agent_run_id: str, stats: ReaderStats, reconnect_after: int) -> None:
+    """LRANGE on connect, then LRANGE from the last index on every "new" notification."""
+    key = response_transport.response_list_key(agent_run_id)
+    channel = response_transport.response_channel(agent_run_id)
+    reconnected = False
+    while True:
+        pubsub = await redis.create_pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            seen = 0
+            fetch = await redis.lrange(key, 0, -1)
+            while True:
+                for raw in fetch:
+                    response = json.loads(raw)
+                    stats.received += 1
+                    stats.latencies.append(time.perf_counter() - response['sent_at'])
+                    if is_final(response):
+                        return
+                seen += len(fetch)
+                if not reconnected and seen >= reconnect_after:
+                    reconnected = True
+                    break
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                fetch = await redis.lrange(key, seen, -1) if message else []
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+
+async def stream_reader(agent_run_id: str, stats: ReaderStats, reconnect_after: int) -> None:
+    """Blocking XREAD from the last entry ID; reconnecting resumes from it."""
+    last_id = response_transport.STREAM_START_ID
+    seen = 0
+    reconnected = False
+    while True:
+        entries = await response_transport.read_stream_responses(agent_run_id, last_id, block_ms=1000)
+        for entry_id, response in entries:
+            last_id = entry_id
+            stats.received += 1
+            stats.latencies.append(time.perf_counter() - response['sent_at'])
+            if is_final(response):
+                return
+        seen += len(entries)
+        if not reconnected and seen >= reconnect_after:
+            # A reconnecting client only sends its Last-Event-ID; nothing is replayed
+            reconnected = True
+
+
+async def produce(agent_run_id: str, responses: int, interval: float) -> None:
+    writer = response_transport.create_response_writer(agent_run_id)
+    writer.start()
+    for i in range(responses):
+        await writer.write({'type': 'assistant', 'content': f'chunk {i} ' + 'x' * 40, 'sent_at': time.perf_counter()})
+        if interval:
+            await asyncio.sleep(interval)
+    await writer.write({'type': 'status', 'status': 'completed', 'sent_at': time.perf_counter()})
+    await writer.close()
+
+
+async def run_transport(transport: str, args: argparse.Namespace) -> None:
+    response_transport.RESPONSE_TRANSPORT = transport
+    agent_run_id = str(uuid.uuid4())
+    reader = stream_reader if transport == response_transport.STREAMS_TRANSPORT else list_reader
+    stats = [ReaderStats() for _ in range(args.readers)]
+
+    start = time.perf_counter()
+    readers = [asyncio.create_task(reader(agent_run_id, s, args.responses // 2)) for s in stats]
+    await asyncio.sleep(0.05)  # let readers connect before the run starts
+    await produce(agent_run_id, args.responses, args.interval)
+    await asyncio.wait_for(asyncio.gather(*readers), timeout=120)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for s in stats for latency in s.latencies)
+    received = sum(s.received for s in stats)
+    expected = (args.responses + 1) * args.readers
+    print(f"{transport:<8} {elapsed * 1000:9.1f} ms  "
+          f"received {received:7d} ({received / expected:4.2f}x of run)  "
+          f"latency p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f} ms")
+
+    await response_transport.delete_responses(agent_run_id)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--responses", type=int, default=2000, help="Responses written by the agent run")
+    parser.add_argument("--readers", type=int, default=10, help="Concurrent SSE clients")
+    parser.add_argument("--interval", type=float, default=0.0005, help="Seconds between responses")
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis server instead of fakeredis")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        import redis.asyncio as redis_asyncio
+        redis.client = redis_asyncio.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis
+        redis.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    redis._initialized = True
+
+    print(f"{args.responses} responses, {args.readers} readers, each reconnecting halfway")
+    await run_transport(response_transport.LIST_TRANSPORT, args)
+    await run_transport(response_transport.STREAMS_TRANSPORT, args)
+    await redis.client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,204 @@
+"""
+Benchmark for SandboxFilesTool file transfers.
+
+Runs SandboxFilesTool against a stand-in sandbox backed by a local temporary
+directory. Every filesystem or process call is delayed by --latency-ms plus
+the time to move its payload at --bandwidth-mbps, standing in for the Daytona
+toolbox API. Measures:
+
+    str_replace      - repeated edits of one large file, previously a full
+                       download and a full upload per edit
+    workspace state  - get_workspace_state over many files, previously one
+                       download after the other
+
+Usage:
+    python benchmarks/sandbox_files_benchmark.py [--file-kb 512] [--edits 20] [--files 50]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("LOGGING_LEVEL", "WARNING")
+
+from agent.tools.sb_files_tool import SandboxFilesTool  # noqa: E402
+from sandbox.file_cache import file_cache  # noqa: E402
+from sandbox.tool_base import SandboxToolsBase  # noqa: E402
+
+WORKSPACE = "/workspace"
+
+
+class LocalSandbox:
+    """The parts of AsyncSandbox used by SandboxFilesTool, on a local directory."""
+
+    def __init__(self, root: str, latency: float, bandwidth: float):
+        self.id = "local-sandbox"
+        self.root = root
+        self.latency = latency
+        self.bandwidth = bandwidth  # bytes per second
+        self.calls = 0
+        self.bytes_transferred = 0
+        self.fs = SimpleNamespace(
+            list_files=self.list_files,
+            get_file_info=self.get_file_info,
+            download_file=self.download_file,
+            upload_file=self.upload_file,
+            set_file_permissions=self.set_file_permissions,
+            create_folder=self.create_folder,
+            delete_file=self.delete_file,
+        )
+        self.process = SimpleNamespace(exec=self.exec)
+
+    def _local(self, path: str) -> str:
+        return os.path.join(self.root, path.lstrip("/"))
+
+    async def _transfer(self, size: int = 0) -> None:
+        self.calls += 1
+        self.bytes_transferred += size
+        await asyncio.sleep(self.latency + size / self.bandwidth)
+
+    def _info(self, path: str) -> SimpleNamespace:
+        stat = os.stat(path)
+        return SimpleNamespace(
+            name=os.path.basename(path), is_dir=os.path.isdir(path), size=stat.st_size, mod_time=str(stat.st_mtime_ns)
+        )
+
+    async def list_files(self, path: str) -> List[SimpleNamespace]:
+        await self._transfer()
+        local = self._local(path)
+        return [self._info(os.path.join(local, name)) for name in sorted(os.listdir(local))]
+
+    async def get_file_info(self, path: str) -> SimpleNamespace:
+        await self._transfer()
+        return self._info(self._local(path))
+
+    async def download_file(self, path: str) -> bytes:
+        with open(self._local(path), "rb") as f:
+            data = f.read()
+        await self._transfer(len(data))
+        return data
+
+    async def upload_file(self, data: bytes, path: str) -> None:
+        await self._transfer(len(data))
+        with open(self._local(path), "wb") as f:
+            f.write(data)
+
+    async def set_file_permissions(self, path: str, mode: str) -> None:
+        await self._transfer()
+
+    async def create_folder(self, path: str, mode: str) -> None:
+        await self._transfer()
+        os.makedirs(self._local(path), exist_ok=True)
+
+    async def delete_file(self, path: str) -> None:
+        await self._transfer()
+        os.remove(self._local(path))
+
+    async def exec(self, command: str, timeout: int = None) -> SimpleNamespace:
+        await self._transfer(len(command))
+        command = command.replace(f" {WORKSPACE}/", f" {self._local(WORKSPACE)}/")
+        result = subprocess.run(["sh", "-c", command], capture_output=True, text=True, timeout=timeout)
+        return SimpleNamespace(exit_code=result.returncode, result=result.stdout + result.stderr)
+
+
+class LocalFilesTool(SandboxFilesTool):
+    def __init__(self, sandbox: LocalSandbox):
+        SandboxToolsBase.__init__(self, "benchmark-project")
+        self.SNIPPET_LINES = 4
+        self._sandbox = sandbox
+        self._sandbox_id = sandbox.id
+
+    async def _ensure_sandbox(self):
+        return self._sandbox
+
+
+def make_file(size: int, seed: int) -> str:
+    lines, total = [], 0
+    while total < size:
+        line = f"value_{seed}_{len(lines)} = compute({len(lines)})  # line {len(lines)}"
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def report(label: str, seconds: float, sandbox: LocalSandbox, calls_before: int, bytes_before: int) -> None:
+    print(f"{label:<28} {seconds * 1000:8.1f} ms  {sandbox.calls - calls_before:5d} calls  "
+          f"{(sandbox.bytes_transferred - bytes_before) / 1024:9.1f} KiB")
+
+
+async def timed(label: str, sandbox: LocalSandbox, operation) -> None:
+    calls, transferred = sandbox.calls, sandbox.bytes_transferred
+    start = time.perf_counter()
+    await operation()
+    report(label, time.perf_counter() - start, sandbox, calls, transferred)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file-kb", type=int, default=512, help="Size of the edited file")
+    parser.add_argument("--edits", type=int, default=20, help="str_replace calls on the edited file")
+    parser.add_argument("--files", type=int, default=50, help="Files in the workspace snapshot")
+    parser.add_argument("--snapshot-file-kb", type=int, default=32, help="Size of each snapshot file")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Delay added to every sandbox call")
+    parser.add_argument("--bandwidth-mbps", type=float, default=80, help="Transfer rate to the sandbox")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="sandbox-files-benchmark-")
+    try:
+        sandbox = LocalSandbox(root, args.latency_ms / 1000, args.bandwidth_mbps * 1e6 / 8)
+        tool = LocalFilesTool(sandbox)
+        os.makedirs(sandbox._local(WORKSPACE))
+        print(f"{args.latency_ms:.0f} ms per call, {args.bandwidth_mbps:.0f} Mbit/s\n")
+
+        path = f"{WORKSPACE}/large.py"
+        with open(sandbox._local(path), "w") as f:
+            f.write(make_file(args.file_kb * 1024, 0))
+
+        async def edit_by_upload():
+            # The previous str_replace: download, replace, upload
+            for i in range(args.edits):
+                await sandbox.fs.get_file_info(path)
+                content = (await sandbox.fs.download_file(path)).decode()
+                content = content.replace(f"compute({i})  #", f"compute_v1({i})  #", 1)
+                await sandbox.fs.upload_file(content.encode(), path)
+
+        async def edit_by_delta():
+            for i in range(args.edits):
+                result = await tool.str_replace("large.py", f"compute_v1({i})  #", f"compute_v2({i})  #")
+                assert result.success, result.output
+
+        print(f"str_replace x{args.edits} on a {args.file_kb} KiB file")
+        await timed("  download + upload", sandbox, edit_by_upload)
+        await timed("  cached + in-sandbox delta", sandbox, edit_by_delta)
+
+        os.remove(sandbox._local(path))
+        for i in range(args.files):
+            with open(sandbox._local(f"{WORKSPACE}/module_{i}.py"), "w") as f:
+                f.write(make_file(args.snapshot_file_kb * 1024, i))
+
+        async def serial_snapshot():
+            files = await sandbox.fs.list_files(WORKSPACE)
+            for file_info in files:
+                (await sandbox.fs.download_file(f"{WORKSPACE}/{file_info.name}")).decode()
+
+        file_cache.invalidate(sandbox.id)
+        print(f"\nget_workspace_state over {args.files} files of {args.snapshot_file_kb} KiB")
+        await timed("  serial downloads", sandbox, serial_snapshot)
+        await timed("  concurrent, cold cache", sandbox, tool.get_workspace_state)
+        await timed("  concurrent, warm cache", sandbox, tool.get_workspace_state)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+Micro-benchmark for streaming XML tool call detection.
+
+Replays the recorded assistant responses in agent/sample_responses as
+multi-thousand-chunk streams and compares the incremental XMLStreamScanner
+with the previous approach of re-running chunk extraction over the whole
+pending buffer on every delta.
+
+Usage:
+    python benchmarks/xml_stream_scanner_benchmark.py [--repeat 8] [--chunk-size 4]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from agentpress.xml_stream_scanner import XMLStreamScanner  # noqa: E402
+
+SAMPLE_RESPONSES = BACKEND_DIR / "agent" / "sample_responses"
+
+# Legacy tags registered by the default tool set (message + browser tools)
+LEGACY_TAGS = [
+    "ask", "complete", "web-browser-takeover", "browser-navigate-to",
+    "browser-click-element", "browser-input-text", "browser-send-keys",
+    "browser-switch-tab", "browser-close-tab", "browser-scroll-down",
+    "browser-scroll-up", "browser-drag-drop", "browser-click-coordinates",
+]
+
+
+def rescan_extract_xml_chunks(content: str, legacy_tags: Iterable[str]) -> List[str]:
+    """Copy of the pre-scanner ResponseProcessor._extract_xml_chunks."""
+    chunks = []
+    pos = 0
+    while pos < len(content):
+        start_pos = content.find('<function_calls>', pos)
+        if start_pos == -1:
+            break
+        end_pos = content.find('</function_calls>', start_pos)
+        if end_pos == -1:
+            break
+        chunk_end = end_pos + len('</function_calls>')
+        chunks.append(content[start_pos:chunk_end])
+        pos = chunk_end
+
+    if not chunks:
+        pos = 0
+        while pos < len(content):
+            next_tag_start = -1
+            current_tag = None
+            for tag_name in legacy_tags:
+                tag_pos = content.find(f'<{tag_name}', pos)
+                if tag_pos != -1 and (next_tag_start == -1 or tag_pos < next_tag_start):
+                    next_tag_start = tag_pos
+                    current_tag = tag_name
+            if next_tag_start == -1 or not current_tag:
+                break
+            end_pattern = f'</{current_tag}>'
+            depth = 0
+            current_pos = next_tag_start
+            while current_pos < len(content):
+                next_start = content.find(f'<{current_tag}', current_pos + 1)
+                next_end = content.find(end_pattern, current_pos)
+                if next_end == -1:
+                    break
+                if next_start != -1 and next_start < next_end:
+                    depth += 1
+                    current_pos = next_start + 1
+                else:
+                    if not depth:
+                        chunk_end = next_end + len(end_pattern)
+                        chunks.append(content[next_tag_start:chunk_end])
+                        pos = chunk_end
+                        break
+                    depth -= 1
+                    current_pos = next_end + 1
+            if current_pos >= len(content):
+                break
+            pos = max(pos + 1, current_pos)
+    return chunks
+
+
+def replay_rescan(deltas: List[str]) -> int:
+    found = 0
+    buffer = ""
+    for delta in deltas:
+        buffer += delta
+        for chunk in rescan_extract_xml_chunks(buffer, LEGACY_TAGS):
+            buffer = buffer.replace(chunk, "", 1)
+            found += 1
+    return found
+
+
+def replay_scanner(deltas: List[str]) -> int:
+    scanner = XMLStreamScanner(LEGACY_TAGS)
+    found = 0
+    for delta in deltas:
+        found += len(scanner.feed(delta))
+    return found
+
+
+def record_stream(repeat: int, chunk_size: int, seed: int) -> List[str]:
+    """Split the recorded responses into token-sized deltas."""
+    content = "".join(
+        path.read_text(encoding="utf-8") for path in sorted(SAMPLE_RESPONSES.glob("*.txt"))
+    ) * repeat
+    rng = random.Random(seed)
+    deltas, pos = [], 0
+    while pos < len(content):
+        step = rng.randint(1, chunk_size * 2)
+        deltas.append(content[pos:pos + step])
+        pos += step
+    return deltas
+
+
+def timed(label: str, fn: Callable[[List[str]], int], deltas: List[str]) -> float:
+    start = time.perf_counter()
+    found = fn(deltas)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed * 1000:10.1f} ms  {found:6d} tool calls  "
+          f"{len(deltas) / elapsed:12.0f} deltas/s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=8, help="How many times to concatenate the recordings")
+    parser.add_argument("--chunk-size", type=int, default=4, help="Average delta size in characters")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    deltas = record_stream(args.repeat, args.chunk_size, args.seed)
+    print(f"Replaying {len(deltas)} deltas ({sum(map(len, deltas))} characters)")
+
+    rescan = timed("rescan", replay_rescan, deltas)
+    scanner = timed("scanner", replay_scanner, deltas)
+    print(f"speedup    {rescan / scanner:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
+import asyncio
 import json
 import logging
 import os
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
 import sys
@@ -10,11 +12,24 @@ from services import redis
 
 logger = logging.getLogger(__name__)
 
+# is_enabled reads an in-process snapshot of all flags. The snapshot is reloaded
+# in the background every FEATURE_FLAG_MAX_STALENESS seconds and right away when
+# set_flag/delete_flag publish a change on FEATURE_FLAG_CHANGES_CHANNEL. If
+# Redis is unavailable the last snapshot keeps being served.
+FEATURE_FLAG_MAX_STALENESS = float(os.getenv("FEATURE_FLAG_MAX_STALENESS", 30))
+FEATURE_FLAG_CHANGES_CHANNEL = "feature_flags:changes"
+
 class FeatureFlagManager:
-    def __init__(self):
+    def __init__(self, max_staleness: float = FEATURE_FLAG_MAX_STALENESS):
         """Initialize with existing Redis service"""
         self.flag_prefix = "feature_flag:"
         self.flag_list_key = "feature_flags:list"
+        self.max_staleness = max_staleness
+        self._snapshot: Optional[Dict[str, bool]] = None
+        self._snapshot_loaded_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
     
     async def set_flag(self, key: str, enabled: bool, description: str = "") -> bool:
         """Set a feature flag to enabled or disabled"""
@@ -30,6 +45,7 @@ class FeatureFlagManager:
             redis_client = await redis.get_client()
             await redis_client.hset(flag_key, mapping=flag_data)
             await redis_client.sadd(self.flag_list_key, key)
+            await self._publish_change(key, enabled)
             
             logger.info(f"Set feature flag {key} to {enabled}")
             return True
@@ -39,15 +55,97 @@ class FeatureFlagManager:
     
     async def is_enabled(self, key: str) -> bool:
         """Check if a feature flag is enabled"""
+        self._ensure_background_tasks()
+        if self._snapshot is None or time.monotonic() - self._snapshot_loaded_at > self.max_staleness:
+            # Only the first lookup, or one after the background refresh fell behind, waits on Redis
+            await self.refresh()
+        # Return False by default if Redis has been unavailable since startup
+        return (self._snapshot or {}).get(key, False)
+    
+    async def refresh(self) -> None:
+        """Reload the flag snapshot from Redis; concurrent callers share one reload"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._load_snapshot())
+        await asyncio.shield(self._refresh_task)
+    
+    async def _load_snapshot(self) -> None:
         try:
-            flag_key = f"{self.flag_prefix}{key}"
             redis_client = await redis.get_client()
-            enabled = await redis_client.hget(flag_key, 'enabled')
-            return enabled == 'true' if enabled else False
+            keys = list(await redis_client.smembers(self.flag_list_key))
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.hget(f"{self.flag_prefix}{key}", 'enabled')
+                values = await pipe.execute()
+            self._snapshot = {key: value == 'true' for key, value in zip(keys, values)}
         except Exception as e:
-            logger.error(f"Failed to check feature flag {key}: {e}")
-            # Return False by default if Redis is unavailable
-            return False
+            logger.error(f"Failed to refresh feature flags: {e}")
+            if self._snapshot is None:
+                self._snapshot = {}
+        # Also on failure, so that a Redis outage doesn't make every lookup wait on it
+        self._snapshot_loaded_at = time.monotonic()
+    
+    async def _publish_change(self, key: str, enabled: Optional[bool]) -> None:
+        if self._snapshot is not None:
+            if enabled is None:
+                self._snapshot.pop(key, None)
+            else:
+                self._snapshot[key] = enabled
+        try:
+            await redis.publish(FEATURE_FLAG_CHANGES_CHANNEL, key)
+        except Exception as e:
+            logger.warning(f"Failed to publish feature flag change for {key}: {e}")
+    
+    def _ensure_background_tasks(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Tasks of a previous event loop can't be used from this one
+            self._loop = loop
+            self._refresh_task = None
+            self._background_tasks = []
+        if self._background_tasks and not any(task.done() for task in self._background_tasks):
+            return
+        for task in self._background_tasks:
+            task.cancel()
+        self._background_tasks = [
+            asyncio.create_task(self._refresh_periodically(), name="feature-flag-refresh"),
+            asyncio.create_task(self._listen_for_changes(), name="feature-flag-changes"),
+        ]
+    
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.max_staleness / 2, 1.0))
+            await self.refresh()
+    
+    async def _listen_for_changes(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = await redis.create_pubsub()
+                await pubsub.subscribe(FEATURE_FLAG_CHANGES_CHANNEL)
+                # Changes published while not subscribed would otherwise wait for the periodic refresh
+                await self.refresh()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+                    if message and message.get('type') == 'message':
+                        await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Feature flag change listener failed, resubscribing: {e}")
+                await asyncio.sleep(self.max_staleness / 2 or 1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+    
+    async def close(self) -> None:
+        """Stop the background refresh and change listener"""
+        tasks, self._background_tasks = self._background_tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
     
     async def get_flag(self, key: str) -> Optional[Dict[str, str]]:
         """Get feature flag details"""
@@ -68,6 +166,7 @@ class FeatureFlagManager:
             deleted = await redis_client.delete(flag_key)
             if deleted:
                 await redis_client.srem(self.flag_list_key, key)
+                await self._publish_change(key, None)
                 logger.info(f"Deleted feature flag: {key}")
                 return True
             return False
@@ -119,6 +218,12 @@ def get_flag_manager() -> FeatureFlagManager:
     return _flag_manager
 
 
+async def close_flag_manager() -> None:
+    """Stop the background tasks of the global feature flag manager, if it was created"""
+    if _flag_manager is not None:
+        await _flag_manager.close()
+
+
 # Async convenience functions
 async def set_flag(key: str, enabled: bool, description: str = "") -> bool:
     return await get_flag_manager().set_flag(key, enabled, description)
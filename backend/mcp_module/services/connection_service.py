@@ -1,6 +1,10 @@
-from typing import Dict, List, Optional, Any
+import asyncio
+from typing import Dict, List, Optional, Any, Awaitable, Callable, Tuple
 from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
+from mcp.types import Tool
+
+from mcp_service.session_pool import MCPSessionPool, session_key, session_pool as default_session_pool
+from mcp_service.tool_catalog import ToolCatalogCache, catalog_scope, tool_catalog as default_tool_catalog
 
 from ..domain.entities import MCPConnection, MCPConnectionRequest
 from ..domain.exceptions import MCPConnectionError, MCPProviderError
@@ -9,67 +13,80 @@ from ..protocols import Logger
 
 
 class ConnectionService:
-    def __init__(self, provider_factory: MCPProviderFactory, logger: Logger):
+    def __init__(
+        self,
+        provider_factory: MCPProviderFactory,
+        logger: Logger,
+        session_pool: Optional[MCPSessionPool] = None,
+        tool_catalog: Optional[ToolCatalogCache] = None,
+        connect_timeout: float = 15.0
+    ):
         self._provider_factory = provider_factory
         self._logger = logger
+        self._session_pool = session_pool if session_pool is not None else default_session_pool
+        self._tool_catalog = tool_catalog if tool_catalog is not None else default_tool_catalog
+        self._connect_timeout = connect_timeout
         self._connections: Dict[str, MCPConnection] = {}
     
     async def connect_server(self, request: MCPConnectionRequest) -> MCPConnection:
         self._logger.info(f"Connecting to MCP server: {request.qualified_name}")
         
         try:
-            provider = self._provider_factory.create_provider(request.provider)
+            scope = catalog_scope({"provider": request.provider, "qualifiedName": request.qualified_name})
+            cached, generation = await self._tool_catalog.get(scope, request.config, request.external_user_id)
+            if cached is not None:
+                # Sessions are opened lazily by the first tool call
+                tools = [Tool.model_validate(tool) for tool in cached]
+            else:
+                tool_result = await self.run_on_session(request, lambda session: session.list_tools())
+                tools = tool_result.tools if tool_result else []
+                await self._tool_catalog.set(
+                    scope, request.config,
+                    [tool.model_dump(mode="json", exclude_none=True) for tool in tools],
+                    generation,
+                    request.external_user_id
+                )
             
-            server_url = provider.get_server_url(request.qualified_name, request.config)
-            headers = provider.get_headers(
-                request.qualified_name, 
-                request.config, 
-                request.external_user_id
+            connection = MCPConnection(
+                qualified_name=request.qualified_name,
+                name=request.name,
+                config=request.config,
+                enabled_tools=request.enabled_tools,
+                provider=request.provider,
+                external_user_id=request.external_user_id,
+                tools=tools
             )
             
-            async with streamablehttp_client(server_url, headers=headers) as (
-                read_stream, write_stream, _
-            ):
-                session = ClientSession(read_stream, write_stream)
-                await session.initialize()
-                
-                tool_result = await session.list_tools()
-                tools = tool_result.tools if tool_result else []
-                
-                connection = MCPConnection(
-                    qualified_name=request.qualified_name,
-                    name=request.name,
-                    config=request.config,
-                    enabled_tools=request.enabled_tools,
-                    provider=request.provider,
-                    external_user_id=request.external_user_id,
-                    session=session,
-                    tools=tools
-                )
-                
-                self._connections[request.qualified_name] = connection
-                self._logger.info(f"Connected to {request.qualified_name} ({len(tools)} tools available)")
-                
-                return connection
+            self._connections[request.qualified_name] = connection
+            self._logger.info(
+                f"Connected to {request.qualified_name} ({len(tools)} tools available"
+                f"{', cached catalog' if cached is not None else ''})"
+            )
+            
+            return connection
                 
         except Exception as e:
             self._logger.error(f"Failed to connect to {request.qualified_name}: {str(e)}")
             raise MCPConnectionError(f"Failed to connect to MCP server: {str(e)}")
     
-    async def disconnect_server(self, qualified_name: str) -> None:
-        connection = self._connections.get(qualified_name)
-        if connection and connection.session:
-            try:
-                await connection.session.close()
-                self._logger.info(f"Disconnected from {qualified_name}")
-            except Exception as e:
-                self._logger.warning(f"Error disconnecting from {qualified_name}: {str(e)}")
+    async def run_on_session(self, connection: Any, operation: Callable[[ClientSession], Awaitable[Any]]) -> Any:
+        """Run `operation` on the pooled session of a connection or connection request."""
+        provider = self._provider_factory.create_provider(connection.provider)
         
-        self._connections.pop(qualified_name, None)
+        async def resolve() -> Tuple[str, Dict[str, str]]:
+            server_url = provider.get_server_url(connection.qualified_name, connection.config)
+            headers = provider.get_headers(connection.qualified_name, connection.config, connection.external_user_id)
+            return server_url, headers
+        
+        key = session_key(connection.provider, connection.qualified_name, connection.config, connection.external_user_id)
+        return await self._session_pool.run(key, resolve, operation)
+    
+    async def disconnect_server(self, qualified_name: str) -> None:
+        # The pooled session stays open for other runs until it goes idle
+        if self._connections.pop(qualified_name, None):
+            self._logger.info(f"Disconnected from {qualified_name}")
     
     async def disconnect_all(self) -> None:
-        for qualified_name in list(self._connections.keys()):
-            await self.disconnect_server(qualified_name)
         self._connections.clear()
         self._logger.info("Disconnected from all MCP servers")
     
@@ -80,13 +97,16 @@ class ConnectionService:
         return list(self._connections.values())
     
     def is_connected(self, qualified_name: str) -> bool:
-        connection = self._connections.get(qualified_name)
-        return connection is not None and connection.session is not None
+        return qualified_name in self._connections
     
     async def connect_all(self, requests: List[MCPConnectionRequest]) -> None:
-        for request in requests:
+        async def connect(request: MCPConnectionRequest) -> None:
             try:
-                await self.connect_server(request)
+                await asyncio.wait_for(self.connect_server(request), timeout=self._connect_timeout)
+            except asyncio.TimeoutError:
+                self._logger.error(f"Timed out after {self._connect_timeout}s connecting to {request.qualified_name}")
             except MCPConnectionError as e:
                 self._logger.error(f"Failed to connect to {request.qualified_name}: {str(e)}")
-                continue 
\ No newline at end of file
+        
+        # Connect concurrently so one slow server doesn't hold up the others
+        await asyncio.gather(*(connect(request) for request in requests))
@@ -42,14 +42,13 @@ class ToolService:
         if not connection:
             raise MCPToolNotFoundError(f"Tool not found: {request.tool_name}")
         
-        if not connection.session:
-            raise MCPToolExecutionError(f"No active session for tool: {request.tool_name}")
-        
         if request.tool_name not in connection.enabled_tools:
             raise MCPToolExecutionError(f"Tool not enabled: {request.tool_name}")
         
         try:
-            result = await connection.session.call_tool(request.tool_name, request.arguments)
+            result = await self._connection_service.run_on_session(
+                connection, lambda session: session.call_tool(request.tool_name, request.arguments)
+            )
             
             self._logger.info(f"Tool {request.tool_name} executed successfully")
             
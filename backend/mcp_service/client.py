@@ -29,10 +29,13 @@ except ImportError:
 
 from utils.logger import logger
 from .mcp_providers import MCPProviderFactory, SmitheryProvider, PipedreamProvider
+from .session_pool import MCPSessionPool, session_key, session_pool as default_session_pool
+from .tool_catalog import ToolCatalogCache, catalog_scope, tool_catalog as default_tool_catalog
 import os
 
 SMITHERY_API_KEY = os.getenv("SMITHERY_API_KEY")
 SMITHERY_SERVER_BASE_URL = "https://server.smithery.ai"
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", 15))
 
 @dataclass
 class MCPConnection:
@@ -46,9 +49,32 @@ class MCPConnection:
     external_user_id: Optional[str] = None
     
 class MCPManager:
-    def __init__(self):
+    def __init__(self, session_pool: Optional[MCPSessionPool] = None, tool_catalog: Optional[ToolCatalogCache] = None):
         self.connections: Dict[str, MCPConnection] = {}
-        self._sessions: Dict[str, Tuple[Any, Any, Any]] = {}  # Store streams for cleanup
+        # Sessions are shared by every manager in the process and outlive disconnect_all
+        self.session_pool = session_pool if session_pool is not None else default_session_pool
+        self.tool_catalog = tool_catalog if tool_catalog is not None else default_tool_catalog
+    
+    def _endpoint_resolver(self, provider_type: str, qualified_name: str, config: Dict[str, Any], external_user_id: Optional[str]):
+        async def resolve() -> Tuple[str, Dict[str, str]]:
+            provider = MCPProviderFactory.create_provider(provider_type)
+            url = provider.get_server_url(qualified_name, config)
+            
+            if provider_type == "pipedream":
+                if not external_user_id:
+                    raise ValueError("external_user_id is required for Pipedream MCP connections")
+                headers = await provider.get_headers_async(qualified_name, config, external_user_id)
+            else:
+                headers = provider.get_headers(qualified_name, config, external_user_id)
+            return url, headers
+        return resolve
+    
+    async def _run_on_session(self, provider_type: str, qualified_name: str, config: Dict[str, Any], external_user_id: Optional[str], operation):
+        return await self.session_pool.run(
+            session_key(provider_type, qualified_name, config, external_user_id),
+            self._endpoint_resolver(provider_type, qualified_name, config, external_user_id),
+            operation
+        )
         
     async def connect_server(self, mcp_config: Dict[str, Any], external_user_id: Optional[str] = None) -> MCPConnection:
         qualified_name = mcp_config["qualifiedName"]
@@ -65,23 +91,10 @@ class MCPManager:
         logger.info(f"Connecting to MCP server: {qualified_name} via {provider_type}")
         
         try:
-            provider = MCPProviderFactory.create_provider(provider_type)
-            url = provider.get_server_url(qualified_name, mcp_config.get("config", {}))
-            
-            if provider_type == "pipedream":
-                if not external_user_id:
-                    raise ValueError("external_user_id is required for Pipedream MCP connections")
-                headers = await provider.get_headers_async(qualified_name, mcp_config.get("config", {}), external_user_id)
-            else:
-                headers = provider.get_headers(qualified_name, mcp_config.get("config", {}), external_user_id)
+            if provider_type == "pipedream" and not external_user_id:
+                raise ValueError("external_user_id is required for Pipedream MCP connections")
             
-            async with streamablehttp_client(url, headers=headers) as (read_stream, write_stream, _):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    logger.info(f"MCP session initialized for {qualified_name} via {provider_type}")
-                    
-                    tools_result = await session.list_tools()
-                    tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
+            tools = await self._list_tools(provider_type, qualified_name, mcp_config.get("config", {}), external_user_id)
             
             logger.info(f"Available tools from {qualified_name}: {[t.name for t in tools]}")
             
@@ -103,12 +116,36 @@ class MCPManager:
             logger.error(f"Failed to connect to MCP server {qualified_name} via {provider_type}: {str(e)}")
             raise
         
-    async def connect_all(self, mcp_configs: List[Dict[str, Any]]) -> None:
-        for config in mcp_configs:
+    async def _list_tools(self, provider_type: str, qualified_name: str, config: Dict[str, Any], external_user_id: Optional[str]) -> List[Tool]:
+        scope = catalog_scope({"provider": provider_type, "qualifiedName": qualified_name})
+        cached, generation = await self.tool_catalog.get(scope, config, external_user_id)
+        if cached is not None:
+            # The session is opened by the first tool call instead
+            logger.info(f"Using cached tool catalog for {qualified_name}")
+            return [Tool.model_validate(tool) for tool in cached]
+        
+        # The session stays in the pool for the tool calls that follow
+        tools_result = await self._run_on_session(
+            provider_type, qualified_name, config, external_user_id,
+            lambda session: session.list_tools()
+        )
+        tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
+        await self.tool_catalog.set(
+            scope, config, [tool.model_dump(mode="json", exclude_none=True) for tool in tools], generation, external_user_id
+        )
+        return tools
+        
+    async def connect_all(self, mcp_configs: List[Dict[str, Any]], timeout: float = MCP_CONNECT_TIMEOUT) -> None:
+        async def connect(config: Dict[str, Any]) -> None:
             try:
-                await self.connect_server(config)
+                await asyncio.wait_for(self.connect_server(config), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Timed out after {timeout}s connecting to {config['qualifiedName']}")
             except Exception as e:
                 logger.error(f"Failed to connect to {config['qualifiedName']}: {str(e)}")
+        
+        # Servers are independent, so a slow one only delays its own tools
+        await asyncio.gather(*(connect(config) for config in mcp_configs))
                 
     def get_all_tools_openapi(self) -> List[Dict[str, Any]]:
         openapi_tools = []
@@ -162,49 +199,42 @@ class MCPManager:
         logger.info(f"Executing MCP tool {original_tool_name} on server {qualified_name} via {conn.provider}")
         
         try:
-            provider = MCPProviderFactory.create_provider(conn.provider)
+            if conn.provider == "pipedream" and not external_user_id:
+                raise ValueError("external_user_id is required for Pipedream MCP tool execution")
             
-            url = provider.get_server_url(qualified_name, conn.config)
+            result = await self._run_on_session(
+                conn.provider, qualified_name, conn.config, conn.external_user_id,
+                lambda session: session.call_tool(original_tool_name, arguments)
+            )
             
-            if conn.provider == "pipedream":
-                if not external_user_id:
-                    raise ValueError("external_user_id is required for Pipedream MCP tool execution")
-                headers = await provider.get_headers_async(qualified_name, conn.config, external_user_id)
-            else:
-                headers = provider.get_headers(qualified_name, conn.config, external_user_id)
-            
-            async with streamablehttp_client(url, headers=headers) as (read_stream, write_stream, _):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    result = await session.call_tool(original_tool_name, arguments)
-                    if hasattr(result, 'content'):
-                        content = result.content
-                        if isinstance(content, list):
-                            text_parts = []
-                            for item in content:
-                                if hasattr(item, 'text'):
-                                    text_parts.append(item.text)
-                                elif hasattr(item, 'content'):
-                                    text_parts.append(str(item.content))
-                                else:
-                                    text_parts.append(str(item))
-                            content_str = "\n".join(text_parts)
-                        elif hasattr(content, 'text'):
-                            content_str = content.text
-                        elif hasattr(content, 'content'):
-                            content_str = str(content.content)
+            if hasattr(result, 'content'):
+                content = result.content
+                if isinstance(content, list):
+                    text_parts = []
+                    for item in content:
+                        if hasattr(item, 'text'):
+                            text_parts.append(item.text)
+                        elif hasattr(item, 'content'):
+                            text_parts.append(str(item.content))
                         else:
-                            content_str = str(content)
+                            text_parts.append(str(item))
+                    content_str = "\n".join(text_parts)
+                elif hasattr(content, 'text'):
+                    content_str = content.text
+                elif hasattr(content, 'content'):
+                    content_str = str(content.content)
+                else:
+                    content_str = str(content)
                         
-                        is_error = getattr(result, 'isError', False)
-                    else:
-                        content_str = str(result)
-                        is_error = False
+                is_error = getattr(result, 'isError', False)
+            else:
+                content_str = str(result)
+                is_error = False
                         
-                return {
-                        "content": content_str,
-                        "isError": is_error
-                }
+            return {
+                "content": content_str,
+                "isError": is_error
+            }
                 
         except Exception as e:
             logger.error(f"Error executing MCP tool {tool_name}: {str(e)}")
@@ -213,15 +243,17 @@ class MCPManager:
                 "isError": True
             }
             
-    async def disconnect_all(self):
+    async def disconnect_all(self, close_sessions: bool = False):
         for qualified_name in list(self.connections.keys()):
             try:
                 del self.connections[qualified_name]
                 logger.info(f"Cleared MCP server configuration for {qualified_name}")
             except Exception as e:
                 logger.error(f"Error clearing configuration for {qualified_name}: {str(e)}")
-                
-        self._sessions.clear()
+        
+        # Pooled sessions are otherwise kept for other runs and closed once idle
+        if close_sessions:
+            await self.session_pool.close_all()
                 
     def get_tool_info(self, tool_name: str) -> Optional[Dict[str, Any]]:
         parts = tool_name.split("_", 2)
@@ -0,0 +1,255 @@
+"""
+Pool of long-lived MCP client sessions.
+
+Opening an MCP session costs an HTTP connection plus the initialize handshake,
+so sessions are kept open and reused across tool calls and agent runs. Each
+session is keyed by provider, qualified name, external user and a digest of
+the server config, so sessions are never shared between different credentials.
+
+streamablehttp_client and ClientSession are anyio context managers that must be
+entered and exited by the same task; every pooled session therefore has an
+owner task that opens both, publishes the session and holds it open until the
+pool closes it or the transport fails.
+
+- Idle sessions are closed after MCP_SESSION_IDLE_TIMEOUT seconds.
+- A session unused for MCP_SESSION_HEALTH_CHECK_INTERVAL seconds is pinged
+  before reuse and reopened if the ping fails.
+- A call that fails because the session was closed before the request was
+  sent is retried once on a new session. Once a request may have reached the
+  server it is never sent again, so side-effecting tools don't run twice.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import anyio
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+
+try:
+    from mcp.types import CONNECTION_CLOSED
+except ImportError:
+    CONNECTION_CLOSED = -32000
+
+try:
+    from mcp.client.streamable_http import streamablehttp_client
+except ImportError:
+    from mcp.client import streamablehttp_client
+
+from utils.logger import logger
+
+MCP_SESSION_IDLE_TIMEOUT = float(os.getenv("MCP_SESSION_IDLE_TIMEOUT", 300))
+MCP_SESSION_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_SESSION_HEALTH_CHECK_INTERVAL", 60))
+MCP_SESSION_CONNECT_TIMEOUT = float(os.getenv("MCP_SESSION_CONNECT_TIMEOUT", 30))
+MCP_SESSION_PING_TIMEOUT = 5.0
+
+T = TypeVar("T")
+
+# Resolves the URL and headers of a server; called again on every reconnect so
+# that short-lived credentials are refreshed
+EndpointResolver = Callable[[], Awaitable[Tuple[str, Dict[str, str]]]]
+
+
+def session_key(provider: str, qualified_name: str, config: Dict[str, Any], external_user_id: Optional[str] = None) -> str:
+    config_digest = hashlib.sha256(json.dumps(config or {}, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{provider}:{qualified_name}:{external_user_id or ''}:{config_digest}"
+
+
+class PooledSession:
+    """An initialized ClientSession held open by its owner task."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.session: Optional[ClientSession] = None
+        self.last_used = time.monotonic()
+        self.last_checked = self.last_used
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self.session is not None
+            and self._task is not None
+            and not self._task.done()
+            and self._loop is asyncio.get_running_loop()
+        )
+
+    async def open(self, url: str, headers: Dict[str, str], timeout: float) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run(url, headers), name=f"mcp-session:{self.key}")
+        self._task.add_done_callback(self._on_exit)
+        ready = asyncio.create_task(self._ready.wait())
+        try:
+            await asyncio.wait({ready, self._task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. a connect timeout); don't leave the owner task running
+            self._closing.set()
+            self._task.cancel()
+            raise
+        finally:
+            ready.cancel()
+        if self._ready.is_set():
+            return
+        if self._task.done():
+            # Re-raise the connection error of the owner task
+            self._task.result()
+        await self.close()
+        raise TimeoutError(f"Timed out after {timeout}s opening MCP session {self.key}")
+
+    async def _run(self, url: str, headers: Dict[str, str]) -> None:
+        try:
+            async with streamablehttp_client(url, headers=headers) as (read_stream, write_stream, _):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        finally:
+            self.session = None
+
+    def _on_exit(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() and self._ready.is_set():
+            logger.warning(f"MCP session {self.key} closed: {str(task.exception())}")
+
+    async def ping(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            self.last_checked = time.monotonic()
+            return True
+        except Exception as e:
+            logger.warning(f"MCP session {self.key} failed health check: {str(e)}")
+            return False
+
+    async def close(self) -> None:
+        self._closing.set()
+        task = self._task
+        if task is None or task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=5)
+        except asyncio.TimeoutError:
+            task.cancel()
+        except Exception as e:
+            logger.debug(f"MCP session {self.key} closed with error: {str(e)}")
+
+
+class MCPSessionPool:
+    def __init__(
+        self,
+        idle_timeout: float = MCP_SESSION_IDLE_TIMEOUT,
+        health_check_interval: float = MCP_SESSION_HEALTH_CHECK_INTERVAL,
+        connect_timeout: float = MCP_SESSION_CONNECT_TIMEOUT,
+    ):
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self._sessions: Dict[str, PooledSession] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def run(self, key: str, resolve: EndpointResolver, operation: Callable[[ClientSession], Awaitable[T]]) -> T:
+        """Run `operation` on the pooled session for `key`, opening it if needed.
+
+        Errors reported by the server (McpError) are raised as-is. If the
+        session's streams were already closed when the request was sent, the
+        session is discarded and the operation is retried once on a new
+        session. Any other error, or the connection closing while waiting for
+        the response, discards the session and is raised: the request may
+        have reached the server, so it is not sent again.
+        """
+        for attempt in range(2):
+            pooled = await self._acquire(key, resolve)
+            try:
+                if not pooled.alive:
+                    # The owner task exited after the session was acquired; nothing was sent yet
+                    raise anyio.ClosedResourceError()
+                return await operation(pooled.session)
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError) as e:
+                await self._discard(key, pooled)
+                if attempt:
+                    raise
+                logger.warning(f"MCP session {key} was closed ({type(e).__name__}), reconnecting")
+            except Exception as e:
+                if not isinstance(e, McpError) or e.error.code == CONNECTION_CLOSED:
+                    await self._discard(key, pooled)
+                raise
+            finally:
+                pooled.last_used = time.monotonic()
+
+    async def _acquire(self, key: str, resolve: EndpointResolver) -> PooledSession:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sessions, locks and the reaper belong to the loop that created them
+            self._sessions.clear()
+            self._locks.clear()
+            self._reaper = None
+            self._loop = loop
+
+        pooled = self._sessions.get(key)
+        if pooled and pooled.alive and not self._needs_check(pooled):
+            return pooled
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            pooled = self._sessions.get(key)
+            if pooled and pooled.alive:
+                if not self._needs_check(pooled) or await pooled.ping(MCP_SESSION_PING_TIMEOUT):
+                    return pooled
+            if pooled:
+                await self._discard(key, pooled)
+
+            url, headers = await resolve()
+            pooled = PooledSession(key)
+            await pooled.open(url, headers, self.connect_timeout)
+            self._sessions[key] = pooled
+            logger.info(f"Opened pooled MCP session {key}")
+            self._ensure_reaper()
+            return pooled
+
+    def _needs_check(self, pooled: PooledSession) -> bool:
+        return time.monotonic() - max(pooled.last_used, pooled.last_checked) > self.health_check_interval
+
+    async def _discard(self, key: str, pooled: PooledSession) -> None:
+        if self._sessions.get(key) is pooled:
+            del self._sessions[key]
+        await pooled.close()
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_idle_sessions(), name="mcp-session-reaper")
+
+    async def _reap_idle_sessions(self) -> None:
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while self._sessions:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key, pooled in list(self._sessions.items()):
+                if not pooled.alive or now - pooled.last_used > self.idle_timeout:
+                    logger.info(f"Closing idle MCP session {key}")
+                    await self._discard(key, pooled)
+
+    async def invalidate(self, key_prefix: str) -> None:
+        """Close the sessions whose key starts with `key_prefix`."""
+        for key, pooled in list(self._sessions.items()):
+            if key.startswith(key_prefix):
+                await self._discard(key, pooled)
+
+    async def close_all(self) -> None:
+        for key, pooled in list(self._sessions.items()):
+            await self._discard(key, pooled)
+        if self._reaper and not self._reaper.done():
+            self._reaper.cancel()
+
+
+session_pool = MCPSessionPool()
@@ -0,0 +1,133 @@
+"""
+Cache of MCP tool catalogs.
+
+Listing the tools of an MCP server means opening a session and calling
+list_tools, which dominates agent run startup. Catalogs are cached in Redis for
+MCP_TOOL_CATALOG_TTL seconds so that later runs, in any worker, skip discovery.
+
+Catalogs are grouped by server scope (provider and qualified name, or custom
+type and name) and keyed within the scope by a digest of the server config and
+external user. Every scope has a generation counter; invalidating a scope bumps
+it, which makes the catalogs stored under the old generation unreachable.
+Agent config changes invalidate the scopes of every server they touch.
+
+A catalog is stored under the generation read before discovery started, so an
+invalidation that lands while the tools are being listed is not lost. The
+generation counters never expire: a counter that restarted would make the
+catalogs stored under its earlier values valid again.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import logger
+
+MCP_TOOL_CATALOG_TTL = int(os.getenv("MCP_TOOL_CATALOG_TTL", 3600))
+
+
+def catalog_scope(mcp_config: Dict[str, Any]) -> str:
+    """Scope of a server entry from an agent's configured_mcps or custom_mcps."""
+    custom_type = mcp_config.get("customType", mcp_config.get("type"))
+    if mcp_config.get("isCustom") or custom_type:
+        return f"custom:{custom_type or 'sse'}:{mcp_config.get('name', '')}"
+    qualified_name = mcp_config.get("qualifiedName", mcp_config.get("name", ""))
+    return f"{mcp_config.get('provider', 'smithery')}:{qualified_name}"
+
+
+class ToolCatalogCache:
+    KEY_PREFIX = "mcp:tool_catalog"
+    GENERATION_PREFIX = "mcp:tool_catalog_generation"
+
+    def __init__(self, ttl: int = MCP_TOOL_CATALOG_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, scope: str, config: Dict[str, Any], external_user_id: Optional[str]) -> str:
+        digest = hashlib.sha256(
+            json.dumps([config or {}, external_user_id], sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        return f"{self.KEY_PREFIX}:{scope}:{digest}"
+
+    def _generation_key(self, scope: str) -> str:
+        return f"{self.GENERATION_PREFIX}:{scope}"
+
+    async def get(
+        self, scope: str, config: Dict[str, Any], external_user_id: Optional[str] = None
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[int]]:
+        """Return the cached tools of a server (None on a miss) and the scope's current generation.
+
+        On a miss, pass the generation to `set` together with the discovered
+        tools. The generation is None when the catalog cannot be cached.
+        """
+        if self.ttl <= 0:
+            return None, None
+        try:
+            from services import redis
+            redis_client = await redis.get_client()
+            cached, generation = await redis_client.mget(
+                [self._key(scope, config, external_user_id), self._generation_key(scope)]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to read MCP tool catalog for {scope}: {str(e)}")
+            return None, None
+
+        generation = int(generation or 0)
+        if cached:
+            entry = json.loads(cached)
+            if entry.get("generation") == generation:
+                self.hits += 1
+                return entry["tools"], generation
+        self.misses += 1
+        return None, generation
+
+    async def set(
+        self,
+        scope: str,
+        config: Dict[str, Any],
+        tools: List[Dict[str, Any]],
+        generation: Optional[int],
+        external_user_id: Optional[str] = None
+    ) -> None:
+        """Store the tools of a server under the generation returned by `get` before discovery."""
+        if self.ttl <= 0 or generation is None:
+            return
+        try:
+            from services import redis
+            redis_client = await redis.get_client()
+            # If the scope was invalidated meanwhile, the entry is stored under a stale generation and never served
+            entry = {"generation": generation, "tools": tools}
+            await redis_client.set(
+                self._key(scope, config, external_user_id), json.dumps(entry, default=str), ex=self.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache MCP tool catalog for {scope}: {str(e)}")
+
+    async def invalidate(self, scopes: Iterable[str]) -> None:
+        scopes = set(scopes)
+        if not scopes:
+            return
+        try:
+            from services import redis
+            redis_client = await redis.get_client()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for scope in scopes:
+                    pipe.incr(self._generation_key(scope))
+                await pipe.execute()
+            logger.info(f"Invalidated MCP tool catalogs for {sorted(scopes)}")
+        except Exception as e:
+            logger.warning(f"Failed to invalidate MCP tool catalogs for {sorted(scopes)}: {str(e)}")
+
+    async def invalidate_mcp_configs(self, *mcp_configs: Optional[List[Dict[str, Any]]]) -> None:
+        """Invalidate the catalogs of every server in the given configured_mcps/custom_mcps lists."""
+        await self.invalidate(
+            catalog_scope(config)
+            for configs in mcp_configs
+            for config in configs or []
+            if isinstance(config, dict)
+        )
+
+
+tool_catalog = ToolCatalogCache()
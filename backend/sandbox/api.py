@@ -8,6 +8,7 @@ from pydantic import BaseModel
 from daytona_sdk import AsyncSandbox
 
 from sandbox.sandbox import get_or_start_sandbox, delete_sandbox
+from sandbox.registry import sandbox_registry
 from utils.logger import logger
 from utils.auth_utils import get_optional_user_id
 from services.supabase import DBConnection
@@ -317,11 +318,12 @@ async def delete_sandbox_route(
     client = await db.client
     
     # Verify the user has access to this sandbox
-    await verify_sandbox_access(client, sandbox_id, user_id)
+    project_data = await verify_sandbox_access(client, sandbox_id, user_id)
     
     try:
         # Delete the sandbox using the sandbox module function
         await delete_sandbox(sandbox_id)
+        sandbox_registry.evict(project_data['project_id'])
         
         return {"status": "success", "deleted": True, "sandbox_id": sandbox_id}
     except Exception as e:
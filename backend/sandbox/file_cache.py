@@ -0,0 +1,142 @@
+"""
+Content cache for sandbox files, and in-sandbox application of edits.
+
+SandboxFilesTool used to download a whole file for every edit and upload it
+again afterwards. File contents are now cached per (sandbox_id, path), up to
+SANDBOX_FILE_CACHE_MAX_BYTES in total, and an entry is only used while the
+size and modification time reported by the sandbox match the cached copy.
+Files written by the tool are cached with the modification time the sandbox
+reports right after the write; an entry without one is never used, since the
+file may have been changed by other means (e.g. a shell command) since.
+
+Edits to large files are shipped to the sandbox as a byte-range splice that a
+small Python script applies in place, after checking that the file still has
+the content the edit was computed from. If it doesn't, the caller falls back
+to re-reading the file.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import shlex
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from utils.logger import logger
+
+SANDBOX_FILE_CACHE_MAX_BYTES = int(os.getenv("SANDBOX_FILE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+SANDBOX_FILE_DOWNLOAD_CONCURRENCY = int(os.getenv("SANDBOX_FILE_DOWNLOAD_CONCURRENCY", 8))
+
+# Smaller files are cheaper to upload whole than to patch with a command
+DELTA_MIN_FILE_SIZE = 16 * 1024
+# Keep the encoded edit well below the kernel's 128 KiB limit for one argument
+DELTA_MAX_PAYLOAD_SIZE = 64 * 1024
+
+# Exits with 3 when the file no longer has the content the edit was made against
+_APPLY_EDIT_SCRIPT = (
+    "import base64,hashlib,json,sys\n"
+    "edit=json.loads(base64.b64decode(sys.argv[2]))\n"
+    "with open(sys.argv[1],'rb') as f: data=f.read()\n"
+    "if hashlib.sha256(data).hexdigest()!=edit['sha256']: sys.exit(3)\n"
+    "data=data[:edit['start']]+edit['text'].encode()+data[edit['end']:]\n"
+    "with open(sys.argv[1],'wb') as f: f.write(data)\n"
+)
+
+
+@dataclass
+class CachedFile:
+    content: str
+    size: int
+    mod_time: str
+
+
+class SandboxFileCache:
+    def __init__(self, max_bytes: int = SANDBOX_FILE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], CachedFile]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sandbox_id: str, path: str, file_info: Any) -> Optional[str]:
+        """Return the cached content of a file if it matches `file_info` (a daytona FileInfo)."""
+        entry = self._entries.get((sandbox_id, path))
+        if entry is not None and entry.size == file_info.size and entry.mod_time == file_info.mod_time:
+            self._entries.move_to_end((sandbox_id, path))
+            self.hits += 1
+            return entry.content
+        self.misses += 1
+        return None
+
+    def put(self, sandbox_id: str, path: str, content: str, file_info: Any) -> None:
+        """Cache the content of a file as described by `file_info`, read before the download or after the upload.
+
+        The file is not cached if `file_info` is missing, has no modification
+        time or doesn't have the size of `content`.
+        """
+        size = len(content.encode())
+        self.invalidate(sandbox_id, path)
+        if size > self.max_bytes // 4:
+            return
+        if file_info is None or not getattr(file_info, "mod_time", None) or file_info.size != size:
+            return
+        self._entries[(sandbox_id, path)] = CachedFile(content, size, file_info.mod_time)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def invalidate(self, sandbox_id: str, path: Optional[str] = None) -> None:
+        """Drop a cached file, or every cached file of a sandbox."""
+        keys = [(sandbox_id, path)] if path is not None else [key for key in self._entries if key[0] == sandbox_id]
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "files": len(self._entries), "bytes": self._bytes}
+
+
+def make_edit_payload(content: str, start: int, end: int, text: str) -> Optional[str]:
+    """Encode the replacement of content[start:end] with `text` for apply_edit_in_sandbox.
+
+    Offsets are character offsets into `content`, the content the edit is made
+    against. Returns None when the edit isn't worth shipping as a delta.
+    """
+    data = content.encode()
+    if len(data) < DELTA_MIN_FILE_SIZE:
+        return None
+    edit = {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "start": len(content[:start].encode()),
+        "end": len(content[:end].encode()),
+        "text": text,
+    }
+    payload = base64.b64encode(json.dumps(edit).encode()).decode()
+    return payload if len(payload) <= DELTA_MAX_PAYLOAD_SIZE else None
+
+
+async def apply_edit_in_sandbox(sandbox, path: str, payload: str) -> bool:
+    """Apply an edit from make_edit_payload to a file without uploading the file.
+
+    Returns False if the edit wasn't applied, e.g. because the file has changed
+    since the content the edit was made against was read.
+    """
+    try:
+        response = await sandbox.process.exec(
+            f"python3 -S -c \"$(echo {base64.b64encode(_APPLY_EDIT_SCRIPT.encode()).decode()} | base64 -d)\" {shlex.quote(path)} {payload}",
+            timeout=30
+        )
+    except Exception as e:
+        logger.warning(f"Failed to apply edit to {path} in sandbox: {str(e)}")
+        return False
+    if response.exit_code != 0:
+        logger.info(f"Edit to {path} not applied in sandbox (exit code {response.exit_code})")
+        return False
+    return True
+
+
+file_cache = SandboxFileCache()
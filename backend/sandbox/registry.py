@@ -0,0 +1,164 @@
+"""
+Process-wide registry of resolved sandboxes.
+
+Every sandbox tool of an agent run (files, shell, browser, deploy, expose,
+vision, image edit) needs the same sandbox. Resolving it means a `projects`
+query plus `get_or_start_sandbox`, which may have to start an archived or
+stopped sandbox. The registry resolves each project's sandbox once and hands
+the same AsyncSandbox to every tool, in this run and in later ones.
+
+- Concurrent lookups for a project share a single resolution.
+- A handle not checked for SANDBOX_HANDLE_TTL seconds is refreshed before
+  reuse: the project's sandbox is read again, so a recreated sandbox is picked
+  up, and `get_or_start_sandbox` restarts it if it was stopped. If that read
+  fails, the refresh keeps the sandbox the handle already had.
+- A failed resolution or refresh evicts the project's handle.
+- The registry holds at most SANDBOX_REGISTRY_MAX_SIZE handles, dropping the
+  least recently used.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from daytona_sdk import AsyncSandbox
+
+from sandbox.sandbox import get_or_start_sandbox
+from services.metrics import get_metrics_collector
+from utils.logger import logger
+
+SANDBOX_HANDLE_TTL = float(os.getenv("SANDBOX_HANDLE_TTL", 60))
+SANDBOX_REGISTRY_MAX_SIZE = int(os.getenv("SANDBOX_REGISTRY_MAX_SIZE", 500))
+
+
+@dataclass
+class SandboxHandle:
+    project_id: str
+    sandbox_id: str
+    sandbox_pass: Optional[str]
+    sandbox: AsyncSandbox
+    checked_at: float
+    cold_start_seconds: float
+
+
+class SandboxRegistry:
+    def __init__(self, ttl: float = SANDBOX_HANDLE_TTL, max_size: int = SANDBOX_REGISTRY_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._handles: "OrderedDict[str, SandboxHandle]" = OrderedDict()
+        self._resolving: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"hits": 0, "cold_starts": 0, "refreshes": 0, "failures": 0, "cold_start_seconds_total": 0.0}
+
+    async def get(self, project_id: str, client) -> SandboxHandle:
+        """Return the sandbox handle of a project, resolving it if needed.
+
+        Args:
+            project_id: The project whose sandbox is needed
+            client: The Supabase client, used to look the sandbox up on a cold start
+
+        Raises:
+            ValueError: If the project or its sandbox doesn't exist
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sandbox clients and pending resolutions belong to the loop that created them
+            self._handles.clear()
+            self._resolving.clear()
+            self._loop = loop
+
+        handle = self._handles.get(project_id)
+        if handle is not None and time.monotonic() - handle.checked_at <= self.ttl:
+            self._handles.move_to_end(project_id)
+            self.stats["hits"] += 1
+            return handle
+
+        task = self._resolving.get(project_id)
+        if task is None:
+            task = asyncio.create_task(self._resolve(project_id, client, handle))
+            self._resolving[project_id] = task
+            task.add_done_callback(lambda _: self._resolving.pop(project_id, None))
+        # A cancelled tool call must not cancel a resolution other tools wait on
+        return await asyncio.shield(task)
+
+    async def _resolve(self, project_id: str, client, stale: Optional[SandboxHandle]) -> SandboxHandle:
+        start = time.monotonic()
+        kind = "refresh" if stale is not None else "cold"
+        try:
+            sandbox_id, sandbox_pass = await self._lookup_sandbox(project_id, client, stale)
+            sandbox = await get_or_start_sandbox(sandbox_id)
+        except Exception:
+            self.stats["failures"] += 1
+            self.evict(project_id)
+            raise
+
+        duration = time.monotonic() - start
+        get_metrics_collector().record_sandbox_resolve(kind, duration)
+        if stale is not None:
+            self.stats["refreshes"] += 1
+            cold_start_seconds = stale.cold_start_seconds
+        else:
+            self.stats["cold_starts"] += 1
+            self.stats["cold_start_seconds_total"] += duration
+            cold_start_seconds = duration
+            logger.info(f"Resolved sandbox {sandbox_id} for project {project_id} in {duration:.2f}s")
+
+        handle = SandboxHandle(
+            project_id=project_id,
+            sandbox_id=sandbox_id,
+            sandbox_pass=sandbox_pass,
+            sandbox=sandbox,
+            checked_at=time.monotonic(),
+            cold_start_seconds=cold_start_seconds,
+        )
+        self._handles[project_id] = handle
+        self._handles.move_to_end(project_id)
+        while len(self._handles) > self.max_size:
+            self._handles.popitem(last=False)
+        return handle
+
+    async def _lookup_sandbox(self, project_id: str, client, stale: Optional[SandboxHandle] = None):
+        try:
+            project = await client.table('projects').select('sandbox').eq('project_id', project_id).execute()
+        except Exception as e:
+            if stale is None:
+                raise
+            # The sandbox may have been replaced, but a failed read is no reason to drop a working handle
+            logger.warning(f"Failed to re-read sandbox of project {project_id}, reusing {stale.sandbox_id}: {str(e)}")
+            return stale.sandbox_id, stale.sandbox_pass
+
+        if not project.data or len(project.data) == 0:
+            raise ValueError(f"Project {project_id} not found")
+
+        sandbox_info = project.data[0].get('sandbox') or {}
+        if not sandbox_info.get('id'):
+            raise ValueError(f"No sandbox found for project {project_id}")
+        if stale is not None and sandbox_info['id'] != stale.sandbox_id:
+            logger.info(f"Sandbox of project {project_id} changed from {stale.sandbox_id} to {sandbox_info['id']}")
+        return sandbox_info['id'], sandbox_info.get('pass')
+
+    def evict(self, project_id: str) -> None:
+        """Forget a project's sandbox, e.g. after it was deleted or replaced."""
+        self._handles.pop(project_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        cold_starts = self.stats["cold_starts"]
+        return {
+            **self.stats,
+            "size": len(self._handles),
+            "avg_cold_start_seconds": self.stats["cold_start_seconds_total"] / cold_starts if cold_starts else 0.0,
+            "handles": {
+                project_id: {
+                    "sandbox_id": handle.sandbox_id,
+                    "cold_start_seconds": round(handle.cold_start_seconds, 3),
+                    "age_seconds": round(time.monotonic() - handle.checked_at, 3),
+                }
+                for project_id, handle in self._handles.items()
+            },
+        }
+
+
+sandbox_registry = SandboxRegistry()
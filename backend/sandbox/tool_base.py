@@ -3,7 +3,7 @@ from typing import Optional
 from agentpress.thread_manager import ThreadManager
 from agentpress.tool import Tool
 from daytona_sdk import AsyncSandbox
-from sandbox.sandbox import get_or_start_sandbox
+from sandbox.registry import sandbox_registry
 from utils.logger import logger
 from utils.files_utils import clean_path
 
@@ -24,46 +24,31 @@ class SandboxToolsBase(Tool):
 
     async def _ensure_sandbox(self) -> AsyncSandbox:
         """Ensure we have a valid sandbox instance, retrieving it from the project if needed."""
-        if self._sandbox is None:
-            try:
-                # Get database client
-                client = await self.thread_manager.db.client
-                
-                # Get project data
-                project = await client.table('projects').select('*').eq('project_id', self.project_id).execute()
-                if not project.data or len(project.data) == 0:
-                    raise ValueError(f"Project {self.project_id} not found")
-                
-                project_data = project.data[0]
-                sandbox_info = project_data.get('sandbox', {})
-                
-                if not sandbox_info.get('id'):
-                    raise ValueError(f"No sandbox found for project {self.project_id}")
-                
-                # Store sandbox info
-                self._sandbox_id = sandbox_info['id']
-                self._sandbox_pass = sandbox_info.get('pass')
-                
-                # Get or start the sandbox
-                self._sandbox = await get_or_start_sandbox(self._sandbox_id)
-                
-                # # Log URLs if not already printed
-                # if not SandboxToolsBase._urls_printed:
-                #     vnc_link = self._sandbox.get_preview_link(6080)
-                #     website_link = self._sandbox.get_preview_link(8080)
-                    
-                #     vnc_url = vnc_link.url if hasattr(vnc_link, 'url') else str(vnc_link)
-                #     website_url = website_link.url if hasattr(website_link, 'url') else str(website_link)
-                    
-                #     print("\033[95m***")
-                #     print(f"VNC URL: {vnc_url}")
-                #     print(f"Website URL: {website_url}")
-                #     print("***\033[0m")
-                #     SandboxToolsBase._urls_printed = True
-                
-            except Exception as e:
-                logger.error(f"Error retrieving sandbox for project {self.project_id}: {str(e)}", exc_info=True)
-                raise e
+        try:
+            # Shared with the other sandbox tools; only the first lookup of a project resolves it
+            client = await self.thread_manager.db.client
+            handle = await sandbox_registry.get(self.project_id, client)
+        except Exception as e:
+            logger.error(f"Error retrieving sandbox for project {self.project_id}: {str(e)}", exc_info=True)
+            raise e
+
+        self._sandbox = handle.sandbox
+        self._sandbox_id = handle.sandbox_id
+        self._sandbox_pass = handle.sandbox_pass
+        
+        # # Log URLs if not already printed
+        # if not SandboxToolsBase._urls_printed:
+        #     vnc_link = self._sandbox.get_preview_link(6080)
+        #     website_link = self._sandbox.get_preview_link(8080)
+            
+        #     vnc_url = vnc_link.url if hasattr(vnc_link, 'url') else str(vnc_link)
+        #     website_url = website_link.url if hasattr(website_link, 'url') else str(website_link)
+            
+        #     print("\033[95m***")
+        #     print(f"VNC URL: {vnc_url}")
+        #     print(f"Website URL: {website_url}")
+        #     print("***\033[0m")
+        #     SandboxToolsBase._urls_printed = True
         
         return self._sandbox
 
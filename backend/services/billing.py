@@ -5,7 +5,7 @@ stripe listen --forward-to localhost:8000/api/billing/webhook
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Request
-from typing import Optional, Dict, Tuple
+from typing import Any, Callable, Optional, Dict, List, Tuple
 import stripe
 from datetime import datetime, timezone
 from utils.logger import logger
@@ -15,6 +15,10 @@ from utils.auth_utils import get_current_user_id_from_jwt
 from pydantic import BaseModel
 from utils.constants import MODEL_ACCESS_TIERS, MODEL_NAME_ALIASES, HARDCODED_MODEL_PRICES
 from litellm.cost_calculator import cost_per_token
+from services import redis
+import asyncio
+import json
+import os
 import time
 
 # Initialize Stripe
@@ -23,6 +27,46 @@ stripe.api_key = config.STRIPE_SECRET_KEY
 # Token price multiplier
 TOKEN_PRICE_MULTIPLIER = 1.5
 
+# Ignore all token counts before this date
+USAGE_CUTOFF_DATE = datetime(2025, 6, 30, 9, 0, 0, tzinfo=timezone.utc)
+
+# Running monthly cost per account, kept in Redis next to the usage logs it summarizes
+MONTHLY_USAGE_KEY_PREFIX = "billing:monthly_usage"
+MONTHLY_USAGE_KEY_TTL = 3600 * 24 * 40  # Outlives the month it counts
+
+# Cached subscription tier, allowed models and cost limit per account
+ENTITLEMENT_KEY_PREFIX = "billing:entitlements"
+ENTITLEMENT_CACHE_TTL = 300  # The Stripe webhook invalidates entries as subscriptions change
+
+# In-flight entitlement fetches, shared by concurrent checks for the same account
+_entitlement_fetches: Dict[str, asyncio.Future] = {}
+
+# Only adds to a counter that has already been built from the usage logs; a
+# missing counter is rebuilt from the logs on its next read instead
+INCREMENT_MONTHLY_USAGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBYFLOAT', KEYS[1], ARGV[1])
+end
+return false
+"""
+
+# Replaces a counter with its rebuilt value only if no increment landed since it
+# was read (ARGV[1] is '' when the counter was missing)
+RECONCILE_MONTHLY_USAGE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if (current == false and ARGV[1] == '') or current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+USAGE_RECONCILE_ATTEMPTS = 3
+
+# How often the counters are reconciled; one API instance per interval enqueues the job
+USAGE_RECONCILE_INTERVAL = int(os.getenv("BILLING_USAGE_RECONCILE_INTERVAL", 3600))
+USAGE_RECONCILE_LOCK_KEY = "billing:monthly_usage_reconcile_lock"
+_usage_reconcile_task: Optional[asyncio.Task] = None
+
 # Initialize router
 router = APIRouter(prefix="/billing", tags=["billing"])
 
@@ -117,8 +161,11 @@ async def create_stripe_customer(client, user_id: str, email: str) -> str:
     
     return customer.id
 
-async def get_user_subscription(user_id: str) -> Optional[Dict]:
-    """Get the current subscription for a user from Stripe."""
+async def get_user_subscription(user_id: str, raise_errors: bool = False) -> Optional[Dict]:
+    """Get the current subscription for a user from Stripe.
+
+    Errors are logged and reported as no subscription, unless raise_errors is set.
+    """
     try:
         # Get customer ID
         db = DBConnection()
@@ -193,8 +240,156 @@ async def get_user_subscription(user_id: str) -> Optional[Dict]:
         
     except Exception as e:
         logger.error(f"Error getting subscription from Stripe: {str(e)}")
+        if raise_errors:
+            raise
         return None
 
+def get_usage_period_start(now: Optional[datetime] = None) -> datetime:
+    """Start of the period usage is counted from: the current month in UTC, not before the cutoff date."""
+    now = now or datetime.now(timezone.utc)
+    return max(datetime(now.year, now.month, 1, tzinfo=timezone.utc), USAGE_CUTOFF_DATE)
+
+
+def _monthly_usage_key(user_id: str, period_start: datetime) -> str:
+    return f"{MONTHLY_USAGE_KEY_PREFIX}:{user_id}:{period_start:%Y-%m}"
+
+
+async def record_usage(user_id: str, thread_created_at: datetime, prompt_tokens: int, completion_tokens: int, model: str) -> None:
+    """
+    Add the cost of one LLM response to the account's monthly usage counter.
+
+    Must be called after the usage message has been written, so that a counter
+    rebuilt from the usage logs in the meantime already includes it.
+    """
+    period_start = get_usage_period_start()
+    # Usage logs only count threads created in the current period
+    if thread_created_at < period_start:
+        return
+
+    cost = calculate_token_cost(prompt_tokens, completion_tokens, model)
+    if cost <= 0:
+        return
+
+    redis_client = await redis.get_client()
+    await redis_client.eval(INCREMENT_MONTHLY_USAGE_SCRIPT, 1, _monthly_usage_key(user_id, period_start), repr(cost))
+
+
+async def get_monthly_usage(client, user_id: str) -> float:
+    """
+    Get the account's usage cost for the current month from its running counter.
+
+    The counter is built from the usage logs when missing, e.g. on the first
+    read of a month, and kept up to date by record_usage afterwards.
+    """
+    key = _monthly_usage_key(user_id, get_usage_period_start())
+    try:
+        cached_usage = await redis.get(key)
+        if cached_usage is not None:
+            return float(cached_usage)
+    except Exception as e:
+        logger.warning(f"Error reading monthly usage counter for {user_id}: {str(e)}")
+        return await calculate_monthly_usage(client, user_id)
+
+    current_usage = await calculate_monthly_usage(client, user_id)
+    try:
+        # NX keeps a counter built concurrently, together with the increments it received since
+        await redis.set(key, repr(current_usage), ex=MONTHLY_USAGE_KEY_TTL, nx=True)
+    except Exception as e:
+        logger.warning(f"Error storing monthly usage counter for {user_id}: {str(e)}")
+    return current_usage
+
+
+async def reconcile_monthly_usage(client, user_ids: Optional[List[str]] = None) -> Dict[str, float]:
+    """
+    Rebuild monthly usage counters from the usage logs.
+
+    Corrects drift from increments that were lost, e.g. while a counter was
+    being built or Redis was unavailable. A counter is only replaced if it did
+    not change while the logs were summed, so increments landing meanwhile are
+    not overwritten; a counter that keeps changing is retried a few times and
+    otherwise left for the next run.
+
+    Args:
+        user_ids: Accounts to reconcile; defaults to every account with a counter this month.
+
+    Returns:
+        Dict mapping each account to the difference between its rebuilt and previous usage.
+    """
+    period_start = get_usage_period_start()
+    redis_client = await redis.get_client()
+    if user_ids is None:
+        # SCAN walks the keyspace incrementally instead of blocking Redis like KEYS
+        pattern = f"{MONTHLY_USAGE_KEY_PREFIX}:*:{period_start:%Y-%m}"
+        user_ids = [key.split(":")[-2] async for key in redis_client.scan_iter(match=pattern, count=1000)]
+
+    drift = {}
+    for user_id in user_ids:
+        key = _monthly_usage_key(user_id, period_start)
+        try:
+            for _ in range(USAGE_RECONCILE_ATTEMPTS):
+                observed = await redis.get(key)
+                current_usage = await calculate_monthly_usage(client, user_id)
+                replaced = await redis_client.eval(
+                    RECONCILE_MONTHLY_USAGE_SCRIPT, 1, key,
+                    observed if observed is not None else "", repr(current_usage), MONTHLY_USAGE_KEY_TTL
+                )
+                if replaced:
+                    break
+            else:
+                logger.info(f"Monthly usage counter for {user_id} kept changing, reconciling it on the next run")
+                continue
+
+            drift[user_id] = current_usage - float(observed or 0.0)
+            if abs(drift[user_id]) > 0.01:
+                logger.warning(f"Monthly usage counter for {user_id} drifted by {drift[user_id]:.4f}, reconciled to {current_usage:.4f}")
+        except Exception as e:
+            logger.error(f"Error reconciling monthly usage for {user_id}: {str(e)}")
+
+    logger.info(f"Reconciled monthly usage counters for {len(drift)} accounts")
+    return drift
+
+
+async def _schedule_usage_reconciliation(enqueue: Callable[[], Any], interval: float) -> None:
+    while True:
+        try:
+            # Whichever instance takes the lock enqueues the job for this interval
+            if await redis.set(USAGE_RECONCILE_LOCK_KEY, "1", ex=max(1, int(interval)), nx=True):
+                enqueue()
+                logger.info("Enqueued monthly usage reconciliation")
+        except Exception as e:
+            logger.warning(f"Failed to schedule monthly usage reconciliation: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+def start_usage_reconciliation(enqueue: Callable[[], Any], interval: float = USAGE_RECONCILE_INTERVAL) -> None:
+    """
+    Periodically enqueue the reconciliation of the monthly usage counters.
+
+    Args:
+        enqueue: Sends the reconciliation job, e.g. the reconcile_billing_usage actor.
+        interval: Seconds between reconciliations; 0 disables them.
+    """
+    global _usage_reconcile_task
+    if interval <= 0:
+        return
+    if _usage_reconcile_task is None or _usage_reconcile_task.done():
+        _usage_reconcile_task = asyncio.create_task(
+            _schedule_usage_reconciliation(enqueue, interval), name="billing-usage-reconciliation"
+        )
+
+
+async def stop_usage_reconciliation() -> None:
+    global _usage_reconcile_task
+    task, _usage_reconcile_task = _usage_reconcile_task, None
+    if task is None or task.done():
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
 async def calculate_monthly_usage(client, user_id: str) -> float:
     """Calculate total agent run minutes for the current month for a user."""
     start_time = time.time()
@@ -230,15 +425,8 @@ async def calculate_monthly_usage(client, user_id: str) -> float:
 
 async def get_usage_logs(client, user_id: str, page: int = 0, items_per_page: int = 1000) -> Dict:
     """Get detailed usage logs for a user with pagination."""
-    # Get start of current month in UTC
-    now = datetime.now(timezone.utc)
-    start_of_month = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
-    
-    # Use fixed cutoff date: June 26, 2025 midnight UTC
-    # Ignore all token counts before this date
-    cutoff_date = datetime(2025, 6, 30, 9, 0, 0, tzinfo=timezone.utc)
-    
-    start_of_month = max(start_of_month, cutoff_date)
+    # Get start of current month in UTC, ignoring token counts before the cutoff date
+    start_of_month = get_usage_period_start()
     
     # First get all threads for this user in batches
     batch_size = 1000
@@ -412,6 +600,82 @@ def calculate_token_cost(prompt_tokens: int, completion_tokens: int, model: str)
         logger.error(f"Error calculating token cost for model {model}: {str(e)}")
         return 0.0
 
+def _get_price_id(subscription: Optional[Dict]) -> str:
+    """Price ID of a subscription's first item, or the free tier without a subscription."""
+    if not subscription:
+        return config.STRIPE_FREE_TIER_ID
+    if subscription.get('items') and subscription['items'].get('data') and len(subscription['items']['data']) > 0:
+        return subscription['items']['data'][0]['price']['id']
+    return subscription.get('price_id', config.STRIPE_FREE_TIER_ID)
+
+
+async def _fetch_entitlements(user_id: str, key: str) -> Dict:
+    try:
+        subscription = await get_user_subscription(user_id, raise_errors=True)
+        cacheable = True
+    except Exception:
+        # Fall back to the free tier for this check only, without caching it
+        subscription, cacheable = None, False
+    price_id = _get_price_id(subscription)
+
+    # Get tier info - default to free tier if not found
+    tier_info = SUBSCRIPTION_TIERS.get(price_id)
+    if not tier_info:
+        logger.warning(f"Unknown subscription tier: {price_id}, defaulting to free tier")
+        tier_info = SUBSCRIPTION_TIERS[config.STRIPE_FREE_TIER_ID]
+
+    entitlements = {
+        'price_id': price_id,
+        'tier': tier_info['name'],
+        'cost_limit': tier_info['cost'],
+        'allowed_models': MODEL_ACCESS_TIERS.get(tier_info['name'], MODEL_ACCESS_TIERS['free']),
+        'subscription': json.loads(json.dumps(subscription, default=str)) if subscription else None
+    }
+    if cacheable:
+        try:
+            await redis.set(key, json.dumps(entitlements), ex=ENTITLEMENT_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Error caching entitlements for {user_id}: {str(e)}")
+    return entitlements
+
+
+async def get_entitlements(user_id: str) -> Dict:
+    """
+    Get what a user's subscription entitles them to: tier, allowed models and monthly cost limit.
+
+    Cached in Redis for ENTITLEMENT_CACHE_TTL seconds and invalidated by the
+    Stripe webhook, so billing gates don't call Stripe on every check.
+    Concurrent lookups for the same user in this process share one fetch.
+
+    Returns:
+        Dict with price_id, tier, cost_limit, allowed_models and the Stripe subscription (or None).
+    """
+    key = f"{ENTITLEMENT_KEY_PREFIX}:{user_id}"
+    try:
+        cached = await redis.get(key)
+        if cached:
+            return json.loads(cached)
+    except Exception as e:
+        logger.warning(f"Error reading cached entitlements for {user_id}: {str(e)}")
+
+    fetch = _entitlement_fetches.get(user_id)
+    if fetch is None:
+        fetch = asyncio.ensure_future(_fetch_entitlements(user_id, key))
+        _entitlement_fetches[user_id] = fetch
+        fetch.add_done_callback(lambda _: _entitlement_fetches.pop(user_id, None))
+    # Shielded so that one cancelled caller doesn't fail the others
+    return await asyncio.shield(fetch)
+
+
+async def invalidate_entitlements(user_id: str) -> None:
+    """Drop a user's cached entitlements, e.g. after their subscription changed."""
+    try:
+        await redis.delete(f"{ENTITLEMENT_KEY_PREFIX}:{user_id}")
+        logger.info(f"Invalidated cached entitlements for {user_id}")
+    except Exception as e:
+        logger.error(f"Error invalidating cached entitlements for {user_id}: {str(e)}")
+
+
 async def get_allowed_models_for_user(client, user_id: str):
     """
     Get the list of models allowed for a user based on their subscription tier.
@@ -419,24 +683,8 @@ async def get_allowed_models_for_user(client, user_id: str):
     Returns:
         List of model names allowed for the user's subscription tier.
     """
-
-    subscription = await get_user_subscription(user_id)
-    tier_name = 'free'
-    
-    if subscription:
-        price_id = None
-        if subscription.get('items') and subscription['items'].get('data') and len(subscription['items']['data']) > 0:
-            price_id = subscription['items']['data'][0]['price']['id']
-        else:
-            price_id = subscription.get('price_id', config.STRIPE_FREE_TIER_ID)
-        
-        # Get tier info for this price_id
-        tier_info = SUBSCRIPTION_TIERS.get(price_id)
-        if tier_info:
-            tier_name = tier_info['name']
-    
-    # Return allowed models for this tier
-    return MODEL_ACCESS_TIERS.get(tier_name, MODEL_ACCESS_TIERS['free'])  # Default to free tier if unknown
+    entitlements = await get_entitlements(user_id)
+    return entitlements['allowed_models']
 
 
 async def can_use_model(client, user_id: str, model_name: str):
@@ -470,36 +718,21 @@ async def check_billing_status(client, user_id: str) -> Tuple[bool, str, Optiona
             "minutes_limit": "no limit"
         }
     
-    # Get current subscription
-    subscription = await get_user_subscription(user_id)
-    # print("Current subscription:", subscription)
+    # Subscription tier and limits, cached between checks
+    entitlements = await get_entitlements(user_id)
     
     # If no subscription, they can use free tier
-    if not subscription:
-        subscription = {
-            'price_id': config.STRIPE_FREE_TIER_ID,  # Free tier
-            'plan_name': 'free'
-        }
-    
-    # Extract price ID from subscription items
-    price_id = None
-    if subscription.get('items') and subscription['items'].get('data') and len(subscription['items']['data']) > 0:
-        price_id = subscription['items']['data'][0]['price']['id']
-    else:
-        price_id = subscription.get('price_id', config.STRIPE_FREE_TIER_ID)
-    
-    # Get tier info - default to free tier if not found
-    tier_info = SUBSCRIPTION_TIERS.get(price_id)
-    if not tier_info:
-        logger.warning(f"Unknown subscription tier: {price_id}, defaulting to free tier")
-        tier_info = SUBSCRIPTION_TIERS[config.STRIPE_FREE_TIER_ID]
+    subscription = entitlements['subscription'] or {
+        'price_id': config.STRIPE_FREE_TIER_ID,  # Free tier
+        'plan_name': 'free'
+    }
     
-    # Calculate current month's usage
-    current_usage = await calculate_monthly_usage(client, user_id)
+    # Current month's usage from the running counter
+    current_usage = await get_monthly_usage(client, user_id)
     
     # Check if within limits
-    if current_usage >= tier_info['cost']:
-        return False, f"Monthly limit of {tier_info['cost']} dollars reached. Please upgrade your plan or wait until next month.", subscription
+    if current_usage >= entitlements['cost_limit']:
+        return False, f"Monthly limit of {entitlements['cost_limit']} dollars reached. Please upgrade your plan or wait until next month.", subscription
     
     return True, "OK", subscription
 
@@ -582,6 +815,7 @@ async def create_checkout_session(
                         {'active': True}
                     ).eq('id', customer_id).execute()
                     logger.info(f"Updated customer {customer_id} active status to TRUE after subscription upgrade")
+                    await invalidate_entitlements(current_user_id)
                     
                     latest_invoice = None
                     if updated_subscription.get('latest_invoice'):
@@ -903,7 +1137,7 @@ async def get_subscription(
         # Calculate current usage
         db = DBConnection()
         client = await db.client
-        current_usage = await calculate_monthly_usage(client, current_user_id)
+        current_usage = await get_monthly_usage(client, current_user_id)
 
         if not subscription:
             # Default to free tier status if no active subscription for our product
@@ -1071,6 +1305,14 @@ async def stripe_webhook(request: Request):
                     ).eq('id', customer_id).execute()
                     logger.info(f"Webhook: Updated customer {customer_id} active status to FALSE after subscription deletion")
             
+            # Billing gates must see the new subscription right away
+            customer_result = await client.schema('basejump').from_('billing_customers') \
+                .select('account_id') \
+                .eq('id', customer_id) \
+                .execute()
+            for customer in customer_result.data or []:
+                await invalidate_entitlements(customer['account_id'])
+            
             logger.info(f"Processed {event.type} event for customer {customer_id}")
         
         return {"status": "success"}
@@ -19,6 +19,7 @@ import litellm
 from litellm.files.main import ModelResponse
 from utils.logger import logger
 from utils.config import config
+from services.llm_cache import llm_response_cache, is_cacheable
 
 # litellm.set_verbose=True
 litellm.modify_params=True
@@ -272,7 +273,8 @@ async def make_llm_api_call(
     top_p: Optional[float] = None,
     model_id: Optional[str] = None,
     enable_thinking: Optional[bool] = False,
-    reasoning_effort: Optional[str] = 'low'
+    reasoning_effort: Optional[str] = 'low',
+    cache: bool = False
 ) -> Union[Dict[str, Any], AsyncGenerator, ModelResponse]:
     """
     Make an API call to a language model using LiteLLM.
@@ -292,6 +294,8 @@ async def make_llm_api_call(
         model_id: Optional ARN for Bedrock inference profiles
         enable_thinking: Whether to enable thinking
         reasoning_effort: Level of reasoning effort
+        cache: Serve identical non-streaming calls with temperature 0 from the
+            response cache, coalescing concurrent duplicates
 
     Returns:
         Union[Dict[str, Any], AsyncGenerator]: API response or stream
@@ -319,6 +323,15 @@ async def make_llm_api_call(
         enable_thinking=enable_thinking,
         reasoning_effort=reasoning_effort
     )
+
+    if cache:
+        if is_cacheable(params):
+            return await llm_response_cache.get_or_call(params, lambda: _call_with_retries(params, model_name))
+        logger.debug(f"Skipping LLM response cache for {model_name}: only non-streaming calls with temperature 0 are cached")
+
+    return await _call_with_retries(params, model_name)
+
+async def _call_with_retries(params: Dict[str, Any], model_name: str) -> Union[AsyncGenerator, ModelResponse]:
     last_error = None
     for attempt in range(MAX_RETRIES):
         try:
@@ -0,0 +1,144 @@
+"""
+Response cache for non-streaming LLM calls.
+
+Auxiliary calls are often repeated with the same prompt, by retries or by
+concurrent duplicate requests. Calls that opt in with
+`make_llm_api_call(..., cache=True)` are keyed by a digest of the prepared
+params and answered, in order, from:
+
+- an in-process LRU of LLM_RESPONSE_CACHE_SIZE entries,
+- a call already in flight for the same key (single-flight), or
+- Redis, where responses are kept for LLM_RESPONSE_CACHE_TTL seconds.
+
+Only deterministic calls (temperature 0) are cached.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import litellm
+
+from services.metrics import get_metrics_collector
+from utils.logger import logger
+
+LLM_RESPONSE_CACHE_SIZE = int(os.getenv("LLM_RESPONSE_CACHE_SIZE", 256))
+LLM_RESPONSE_CACHE_TTL = int(os.getenv("LLM_RESPONSE_CACHE_TTL", 3600))
+
+# Params that don't change the response, or that must never end up in a key
+_IGNORED_PARAMS = {"api_key", "fallbacks", "stream"}
+
+
+def is_cacheable(params: Dict[str, Any]) -> bool:
+    return not params.get("stream") and params.get("temperature") == 0
+
+
+class LLMResponseCache:
+    KEY_PREFIX = "llm:response"
+
+    def __init__(self, max_size: int = LLM_RESPONSE_CACHE_SIZE, ttl: int = LLM_RESPONSE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"local_hits": 0, "redis_hits": 0, "coalesced": 0, "misses": 0}
+
+    def key(self, params: Dict[str, Any]) -> str:
+        canonical = {name: value for name, value in params.items() if name not in _IGNORED_PARAMS}
+        digest = hashlib.sha256(json.dumps(canonical, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{self.KEY_PREFIX}:{digest}"
+
+    async def get_or_call(self, params: Dict[str, Any], call: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached response for `params`, calling the provider on a miss."""
+        if self.ttl <= 0:
+            return await call()
+        key = self.key(params)
+
+        data = self._get_local(key)
+        if data is not None:
+            self._record("local_hits")
+            return litellm.ModelResponse(**data)
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._record("coalesced")
+        else:
+            task = asyncio.create_task(self._fetch(key, call))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # A caller that is cancelled must not cancel the call the others wait on
+        data = await asyncio.shield(task)
+        return litellm.ModelResponse(**data)
+
+    async def _fetch(self, key: str, call: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        data = await self._get_redis(key)
+        if data is not None:
+            self._record("redis_hits")
+        else:
+            self._record("misses")
+            response = await call()
+            data = response.model_dump()
+            await self._set_redis(key, data)
+        self._set_local(key, data)
+        return data
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return data
+
+    def _set_local(self, key: str, data: Dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+        self._local[key] = (time.monotonic() + self.ttl, data)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    async def _get_redis(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            from services import redis
+            redis_client = await redis.get_client()
+            cached = await redis_client.get(key)
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"Failed to read cached LLM response: {str(e)}")
+            return None
+
+    async def _set_redis(self, key: str, data: Dict[str, Any]) -> None:
+        try:
+            from services import redis
+            redis_client = await redis.get_client()
+            await redis_client.set(key, json.dumps(data, default=str), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to cache LLM response: {str(e)}")
+
+    def _record(self, result: str) -> None:
+        self.stats[result] += 1
+        get_metrics_collector().record_llm_cache_lookup(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = sum(self.stats.values())
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._local),
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+
+llm_response_cache = LLMResponseCache()
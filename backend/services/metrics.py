@@ -182,6 +182,58 @@ class MetricsCollector:
             registry=self.registry
         )
         
+        self.llm_cache_lookups_total = Counter(
+            'llm_cache_lookups_total',
+            'Total number of cached LLM call lookups',
+            ['result'],  # result: local_hits/redis_hits/coalesced/misses
+            registry=self.registry
+        )
+        
+        # Agent Response Streaming Metrics
+        self.agent_responses_written_total = Counter(
+            'agent_responses_written_total',
+            'Total number of agent responses written to Redis',
+            ['status'],
+            registry=self.registry
+        )
+        
+        self.agent_response_batch_size = Histogram(
+            'agent_response_batch_size',
+            'Number of agent responses per pipelined Redis write',
+            buckets=[1, 2, 5, 10, 20, 50, 100, 200],
+            registry=self.registry
+        )
+        
+        self.agent_response_latency_seconds = Histogram(
+            'agent_response_latency_seconds',
+            'Time from an agent response being produced to its publish notification',
+            buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5],
+            registry=self.registry
+        )
+        
+        self.agent_response_backpressure_seconds = Histogram(
+            'agent_response_backpressure_seconds',
+            'Time agent runs spent blocked waiting for Redis to drain responses',
+            buckets=[0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0],
+            registry=self.registry
+        )
+        
+        self.agent_run_response_throughput = Histogram(
+            'agent_run_response_throughput',
+            'Agent responses written per second over a whole agent run',
+            buckets=[1, 5, 10, 25, 50, 100, 250, 500, 1000],
+            registry=self.registry
+        )
+        
+        # Sandbox Metrics
+        self.sandbox_resolve_duration_seconds = Histogram(
+            'sandbox_resolve_duration_seconds',
+            'Time to resolve (and start if needed) the sandbox of a project',
+            ['kind'],  # kind: cold/refresh
+            buckets=[0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0],
+            registry=self.registry
+        )
+        
         # System Metrics
         self.application_info = Info(
             'application_info',
@@ -395,6 +447,32 @@ class MetricsCollector:
                 type="output"
             ).inc(output_tokens)
     
+    def record_llm_cache_lookup(self, result: str):
+        """Record the outcome of an LLM response cache lookup."""
+        self.llm_cache_lookups_total.labels(result=result).inc()
+    
+    def record_response_batch(self, size: int, status: str, duration: float, latencies: Optional[list] = None):
+        """Record a pipelined write of agent responses to Redis."""
+        self.agent_responses_written_total.labels(status=status).inc(size)
+        self.agent_response_batch_size.observe(size)
+        self.record_redis_operation("RPUSH_PUBLISH_BATCH", status, duration)
+        
+        for latency in latencies or []:
+            self.agent_response_latency_seconds.observe(latency)
+    
+    def record_response_backpressure(self, duration: float):
+        """Record time an agent run was blocked by a full response buffer."""
+        self.agent_response_backpressure_seconds.observe(duration)
+    
+    def record_run_response_throughput(self, responses: int, duration: float):
+        """Record the response throughput of a finished agent run."""
+        if duration > 0:
+            self.agent_run_response_throughput.observe(responses / duration)
+    
+    def record_sandbox_resolve(self, kind: str, duration: float):
+        """Record the resolution of a project's sandbox by the sandbox registry."""
+        self.sandbox_resolve_duration_seconds.labels(kind=kind).observe(duration)
+    
     # Error Metrics Methods
     def record_error(self, error_type: str, component: str):
         """Record error occurrence."""
@@ -3,7 +3,7 @@ import os
 from dotenv import load_dotenv
 import asyncio
 from utils.logger import logger
-from typing import List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from utils.retry import retry
 from services.metrics_decorators import instrument_redis_operation, time_redis_operation
 
@@ -165,6 +165,15 @@ async def rpush(key: str, *values: Any):
     return await redis_client.rpush(key, *values)
 
 
+async def rpush_and_publish(key: str, values: List[Any], channel: str, message: str):
+    """Append values to a list and publish a notification in one pipelined round trip."""
+    redis_client = await get_client()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.rpush(key, *values)
+        pipe.publish(channel, message)
+        return await pipe.execute()
+
+
 @instrument_redis_operation("LRANGE")
 async def lrange(key: str, start: int, end: int) -> List[str]:
     """Get a range of elements from a list."""
@@ -172,6 +181,32 @@ async def lrange(key: str, start: int, end: int) -> List[str]:
     return await redis_client.lrange(key, start, end)
 
 
+# Stream operations
+async def xadd_many(key: str, entries: List[Dict[str, Any]], maxlen: Optional[int] = None):
+    """Append entries to a stream in one pipelined round trip, trimming it to roughly `maxlen`."""
+    redis_client = await get_client()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for fields in entries:
+            pipe.xadd(key, fields, maxlen=maxlen, approximate=True)
+        return await pipe.execute()
+
+
+async def xread(streams: Dict[str, str], count: Optional[int] = None, block: Optional[int] = None) -> List[Tuple[str, List[Tuple[str, Dict[str, str]]]]]:
+    """Read entries newer than the given IDs from one or more streams, blocking up to `block` ms.
+
+    Not instrumented: blocking reads would swamp the operation latency histogram.
+    """
+    redis_client = await get_client()
+    return await redis_client.xread(streams, count=count, block=block)
+
+
+@instrument_redis_operation("XRANGE")
+async def xrange(key: str, min: str = "-", max: str = "+", count: Optional[int] = None) -> List[Tuple[str, Dict[str, str]]]:
+    """Get the entries of a stream with IDs between `min` and `max`."""
+    redis_client = await get_client()
+    return await redis_client.xrange(key, min=min, max=max, count=count)
+
+
 # Key management
 
 
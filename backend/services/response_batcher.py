@@ -0,0 +1,169 @@
+"""
+Coalescing writer for streamed agent responses.
+
+run_agent_background used to spawn one RPUSH task and one PUBLISH task per
+yielded response. BatchedResponseWriter buffers responses and writes them with
+a single pipelined RPUSH + PUBLISH per batch, flushing when the batch is full
+or after a short linger interval. When Redis falls behind, writers block once
+the buffer holds `max_pending` responses instead of piling up tasks.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services import redis
+from services.metrics import MetricsCollector, get_metrics_collector
+from utils.logger import logger
+
+DEFAULT_FLUSH_INTERVAL = 0.02  # seconds a response may wait for others to join its batch
+DEFAULT_MAX_BATCH_SIZE = 50
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_MAX_FLUSH_ATTEMPTS = 3
+
+PushFunction = Callable[[str, List[str], str, str], Awaitable[Any]]
+
+
+class BatchedResponseWriter:
+    """Batches agent responses into pipelined Redis writes for one agent run.
+
+    Usage:
+        writer = BatchedResponseWriter(response_list_key, response_channel)
+        writer.start()
+        await writer.write(response)
+        ...
+        await writer.close()  # flushes everything still buffered
+    """
+
+    def __init__(
+        self,
+        list_key: str,
+        channel: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_flush_attempts: int = DEFAULT_MAX_FLUSH_ATTEMPTS,
+        push: Optional[PushFunction] = None,
+        metrics: Optional[MetricsCollector] = None,
+    ):
+        self.list_key = list_key
+        self.channel = channel
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.max_pending = max(max_pending, max_batch_size)
+        self.max_flush_attempts = max_flush_attempts
+        self._push = push or redis.rpush_and_publish
+        self._metrics = metrics or get_metrics_collector()
+
+        self._buffer: List[Tuple[str, float]] = []  # (response_json, enqueued_at)
+        self._condition = asyncio.Condition()
+        self._write_lock = asyncio.Lock()  # one batch in flight at a time keeps responses ordered
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+        self._started_at: Optional[float] = None
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def start(self) -> None:
+        """Start the background flusher."""
+        if self._flusher is None:
+            self._started_at = time.monotonic()
+            self._flusher = asyncio.create_task(self._run())
+
+    async def write(self, response: Dict[str, Any]) -> None:
+        """Queue a response, blocking while the buffer is full."""
+        if self._closed:
+            raise RuntimeError(f"Response writer for {self.list_key} is closed")
+        if self._flusher is None:
+            self.start()
+
+        response_json = json.dumps(response)
+        async with self._condition:
+            if len(self._buffer) >= self.max_pending:
+                wait_start = time.monotonic()
+                await self._condition.wait_for(lambda: len(self._buffer) < self.max_pending or self._flusher.done())
+                self._metrics.record_response_backpressure(time.monotonic() - wait_start)
+            self._buffer.append((response_json, time.monotonic()))
+            self._condition.notify_all()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far before returning."""
+        async with self._write_lock:
+            while True:
+                async with self._condition:
+                    if not self._buffer:
+                        return
+                    batch = self._take_batch()
+                await self._write_batch(batch)
+
+    async def close(self) -> None:
+        """Flush the remaining responses and stop the flusher."""
+        if self._closed:
+            return
+        self._closed = True
+        async with self._condition:
+            self._condition.notify_all()
+        if self._flusher:
+            try:
+                await self._flusher
+            except Exception as e:
+                logger.error(f"Response flusher for {self.list_key} failed: {e}", exc_info=True)
+        await self.flush()
+
+        if self._started_at is not None:
+            self._metrics.record_run_response_throughput(self.written, time.monotonic() - self._started_at)
+        logger.debug(f"Response writer for {self.list_key} closed: {self.written} written in {self.batches} batches, {self.dropped} dropped")
+
+    def _take_batch(self) -> List[Tuple[str, float]]:
+        batch = self._buffer[:self.max_batch_size]
+        del self._buffer[:self.max_batch_size]
+        self._condition.notify_all()
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._buffer or self._closed)
+                if not self._buffer:
+                    return
+                if len(self._buffer) < self.max_batch_size and not self._closed:
+                    # Let more responses join the batch, up to the linger interval
+                    try:
+                        await asyncio.wait_for(
+                            self._condition.wait_for(lambda: len(self._buffer) >= self.max_batch_size or self._closed),
+                            timeout=self.flush_interval,
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+            async with self._write_lock:
+                async with self._condition:
+                    batch = self._take_batch()
+                if batch:
+                    await self._write_batch(batch)
+
+    async def _write_batch(self, batch: List[Tuple[str, float]]) -> None:
+        values = [response_json for response_json, _ in batch]
+        for attempt in range(1, self.max_flush_attempts + 1):
+            start = time.monotonic()
+            try:
+                await self._push(self.list_key, values, self.channel, "new")
+            except Exception as e:
+                self._metrics.record_response_batch(len(values), "error", time.monotonic() - start)
+                if attempt == self.max_flush_attempts:
+                    self.dropped += len(values)
+                    logger.error(f"Dropping {len(values)} responses for {self.list_key} after {attempt} failed writes: {e}")
+                    return
+                logger.warning(f"Failed to write {len(values)} responses to {self.list_key} (attempt {attempt}): {e}")
+                await asyncio.sleep(0.1 * (2 ** (attempt - 1)))
+                continue
+
+            now = time.monotonic()
+            self._metrics.record_response_batch(
+                len(values), "success", now - start, [now - enqueued_at for _, enqueued_at in batch]
+            )
+            self.written += len(values)
+            self.batches += 1
+            return
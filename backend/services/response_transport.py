@@ -0,0 +1,133 @@
+"""
+Transport for streamed agent responses between the worker and the API.
+
+Two transports are supported, selected with AGENT_RESPONSE_TRANSPORT:
+
+    list    (default) - responses are RPUSHed to `agent_run:{id}:responses` and a
+                        "new" notification is published on `agent_run:{id}:new_response`.
+                        Readers LRANGE the list from the index they last saw.
+    streams           - responses are XADDed to the Redis Stream `agent_run:{id}:stream`,
+                        trimmed to roughly AGENT_RESPONSE_STREAM_MAXLEN entries. Readers
+                        block on XREAD from the last entry ID they saw, so no pub/sub
+                        connection is needed for data and clients can resume from an
+                        SSE Last-Event-ID.
+
+The worker and the API must run with the same transport.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import redis
+from services.response_batcher import BatchedResponseWriter
+
+LIST_TRANSPORT = "list"
+STREAMS_TRANSPORT = "streams"
+
+RESPONSE_TRANSPORT = os.getenv("AGENT_RESPONSE_TRANSPORT", LIST_TRANSPORT).lower()
+RESPONSE_STREAM_MAXLEN = int(os.getenv("AGENT_RESPONSE_STREAM_MAXLEN", 50000))
+
+STREAM_START_ID = "0-0"
+STREAM_READ_BLOCK_MS = 5000  # must stay below the Redis socket timeout
+STREAM_READ_COUNT = 500
+
+_STREAM_ID_PATTERN = re.compile(r'^\d+-\d+$')
+
+
+def streams_enabled() -> bool:
+    return RESPONSE_TRANSPORT == STREAMS_TRANSPORT
+
+
+def response_list_key(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:responses"
+
+
+def response_stream_key(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:stream"
+
+
+def response_channel(agent_run_id: str) -> str:
+    return f"agent_run:{agent_run_id}:new_response"
+
+
+def response_key(agent_run_id: str) -> str:
+    """Key holding the run's responses for the configured transport."""
+    return response_stream_key(agent_run_id) if streams_enabled() else response_list_key(agent_run_id)
+
+
+def parse_stream_id(value: Optional[str]) -> Optional[str]:
+    """Validate a client-supplied stream cursor such as an SSE Last-Event-ID."""
+    if value and _STREAM_ID_PATTERN.match(value.strip()):
+        return value.strip()
+    return None
+
+
+async def xadd_responses(key: str, values: List[str], channel: str, message: str):
+    """Append serialized responses to a stream.
+
+    Matches the push signature of BatchedResponseWriter; `channel` and `message`
+    are unused because stream readers are woken by XREAD itself.
+    """
+    return await redis.xadd_many(key, [{"data": value} for value in values], maxlen=RESPONSE_STREAM_MAXLEN)
+
+
+def create_response_writer(agent_run_id: str) -> BatchedResponseWriter:
+    """Batched writer for the run's responses on the configured transport."""
+    if streams_enabled():
+        return BatchedResponseWriter(
+            response_stream_key(agent_run_id), response_channel(agent_run_id), push=xadd_responses
+        )
+    return BatchedResponseWriter(response_list_key(agent_run_id), response_channel(agent_run_id))
+
+
+async def append_response(agent_run_id: str, response: Dict[str, Any]) -> None:
+    """Write a single response outside of a batched writer."""
+    value = json.dumps(response)
+    if streams_enabled():
+        await xadd_responses(response_stream_key(agent_run_id), [value], response_channel(agent_run_id), "new")
+    else:
+        await redis.rpush_and_publish(response_list_key(agent_run_id), [value], response_channel(agent_run_id), "new")
+
+
+async def read_stream_responses(
+    agent_run_id: str,
+    last_id: str = STREAM_START_ID,
+    block_ms: Optional[int] = None,
+    count: int = STREAM_READ_COUNT,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Read responses added after `last_id`, blocking up to `block_ms` for new ones.
+
+    Returns:
+        (entry_id, response) pairs in stream order; empty if the read timed out
+    """
+    result = await redis.xread({response_stream_key(agent_run_id): last_id}, count=count, block=block_ms)
+    if not result:
+        return []
+    _, entries = result[0]
+    return [(entry_id, json.loads(fields["data"])) for entry_id, fields in entries]
+
+
+async def fetch_all_responses(agent_run_id: str) -> List[Dict[str, Any]]:
+    """Every response of the run still held in Redis, oldest first."""
+    if not streams_enabled():
+        return [json.loads(r) for r in await redis.lrange(response_list_key(agent_run_id), 0, -1)]
+
+    key = response_stream_key(agent_run_id)
+    responses: List[Dict[str, Any]] = []
+    start = "-"
+    while True:
+        entries = await redis.xrange(key, min=start, count=STREAM_READ_COUNT)
+        responses.extend(json.loads(fields["data"]) for _, fields in entries)
+        if len(entries) < STREAM_READ_COUNT:
+            return responses
+        start = f"({entries[-1][0]}"
+
+
+async def expire_responses(agent_run_id: str, seconds: int):
+    return await redis.expire(response_key(agent_run_id), seconds)
+
+
+async def delete_responses(agent_run_id: str):
+    return await redis.delete(response_key(agent_run_id))
@@ -0,0 +1,150 @@
+"""
+Tests for the thread access and thread lookup caches in auth_utils.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from utils import auth_utils
+from utils.auth_utils import _TTLCache, get_account_id_from_thread, verify_thread_access
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = {}
+
+    def select(self, *_):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    async def execute(self):
+        self.client.queries.append(self.table)
+        rows = [
+            row for row in self.client.rows[self.table]
+            if all(row.get(column) == value for column, value in self.filters.items())
+        ]
+        return SimpleNamespace(data=rows)
+
+
+class FakeClient:
+    def __init__(self):
+        self.queries = []
+        self.rows = {
+            "threads": [{"thread_id": "t1", "account_id": "acc", "project_id": "p1"}],
+            "projects": [{"project_id": "p1", "is_public": False}],
+            "account_user": [{"user_id": "member", "account_id": "acc", "account_role": "owner"}],
+        }
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def schema(self, _):
+        return SimpleNamespace(from_=self.table)
+
+
+class FakeMonotonic:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeMonotonic()
+    monkeypatch.setattr(auth_utils.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    auth_utils._thread_info_cache.clear()
+    auth_utils._thread_access_cache.clear()
+    yield
+    auth_utils._thread_info_cache.clear()
+    auth_utils._thread_access_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_granted_access_is_served_from_the_cache(clock):
+    client = FakeClient()
+
+    assert await verify_thread_access(client, "t1", "member") is True
+    assert sorted(client.queries) == ["account_user", "projects", "threads"]
+
+    client.queries.clear()
+    assert await verify_thread_access(client, "t1", "member") is True
+    assert client.queries == []
+
+
+@pytest.mark.asyncio
+async def test_denials_are_not_cached(clock):
+    client = FakeClient()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await verify_thread_access(client, "t1", "outsider")
+    assert exc_info.value.status_code == 403
+
+    # Access granted right after the denial is seen on the next check
+    client.rows["account_user"].append({"user_id": "outsider", "account_id": "acc", "account_role": "member"})
+    assert await verify_thread_access(client, "t1", "outsider") is True
+
+
+@pytest.mark.asyncio
+async def test_revoked_access_takes_effect_when_the_grant_expires(clock):
+    client = FakeClient()
+    client.rows["projects"][0]["is_public"] = True
+    assert await verify_thread_access(client, "t1", "outsider") is True
+
+    # The project is made private: the grant is still served within the TTL
+    client.rows["projects"][0]["is_public"] = False
+    clock.now += auth_utils.THREAD_ACCESS_CACHE_TTL - 1
+    assert await verify_thread_access(client, "t1", "outsider") is True
+
+    clock.now += 2
+    with pytest.raises(HTTPException) as exc_info:
+        await verify_thread_access(client, "t1", "outsider")
+    assert exc_info.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_thread_lookup_is_shared_with_get_account_id_from_thread(clock):
+    client = FakeClient()
+    assert await verify_thread_access(client, "t1", "member") is True
+
+    client.queries.clear()
+    assert await get_account_id_from_thread(client, "t1") == "acc"
+    assert client.queries == []
+
+
+@pytest.mark.asyncio
+async def test_missing_thread_is_not_found(clock):
+    with pytest.raises(HTTPException) as exc_info:
+        await verify_thread_access(FakeClient(), "missing", "member")
+    assert exc_info.value.status_code == 404
+
+
+def test_ttl_cache_evicts_least_recently_used_and_can_be_disabled(clock):
+    cache = _TTLCache(ttl=10, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+    clock.now += 11
+    assert cache.get("a") is None
+
+    disabled = _TTLCache(ttl=0)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
@@ -0,0 +1,187 @@
+"""
+Tests for the cached subscription entitlements used by billing gates.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from services import billing
+from services.billing import ENTITLEMENT_KEY_PREFIX, get_entitlements, invalidate_entitlements
+from utils.config import config
+
+PAID_PRICE_ID = config.STRIPE_TIER_6_50_ID
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    from services import redis
+
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(redis, "get_client", get_client)
+    return client
+
+
+class Subscriptions:
+    """get_user_subscription stand-in; lookups wait until `ready` is set."""
+
+    def __init__(self):
+        self.price_ids = {}
+        self.lookups = []
+        self.error = None
+        self.ready = asyncio.Event()
+        self.ready.set()
+
+    async def get_user_subscription(self, user_id, raise_errors=False):
+        self.lookups.append(user_id)
+        await self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        price_id = self.price_ids.get(user_id)
+        return {"id": f"sub_{user_id}", "price_id": price_id} if price_id else None
+
+
+@pytest.fixture
+def subscriptions(monkeypatch):
+    subscriptions = Subscriptions()
+    monkeypatch.setattr(billing, "get_user_subscription", subscriptions.get_user_subscription)
+    return subscriptions
+
+
+def key(user_id: str) -> str:
+    return f"{ENTITLEMENT_KEY_PREFIX}:{user_id}"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_fetch(redis_client, subscriptions):
+    subscriptions.price_ids["alice"] = PAID_PRICE_ID
+    subscriptions.ready.clear()
+
+    lookups = [asyncio.create_task(get_entitlements("alice")) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    subscriptions.ready.set()
+    results = await asyncio.gather(*lookups)
+
+    assert subscriptions.lookups == ["alice"]
+    assert all(result == results[0] for result in results)
+    assert (results[0]["price_id"], results[0]["tier"]) == (PAID_PRICE_ID, "tier_6_50")
+    assert billing._entitlement_fetches == {}
+
+
+@pytest.mark.asyncio
+async def test_entitlements_are_served_from_redis(redis_client, subscriptions):
+    subscriptions.price_ids["alice"] = PAID_PRICE_ID
+    first = await get_entitlements("alice")
+
+    assert json.loads(await redis_client.get(key("alice"))) == first
+    assert 0 < await redis_client.ttl(key("alice")) <= billing.ENTITLEMENT_CACHE_TTL
+
+    assert await get_entitlements("alice") == first
+    assert subscriptions.lookups == ["alice"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_fail_the_shared_fetch(redis_client, subscriptions):
+    subscriptions.ready.clear()
+
+    cancelled = asyncio.create_task(get_entitlements("alice"))
+    waiting = asyncio.create_task(get_entitlements("alice"))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    subscriptions.ready.set()
+
+    assert (await waiting)["tier"] == "free"
+    assert cancelled.cancelled()
+    assert subscriptions.lookups == ["alice"]
+
+
+@pytest.mark.asyncio
+async def test_failed_lookup_falls_back_to_free_without_caching(redis_client, subscriptions):
+    subscriptions.price_ids["alice"] = PAID_PRICE_ID
+    subscriptions.error = ConnectionError("stripe unavailable")
+
+    assert (await get_entitlements("alice"))["tier"] == "free"
+    assert await redis_client.get(key("alice")) is None
+
+    subscriptions.error = None
+    assert (await get_entitlements("alice"))["tier"] == "tier_6_50"
+    assert subscriptions.lookups == ["alice", "alice"]
+
+
+@pytest.mark.asyncio
+async def test_invalidated_entitlements_are_fetched_again(redis_client, subscriptions):
+    assert (await get_entitlements("alice"))["tier"] == "free"
+
+    subscriptions.price_ids["alice"] = PAID_PRICE_ID
+    assert (await get_entitlements("alice"))["tier"] == "free"
+
+    await invalidate_entitlements("alice")
+    assert await redis_client.get(key("alice")) is None
+    assert (await get_entitlements("alice"))["tier"] == "tier_6_50"
+
+
+class FakeBillingCustomers:
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self.updates = []
+
+    def update(self, values):
+        self.updates.append(values)
+        return self
+
+    def select(self, *_):
+        return self
+
+    def eq(self, column, value):
+        assert (column, value) == ("id", "cus_1")
+        return self
+
+    async def execute(self):
+        return SimpleNamespace(data=[{"account_id": account_id} for account_id in self.accounts])
+
+
+class FakeDBConnection:
+    customers = None
+
+    @property
+    async def client(self):
+        customers = self.customers
+        return SimpleNamespace(schema=lambda _: SimpleNamespace(from_=lambda table: customers))
+
+
+class FakeRequest:
+    headers = {"stripe-signature": "signature"}
+
+    async def body(self):
+        return b"{}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("event_type", ["customer.subscription.created", "customer.subscription.updated"])
+async def test_subscription_webhook_invalidates_the_account_entitlements(redis_client, subscriptions, monkeypatch, event_type):
+    assert (await get_entitlements("alice"))["tier"] == "free"
+    await redis_client.set(key("bob"), "{}")
+
+    event = SimpleNamespace(
+        type=event_type,
+        data=SimpleNamespace(object={"customer": "cus_1", "status": "active"}),
+    )
+    monkeypatch.setattr(billing.stripe.Webhook, "construct_event", lambda payload, signature, secret: event)
+    FakeDBConnection.customers = FakeBillingCustomers(["alice"])
+    monkeypatch.setattr(billing, "DBConnection", FakeDBConnection)
+
+    subscriptions.price_ids["alice"] = PAID_PRICE_ID
+    assert await billing.stripe_webhook(FakeRequest()) == {"status": "success"}
+
+    assert FakeDBConnection.customers.updates == [{"active": True}]
+    assert await redis_client.get(key("alice")) is None
+    assert await redis_client.get(key("bob")) == "{}"
+    assert (await get_entitlements("alice"))["tier"] == "tier_6_50"
@@ -0,0 +1,149 @@
+"""
+Tests for the running monthly usage counter used by billing checks.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from services import billing
+from services.billing import (
+    _monthly_usage_key,
+    get_monthly_usage,
+    get_usage_period_start,
+    reconcile_monthly_usage,
+    record_usage,
+)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    from services import redis
+
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(redis, "get_client", get_client)
+    return client
+
+
+class UsageLogs(dict):
+    """Usage cost per account as summed from the usage logs."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = []
+
+    async def calculate_monthly_usage(self, client, user_id):
+        self.reads.append(user_id)
+        return self.get(user_id, 0.0)
+
+
+@pytest.fixture
+def usage_logs(monkeypatch):
+    logs = UsageLogs()
+    monkeypatch.setattr(billing, "calculate_monthly_usage", logs.calculate_monthly_usage)
+    monkeypatch.setattr(billing, "calculate_token_cost", lambda prompt, completion, model: (prompt + completion) / 1000)
+    return logs
+
+
+def key(user_id: str) -> str:
+    return _monthly_usage_key(user_id, get_usage_period_start())
+
+
+def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_counter_is_built_from_the_logs_then_served_from_redis(redis_client, usage_logs):
+    usage_logs["alice"] = 1.5
+
+    assert await get_monthly_usage(None, "alice") == 1.5
+    assert float(await redis_client.get(key("alice"))) == 1.5
+
+    usage_logs["alice"] = 99.0
+    assert await get_monthly_usage(None, "alice") == 1.5
+    assert usage_logs.reads == ["alice"]
+
+
+@pytest.mark.asyncio
+async def test_record_usage_adds_to_an_existing_counter(redis_client, usage_logs):
+    await redis_client.set(key("alice"), "1.0")
+
+    await record_usage("alice", now(), 300, 200, "model")
+
+    assert float(await redis_client.get(key("alice"))) == pytest.approx(1.5)
+
+
+@pytest.mark.asyncio
+async def test_record_usage_does_not_create_a_missing_counter(redis_client, usage_logs):
+    # A counter created from a single increment would hide the rest of the month's usage
+    await record_usage("alice", now(), 300, 200, "model")
+    assert await redis_client.get(key("alice")) is None
+
+    usage_logs["alice"] = 4.0
+    assert await get_monthly_usage(None, "alice") == 4.0
+
+
+@pytest.mark.asyncio
+async def test_record_usage_ignores_threads_from_before_the_period(redis_client, usage_logs):
+    await redis_client.set(key("alice"), "1.0")
+
+    await record_usage("alice", get_usage_period_start() - timedelta(days=1), 300, 200, "model")
+
+    assert float(await redis_client.get(key("alice"))) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_replaces_drifted_counters_found_by_scan(redis_client, usage_logs):
+    await redis_client.set(key("alice"), "1.0")
+    await redis_client.set(key("bob"), "2.0")
+    await redis_client.set(_monthly_usage_key("carol", datetime(2024, 1, 1, tzinfo=timezone.utc)), "3.0")
+    usage_logs.update(alice=1.25, bob=2.0, carol=7.0)
+
+    drift = await reconcile_monthly_usage(None)
+
+    assert drift == {"alice": pytest.approx(0.25), "bob": 0.0}
+    assert float(await redis_client.get(key("alice"))) == 1.25
+    assert await redis_client.ttl(key("alice")) > 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_retries_when_an_increment_lands_meanwhile(redis_client, usage_logs, monkeypatch):
+    await redis_client.set(key("alice"), "1.0")
+    attempts = []
+
+    async def calculate_monthly_usage(client, user_id):
+        attempts.append(user_id)
+        if len(attempts) == 1:
+            # record_usage runs while the logs are being summed
+            await record_usage("alice", now(), 300, 200, "model")
+            return 1.0
+        return 1.5
+
+    monkeypatch.setattr(billing, "calculate_monthly_usage", calculate_monthly_usage)
+
+    drift = await reconcile_monthly_usage(None, ["alice"])
+
+    assert len(attempts) == 2
+    assert drift == {"alice": 0.0}
+    assert float(await redis_client.get(key("alice"))) == 1.5
+
+
+@pytest.mark.asyncio
+async def test_reconcile_leaves_a_counter_that_keeps_changing(redis_client, usage_logs, monkeypatch):
+    await redis_client.set(key("alice"), "1.0")
+
+    async def calculate_monthly_usage(client, user_id):
+        await redis_client.incrbyfloat(key("alice"), 0.5)
+        return 100.0
+
+    monkeypatch.setattr(billing, "calculate_monthly_usage", calculate_monthly_usage)
+
+    assert await reconcile_monthly_usage(None, ["alice"]) == {}
+    assert float(await redis_client.get(key("alice"))) == 1.0 + 0.5 * billing.USAGE_RECONCILE_ATTEMPTS
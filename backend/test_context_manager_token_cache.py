@@ -0,0 +1,133 @@
+"""
+Tests for the per-message token count cache and running token tally of ContextManager.
+"""
+
+import pytest
+from litellm.utils import token_counter
+
+from agentpress import context_manager as context_manager_module
+from agentpress.context_manager import ContextManager, MessageTokenCache, TokenTally
+
+MODEL = "gpt-4o"
+
+
+@pytest.fixture
+def tokenized(monkeypatch):
+    """Messages passed to token_counter, i.e. the cache misses."""
+    calls = []
+
+    def counting_token_counter(model, messages):
+        calls.append(messages[0])
+        return token_counter(model=model, messages=messages)
+
+    monkeypatch.setattr(context_manager_module, "token_counter", counting_token_counter)
+    return calls
+
+
+def message(message_id, content, role="user"):
+    return {"message_id": message_id, "role": role, "content": content}
+
+
+def test_counts_are_tokenized_once(tokenized):
+    cache = MessageTokenCache()
+    msg = message("m1", "The quick brown fox jumps over the lazy dog")
+
+    assert cache.count(msg, MODEL) == token_counter(model=MODEL, messages=[msg])
+    assert cache.count(dict(msg), MODEL) == token_counter(model=MODEL, messages=[msg])
+
+    assert len(tokenized) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_edited_message_is_recounted(tokenized):
+    cache = MessageTokenCache()
+    original = message("m1", "short")
+    edited = message("m1", "a considerably longer version of the same message " * 10)
+
+    cache.count(original, MODEL)
+    assert cache.count(edited, MODEL) == token_counter(model=MODEL, messages=[edited])
+    assert len(tokenized) == 2
+
+    # Compression alternates between a few versions of a message; those stay cached
+    assert cache.count(original, MODEL) == token_counter(model=MODEL, messages=[original])
+    assert len(tokenized) == 2
+
+
+def test_tool_calls_and_role_are_part_of_the_fingerprint(tokenized):
+    cache = MessageTokenCache()
+    msg = message("m1", "same content")
+
+    cache.count(msg, MODEL)
+    cache.count({**msg, "role": "assistant"}, MODEL)
+    cache.count({**msg, "tool_calls": [{"id": "c1", "function": {"name": "f", "arguments": "{}"}}]}, MODEL)
+
+    assert cache.misses == 3
+
+
+def test_invalidate_drops_every_model(tokenized):
+    cache = MessageTokenCache()
+    msg = message("m1", "hello there")
+    cache.count(msg, MODEL)
+    cache.count(msg, "gpt-4o-mini")
+
+    cache.invalidate("m1")
+    cache.count(msg, MODEL)
+    cache.count(msg, "gpt-4o-mini")
+
+    assert cache.misses == 4
+    assert cache.hits == 0
+
+
+def test_messages_without_id_are_keyed_by_content(tokenized):
+    cache = MessageTokenCache()
+    system = {"role": "system", "content": "You are a helpful assistant."}
+
+    cache.count(system, MODEL)
+    cache.count(dict(system), MODEL)
+    cache.count({"role": "system", "content": "You are terse."}, MODEL)
+
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_messages_are_evicted(tokenized):
+    cache = MessageTokenCache(max_entries=2)
+    first, second, third = (message(f"m{i}", f"message {i}") for i in range(3))
+    cache.count(first, MODEL)
+    cache.count(second, MODEL)
+    cache.count(first, MODEL)
+    cache.count(third, MODEL)
+
+    tokenized.clear()
+    cache.count(first, MODEL)
+    cache.count(second, MODEL)
+    assert tokenized == [second]
+
+
+def test_tally_matches_token_counter_after_edits(tokenized):
+    cache = MessageTokenCache()
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        message("m1", "Summarize the following document for me."),
+        message("m2", '{"tool_execution": {"result": "%s"}}' % ("x" * 500), role="assistant"),
+        message("m3", "Thanks!"),
+    ]
+
+    tally = TokenTally(cache, messages, MODEL)
+    assert tally.total == sum(token_counter(model=MODEL, messages=[msg]) for msg in messages)
+
+    messages[2] = message("m2", "(compressed)", role="assistant")
+    total = tally.recount(2, messages[2])
+    assert total == tally.total == sum(token_counter(model=MODEL, messages=[msg]) for msg in messages)
+    assert tally.counts[2] == token_counter(model=MODEL, messages=[messages[2]])
+
+
+def test_context_manager_counts_through_the_cache(tokenized):
+    manager = ContextManager(token_cache=MessageTokenCache())
+    messages = [message(f"m{i}", f"message number {i}") for i in range(5)]
+
+    expected = sum(token_counter(model=MODEL, messages=[msg]) for msg in messages)
+    assert manager.count_tokens(messages, MODEL) == expected
+
+    tokenized.clear()
+    assert manager.count_tokens(messages + [message("m5", "one more")], MODEL) > expected
+    assert len(tokenized) == 1
@@ -0,0 +1,324 @@
+"""
+Tests for the compressed-context snapshots reused by ThreadManager across turns and runs.
+"""
+
+import datetime
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agentpress.context_manager import ContextManager, MessageTokenCache
+from agentpress.context_snapshot import ContextSnapshot, ContextSnapshotCache
+from agentpress.thread_manager import ThreadManager
+
+MODEL = "gpt-4o"
+SYSTEM_PROMPT = {"role": "system", "content": "You are a helpful assistant."}
+
+
+def snapshot(thread_id="t1", llm_model=MODEL, system_fingerprint=1):
+    return ContextSnapshot(
+        thread_id=thread_id,
+        llm_model=llm_model,
+        system_fingerprint=system_fingerprint,
+        last_message_id=None,
+        last_created_at=None,
+        row_count=0,
+        last_updated_at=None,
+        messages=[],
+        token_count=0,
+        compressed_messages=[],
+        compressed_token_count=0,
+    )
+
+
+class FakeMessages:
+    """The thread's LLM messages in the messages table."""
+
+    def __init__(self):
+        self.rows = []
+        self.fetches = []
+        self.validations = 0
+        self.error = None
+
+    def add(self, message_id, content, role="user", created_at=None):
+        created_at = created_at or f"2026-01-01T00:00:{len(self.rows):02d}+00:00"
+        self.rows.append({
+            "message_id": message_id,
+            "content": json.dumps({"role": role, "content": content}),
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+
+    def edit(self, message_id, content, role="user"):
+        for row in self.rows:
+            if row["message_id"] == message_id:
+                row["content"] = json.dumps({"role": role, "content": content})
+                row["updated_at"] = "2026-01-01T01:00:00.250+00:00"
+
+    def delete(self, message_id):
+        self.rows = [row for row in self.rows if row["message_id"] != message_id]
+
+    async def fetch(self, thread_id, since=None):
+        """Stands in for ThreadManager._fetch_llm_message_rows."""
+        self.fetches.append(since)
+        return [dict(row) for row in self.rows if since is None or row["created_at"] >= since]
+
+
+def timestamp(value):
+    return datetime.datetime.fromisoformat(value)
+
+
+class FakeQuery:
+    """The deletes and the snapshot validation query ThreadManager sends to the messages table."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.deleting = False
+        self.counting = False
+        self.filters = {}
+        self.until = None
+        self.max_rows = None
+
+    def delete(self):
+        self.deleting = True
+        return self
+
+    def select(self, columns, count=None):
+        self.counting = count == "exact"
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def lte(self, column, value):
+        assert column == "created_at"
+        self.until = value
+        return self
+
+    def order(self, column, desc=False):
+        assert (column, desc) == ("updated_at", True)
+        return self
+
+    def limit(self, count):
+        self.max_rows = count
+        return self
+
+    async def execute(self):
+        if self.deleting:
+            self.messages.delete(self.filters["message_id"])
+            return SimpleNamespace(data=[])
+
+        self.messages.validations += 1
+        if self.messages.error is not None:
+            raise self.messages.error
+        rows = [row for row in self.messages.rows if timestamp(row["created_at"]) <= timestamp(self.until)]
+        rows.sort(key=lambda row: timestamp(row["updated_at"]), reverse=True)
+        return SimpleNamespace(data=rows[:self.max_rows], count=len(rows) if self.counting else None)
+
+
+class FakeDB:
+    def __init__(self, messages):
+        self.messages = messages
+
+    @property
+    async def client(self):
+        return SimpleNamespace(table=lambda name: FakeQuery(self.messages))
+
+
+@pytest.fixture
+def messages():
+    return FakeMessages()
+
+
+def make_thread_manager(messages, snapshot_cache, monkeypatch):
+    # Built without __init__, which connects to the database and langfuse
+    manager = ThreadManager.__new__(ThreadManager)
+    manager.context_manager = ContextManager(token_cache=MessageTokenCache())
+    manager.snapshot_cache = snapshot_cache
+    manager.db = FakeDB(messages)
+    monkeypatch.setattr(manager, "_fetch_llm_message_rows", messages.fetch)
+    return manager
+
+
+@pytest.fixture
+def snapshot_cache():
+    return ContextSnapshotCache()
+
+
+@pytest.fixture
+def thread_manager(messages, snapshot_cache, monkeypatch):
+    return make_thread_manager(messages, snapshot_cache, monkeypatch)
+
+
+def full_compression(manager, messages):
+    """The uncached path: parse every row and compress the whole history."""
+    parsed = manager._parse_llm_message_rows([dict(row) for row in messages.rows])
+    compressed = manager.context_manager.compress_messages([SYSTEM_PROMPT] + parsed, MODEL)
+    return compressed, manager.context_manager.count_tokens(compressed, MODEL)
+
+
+def test_snapshot_is_only_reused_for_the_same_model_and_system_prompt():
+    cache = ContextSnapshotCache()
+    cache.put(snapshot(system_fingerprint=cache.fingerprint(SYSTEM_PROMPT)))
+    fingerprint = cache.fingerprint(dict(SYSTEM_PROMPT))
+
+    assert cache.get("t1", MODEL, fingerprint) is not None
+    assert cache.get("t1", "gpt-4o-mini", fingerprint) is None
+    assert cache.get("t1", MODEL, cache.fingerprint({"role": "system", "content": "Be terse."})) is None
+    assert cache.get("t2", MODEL, fingerprint) is None
+
+
+def test_least_recently_used_snapshots_are_evicted():
+    cache = ContextSnapshotCache(max_snapshots=2)
+    for thread_id in ("t1", "t2"):
+        cache.put(snapshot(thread_id))
+    cache.get("t1", MODEL, 1)
+    cache.put(snapshot("t3"))
+
+    assert cache.get("t2", MODEL, 1) is None
+    assert cache.get("t1", MODEL, 1) is not None
+    assert cache.get("t3", MODEL, 1) is not None
+
+    cache.invalidate("t1")
+    assert cache.get("t1", MODEL, 1) is None
+
+
+@pytest.mark.asyncio
+async def test_next_turn_only_fetches_from_the_watermark(thread_manager, messages):
+    messages.add("m1", "Hello")
+    messages.add("m2", "Hi, how can I help?", role="assistant")
+    first = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+    assert first.last_message_id == "m2"
+
+    second = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    assert messages.fetches == [None, first.last_created_at]
+    assert second.compressed_messages == first.compressed_messages
+    assert second.compressed_token_count == first.compressed_token_count
+    assert [msg["message_id"] for msg in second.messages] == ["m1", "m2"]
+
+
+@pytest.mark.asyncio
+async def test_appended_messages_extend_the_snapshot(thread_manager, messages):
+    messages.add("m1", "Hello")
+    await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    messages.add("m2", "Hi, how can I help?", role="assistant")
+    messages.add("m3", "Summarize this thread.")
+    extended = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    assert [msg["message_id"] for msg in extended.messages] == ["m1", "m2", "m3"]
+    assert extended.last_message_id == "m3"
+    assert (extended.compressed_messages, extended.compressed_token_count) == full_compression(thread_manager, messages)
+    assert extended.token_count == thread_manager.context_manager.count_tokens([SYSTEM_PROMPT] + extended.messages, MODEL)
+
+
+@pytest.mark.asyncio
+async def test_message_sharing_the_watermark_timestamp_is_picked_up_once(thread_manager, messages):
+    messages.add("m1", "Hello", created_at="2026-01-01T00:00:00+00:00")
+    await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    # Committed after the previous read, with the same created_at as the watermark
+    messages.add("m2", "Are you there?", created_at="2026-01-01T00:00:00+00:00")
+    context = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    assert [msg["message_id"] for msg in context.messages] == ["m1", "m2"]
+    assert (context.compressed_messages, context.compressed_token_count) == full_compression(thread_manager, messages)
+
+
+@pytest.mark.asyncio
+async def test_next_run_reuses_the_snapshot_of_an_unchanged_thread(messages, snapshot_cache, monkeypatch):
+    messages.add("m1", "Hello")
+    messages.add("m2", "Hi, how can I help?", role="assistant")
+    first = await make_thread_manager(messages, snapshot_cache, monkeypatch)._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    # A new user message starts a new run, with its own ThreadManager
+    messages.add("m3", "Summarize this thread.")
+    manager = make_thread_manager(messages, snapshot_cache, monkeypatch)
+    context = await manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    assert messages.fetches == [None, first.last_created_at]
+    assert messages.validations == 1
+    assert [msg["message_id"] for msg in context.messages] == ["m1", "m2", "m3"]
+    assert (context.compressed_messages, context.compressed_token_count) == full_compression(manager, messages)
+
+
+@pytest.mark.asyncio
+async def test_edited_message_is_reread(thread_manager, messages):
+    messages.add("m1", "Hello")
+    messages.add("m2", "Draft answer", role="assistant")
+    await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    messages.edit("m2", "Final answer", role="assistant")
+    context = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    assert messages.fetches[-1] is None
+    assert context.messages[-1]["content"] == "Final answer"
+    assert (context.compressed_messages, context.compressed_token_count) == full_compression(thread_manager, messages)
+
+
+@pytest.mark.asyncio
+async def test_delete_message_drops_the_snapshot(thread_manager, messages):
+    messages.add("m1", "Hello")
+    messages.add("m2", "Look at this image")
+    await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    await thread_manager.delete_message("t1", "m2")
+    assert thread_manager.snapshot_cache.get("t1", MODEL, thread_manager.snapshot_cache.fingerprint(SYSTEM_PROMPT)) is None
+
+    context = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+    assert [msg["message_id"] for msg in context.messages] == ["m1"]
+    assert (context.compressed_messages, context.compressed_token_count) == full_compression(thread_manager, messages)
+
+
+@pytest.mark.asyncio
+async def test_message_deleted_by_another_process_is_dropped(thread_manager, messages):
+    messages.add("m1", "Hello")
+    messages.add("m2", "Look at this image")
+    messages.add("m3", "What do you see?")
+    await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    messages.delete("m2")
+    context = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    assert messages.fetches[-1] is None
+    assert [msg["message_id"] for msg in context.messages] == ["m1", "m3"]
+    assert (context.compressed_messages, context.compressed_token_count) == full_compression(thread_manager, messages)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_rebuilt_when_it_cannot_be_validated(thread_manager, messages):
+    messages.add("m1", "Hello")
+    await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    messages.error = ConnectionError("database unavailable")
+    context = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    assert messages.fetches == [None, None]
+    assert [msg["message_id"] for msg in context.messages] == ["m1"]
+
+
+@pytest.mark.asyncio
+async def test_changed_system_prompt_rebuilds_from_the_full_history(thread_manager, messages):
+    messages.add("m1", "Hello")
+    await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    other_prompt = {"role": "system", "content": "You are terse."}
+    context = await thread_manager._build_context("t1", other_prompt, MODEL)
+
+    assert messages.fetches == [None, None]
+    assert context.compressed_messages[0] == other_prompt
+
+
+@pytest.mark.asyncio
+async def test_tail_that_does_not_fit_falls_back_to_full_compression(thread_manager, messages, monkeypatch):
+    messages.add("m1", "Hello")
+    await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    monkeypatch.setattr(thread_manager.context_manager, "extend_compressed_messages", lambda *args: None)
+    messages.add("m2", "Another question")
+    context = await thread_manager._build_context("t1", SYSTEM_PROMPT, MODEL)
+
+    assert (context.compressed_messages, context.compressed_token_count) == full_compression(thread_manager, messages)
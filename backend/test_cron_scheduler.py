@@ -0,0 +1,227 @@
+"""
+Tests for the in-process cron scheduler of schedule triggers, driven by a fake clock.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from triggers.domain.entities import Trigger
+from triggers.domain.value_objects import TriggerConfig, TriggerIdentity, TriggerType
+from triggers.services.cron_scheduler import (
+    CronScheduler,
+    deserialize_trigger,
+    next_fire_time,
+    serialize_trigger,
+)
+
+
+def ts(value: str) -> float:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+def make_trigger(trigger_id: str, cron_expression: str, tz: str = "UTC", is_active: bool = True) -> Trigger:
+    return Trigger(
+        identity=TriggerIdentity(trigger_id=trigger_id, agent_id="agent-1"),
+        provider_id="schedule",
+        trigger_type=TriggerType.SCHEDULE,
+        config=TriggerConfig(
+            name=trigger_id,
+            description=None,
+            config={"cron_expression": cron_expression, "timezone": tz, "agent_prompt": "run"},
+            is_active=is_active,
+        ),
+    )
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_scheduler(triggers, clock, batch_size=50):
+    fired = []
+
+    async def load_triggers():
+        return list(triggers)
+
+    async def dispatch(trigger, fire_at):
+        fired.append((trigger.trigger_id, fire_at))
+
+    return CronScheduler(load_triggers, dispatch, clock=clock, batch_size=batch_size), fired
+
+
+def test_next_fire_time_uses_the_trigger_timezone():
+    after = ts("2025-01-10T10:00:00")
+    assert next_fire_time("0 9 * * *", after) == ts("2025-01-11T09:00:00")
+    # 09:00 in São Paulo (UTC-3) is 12:00 UTC
+    assert next_fire_time("0 9 * * *", after, "America/Sao_Paulo") == ts("2025-01-10T12:00:00")
+
+
+@pytest.mark.asyncio
+async def test_fires_due_triggers_and_reschedules_them():
+    clock = FakeClock(ts("2025-01-10T10:00:30"))
+    scheduler, fired = make_scheduler(
+        [make_trigger("every-minute", "* * * * *"), make_trigger("hourly", "0 * * * *")], clock
+    )
+    await scheduler.sync()
+    assert scheduler.next_due() == ts("2025-01-10T10:01:00")
+
+    assert scheduler.dispatch_due() == 0
+
+    clock.now = ts("2025-01-10T10:01:00")
+    assert scheduler.dispatch_due() == 1
+    await scheduler.wait_dispatched()
+    assert fired == [("every-minute", ts("2025-01-10T10:01:00"))]
+    assert scheduler.next_due() == ts("2025-01-10T10:02:00")
+
+    clock.now = ts("2025-01-10T11:00:00")
+    scheduler.dispatch_due()
+    await scheduler.wait_dispatched()
+    assert sorted(fired[1:]) == [("every-minute", ts("2025-01-10T10:02:00")), ("hourly", ts("2025-01-10T11:00:00"))]
+
+
+@pytest.mark.asyncio
+async def test_missed_runs_fire_once():
+    clock = FakeClock(ts("2025-01-10T10:00:30"))
+    scheduler, fired = make_scheduler([make_trigger("every-minute", "* * * * *")], clock)
+    await scheduler.sync()
+
+    clock.now = ts("2025-01-10T10:30:30")
+    assert scheduler.dispatch_due() == 1
+    await scheduler.wait_dispatched()
+    assert scheduler.next_due() == ts("2025-01-10T10:31:00")
+
+
+@pytest.mark.asyncio
+async def test_bounds_concurrent_dispatches_and_survives_failures():
+    triggers = [make_trigger(f"trigger-{i}", "* * * * *") for i in range(7)]
+    clock = FakeClock(ts("2025-01-10T10:00:30"))
+    batches = []
+    running = 0
+    peak = 0
+
+    async def load_triggers():
+        return triggers
+
+    async def dispatch(trigger, fire_at):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        batches.append(trigger.trigger_id)
+        if trigger.trigger_id == "trigger-3":
+            raise RuntimeError("boom")
+
+    scheduler = CronScheduler(load_triggers, dispatch, clock=clock, batch_size=3)
+    await scheduler.sync()
+    clock.now = ts("2025-01-10T10:01:00")
+
+    assert scheduler.dispatch_due() == 7
+    await scheduler.wait_dispatched()
+    assert sorted(batches) == sorted(t.trigger_id for t in triggers)
+    assert peak == 3
+    assert scheduler.stats["fired"] == 6
+    assert scheduler.stats["failed"] == 1
+    assert len(scheduler) == 7
+
+
+@pytest.mark.asyncio
+async def test_changes_update_the_schedule():
+    clock = FakeClock(ts("2025-01-10T10:00:30"))
+    scheduler, fired = make_scheduler([], clock)
+    await scheduler.sync()
+    assert scheduler.next_due() is None
+
+    trigger = make_trigger("daily", "0 12 * * *")
+    scheduler.apply_change({"trigger_id": "daily", "trigger": serialize_trigger(trigger)})
+    assert scheduler.next_due() == ts("2025-01-10T12:00:00")
+
+    updated = make_trigger("daily", "30 10 * * *")
+    scheduler.apply_change({"trigger_id": "daily", "trigger": serialize_trigger(updated)})
+    assert scheduler.next_due() == ts("2025-01-10T10:30:00")
+
+    scheduler.apply_change({"trigger_id": "daily", "removed": True})
+    assert scheduler.next_due() is None
+    clock.now = ts("2025-01-11T00:00:00")
+    assert scheduler.dispatch_due() == 0
+    assert fired == []
+
+
+@pytest.mark.asyncio
+async def test_sync_keeps_the_fire_time_of_unchanged_triggers():
+    triggers = [make_trigger("every-minute", "* * * * *"), make_trigger("inactive", "* * * * *", is_active=False)]
+    clock = FakeClock(ts("2025-01-10T10:00:30"))
+    scheduler, fired = make_scheduler(triggers, clock)
+    await scheduler.sync()
+    assert len(scheduler) == 1
+
+    # A sync right when the trigger is due must not push it to the next minute
+    clock.now = ts("2025-01-10T10:01:00")
+    await scheduler.sync()
+    assert scheduler.dispatch_due() == 1
+    await scheduler.wait_dispatched()
+    assert fired == [("every-minute", ts("2025-01-10T10:01:00"))]
+
+
+def test_serialized_trigger_round_trips():
+    trigger = deserialize_trigger(serialize_trigger(make_trigger("daily", "0 9 * * *", "Europe/Lisbon")))
+    assert trigger.trigger_id == "daily"
+    assert trigger.trigger_type == TriggerType.SCHEDULE
+    assert trigger.config.config["timezone"] == "Europe/Lisbon"
+
+
+@pytest.mark.asyncio
+async def test_slow_dispatch_does_not_let_the_leader_lock_expire(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from services import redis
+
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def get_client():
+        return redis_client
+
+    async def no_changes():
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(redis, "get_client", get_client)
+
+    clock = FakeClock(ts("2025-01-10T10:01:00"))
+    triggers = [make_trigger("slow", "* * * * *"), make_trigger("fast", "* * * * *")]
+    fired = []
+
+    async def load_triggers():
+        return triggers
+
+    async def dispatch(trigger, fire_at):
+        if trigger.trigger_id == "slow":
+            await asyncio.sleep(1.0)
+        fired.append(trigger.trigger_id)
+
+    scheduler = CronScheduler(load_triggers, dispatch, clock=clock, lock_ttl=0.3)
+    standby = CronScheduler(load_triggers, dispatch, clock=clock, lock_ttl=0.3)
+    monkeypatch.setattr(scheduler, "_listen_for_changes", no_changes)
+    # Both triggers are due as soon as the leader syncs
+    await scheduler.sync(clock.now - 30)
+    monkeypatch.setattr(scheduler, "sync", lambda now=None: asyncio.sleep(0))
+
+    scheduler.start()
+    try:
+        await asyncio.sleep(0.1)
+        # The fast trigger doesn't wait for the slow one
+        assert fired == ["fast"]
+
+        # The slow dispatch outlives the lock TTL several times over
+        await asyncio.sleep(1.2)
+        assert fired == ["fast", "slow"]
+        assert scheduler.is_leader
+        assert await redis_client.get("triggers:cron_scheduler:leader") == scheduler.instance_id
+        assert not await standby.acquire_leadership()
+    finally:
+        await scheduler.stop()
+    await redis_client.aclose()
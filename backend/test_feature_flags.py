@@ -0,0 +1,118 @@
+"""
+Tests for the in-process feature flag snapshot and its invalidation through Redis pub/sub.
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from flags.flags import FeatureFlagManager
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    from services import redis
+
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(redis, "get_client", get_client)
+    return client
+
+
+@pytest_asyncio.fixture
+async def managers():
+    created = []
+
+    def make(**kwargs):
+        manager = FeatureFlagManager(**kwargs)
+        created.append(manager)
+        return manager
+
+    yield make
+    for manager in created:
+        await manager.close()
+
+
+async def eventually(condition, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_served_from_the_snapshot(redis_client, managers):
+    manager = managers(max_staleness=100)
+    await manager.set_flag("beta", True)
+    assert await manager.is_enabled("beta") is True
+    await asyncio.sleep(0.05)
+
+    # Written behind the manager's back, without publishing a change
+    await redis_client.hset("feature_flag:beta", "enabled", "false")
+    assert await manager.is_enabled("beta") is True
+
+    await manager.refresh()
+    assert await manager.is_enabled("beta") is False
+
+
+@pytest.mark.asyncio
+async def test_changes_published_by_another_process_invalidate_the_snapshot(redis_client, managers):
+    reader = managers(max_staleness=100)
+    writer = managers(max_staleness=100)
+    assert await reader.is_enabled("beta") is False
+    await asyncio.sleep(0.05)
+
+    await writer.set_flag("beta", True)
+    await eventually(lambda: reader.is_enabled("beta"))
+
+    await writer.delete_flag("beta")
+
+    async def disabled():
+        return not await reader.is_enabled("beta")
+
+    await eventually(disabled)
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_reloaded_on_lookup(redis_client, managers):
+    manager = managers(max_staleness=0.05)
+    assert await manager.is_enabled("beta") is False
+
+    await redis_client.hset("feature_flag:beta", "enabled", "true")
+    await redis_client.sadd("feature_flags:list", "beta")
+    await asyncio.sleep(0.1)
+    assert await manager.is_enabled("beta") is True
+
+
+@pytest.mark.asyncio
+async def test_last_snapshot_is_served_while_redis_is_down(redis_client, managers, monkeypatch):
+    from services import redis
+
+    manager = managers(max_staleness=0.05)
+    await manager.set_flag("beta", True)
+    assert await manager.is_enabled("beta") is True
+
+    async def unavailable():
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(redis, "get_client", unavailable)
+    await asyncio.sleep(0.1)
+    assert await manager.is_enabled("beta") is True
+
+
+@pytest.mark.asyncio
+async def test_close_stops_the_background_tasks(redis_client):
+    manager = FeatureFlagManager(max_staleness=100)
+    await manager.is_enabled("beta")
+    tasks = list(manager._background_tasks)
+    assert tasks and not any(task.done() for task in tasks)
+
+    await manager.close()
+    assert all(task.done() for task in tasks)
+    assert manager._background_tasks == []
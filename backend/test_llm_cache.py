@@ -0,0 +1,224 @@
+"""
+Tests for the LLM response cache and its use by make_llm_api_call.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import litellm
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from services import llm, llm_cache
+from services.llm import make_llm_api_call
+from services.llm_cache import LLMResponseCache, is_cacheable
+
+MESSAGES = [{"role": "user", "content": "Name this thread"}]
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    from services import redis
+
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(redis, "get_client", get_client)
+    return client
+
+
+class FakeMonotonic:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeMonotonic()
+    # Only the cache's clock: the event loop keeps running on the real one
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+class Provider:
+    """litellm.acompletion stand-in answering with a numbered response."""
+
+    def __init__(self):
+        self.calls = []
+        self.ready = asyncio.Event()
+        self.ready.set()
+
+    async def __call__(self, **params):
+        self.calls.append(params)
+        await self.ready.wait()
+        return response(f"answer {len(self.calls)}")
+
+
+def response(content):
+    return litellm.ModelResponse(choices=[{"message": {"role": "assistant", "content": content}}])
+
+
+def content(result):
+    return result.choices[0].message.content
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = Provider()
+    monkeypatch.setattr(llm.litellm, "acompletion", provider)
+    return provider
+
+
+@pytest.fixture
+def response_cache(monkeypatch, redis_client, clock):
+    cache = LLMResponseCache(max_size=4, ttl=60)
+    monkeypatch.setattr(llm, "llm_response_cache", cache)
+    return cache
+
+
+def params(**overrides):
+    return {"model": "gpt-4o-mini", "messages": MESSAGES, "temperature": 0, "stream": False, **overrides}
+
+
+def test_key_covers_model_messages_and_params():
+    cache = LLMResponseCache()
+    key = cache.key(params())
+
+    assert cache.key(dict(reversed(list(params().items())))) == key
+    assert cache.key(params(model="gpt-4o")) != key
+    assert cache.key(params(messages=[{"role": "user", "content": "Name this chat"}])) != key
+    assert cache.key(params(max_tokens=20)) != key
+    assert cache.key(params(response_format={"type": "json_object"})) != key
+
+
+def test_key_ignores_credentials_and_transport_params():
+    cache = LLMResponseCache()
+    key = cache.key(params())
+
+    assert cache.key(params(api_key="sk-secret")) == key
+    assert cache.key(params(fallbacks=[{"model": "gpt-4o"}])) == key
+    assert "sk-secret" not in cache.key(params(api_key="sk-secret"))
+
+
+def test_only_deterministic_non_streaming_calls_are_cacheable():
+    assert is_cacheable(params())
+    assert not is_cacheable(params(temperature=0.7))
+    assert not is_cacheable(params(stream=True))
+    assert not is_cacheable({"model": "gpt-4o-mini", "messages": MESSAGES})
+
+
+@pytest.mark.asyncio
+async def test_repeated_call_is_served_from_the_cache(response_cache, provider, redis_client):
+    first = await make_llm_api_call(MESSAGES, "gpt-4o-mini", max_tokens=20, cache=True)
+    second = await make_llm_api_call(MESSAGES, "gpt-4o-mini", max_tokens=20, cache=True)
+
+    assert content(first) == content(second) == "answer 1"
+    assert len(provider.calls) == 1
+    assert response_cache.stats["local_hits"] == 1
+
+    await make_llm_api_call(MESSAGES, "gpt-4o-mini", max_tokens=40, cache=True)
+    assert len(provider.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_calls_without_opt_in_are_not_cached(response_cache, provider):
+    await make_llm_api_call(MESSAGES, "gpt-4o-mini")
+    await make_llm_api_call(MESSAGES, "gpt-4o-mini")
+
+    assert len(provider.calls) == 2
+    assert sum(response_cache.stats.values()) == 0
+
+
+@pytest.mark.asyncio
+async def test_non_deterministic_calls_skip_the_cache(response_cache, provider, redis_client):
+    first = await make_llm_api_call(MESSAGES, "gpt-4o-mini", temperature=0.7, cache=True)
+    second = await make_llm_api_call(MESSAGES, "gpt-4o-mini", temperature=0.7, cache=True)
+
+    assert (content(first), content(second)) == ("answer 1", "answer 2")
+    assert sum(response_cache.stats.values()) == 0
+    assert await redis_client.keys(f"{LLMResponseCache.KEY_PREFIX}:*") == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_share_one_call(response_cache, provider):
+    provider.ready.clear()
+    calls = [asyncio.create_task(make_llm_api_call(MESSAGES, "gpt-4o-mini", cache=True)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    provider.ready.set()
+
+    assert [content(result) for result in await asyncio.gather(*calls)] == ["answer 1"] * 3
+    assert len(provider.calls) == 1
+    assert response_cache.stats["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_responses_expire_after_the_ttl(response_cache, provider, redis_client, clock):
+    await make_llm_api_call(MESSAGES, "gpt-4o-mini", cache=True)
+    (key,) = await redis_client.keys(f"{LLMResponseCache.KEY_PREFIX}:*")
+    assert 0 < await redis_client.ttl(key) <= 60
+
+    clock.now += 59
+    await make_llm_api_call(MESSAGES, "gpt-4o-mini", cache=True)
+    assert response_cache.stats["local_hits"] == 1
+
+    # The local copy is past its TTL; the one in Redis is expired too
+    clock.now += 2
+    await redis_client.delete(key)
+    result = await make_llm_api_call(MESSAGES, "gpt-4o-mini", cache=True)
+    assert content(result) == "answer 2"
+    assert len(provider.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_other_processes_are_served_from_redis(response_cache, provider, redis_client, monkeypatch):
+    await make_llm_api_call(MESSAGES, "gpt-4o-mini", cache=True)
+
+    other_process = LLMResponseCache(max_size=4, ttl=60)
+    monkeypatch.setattr(llm, "llm_response_cache", other_process)
+    result = await make_llm_api_call(MESSAGES, "gpt-4o-mini", cache=True)
+
+    assert content(result) == "answer 1"
+    assert len(provider.calls) == 1
+    assert other_process.stats["redis_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bypassed_when_disabled_or_redis_is_down(provider, clock, monkeypatch):
+    from services import redis
+
+    async def unavailable():
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(redis, "get_client", unavailable)
+    cache = LLMResponseCache(ttl=60)
+    call = lambda: provider()
+
+    assert content(await cache.get_or_call(params(), call)) == "answer 1"
+    assert content(await cache.get_or_call(params(), call)) == "answer 1"
+
+    disabled = LLMResponseCache(ttl=0)
+    await disabled.get_or_call(params(), call)
+    await disabled.get_or_call(params(), call)
+    assert len(provider.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_responses_are_evicted(redis_client, clock):
+    cache = LLMResponseCache(max_size=2, ttl=60)
+
+    async def call():
+        return response("answer")
+
+    for model in ("a", "b", "a", "c"):
+        await cache.get_or_call(params(model=model), call)
+
+    assert cache.get_stats()["size"] == 2
+    assert cache._get_local(cache.key(params(model="b"))) is None
+    assert json.loads(await redis_client.get(cache.key(params(model="b"))))["choices"]
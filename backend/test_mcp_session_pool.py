@@ -0,0 +1,127 @@
+"""
+Tests for retrying MCP operations on a new pooled session.
+"""
+
+import anyio
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from mcp_service.session_pool import CONNECTION_CLOSED, MCPSessionPool
+
+
+class FakePooledSession:
+    def __init__(self, name: str, alive: bool = True):
+        self.session = name
+        self.alive = alive
+        self.closed = False
+        self.last_used = 0.0
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePool(MCPSessionPool):
+    """Pool handing out prepared sessions instead of opening connections."""
+
+    def __init__(self, *sessions: FakePooledSession):
+        super().__init__()
+        self.available = list(sessions)
+        self.acquired = []
+
+    async def _acquire(self, key, resolve):
+        pooled = self.available.pop(0)
+        self._sessions[key] = pooled
+        self.acquired.append(pooled)
+        return pooled
+
+
+def failing_once(error: Exception):
+    calls = []
+
+    async def operation(session):
+        calls.append(session)
+        if len(calls) == 1:
+            raise error
+        return f"result from {session}"
+
+    return operation, calls
+
+
+async def resolve():
+    return "http://mcp.example", {}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [anyio.ClosedResourceError(), anyio.BrokenResourceError()])
+async def test_retries_when_the_session_was_closed_before_sending(error):
+    first, second = FakePooledSession("first"), FakePooledSession("second")
+    pool = FakePool(first, second)
+    operation, calls = failing_once(error)
+
+    assert await pool.run("key", resolve, operation) == "result from second"
+    assert calls == ["first", "second"]
+    assert first.closed and not second.closed
+
+
+@pytest.mark.asyncio
+async def test_retries_when_the_acquired_session_is_already_dead():
+    dead, fresh = FakePooledSession("dead", alive=False), FakePooledSession("fresh")
+    pool = FakePool(dead, fresh)
+    calls = []
+
+    async def operation(session):
+        calls.append(session)
+        return f"result from {session}"
+
+    assert await pool.run("key", resolve, operation) == "result from fresh"
+    assert calls == ["fresh"]
+    assert dead.closed
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [
+    TimeoutError("read timed out"),
+    anyio.EndOfStream(),
+    McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed")),
+])
+async def test_does_not_resend_a_request_that_may_have_reached_the_server(error):
+    first, second = FakePooledSession("first"), FakePooledSession("second")
+    pool = FakePool(first, second)
+    operation, calls = failing_once(error)
+
+    with pytest.raises(type(error)):
+        await pool.run("key", resolve, operation)
+
+    assert calls == ["first"]
+    assert first.closed
+    assert "key" not in pool._sessions
+
+
+@pytest.mark.asyncio
+async def test_server_errors_keep_the_session():
+    first = FakePooledSession("first")
+    pool = FakePool(first)
+    operation, calls = failing_once(McpError(ErrorData(code=-32602, message="Invalid params")))
+
+    with pytest.raises(McpError):
+        await pool.run("key", resolve, operation)
+
+    assert calls == ["first"]
+    assert not first.closed
+    assert pool._sessions["key"] is first
+
+
+@pytest.mark.asyncio
+async def test_retries_only_once():
+    first, second = FakePooledSession("first"), FakePooledSession("second")
+    pool = FakePool(first, second)
+
+    async def operation(session):
+        raise anyio.ClosedResourceError()
+
+    with pytest.raises(anyio.ClosedResourceError):
+        await pool.run("key", resolve, operation)
+
+    assert pool.acquired == [first, second]
+    assert first.closed and second.closed
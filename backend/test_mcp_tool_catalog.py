@@ -0,0 +1,51 @@
+"""
+Tests for invalidating cached MCP tool catalogs.
+"""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from mcp_service.tool_catalog import ToolCatalogCache
+
+TOOLS = [{"name": "search", "inputSchema": {"type": "object"}}]
+CONFIG = {"url": "https://mcp.example"}
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    from services import redis
+
+    client = fakeredis.FakeAsyncRedis()
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(redis, "get_client", get_client)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_cached_catalog_is_served_until_invalidated(redis_client):
+    catalog = ToolCatalogCache(ttl=60)
+
+    tools, generation = await catalog.get("smithery:exa", CONFIG)
+    assert tools is None
+    await catalog.set("smithery:exa", CONFIG, TOOLS, generation)
+    assert (await catalog.get("smithery:exa", CONFIG))[0] == TOOLS
+
+    await catalog.invalidate(["smithery:exa"])
+    assert (await catalog.get("smithery:exa", CONFIG))[0] is None
+    assert await redis_client.ttl(catalog._generation_key("smithery:exa")) == -1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_discovery_is_not_lost(redis_client):
+    catalog = ToolCatalogCache(ttl=60)
+
+    tools, generation = await catalog.get("smithery:exa", CONFIG)
+    # The agent config changes while the tools are being listed
+    await catalog.invalidate(["smithery:exa"])
+    await catalog.set("smithery:exa", CONFIG, TOOLS, generation)
+
+    assert (await catalog.get("smithery:exa", CONFIG))[0] is None
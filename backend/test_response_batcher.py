@@ -0,0 +1,174 @@
+"""
+Tests for the batched Redis writer used for streamed agent responses.
+"""
+
+import asyncio
+import json
+
+import pytest
+from prometheus_client import CollectorRegistry
+
+from services.metrics import MetricsCollector
+from services.response_batcher import BatchedResponseWriter
+
+
+class FakePush:
+    """rpush_and_publish stand-in recording each pipelined write."""
+
+    def __init__(self, failures: int = 0, delay: float = 0):
+        self.batches = []
+        self.attempts = 0
+        self.failures = failures
+        self.delay = delay
+        self.released = asyncio.Event()
+        self.released.set()
+
+    async def __call__(self, list_key, values, channel, message):
+        self.attempts += 1
+        await self.released.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("redis unavailable")
+        assert (list_key, channel, message) == ("responses", "channel", "new")
+        self.batches.append([json.loads(value)["n"] for value in values])
+
+    @property
+    def written(self):
+        return [n for batch in self.batches for n in batch]
+
+
+def make_writer(push, **kwargs):
+    return BatchedResponseWriter(
+        "responses", "channel", push=push, metrics=MetricsCollector(CollectorRegistry()), **kwargs
+    )
+
+
+async def eventually(condition, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_without_waiting_for_the_interval():
+    push = FakePush()
+    writer = make_writer(push, max_batch_size=3, flush_interval=10)
+
+    for n in range(5):
+        await writer.write({"n": n})
+    await eventually(lambda: push.batches)
+    await asyncio.sleep(0.05)
+
+    assert push.batches == [[0, 1, 2]]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_flushed_after_the_interval():
+    push = FakePush()
+    writer = make_writer(push, max_batch_size=50, flush_interval=0.05)
+
+    await writer.write({"n": 0})
+    await writer.write({"n": 1})
+    await asyncio.sleep(0.01)
+    assert push.batches == []
+
+    await eventually(lambda: push.batches)
+    assert push.batches == [[0, 1]]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_responses_are_written_in_order():
+    push = FakePush(delay=0.005)
+    writer = make_writer(push, max_batch_size=4, flush_interval=0.001)
+
+    for n in range(30):
+        await writer.write({"n": n})
+        if n % 7 == 0:
+            await asyncio.sleep(0.002)
+    await writer.close()
+
+    assert push.written == list(range(30))
+    assert all(len(batch) <= 4 for batch in push.batches)
+    assert (writer.written, writer.batches, writer.dropped) == (30, len(push.batches), 0)
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_what_is_still_buffered():
+    push = FakePush()
+    writer = make_writer(push, max_batch_size=50, flush_interval=10)
+
+    await writer.write({"n": 0})
+    await writer.write({"n": 1})
+    await writer.close()
+
+    assert push.batches == [[0, 1]]
+    with pytest.raises(RuntimeError):
+        await writer.write({"n": 2})
+
+
+@pytest.mark.asyncio
+async def test_explicit_flush_writes_everything_buffered():
+    push = FakePush()
+    writer = make_writer(push, max_batch_size=2, flush_interval=10)
+    writer.start()
+    push.released.clear()
+
+    for n in range(5):
+        await writer.write({"n": n})
+    push.released.set()
+    await writer.flush()
+
+    assert push.written == list(range(5))
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_retried_in_place():
+    push = FakePush(failures=1)
+    writer = make_writer(push, max_batch_size=2, flush_interval=0.001, max_flush_attempts=3)
+
+    for n in range(4):
+        await writer.write({"n": n})
+    await writer.close()
+
+    assert push.written == [0, 1, 2, 3]
+    assert (writer.written, writer.dropped) == (4, 0)
+
+
+@pytest.mark.asyncio
+async def test_batch_is_dropped_after_the_last_attempt_and_writing_goes_on():
+    push = FakePush(failures=2)
+    writer = make_writer(push, max_batch_size=2, flush_interval=10, max_flush_attempts=2)
+
+    for n in range(4):
+        await writer.write({"n": n})
+    await writer.close()
+
+    assert push.written == [2, 3]
+    assert (writer.written, writer.dropped) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_writers_block_while_the_buffer_is_full():
+    push = FakePush()
+    push.released.clear()
+    writer = make_writer(push, max_batch_size=1, max_pending=2, flush_interval=0)
+
+    await writer.write({"n": 0})
+    await eventually(lambda: push.attempts == 1)
+    await writer.write({"n": 1})
+    await writer.write({"n": 2})
+
+    blocked = asyncio.create_task(writer.write({"n": 3}))
+    await asyncio.sleep(0.02)
+    assert not blocked.done()
+
+    push.released.set()
+    await asyncio.wait_for(blocked, timeout=1)
+    await writer.close()
+    assert push.written == [0, 1, 2, 3]
@@ -0,0 +1,172 @@
+"""
+Tests for the list and Redis Streams transports of streamed agent responses.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from services import response_transport
+from services.response_transport import (
+    STREAM_START_ID,
+    append_response,
+    create_response_writer,
+    fetch_all_responses,
+    parse_stream_id,
+    read_stream_responses,
+    response_list_key,
+    response_stream_key,
+)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    from services import redis
+
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(redis, "get_client", get_client)
+    return client
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    monkeypatch.setattr(response_transport, "RESPONSE_TRANSPORT", response_transport.STREAMS_TRANSPORT)
+
+
+async def append_many(agent_run_id, count):
+    for n in range(count):
+        await append_response(agent_run_id, {"n": n})
+
+
+@pytest.mark.asyncio
+async def test_read_resumes_after_the_last_seen_entry(redis_client, streams):
+    await append_many("run", 5)
+
+    entries = await read_stream_responses("run", STREAM_START_ID)
+    assert [response["n"] for _, response in entries] == [0, 1, 2, 3, 4]
+
+    # A client that saw the first two events reconnects with the second ID as Last-Event-ID
+    resumed = await read_stream_responses("run", parse_stream_id(entries[1][0]))
+    assert resumed == entries[2:]
+
+    assert await read_stream_responses("run", entries[-1][0]) == []
+
+
+@pytest.mark.asyncio
+async def test_read_is_paged_by_count(redis_client, streams):
+    await append_many("run", 5)
+
+    first = await read_stream_responses("run", STREAM_START_ID, count=2)
+    second = await read_stream_responses("run", first[-1][0], count=2)
+
+    assert [response["n"] for _, response in first + second] == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_blocking_read_wakes_up_on_a_new_entry(redis_client, streams):
+    await append_many("run", 1)
+    (last_id, _), = await read_stream_responses("run", STREAM_START_ID)
+
+    reader = asyncio.create_task(read_stream_responses("run", last_id, block_ms=2000))
+    await asyncio.sleep(0.05)
+    assert not reader.done()
+
+    await append_response("run", {"n": 1})
+    entries = await asyncio.wait_for(reader, timeout=2)
+    assert [response["n"] for _, response in entries] == [1]
+
+
+@pytest.mark.asyncio
+async def test_batched_writer_xadds_readable_entries(redis_client, streams):
+    writer = create_response_writer("run")
+    for n in range(7):
+        await writer.write({"n": n})
+    await writer.close()
+
+    entries = await read_stream_responses("run", STREAM_START_ID)
+    assert [response["n"] for _, response in entries] == list(range(7))
+    assert await redis_client.exists(response_list_key("run")) == 0
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_pages_through_the_stream(redis_client, streams, monkeypatch):
+    monkeypatch.setattr(response_transport, "STREAM_READ_COUNT", 3)
+    await append_many("run", 7)
+
+    assert [response["n"] for response in await fetch_all_responses("run")] == list(range(7))
+
+
+@pytest.mark.asyncio
+async def test_stream_is_capped_at_the_configured_length(redis_client, streams, monkeypatch):
+    monkeypatch.setattr(response_transport, "RESPONSE_STREAM_MAXLEN", 3)
+    xadds = []
+    pipeline = redis_client.pipeline
+
+    def recording_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        xadd = pipe.xadd
+
+        def recording_xadd(name, fields, **options):
+            xadds.append(options)
+            return xadd(name, fields, **options)
+
+        pipe.xadd = recording_xadd
+        return pipe
+
+    monkeypatch.setattr(redis_client, "pipeline", recording_pipeline)
+    await append_many("run", 2)
+
+    assert xadds == [{"maxlen": 3, "approximate": True}] * 2
+
+
+@pytest.mark.asyncio
+async def test_resume_from_a_trimmed_entry_continues_with_the_oldest_kept(redis_client, streams):
+    await append_many("run", 6)
+    entries = await read_stream_responses("run", STREAM_START_ID)
+
+    # MAXLEN ~ drops whole stream nodes at a time; an exact trim stands in for it
+    await redis_client.xtrim(response_stream_key("run"), maxlen=3, approximate=False)
+
+    resumed = await read_stream_responses("run", entries[0][0])
+    assert [response["n"] for _, response in resumed] == [3, 4, 5]
+    assert [response["n"] for response in await fetch_all_responses("run")] == [3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_expire_and_delete_target_the_stream(redis_client, streams):
+    await append_many("run", 1)
+
+    await response_transport.expire_responses("run", 60)
+    assert 0 < await redis_client.ttl(response_stream_key("run")) <= 60
+
+    await response_transport.delete_responses("run")
+    assert await redis_client.exists(response_stream_key("run")) == 0
+
+
+@pytest.mark.asyncio
+async def test_list_transport_pushes_and_notifies(redis_client):
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(response_transport.response_channel("run"))
+    await pubsub.get_message(timeout=1)
+
+    await append_many("run", 2)
+
+    assert [json.loads(value)["n"] for value in await redis_client.lrange(response_list_key("run"), 0, -1)] == [0, 1]
+    assert [response["n"] for response in await fetch_all_responses("run")] == [0, 1]
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+    assert message["data"] == "new"
+    assert await redis_client.exists(response_stream_key("run")) == 0
+    await pubsub.aclose()
+
+
+def test_only_well_formed_stream_ids_are_accepted():
+    assert parse_stream_id(" 1700000000000-3 ") == "1700000000000-3"
+    for value in (None, "", "$", "+", "1700000000000", "0-0; DEL x", "abc-1"):
+        assert parse_stream_id(value) is None
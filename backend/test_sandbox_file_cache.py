@@ -0,0 +1,85 @@
+"""
+Tests for the sandbox file content cache and the edits SandboxFilesTool makes through it.
+"""
+
+import os
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.sandbox_files_benchmark import WORKSPACE, LocalFilesTool, LocalSandbox
+from sandbox.file_cache import SandboxFileCache, file_cache
+
+
+def info(content: str, mod_time: str = "1") -> SimpleNamespace:
+    return SimpleNamespace(size=len(content.encode()), mod_time=mod_time)
+
+
+def test_entry_is_served_only_while_size_and_mod_time_match():
+    cache = SandboxFileCache()
+    cache.put("sb", "/workspace/a.py", "x = 1\n", info("x = 1\n", "1"))
+
+    assert cache.get("sb", "/workspace/a.py", info("x = 1\n", "1")) == "x = 1\n"
+    # Same size, changed by other means
+    assert cache.get("sb", "/workspace/a.py", info("x = 2\n", "2")) is None
+    assert cache.get("sb", "/workspace/a.py", info("x = 10\n", "1")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_content_without_a_matching_file_info_is_not_cached():
+    cache = SandboxFileCache()
+    cache.put("sb", "/workspace/a.py", "x = 1\n", None)
+    cache.put("sb", "/workspace/b.py", "x = 1\n", info("x = 1\n", None))
+    cache.put("sb", "/workspace/c.py", "x = 1\n", info("x = 100\n", "1"))
+
+    assert cache.get_stats()["files"] == 0
+    for path in ("a.py", "b.py", "c.py"):
+        assert cache.get("sb", f"/workspace/{path}", info("x = 1\n", None)) is None
+
+
+def test_evicts_least_recently_used_files_to_stay_within_budget():
+    cache = SandboxFileCache(max_bytes=40)
+    for name in ("a", "b", "c", "d"):
+        cache.put("sb", name, "0123456789", info("0123456789"))
+    cache.get("sb", "a", info("0123456789"))
+    cache.put("sb", "e", "0123456789", info("0123456789"))
+
+    assert cache.get_stats()["bytes"] == 40
+    assert cache.get("sb", "b", info("0123456789")) is None
+    assert cache.get("sb", "a", info("0123456789")) == "0123456789"
+
+    cache.invalidate("sb")
+    assert cache.get_stats() == {"hits": 2, "misses": 1, "files": 0, "bytes": 0}
+
+
+@pytest.fixture
+def tool(tmp_path):
+    os.makedirs(tmp_path / WORKSPACE.lstrip("/"))
+    sandbox = LocalSandbox(str(tmp_path), latency=0, bandwidth=float("inf"))
+    file_cache.invalidate(sandbox.id)
+    yield LocalFilesTool(sandbox)
+    file_cache.invalidate(sandbox.id)
+
+
+@pytest.mark.asyncio
+async def test_str_replace_keeps_an_out_of_band_edit_of_the_same_size(tool):
+    path = tool._sandbox._local(f"{WORKSPACE}/app.py")
+    assert (await tool.create_file("app.py", "VERSION = '1.2.3'\nDEBUG = False\n")).success
+
+    # A shell command changes the file without changing its size
+    subprocess.run(["sed", "-i", "s/1.2.3/1.2.4/", path], check=True)
+
+    assert (await tool.str_replace("app.py", "DEBUG = False", "DEBUG = True")).success
+    with open(path) as f:
+        assert f.read() == "VERSION = '1.2.4'\nDEBUG = True\n"
+
+
+@pytest.mark.asyncio
+async def test_unchanged_file_is_edited_from_the_cache(tool):
+    assert (await tool.create_file("app.py", "VERSION = '1.2.3'\nDEBUG = False\n")).success
+    assert (await tool.str_replace("app.py", "DEBUG = False", "DEBUG = True")).success
+
+    with open(tool._sandbox._local(f"{WORKSPACE}/app.py")) as f:
+        assert f.read() == "VERSION = '1.2.3'\nDEBUG = True\n"
+    assert file_cache.get_stats()["hits"] >= 1
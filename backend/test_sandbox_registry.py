@@ -0,0 +1,153 @@
+"""
+Tests for the process-wide sandbox registry shared by the sandbox tools.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from sandbox import registry as registry_module
+from sandbox.registry import SandboxRegistry
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+
+    def select(self, *_):
+        return self
+
+    def eq(self, column, value):
+        self.project_id = value
+        return self
+
+    async def execute(self):
+        self.client.reads += 1
+        if self.client.error is not None:
+            raise self.client.error
+        sandbox = self.client.sandboxes.get(self.project_id)
+        if sandbox is None:
+            return SimpleNamespace(data=[])
+        return SimpleNamespace(data=[{"sandbox": sandbox}])
+
+
+class FakeClient:
+    def __init__(self, **sandboxes):
+        self.sandboxes = sandboxes
+        self.reads = 0
+        self.error = None
+
+    def table(self, name):
+        assert name == "projects"
+        return FakeQuery(self)
+
+
+class FakeMonotonic:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeMonotonic()
+    monkeypatch.setattr(registry_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def started(monkeypatch):
+    started = []
+
+    async def get_or_start_sandbox(sandbox_id):
+        started.append(sandbox_id)
+        await asyncio.sleep(0)
+        return SimpleNamespace(id=sandbox_id)
+
+    monkeypatch.setattr(registry_module, "get_or_start_sandbox", get_or_start_sandbox)
+    return started
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_resolution(clock, started):
+    registry = SandboxRegistry(ttl=60)
+    client = FakeClient(p1={"id": "sb-1", "pass": "secret"})
+
+    handles = await asyncio.gather(*(registry.get("p1", client) for _ in range(5)))
+
+    assert {handle.sandbox.id for handle in handles} == {"sb-1"}
+    assert handles[0].sandbox_pass == "secret"
+    assert (client.reads, started) == (1, ["sb-1"])
+
+    await registry.get("p1", client)
+    assert client.reads == 1
+    assert registry.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_picks_up_a_recreated_sandbox(clock, started):
+    registry = SandboxRegistry(ttl=60)
+    client = FakeClient(p1={"id": "sb-1", "pass": "old"})
+    await registry.get("p1", client)
+
+    client.sandboxes["p1"] = {"id": "sb-2", "pass": "new"}
+    clock.now += 61
+    handle = await registry.get("p1", client)
+
+    assert (handle.sandbox_id, handle.sandbox_pass, handle.sandbox.id) == ("sb-2", "new", "sb-2")
+    assert client.reads == 2
+    assert started == ["sb-1", "sb-2"]
+    assert registry.get_stats()["refreshes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_keeps_the_sandbox_when_the_project_cannot_be_read(clock, started):
+    registry = SandboxRegistry(ttl=60)
+    client = FakeClient(p1={"id": "sb-1", "pass": "secret"})
+    await registry.get("p1", client)
+
+    client.error = ConnectionError("database unavailable")
+    clock.now += 61
+    handle = await registry.get("p1", client)
+
+    assert (handle.sandbox_id, handle.sandbox_pass) == ("sb-1", "secret")
+    assert started == ["sb-1", "sb-1"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_of_a_project_without_sandbox_evicts_the_handle(clock, started):
+    registry = SandboxRegistry(ttl=60)
+    client = FakeClient(p1={"id": "sb-1"})
+    await registry.get("p1", client)
+
+    del client.sandboxes["p1"]
+    clock.now += 61
+    with pytest.raises(ValueError):
+        await registry.get("p1", client)
+
+    assert registry.get_stats()["size"] == 0
+    assert registry.get_stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cold_start_read_failure_is_raised(clock, started):
+    registry = SandboxRegistry(ttl=60)
+    client = FakeClient()
+    client.error = ConnectionError("database unavailable")
+
+    with pytest.raises(ConnectionError):
+        await registry.get("p1", client)
+    assert started == []
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_handles_are_dropped(clock, started):
+    registry = SandboxRegistry(ttl=60, max_size=2)
+    client = FakeClient(p1={"id": "sb-1"}, p2={"id": "sb-2"}, p3={"id": "sb-3"})
+    for project_id in ("p1", "p2", "p3"):
+        await registry.get(project_id, client)
+
+    assert set(registry.get_stats()["handles"]) == {"p2", "p3"}
@@ -0,0 +1,93 @@
+"""
+Tests for the incremental XML tool call scanner used by ResponseProcessor.
+"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from agentpress.xml_stream_scanner import XMLStreamScanner
+
+SAMPLE_RESPONSES = Path(__file__).parent / "agent" / "sample_responses"
+
+TWO_INVOKES = (
+    "Let me look around.\n"
+    "<function_calls>\n"
+    "<invoke name=\"execute_command\">\n"
+    "<parameter name=\"command\">ls -la</parameter>\n"
+    "</invoke>\n"
+    "<invoke name=\"create_file\">\n"
+    "<parameter name=\"file_path\">notes.md</parameter>\n"
+    "<parameter name=\"file_contents\">a literal </invoke> inside a value</parameter>\n"
+    "</invoke>\n"
+    "</function_calls>\n"
+    "Done."
+)
+
+
+def feed_in_pieces(scanner, content, size):
+    chunks = []
+    for i in range(0, len(content), size):
+        chunks.extend(scanner.feed(content[i:i + size]))
+    return chunks
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_emits_each_invoke_once_regardless_of_delta_size(size):
+    chunks = feed_in_pieces(XMLStreamScanner(), TWO_INVOKES, size)
+
+    assert [c.raw.split('"')[1] for c in chunks] == ["execute_command", "create_file"]
+    assert chunks[1].raw.endswith("inside a value</parameter>\n</invoke>")
+    assert chunks[0].xml == f"<function_calls>\n{chunks[0].raw}\n</function_calls>"
+    assert chunks[0].closing == "\n</function_calls>"
+
+
+def test_incomplete_call_is_not_emitted_until_closed():
+    scanner = XMLStreamScanner()
+    assert scanner.feed("<function_calls>\n<invoke name=\"ask\">\n<parameter name=\"text\">hi") == []
+    assert scanner.state == XMLStreamScanner.PARAMETER
+    assert scanner.feed("</parameter>\n</inv") == []
+    chunks = scanner.feed("oke>\n</function_calls>")
+    assert len(chunks) == 1
+    assert scanner.state == XMLStreamScanner.OUTSIDE
+
+
+def test_legacy_tags_with_nesting():
+    content = "x <ask attachments=\"a\">outer <ask>inner</ask> tail</ask> <complete></complete> <asking>no</asking>"
+    chunks = feed_in_pieces(XMLStreamScanner(["ask", "complete"]), content, 3)
+
+    assert [c.raw for c in chunks] == [
+        "<ask attachments=\"a\">outer <ask>inner</ask> tail</ask>",
+        "<complete></complete>",
+    ]
+    assert all(c.xml == c.raw and c.closing == "" for c in chunks)
+
+
+def test_legacy_tags_are_ignored_inside_function_calls():
+    content = "<function_calls>\n<invoke name=\"x\">\n<parameter name=\"p\"><ask>q</ask></parameter>\n</invoke>\n</function_calls>"
+    chunks = feed_in_pieces(XMLStreamScanner(["ask"]), content, 5)
+    assert len(chunks) == 1
+    assert "<ask>q</ask>" in chunks[0].raw
+
+
+def test_scanned_text_is_released():
+    scanner = XMLStreamScanner()
+    for _ in range(1000):
+        scanner.feed("plain prose without any tool calls. ")
+    assert len(scanner._buffer) <= scanner._hold + len("plain prose without any tool calls. ")
+
+
+@pytest.mark.parametrize("name", ["1.txt", "2.txt", "3.txt"])
+def test_recorded_responses_match_invoke_count(name):
+    content = (SAMPLE_RESPONSES / name).read_text(encoding="utf-8")
+    rng = random.Random(name)
+    scanner = XMLStreamScanner()
+    chunks, pos = [], 0
+    while pos < len(content):
+        step = rng.randint(1, 12)
+        chunks.extend(scanner.feed(content[pos:pos + step]))
+        pos += step
+
+    assert len(chunks) == content.count("</invoke>")
+    assert all(content.count(c.raw) >= 1 for c in chunks)
@@ -12,6 +12,7 @@ from .support.exceptions import TriggerError, ConfigurationError, ProviderError
 from .services.trigger_service import TriggerService
 from .services.execution_service import TriggerExecutionService
 from .services.provider_service import ProviderService
+from .services.cron_scheduler import CronScheduler, uses_local_scheduler
 from .endpoints import workflows_router, set_workflows_db_connection
 from services.supabase import DBConnection
 from utils.auth_utils import get_current_user_id_from_jwt
@@ -27,6 +28,7 @@ workflows_api_router.include_router(workflows_router)
 trigger_service: Optional[TriggerService] = None
 execution_service: Optional[TriggerExecutionService] = None
 provider_service: Optional[ProviderService] = None
+cron_scheduler: Optional[CronScheduler] = None
 db = None
 
 
@@ -106,6 +108,56 @@ async def get_services() -> tuple[TriggerService, TriggerExecutionService, Provi
     return trigger_service, execution_service, provider_service
 
 
+async def _load_schedule_triggers():
+    trigger_svc, _, _ = await get_services()
+    triggers = await trigger_svc.get_active_triggers()
+    return [trigger for trigger in triggers if trigger.provider_id == "schedule"]
+
+
+async def _fire_schedule_trigger(trigger, fire_at: float):
+    if not await is_enabled("agent_triggers"):
+        return
+    
+    from .domain.entities import TriggerEvent
+    from .infrastructure.providers.schedule_provider import schedule_payload
+    
+    trigger_svc, execution_svc, _ = await get_services()
+    raw_data = schedule_payload(trigger, datetime.fromtimestamp(fire_at, timezone.utc))
+    result = await trigger_svc.process_trigger_event(trigger.trigger_id, raw_data, trigger=trigger)
+    if not result.success:
+        logger.warning(f"Schedule trigger {trigger.trigger_id} not executed: {result.error_message}")
+        return
+    
+    if result.should_execute_agent or result.should_execute_workflow:
+        event = TriggerEvent(
+            trigger_id=trigger.trigger_id,
+            agent_id=trigger.agent_id,
+            trigger_type=trigger.trigger_type,
+            raw_data=raw_data
+        )
+        execution_result = await execution_svc.execute_trigger_result(
+            agent_id=trigger.agent_id,
+            trigger_result=result,
+            trigger_event=event
+        )
+        logger.info(f"Schedule trigger {trigger.trigger_id} execution result: {execution_result}")
+
+
+def start_cron_scheduler():
+    """Start the local cron scheduler when schedule triggers don't go through QStash."""
+    global cron_scheduler
+    if not uses_local_scheduler():
+        return
+    if cron_scheduler is None:
+        cron_scheduler = CronScheduler(_load_schedule_triggers, _fire_schedule_trigger)
+    cron_scheduler.start()
+
+
+async def stop_cron_scheduler():
+    if cron_scheduler is not None:
+        await cron_scheduler.stop()
+
+
 async def verify_agent_access(agent_id: str, user_id: str):
     client = await db.client
     result = await client.table('agents').select('agent_id').eq('agent_id', agent_id).eq('account_id', user_id).execute()
@@ -542,7 +594,8 @@ async def trigger_webhook(
         except:
             raw_data = {}
         
-        result = await trigger_svc.process_trigger_event(trigger_id, raw_data)
+        trigger = await trigger_svc.get_trigger(trigger_id)
+        result = await trigger_svc.process_trigger_event(trigger_id, raw_data, trigger=trigger)
         
         if not result.success:
             return JSONResponse(
@@ -551,7 +604,6 @@ async def trigger_webhook(
             )
         
         if result.should_execute_agent or result.should_execute_workflow:
-            trigger = await trigger_svc.get_trigger(trigger_id)
             if trigger:
                 logger.info(f"Executing agent {trigger.agent_id} for trigger {trigger_id}")
                 
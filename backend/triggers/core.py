@@ -423,7 +423,8 @@ class TriggerManager:
     async def process_trigger_event(self, trigger_id: str, raw_data: Dict[str, Any]) -> TriggerResult:
         from utils.logger import logger
         logger.info(f"Processing trigger event for {trigger_id}")
-        await self.load_provider_definitions()
+        if not self.provider_definitions:
+            await self.load_provider_definitions()
         
         trigger_config = await self.get_trigger(trigger_id)
         if not trigger_config:
@@ -8,9 +8,23 @@ from qstash.client import QStash
 from utils.logger import logger
 from ...domain.entities import TriggerProvider, TriggerEvent, TriggerResult, Trigger
 from ...domain.value_objects import ProviderDefinition, TriggerType, ExecutionVariables
+from ...services.cron_scheduler import uses_local_scheduler, publish_schedule_change
 from utils.config import config, EnvMode
 
 
+def schedule_payload(trigger: Trigger, scheduled_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Event data of one scheduled run, as delivered to process_event."""
+    return {
+        "trigger_id": trigger.trigger_id,
+        "agent_id": trigger.agent_id,
+        "execution_type": trigger.config.config.get('execution_type', 'agent'),
+        "agent_prompt": trigger.config.config.get('agent_prompt'),
+        "workflow_id": trigger.config.config.get('workflow_id'),
+        "workflow_input": trigger.config.config.get('workflow_input', {}),
+        "timestamp": (scheduled_at or datetime.now(timezone.utc)).isoformat()
+    }
+
+
 class ScheduleTriggerProvider(TriggerProvider):
     def __init__(self, provider_definition: ProviderDefinition):
         super().__init__(provider_definition)
@@ -25,7 +39,7 @@ class ScheduleTriggerProvider(TriggerProvider):
             self._qstash = QStash(token=self._qstash_token)
     
     async def validate_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        if not self._qstash:
+        if not self._qstash and not uses_local_scheduler():
             raise ValueError("QSTASH_TOKEN environment variable is required for QStash scheduling")
         
         if 'cron_expression' not in config:
@@ -119,6 +133,11 @@ class ScheduleTriggerProvider(TriggerProvider):
             return cron_expression
     
     async def setup_trigger(self, trigger: Trigger) -> bool:
+        if uses_local_scheduler():
+            await publish_schedule_change(trigger)
+            logger.info(f"Scheduled trigger {trigger.trigger_id} on the local cron scheduler with cron: {trigger.config.config['cron_expression']}")
+            return True
+        
         if not self._qstash:
             logger.error("QStash client not available")
             return False
@@ -126,22 +145,13 @@ class ScheduleTriggerProvider(TriggerProvider):
         try:
             webhook_url = f"{self._webhook_base_url}/api/triggers/{trigger.trigger_id}/webhook"
             cron_expression = trigger.config.config['cron_expression']
-            execution_type = trigger.config.config.get('execution_type', 'agent')
             user_timezone = trigger.config.config.get('timezone', 'UTC')
 
             if user_timezone != 'UTC':
                 cron_expression = self._convert_cron_to_utc(cron_expression, user_timezone)
                 logger.info(f"Converted cron expression from {user_timezone} to UTC: {trigger.config.config['cron_expression']} -> {cron_expression}")
             
-            payload = {
-                "trigger_id": trigger.trigger_id,
-                "agent_id": trigger.agent_id,
-                "execution_type": execution_type,
-                "agent_prompt": trigger.config.config.get('agent_prompt'),
-                "workflow_id": trigger.config.config.get('workflow_id'),
-                "workflow_input": trigger.config.config.get('workflow_input', {}),
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }
+            payload = schedule_payload(trigger)
             
             headers = {
                 "Content-Type": "application/json",
@@ -171,6 +181,10 @@ class ScheduleTriggerProvider(TriggerProvider):
             return False
     
     async def teardown_trigger(self, trigger: Trigger) -> bool:
+        if uses_local_scheduler():
+            await publish_schedule_change(trigger, removed=True)
+            return True
+        
         if not self._qstash:
             logger.warning("QStash client not available, skipping teardown")
             return True
@@ -248,6 +262,9 @@ class ScheduleTriggerProvider(TriggerProvider):
             )
     
     async def health_check(self, trigger: Trigger) -> bool:
+        if uses_local_scheduler():
+            return trigger.is_active
+        
         if not self._qstash:
             logger.warning("QStash client not available for health check")
             return False
@@ -286,7 +303,7 @@ class ScheduleTriggerProvider(TriggerProvider):
         return await self.setup_trigger(trigger)
     
     async def update_trigger(self, trigger: Trigger) -> bool:
-        if not self._qstash:
+        if not self._qstash and not uses_local_scheduler():
             logger.warning("QStash client not available for trigger update")
             return True
         
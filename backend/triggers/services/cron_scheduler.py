@@ -0,0 +1,374 @@
+"""
+In-process cron scheduler for schedule triggers.
+
+With SCHEDULE_BACKEND=local, schedule triggers are fired by this scheduler
+instead of QStash calling back the trigger webhook for every run.
+
+- The next fire time of every active schedule trigger is computed with
+  croniter, in the trigger's timezone, and kept in a heap ordered by fire time.
+- One worker fires triggers at a time: the one holding the Redis leader lock.
+  The others stand by and take over when the lock expires.
+- Due triggers are dispatched as background tasks, at most
+  CRON_SCHEDULER_BATCH_SIZE at a time, so a slow trigger neither delays the
+  others nor keeps the leader from renewing its lock. Runs missed while no
+  worker was leader are not replayed; the trigger fires once and is scheduled
+  after the current time.
+- Creating, updating or removing a schedule trigger publishes the trigger on
+  CRON_SCHEDULER_CHANGES_CHANNEL, and every CRON_SCHEDULER_SYNC_INTERVAL
+  seconds the leader reloads all schedule triggers from the database.
+
+The clock is injectable, so the scheduling logic can be exercised without
+waiting for real cron times.
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import croniter
+import pytz
+
+from utils.logger import logger
+from ..domain.entities import Trigger
+from ..domain.value_objects import TriggerConfig, TriggerIdentity, TriggerType
+
+SCHEDULE_BACKEND = os.getenv("SCHEDULE_BACKEND", "qstash")
+CRON_SCHEDULER_LOCK_TTL = float(os.getenv("CRON_SCHEDULER_LOCK_TTL", 30))
+CRON_SCHEDULER_SYNC_INTERVAL = float(os.getenv("CRON_SCHEDULER_SYNC_INTERVAL", 60))
+CRON_SCHEDULER_BATCH_SIZE = int(os.getenv("CRON_SCHEDULER_BATCH_SIZE", 50))
+
+CRON_SCHEDULER_LEADER_KEY = "triggers:cron_scheduler:leader"
+CRON_SCHEDULER_CHANGES_CHANNEL = "triggers:cron_scheduler:changes"
+
+# Only the holder of the lock may extend or release it
+_RENEW_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+TriggerLoader = Callable[[], Awaitable[List[Trigger]]]
+TriggerDispatcher = Callable[[Trigger, float], Awaitable[Any]]
+
+
+def uses_local_scheduler() -> bool:
+    return SCHEDULE_BACKEND == "local"
+
+
+def next_fire_time(cron_expression: str, after: float, timezone: str = "UTC") -> float:
+    """Return the first time (epoch seconds) after `after` matching the cron expression in `timezone`."""
+    tz = pytz.timezone(timezone or "UTC")
+    base = datetime.fromtimestamp(after, tz)
+    return croniter.croniter(cron_expression, base).get_next(float)
+
+
+def _schedule_of(trigger: Trigger) -> Tuple[Optional[str], str]:
+    return trigger.config.config.get("cron_expression"), trigger.config.config.get("timezone", "UTC")
+
+
+def serialize_trigger(trigger: Trigger) -> Dict[str, Any]:
+    return {
+        "trigger_id": trigger.trigger_id,
+        "agent_id": trigger.agent_id,
+        "provider_id": trigger.provider_id,
+        "trigger_type": trigger.trigger_type.value,
+        "name": trigger.config.name,
+        "description": trigger.config.description,
+        "config": trigger.config.config,
+        "is_active": trigger.is_active,
+    }
+
+
+def deserialize_trigger(data: Dict[str, Any]) -> Trigger:
+    return Trigger(
+        identity=TriggerIdentity(trigger_id=data["trigger_id"], agent_id=data["agent_id"]),
+        provider_id=data["provider_id"],
+        trigger_type=TriggerType(data["trigger_type"]),
+        config=TriggerConfig(
+            name=data["name"],
+            description=data.get("description"),
+            config=data.get("config") or {},
+            is_active=data.get("is_active", True),
+        ),
+    )
+
+
+async def publish_schedule_change(trigger: Trigger, removed: bool = False) -> None:
+    """Tell the scheduler that a schedule trigger was set up or torn down."""
+    message = {"trigger_id": trigger.trigger_id, "removed": removed}
+    if not removed:
+        message["trigger"] = serialize_trigger(trigger)
+    try:
+        from services import redis
+        await redis.publish(CRON_SCHEDULER_CHANGES_CHANNEL, json.dumps(message, default=str))
+    except Exception as e:
+        logger.warning(f"Failed to publish schedule change for trigger {trigger.trigger_id}: {str(e)}")
+
+
+class CronScheduler:
+    def __init__(
+        self,
+        load_triggers: TriggerLoader,
+        dispatch: TriggerDispatcher,
+        clock: Callable[[], float] = time.time,
+        lock_ttl: float = CRON_SCHEDULER_LOCK_TTL,
+        sync_interval: float = CRON_SCHEDULER_SYNC_INTERVAL,
+        batch_size: int = CRON_SCHEDULER_BATCH_SIZE,
+    ):
+        self._load_triggers = load_triggers
+        self._dispatch = dispatch
+        self.clock = clock
+        self.lock_ttl = lock_ttl
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        self.instance_id = str(uuid.uuid4())
+
+        # Heap of (fire_at, trigger_id, generation); entries whose generation is
+        # no longer the trigger's current one were unscheduled and are skipped
+        self._heap: List[Tuple[float, str, int]] = []
+        self._triggers: Dict[str, Tuple[Trigger, int]] = {}
+        self._generation = 0
+
+        self._dispatch_slots = asyncio.Semaphore(batch_size)
+        self._dispatching: Set[asyncio.Task] = set()
+
+        self.is_leader = False
+        self._next_sync_at = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {"fired": 0, "failed": 0, "syncs": 0}
+
+    def __len__(self) -> int:
+        return len(self._triggers)
+
+    def schedule(self, trigger: Trigger, now: Optional[float] = None, fire_at: Optional[float] = None) -> Optional[float]:
+        """(Re)schedule a trigger from its cron expression. Returns its next fire time."""
+        self.unschedule(trigger.trigger_id)
+        cron_expression = trigger.config.config.get("cron_expression")
+        if not trigger.is_active or not cron_expression:
+            return None
+        now = self.clock() if now is None else now
+        if fire_at is None:
+            try:
+                fire_at = next_fire_time(cron_expression, now, trigger.config.config.get("timezone", "UTC"))
+            except Exception as e:
+                logger.error(f"Cannot schedule trigger {trigger.trigger_id} ({cron_expression}): {str(e)}")
+                return None
+
+        self._generation += 1
+        self._triggers[trigger.trigger_id] = (trigger, self._generation)
+        heapq.heappush(self._heap, (fire_at, trigger.trigger_id, self._generation))
+        self._wake()
+        return fire_at
+
+    def unschedule(self, trigger_id: str) -> None:
+        self._triggers.pop(trigger_id, None)
+
+    def next_due(self) -> Optional[float]:
+        """Fire time of the earliest scheduled trigger, if any."""
+        while self._heap:
+            fire_at, trigger_id, generation = self._heap[0]
+            current = self._triggers.get(trigger_id)
+            if current is not None and current[1] == generation:
+                return fire_at
+            heapq.heappop(self._heap)
+        return None
+
+    async def sync(self, now: Optional[float] = None) -> None:
+        """Replace the schedule with the active schedule triggers from the database."""
+        triggers = await self._load_triggers()
+        now = self.clock() if now is None else now
+        # Unchanged triggers keep their fire time, so a run that is due isn't skipped
+        previous = {}
+        for fire_at, trigger_id, generation in self._heap:
+            current = self._triggers.get(trigger_id)
+            if current is not None and current[1] == generation:
+                previous[trigger_id] = (fire_at, _schedule_of(current[0]))
+        self._heap.clear()
+        self._triggers.clear()
+        for trigger in triggers:
+            fire_at, schedule = previous.get(trigger.trigger_id, (None, None))
+            self.schedule(trigger, now, fire_at if schedule == _schedule_of(trigger) else None)
+        self._next_sync_at = now + self.sync_interval
+        self.stats["syncs"] += 1
+        logger.debug(f"Cron scheduler synced {len(self._triggers)} schedule triggers")
+
+    def dispatch_due(self, now: Optional[float] = None) -> int:
+        """Start firing every trigger due at `now`. Returns the number started."""
+        now = self.clock() if now is None else now
+        started = 0
+        while True:
+            fire_at = self.next_due()
+            if fire_at is None or fire_at > now:
+                return started
+            _, trigger_id, _ = heapq.heappop(self._heap)
+            trigger, _ = self._triggers[trigger_id]
+            self.schedule(trigger, now)
+            task = asyncio.create_task(self._fire(trigger, fire_at))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+            started += 1
+
+    async def _fire(self, trigger: Trigger, fire_at: float) -> None:
+        async with self._dispatch_slots:
+            try:
+                await self._dispatch(trigger, fire_at)
+                self.stats["fired"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Failed to fire schedule trigger {trigger.trigger_id}: {str(e)}")
+
+    async def wait_dispatched(self, timeout: Optional[float] = None) -> None:
+        """Wait for the triggers already started to finish firing."""
+        if self._dispatching:
+            await asyncio.wait(set(self._dispatching), timeout=timeout)
+
+    def apply_change(self, message: Dict[str, Any]) -> None:
+        """Apply a change published by publish_schedule_change."""
+        if message.get("removed") or not message.get("trigger"):
+            self.unschedule(message["trigger_id"])
+        else:
+            self.schedule(deserialize_trigger(message["trigger"]))
+
+    async def acquire_leadership(self) -> bool:
+        """Take or extend the leader lock. Returns whether this scheduler is the leader."""
+        try:
+            from services import redis
+            redis_client = await redis.get_client()
+            ttl_ms = int(self.lock_ttl * 1000)
+            if self.is_leader:
+                held = await redis_client.eval(_RENEW_LOCK_SCRIPT, 1, CRON_SCHEDULER_LEADER_KEY, self.instance_id, ttl_ms)
+            else:
+                held = await redis_client.set(CRON_SCHEDULER_LEADER_KEY, self.instance_id, nx=True, px=ttl_ms)
+            was_leader, self.is_leader = self.is_leader, bool(held)
+        except Exception as e:
+            logger.warning(f"Cron scheduler failed to check leadership: {str(e)}")
+            was_leader, self.is_leader = self.is_leader, False
+
+        if self.is_leader and not was_leader:
+            logger.info(f"Cron scheduler {self.instance_id} is now the leader")
+            # Changes may have been missed while standing by
+            self._next_sync_at = 0.0
+        elif was_leader and not self.is_leader:
+            logger.warning(f"Cron scheduler {self.instance_id} lost leadership")
+        return self.is_leader
+
+    async def release_leadership(self) -> None:
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            from services import redis
+            redis_client = await redis.get_client()
+            await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, CRON_SCHEDULER_LEADER_KEY, self.instance_id)
+        except Exception as e:
+            logger.warning(f"Cron scheduler failed to release leadership: {str(e)}")
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        listener = asyncio.create_task(self._listen_for_changes())
+        try:
+            while not self._stopping:
+                # Changes made from here on are accounted for by next_due() below
+                self._wakeup.clear()
+                renew_in = self.lock_ttl / 3
+                if not await self.acquire_leadership():
+                    await self._sleep(renew_in)
+                    continue
+
+                now = self.clock()
+                try:
+                    if now >= self._next_sync_at:
+                        await self.sync(now)
+                    self.dispatch_due(now)
+                except Exception as e:
+                    logger.error(f"Cron scheduler iteration failed: {str(e)}")
+                    self._next_sync_at = min(self._next_sync_at, now + renew_in)
+
+                timeout = min(renew_in, self._next_sync_at - now)
+                next_due = self.next_due()
+                if next_due is not None:
+                    timeout = min(timeout, next_due - self.clock())
+                await self._sleep(max(timeout, 0))
+        finally:
+            listener.cancel()
+            await self.release_leadership()
+
+    async def _sleep(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _listen_for_changes(self) -> None:
+        from services import redis
+        while not self._stopping:
+            pubsub = None
+            try:
+                pubsub = await redis.create_pubsub()
+                await pubsub.subscribe(CRON_SCHEDULER_CHANGES_CHANNEL)
+                # Anything published before the subscription is picked up by a sync
+                self._next_sync_at = 0.0
+                self._wake()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.apply_change(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cron scheduler change listener failed: {str(e)}")
+                await asyncio.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self.run(), name="cron-scheduler")
+            logger.info(f"Started cron scheduler {self.instance_id}")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        self._wake()
+        try:
+            await asyncio.wait_for(task, timeout=5)
+        except asyncio.TimeoutError:
+            task.cancel()
+        except Exception as e:
+            logger.warning(f"Cron scheduler stopped with error: {str(e)}")
+        # Triggers already fired keep running; give them a moment to finish
+        await self.wait_dispatched(timeout=5)
+
+    def get_stats(self) -> Dict[str, Any]:
+        next_due = self.next_due()
+        return {
+            **self.stats,
+            "is_leader": self.is_leader,
+            "dispatching": len(self._dispatching),
+            "scheduled": len(self._triggers),
+            "next_due_in_seconds": round(next_due - self.clock(), 3) if next_due is not None else None,
+        }
@@ -163,9 +163,11 @@ class TriggerService:
     async def process_trigger_event(
         self,
         trigger_id: str,
-        raw_data: Dict[str, Any]
+        raw_data: Dict[str, Any],
+        trigger: Optional[Trigger] = None
     ) -> TriggerResult:
-        trigger = await self._trigger_repo.find_by_id(trigger_id)
+        if trigger is None:
+            trigger = await self._trigger_repo.find_by_id(trigger_id)
         if not trigger:
             return TriggerResult(
                 success=False,
@@ -1,6 +1,10 @@
 import sentry
+import asyncio
+import os
+import time
+from collections import OrderedDict
 from fastapi import HTTPException, Request, Header
-from typing import Optional
+from typing import Any, Dict, Hashable, Optional, Tuple
 import jwt
 from jwt.exceptions import PyJWTError
 from utils.logger import structlog
@@ -12,6 +16,73 @@ from utils.sentry_utils import (
     monitor_performance
 )
 
+# Reconnecting stream clients and status polling re-check thread access on
+# every request. Granted access is cached per (user_id, thread_id) for a short
+# time and the account/project of a thread, which never change, for longer.
+# Denials are never cached. Project visibility and account membership are
+# changed through Supabase directly, not by this service, so cached grants are
+# not invalidated: making a project private or removing a user from an account
+# takes effect within THREAD_ACCESS_CACHE_TTL seconds. Set it to 0 to disable
+# the cache.
+THREAD_ACCESS_CACHE_TTL = float(os.getenv("THREAD_ACCESS_CACHE_TTL", 30))
+THREAD_INFO_CACHE_TTL = float(os.getenv("THREAD_INFO_CACHE_TTL", 600))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", 10000))
+
+
+class _TTLCache:
+    """Size-bounded LRU whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_size: int = AUTH_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# thread_id -> {"account_id": ..., "project_id": ...}
+_thread_info_cache = _TTLCache(THREAD_INFO_CACHE_TTL)
+# (user_id, thread_id) -> the thread info the grant was based on
+_thread_access_cache = _TTLCache(THREAD_ACCESS_CACHE_TTL)
+
+
+async def _get_thread_info(client, thread_id: str) -> Dict[str, Any]:
+    """Return the account_id and project_id of a thread, raising 404 if it doesn't exist."""
+    thread_info = _thread_info_cache.get(thread_id)
+    if thread_info is not None:
+        return thread_info
+
+    response = await client.table('threads').select('account_id, project_id').eq('thread_id', thread_id).execute()
+    if not response.data or len(response.data) == 0:
+        raise HTTPException(status_code=404, detail="Thread not found")
+
+    thread_info = {
+        'account_id': response.data[0].get('account_id'),
+        'project_id': response.data[0].get('project_id'),
+    }
+    _thread_info_cache.set(thread_id, thread_info)
+    return thread_info
+
 # This function extracts the user ID from Supabase JWT
 @monitor_performance("jwt_authentication")
 async def get_current_user_id_from_jwt(request: Request) -> str:
@@ -96,15 +167,7 @@ async def get_account_id_from_thread(client, thread_id: str) -> str:
         HTTPException: If the thread is not found or if there's an error
     """
     try:
-        response = await client.table('threads').select('account_id').eq('thread_id', thread_id).execute()
-        
-        if not response.data or len(response.data) == 0:
-            raise HTTPException(
-                status_code=404,
-                detail="Thread not found"
-            )
-        
-        account_id = response.data[0].get('account_id')
+        account_id = (await _get_thread_info(client, thread_id)).get('account_id')
         
         if not account_id:
             raise HTTPException(
@@ -213,28 +276,30 @@ async def verify_thread_access(client, thread_id: str, user_id: str):
         HTTPException: If the user doesn't have access to the thread
     """
     try:
-        # Query the thread to get account information
-        thread_result = await client.table('threads').select('*,project_id').eq('thread_id', thread_id).execute()
+        if _thread_access_cache.get((user_id, thread_id)) is not None:
+            return True
 
-        if not thread_result.data or len(thread_result.data) == 0:
-            raise HTTPException(status_code=404, detail="Thread not found")
-        
-        thread_data = thread_result.data[0]
-        
-        # Check if project is public
-        project_id = thread_data.get('project_id')
-        if project_id:
+        thread_info = await _get_thread_info(client, thread_id)
+        project_id = thread_info.get('project_id')
+        account_id = thread_info.get('account_id')
+
+        async def is_public_project():
+            if not project_id:
+                return False
             project_result = await client.table('projects').select('is_public').eq('project_id', project_id).execute()
-            if project_result.data and len(project_result.data) > 0:
-                if project_result.data[0].get('is_public'):
-                    return True
-            
-        account_id = thread_data.get('account_id')
-        # When using service role, we need to manually check account membership instead of using current_user_account_role
-        if account_id:
+            return bool(project_result.data and project_result.data[0].get('is_public'))
+
+        async def is_account_member():
+            # When using service role, we need to manually check account membership instead of using current_user_account_role
+            if not account_id:
+                return False
             account_user_result = await client.schema('basejump').from_('account_user').select('account_role').eq('user_id', user_id).eq('account_id', account_id).execute()
-            if account_user_result.data and len(account_user_result.data) > 0:
-                return True
+            return bool(account_user_result.data)
+
+        is_public, is_member = await asyncio.gather(is_public_project(), is_account_member())
+        if is_public or is_member:
+            _thread_access_cache.set((user_id, thread_id), thread_info)
+            return True
         raise HTTPException(status_code=403, detail="Not authorized to access this thread")
     except HTTPException:
         # Re-raise HTTP exceptions as they are
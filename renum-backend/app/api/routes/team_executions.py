@@ -17,6 +17,7 @@ from app.models.team_models import (
     ExecutionStatusResponse
 )
 from app.services.team_orchestrator import TeamOrchestrator
+from app.services.execution_scheduler import ExecutionAdmissionError, execution_scheduler
 # from app.repositories.team_execution_repository import TeamExecutionRepository
 from app.core.dependencies import get_team_orchestrator, get_team_execution_repository, get_websocket_manager
 from app.core.auth import get_current_user_id, get_user_id_from_token
@@ -59,6 +60,9 @@ async def execute_team(
         
         # Executa a equipe
         return await team_orchestrator.execute_team(user_id, execution_data)
+    except ExecutionAdmissionError as e:
+        headers = {"Retry-After": str(int(e.retry_after) + 1)} if e.retry_after else None
+        raise HTTPException(status_code=429, detail=str(e), headers=headers)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -92,6 +96,25 @@ async def list_executions(
         raise HTTPException(status_code=500, detail=f"Failed to list executions: {str(e)}")
 
 
+@router.get("/executions/queue", response_model=dict)
+async def get_execution_queue(
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Obtém o estado da fila de execuções.
+    
+    Args:
+        user_id: ID do usuário autenticado
+        
+    Returns:
+        Métricas do escalonador e o número de execuções do usuário na fila
+    """
+    stats = execution_scheduler.get_stats()
+    queue_depth_by_user = stats.pop("queue_depth_by_user")
+    stats["user_queue_depth"] = queue_depth_by_user.get(str(user_id), 0)
+    return stats
+
+
 @router.get("/executions/{execution_id}/status", response_model=ExecutionStatusResponse)
 async def get_execution_status(
     execution_id: UUID = Path(..., description="Execution ID"),
@@ -173,6 +196,40 @@ async def stop_execution(
     return {"status": "success", "message": f"Execution {execution_id} stopped"}
 
 
+@router.post("/executions/{execution_id}/resume", response_model=dict)
+async def resume_execution(
+    execution_id: UUID = Path(..., description="Execution ID"),
+    user_id: UUID = Depends(get_current_user_id),
+    team_orchestrator: TeamOrchestrator = Depends(get_team_orchestrator)
+):
+    """
+    Retoma uma execução que falhou ou foi interrompida, a partir do primeiro passo incompleto.
+    
+    Args:
+        execution_id: ID da execução
+        user_id: ID do usuário autenticado
+        team_orchestrator: Orquestrador de equipes
+        
+    Returns:
+        Dicionário com status da operação
+        
+    Raises:
+        HTTPException: Se a execução não existir, já tiver sido concluída ou ainda estiver em andamento
+    """
+    try:
+        resumed = await team_orchestrator.resume_execution(execution_id, user_id)
+    except ExecutionAdmissionError as e:
+        headers = {"Retry-After": str(int(e.retry_after) + 1)} if e.retry_after else None
+        raise HTTPException(status_code=429, detail=str(e), headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if not resumed:
+        raise HTTPException(status_code=404, detail=f"Execution {execution_id} not found")
+    
+    return {"status": "success", "message": f"Execution {execution_id} resumed"}
+
+
 @router.delete("/executions/{execution_id}", response_model=dict)
 async def delete_execution(
     execution_id: UUID = Path(..., description="Execution ID"),
@@ -56,6 +56,32 @@ class Settings(BaseSettings):
     # Limites
     MAX_CONCURRENT_EXECUTIONS: int = 5
     MAX_AGENTS_PER_TEAM: int = 10
+    TEAM_DAG_MAX_CONCURRENCY: int = 4
+    
+    # Escalonador de execuções de equipes
+    TEAM_EXECUTION_WORKERS: int = 20
+    TEAM_EXECUTION_MAX_QUEUE_DEPTH: int = 200
+    TEAM_EXECUTION_MAX_QUEUED_PER_USER: int = 20
+    TEAM_EXECUTION_USER_WEIGHTS: Dict[str, float] = {}
+    TEAM_AGENT_MAX_CONCURRENCY: int = 40
+    # Execuções em andamento renovam heartbeat_at neste intervalo; uma execução
+    # sem heartbeat há mais de TEAM_EXECUTION_LEASE_SECONDS pode ser retomada
+    TEAM_EXECUTION_HEARTBEAT_INTERVAL: int = 30
+    TEAM_EXECUTION_LEASE_SECONDS: int = 120
+    
+    # Cache de resultados de passos
+    TEAM_STEP_CACHE_ENABLED: bool = True
+    TEAM_STEP_CACHE_TTL: int = 172800
+    
+    # RAG
+    RAG_CHUNK_WRITE_BATCH_SIZE: int = 200
+    RAG_CHUNK_WRITE_MAX_RETRIES: int = 3
+    RAG_EMBEDDING_MAX_CONCURRENCY: int = 4
+    RAG_EMBEDDING_MAX_RETRIES: int = 5
+    RAG_CACHE_REDIS_ENABLED: bool = True
+    RAG_QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    RAG_QUERY_EMBEDDING_CACHE_TTL: int = 86400
+    RAG_RETRIEVAL_CACHE_TTL: int = 600
     
     # Criptografia
     ENCRYPTION_KEY: Optional[str] = None
@@ -54,6 +54,10 @@ async def lifespan(app: FastAPI):
     # Finaliza o serviço de notificações
     await notification_service.shutdown()
     
+    # Interrompe as execuções de equipes em andamento e na fila
+    from app.services.execution_scheduler import execution_scheduler
+    await execution_scheduler.shutdown()
+    
     # Fecha a conexão com o banco de dados
     db = get_db_instance()
     await db.close()
@@ -18,6 +18,7 @@ class WorkflowType(str, Enum):
     PARALLEL = "parallel"
     CONDITIONAL = "conditional"
     PIPELINE = "pipeline"
+    DAG = "dag"
 
 
 class AgentRole(str, Enum):
@@ -60,6 +61,8 @@ class WorkflowAgent(BaseModel):
     execution_order: Optional[int] = Field(None, description="Ordem de execução (workflow sequencial)")
     timeout: Optional[int] = Field(None, description="Timeout em segundos para execução do agente")
     retry_config: Optional[Dict[str, Any]] = Field(None, description="Configuração de retry para falhas")
+    cache_results: bool = Field(default=False, description="Reutiliza o resultado quando o agente e as entradas não mudaram")
+    cache_ttl: Optional[int] = Field(None, description="Tempo de vida do resultado em cache, em segundos")
 
 
 class WorkflowDefinition(BaseModel):
@@ -93,6 +96,11 @@ class WorkflowDefinition(BaseModel):
                 if v[i].input.source != "agent_result" or v[i].input.agent_id != v[i-1].agent_id:
                     raise ValueError(f"Agente {v[i].agent_id} deve receber entrada do agente anterior em workflow pipeline")
         
+        elif workflow_type == WorkflowType.DAG:
+            # Verifica se as dependências declaradas nas entradas formam um grafo sem ciclos
+            from app.services.dag_scheduler import build_dependency_graph
+            build_dependency_graph((agent.agent_id, agent.input) for agent in v)
+        
         return v
 
 
@@ -160,11 +168,16 @@ class ExecutionStep(BaseModel):
     """Etapa de execução em um plano de execução."""
     step_id: str = Field(default_factory=lambda: str(uuid4()), description="ID único da etapa")
     agent_id: str = Field(..., description="ID do agente a ser executado")
+    step_order: int = Field(default=0, description="Ordem da etapa no plano")
+    input_config: Optional[InputSource] = Field(None, description="Configuração de entrada do agente")
+    conditions: Optional[List[AgentCondition]] = Field(None, description="Condições para execução (workflow condicional)")
     action: str = Field(default="execute", description="Ação a ser executada")
     input_data: Dict[str, Any] = Field(default_factory=dict, description="Dados de entrada para o agente")
     dependencies: List[str] = Field(default_factory=list, description="IDs das etapas que devem ser concluídas antes")
     timeout: Optional[int] = Field(None, description="Timeout em segundos")
     retry_config: Optional[Dict[str, Any]] = Field(None, description="Configuração de retry")
+    cache_results: bool = Field(default=False, description="Reutiliza o resultado quando o agente e as entradas não mudaram")
+    cache_ttl: Optional[int] = Field(None, description="Tempo de vida do resultado em cache, em segundos")
 
 
 class ResourceRequirements(BaseModel):
@@ -18,6 +18,7 @@ from app.rag.models.api import (
     CollectionCreate, CollectionResponse, CollectionUpdate,
     DocumentResponse, ProcessingJobResponse, RetrievalRequest, RetrievalResponse
 )
+from app.rag.services.cache_service import get_retrieval_cache
 from app.rag.services.retrieval_service import RetrievalService
 from app.rag.services.llm_integration_service import LLMIntegrationService
 
@@ -220,4 +221,24 @@ async def submit_retrieval_feedback(
         
     except Exception as e:
         logger.error(f"Error submitting retrieval feedback: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to submit feedback: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to submit feedback: {str(e)}")
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Get the counters of the retrieval caches.
+    
+    This endpoint returns the hits, misses and evictions of the query-embedding
+    cache and the hits, misses and invalidations of the retrieval-result cache
+    of this process.
+    """
+    if not is_feature_enabled("rag_module"):
+        raise HTTPException(
+            status_code=403, 
+            detail="The RAG module is not available at the moment."
+        )
+    
+    return get_retrieval_cache().get_stats()
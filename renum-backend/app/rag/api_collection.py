@@ -17,6 +17,7 @@ from app.rag.models.api import (
 )
 from app.rag.repositories.collection_repository import CollectionRepository
 from app.rag.repositories.knowledge_base_repository import KnowledgeBaseRepository
+from app.rag.services.cache_service import get_retrieval_cache
 
 
 # Create router
@@ -301,6 +302,9 @@ async def delete_collection(
                 detail=f"Failed to delete collection: {collection_id}"
             )
         
+        # Drop cached retrieval results that may include its chunks
+        await get_retrieval_cache().invalidate_collection(str(collection_id))
+        
         # Return no content
         return None
         
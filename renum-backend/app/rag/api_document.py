@@ -4,6 +4,7 @@ API endpoints for document management in the RAG module.
 This module provides FastAPI endpoints for managing documents.
 """
 
+import tempfile
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, Path, UploadFile, File, Form, Body
 from pydantic import UUID4, HttpUrl, BaseModel, Field
@@ -19,12 +20,16 @@ from app.rag.repositories.document_repository import DocumentRepository
 from app.rag.repositories.collection_repository import CollectionRepository
 from app.rag.repositories.knowledge_base_repository import KnowledgeBaseRepository
 from app.rag.repositories.processing_job_repository import ProcessingJobRepository
+from app.rag.services.cache_service import get_retrieval_cache
 from app.rag.services.ingestion_service import IngestionCoordinator
 
 
 # Create router
 router = APIRouter(tags=["rag"])
 
+# Bytes read from an upload at a time
+UPLOAD_READ_SIZE = 1024 * 1024
+
 
 class TextDocumentRequest(BaseModel):
     """Request model for adding a text document."""
@@ -149,11 +154,18 @@ async def upload_file(
                 detail="You don't have permission to upload to this collection"
             )
         
-        # Read file content
-        content = await file.read()
+        # Copy the upload to a temporary file that outlives the request; the
+        # ingestion pipeline reads it incrementally and closes it when done
+        content = tempfile.TemporaryFile()
+        while True:
+            block = await file.read(UPLOAD_READ_SIZE)
+            if not block:
+                break
+            content.write(block)
         
         # Get file size
-        file_size = len(content)
+        file_size = content.tell()
+        content.seek(0)
         
         # Get file type
         file_type = file.content_type
@@ -471,6 +483,9 @@ async def delete_document(
                 detail=f"Failed to delete document: {document_id}"
             )
         
+        # Drop cached retrieval results that may include its chunks
+        await get_retrieval_cache().invalidate_collection(document["collection_id"])
+        
         # Return no content
         return None
         
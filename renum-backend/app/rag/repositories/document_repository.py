@@ -4,11 +4,17 @@ Document repository for the RAG module.
 This module provides functionality for managing documents and chunks.
 """
 
-from typing import Dict, Any, List, Optional, Union
+import asyncio
+import json
+import uuid
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Union
 from datetime import datetime
 
 from app.core.logger import logger
 from app.core.database import get_db_client
+from app.core.config import get_settings
+
+BatchProgressCallback = Callable[[int, int], Awaitable[None]]
 
 
 class DocumentRepository:
@@ -215,6 +221,177 @@ class DocumentRepository:
             logger.error(f"Error creating document chunk: {str(e)}")
             raise
 
+    async def create_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        on_batch: Optional[BatchProgressCallback] = None
+    ) -> int:
+        """Create document chunks together with their embeddings in bulk.
+        
+        Each batch is written with a single multi-row upsert keyed on the chunk
+        ID, so a batch that failed part-way can be retried as a whole without
+        creating duplicates.
+        
+        Args:
+            chunks: Chunks to create. Each needs "id", "document_id", "content",
+                "chunk_index", "metadata" and "embedding", and may carry the
+                "content_hash" and "embedding_model" used to reuse the embedding.
+            batch_size: Chunks per request. Defaults to RAG_CHUNK_WRITE_BATCH_SIZE.
+            max_retries: Retries per batch. Defaults to RAG_CHUNK_WRITE_MAX_RETRIES.
+            on_batch: Awaited after each batch with (chunks written, total chunks).
+            
+        Returns:
+            Number of chunks written.
+        """
+        settings = get_settings()
+        batch_size = batch_size or settings.RAG_CHUNK_WRITE_BATCH_SIZE
+        max_retries = settings.RAG_CHUNK_WRITE_MAX_RETRIES if max_retries is None else max_retries
+        
+        client = await get_db_client()
+        now = datetime.utcnow().isoformat()
+        rows = [
+            {
+                "id": chunk["id"],
+                "document_id": chunk["document_id"],
+                "content": chunk["content"],
+                "chunk_index": chunk["chunk_index"],
+                "metadata": chunk["metadata"],
+                "embedding": chunk["embedding"],
+                "content_hash": chunk.get("content_hash"),
+                "embedding_model": chunk.get("embedding_model"),
+                "created_at": now
+            }
+            for chunk in chunks
+        ]
+        
+        written = 0
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            await self._write_batch(
+                lambda: client.table("document_chunks").upsert(batch).execute(),
+                f"chunks {start}-{start + len(batch) - 1}",
+                max_retries,
+                written
+            )
+            written += len(batch)
+            if on_batch:
+                await on_batch(written, len(rows))
+        
+        return written
+
+    async def update_chunk_embeddings(
+        self,
+        chunk_ids: List[str],
+        embeddings: List[List[float]],
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        on_batch: Optional[BatchProgressCallback] = None
+    ) -> int:
+        """Set the embeddings of existing chunks in bulk.
+        
+        Each batch is one call to the update_chunk_embeddings RPC.
+        
+        Args:
+            chunk_ids: IDs of the chunks.
+            embeddings: Embeddings, in the same order as chunk_ids.
+            batch_size: Chunks per request. Defaults to RAG_CHUNK_WRITE_BATCH_SIZE.
+            max_retries: Retries per batch. Defaults to RAG_CHUNK_WRITE_MAX_RETRIES.
+            on_batch: Awaited after each batch with (chunks written, total chunks).
+            
+        Returns:
+            Number of chunks updated.
+        """
+        if len(chunk_ids) != len(embeddings):
+            raise ValueError("Number of chunk IDs and embeddings must match")
+        
+        settings = get_settings()
+        batch_size = batch_size or settings.RAG_CHUNK_WRITE_BATCH_SIZE
+        max_retries = settings.RAG_CHUNK_WRITE_MAX_RETRIES if max_retries is None else max_retries
+        
+        client = await get_db_client()
+        written = 0
+        for start in range(0, len(chunk_ids), batch_size):
+            batch = [
+                {"chunk_id": chunk_id, "embedding": embedding}
+                for chunk_id, embedding in zip(chunk_ids[start:start + batch_size], embeddings[start:start + batch_size])
+            ]
+            await self._write_batch(
+                lambda: client.rpc("update_chunk_embeddings", {"p_embeddings": batch}).execute(),
+                f"embeddings {start}-{start + len(batch) - 1}",
+                max_retries,
+                written
+            )
+            written += len(batch)
+            if on_batch:
+                await on_batch(written, len(chunk_ids))
+        
+        return written
+
+    async def get_embeddings_by_content_hash(
+        self,
+        content_hashes: List[str],
+        embedding_model: str,
+        batch_size: int = 100
+    ) -> Dict[str, List[float]]:
+        """Get stored embeddings of chunks with the given content hashes.
+        
+        Args:
+            content_hashes: Normalized content hashes to look up.
+            embedding_model: Model the embeddings must have been generated with.
+            batch_size: Hashes per query, keeping request URLs short.
+            
+        Returns:
+            Mapping of content hash to embedding, for the hashes found.
+        """
+        try:
+            client = await get_db_client()
+            
+            embeddings: Dict[str, List[float]] = {}
+            for start in range(0, len(content_hashes), batch_size):
+                result = await client.table("document_chunks").select("content_hash, embedding").eq(
+                    "embedding_model", embedding_model
+                ).in_("content_hash", content_hashes[start:start + batch_size]).execute()
+                
+                for row in result.data or []:
+                    embedding = row.get("embedding")
+                    if embedding is None:
+                        continue
+                    # pgvector columns come back as their text form, e.g. "[0.1,0.2]"
+                    embeddings[row["content_hash"]] = json.loads(embedding) if isinstance(embedding, str) else embedding
+            
+            return embeddings
+        except Exception as e:
+            logger.error(f"Error getting embeddings by content hash: {str(e)}")
+            raise
+
+    async def _write_batch(
+        self,
+        write: Callable[[], Awaitable[Any]],
+        description: str,
+        max_retries: int,
+        written: int
+    ) -> None:
+        """Run an idempotent batch write, retrying with exponential backoff.
+        
+        Args:
+            write: Performs the write.
+            description: Batch description for logs.
+            max_retries: Retries after the first attempt.
+            written: Chunks already written before this batch, for logs.
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                await write()
+                return
+            except Exception as e:
+                if attempt == max_retries:
+                    logger.error(f"Error writing {description} after {attempt + 1} attempts ({written} chunks written): {str(e)}")
+                    raise
+                logger.warning(f"Error writing {description} (attempt {attempt + 1}), retrying: {str(e)}")
+                await asyncio.sleep(0.5 * (2 ** attempt))
+
     async def get_chunks_by_document_id(self, document_id: str) -> List[Dict[str, Any]]:
         """Get chunks by document ID.
         
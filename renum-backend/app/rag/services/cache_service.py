@@ -0,0 +1,314 @@
+"""
+Cache service for the RAG module.
+
+This module provides the caches used by retrieval: a query-embedding cache
+(an in-process LRU in front of Redis) and a retrieval-result cache in Redis
+that is invalidated per collection.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+from app.core.logger import logger
+from app.rag.services.embedding_service import EmbeddingService
+
+
+class LRUCache:
+    """Bounded in-process cache that evicts the least recently used entry."""
+
+    def __init__(self, max_size: int = 1024):
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries.
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get an entry and mark it as recently used."""
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store an entry, evicting the least recently used one when full."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RetrievalCache:
+    """Query-embedding and retrieval-result caches shared by the process.
+
+    Query embeddings are keyed by model and normalized query text, so the same
+    question is embedded once regardless of top_k, filters or collections.
+    Retrieval results are keyed by the query, the search parameters and the
+    current generation of each searched collection; bumping a collection's
+    generation when its documents change makes the old results unreachable
+    and lets them expire.
+    """
+
+    EMBEDDING_PREFIX = "rag:query_embedding"
+    RESULT_PREFIX = "rag:retrieval"
+    GENERATION_PREFIX = "rag:collection_generation"
+
+    # Generation bumped on every change, for searches across all collections
+    ALL_COLLECTIONS = "*"
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        local_size: int = 1024,
+        embedding_ttl: int = 86400,  # 1 day
+        result_ttl: int = 600  # 10 minutes
+    ):
+        """Initialize the cache.
+
+        Args:
+            redis_client: Redis client for the shared tier; without one only
+                query embeddings are cached, in process.
+            local_size: Maximum number of query embeddings kept in process.
+            embedding_ttl: Time-to-live for query embeddings in Redis in seconds.
+            result_ttl: Time-to-live for retrieval results in seconds.
+        """
+        self.redis_client = redis_client
+        self.embeddings = LRUCache(local_size)
+        self.embedding_ttl = embedding_ttl
+        self.result_ttl = result_ttl
+        self.redis_embedding_hits = 0
+        self.result_hits = 0
+        self.result_misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _embedding_key(model_name: str, query: str) -> str:
+        """Key of a query embedding; content_hash normalizes the text."""
+        return f"{RetrievalCache.EMBEDDING_PREFIX}:{model_name}:{EmbeddingService.content_hash(query)}"
+
+    async def get_query_embedding(self, model_name: str, query: str) -> Optional[List[float]]:
+        """Get the embedding of a query, from process memory or Redis.
+
+        Args:
+            model_name: Embedding model.
+            query: Query text.
+
+        Returns:
+            Cached embedding or None if not found.
+        """
+        key = self._embedding_key(model_name, query)
+        embedding = self.embeddings.get(key)
+        if embedding is not None or not self.redis_client:
+            return embedding
+
+        try:
+            cached_data = await self.redis_client.get(key)
+        except Exception as e:
+            logger.error(f"Error getting query embedding from cache: {str(e)}")
+            return None
+        if not cached_data:
+            return None
+
+        self.redis_embedding_hits += 1
+        embedding = json.loads(cached_data)
+        self.embeddings.set(key, embedding)
+        return embedding
+
+    async def set_query_embedding(self, model_name: str, query: str, embedding: List[float]) -> None:
+        """Store the embedding of a query in process memory and Redis.
+
+        Args:
+            model_name: Embedding model.
+            query: Query text.
+            embedding: Embedding of the query.
+        """
+        key = self._embedding_key(model_name, query)
+        self.embeddings.set(key, embedding)
+        if not self.redis_client:
+            return
+
+        try:
+            await self.redis_client.setex(key, self.embedding_ttl, json.dumps(embedding))
+        except Exception as e:
+            logger.error(f"Error storing query embedding in cache: {str(e)}")
+
+    async def get_result_key(
+        self,
+        model_name: str,
+        query: str,
+        collection_ids: Optional[List[str]],
+        top_k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> Optional[str]:
+        """Generate the key of a retrieval result.
+
+        Args:
+            model_name: Embedding model.
+            query: Query text.
+            collection_ids: List of collection IDs.
+            top_k: Number of chunks to retrieve.
+            filters: Additional filters.
+
+        Returns:
+            Cache key, or None if results cannot be cached.
+        """
+        if not self.redis_client:
+            return None
+
+        scopes = sorted(collection_ids) if collection_ids else [self.ALL_COLLECTIONS]
+        try:
+            generations = await self.redis_client.mget([self._generation_key(scope) for scope in scopes])
+        except Exception as e:
+            logger.error(f"Error getting collection generations: {str(e)}")
+            return None
+
+        # Sort filter keys for consistent cache keys
+        params = json.dumps(
+            {
+                "model": model_name,
+                "query": EmbeddingService.content_hash(query),
+                "collections": [
+                    f"{scope}@{int(generation or 0)}" for scope, generation in zip(scopes, generations)
+                ],
+                "top_k": top_k,
+                "filters": filters or {}
+            },
+            sort_keys=True
+        )
+        return f"{self.RESULT_PREFIX}:{hashlib.sha256(params.encode('utf-8')).hexdigest()}"
+
+    async def get_results(self, key: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Get a retrieval result.
+
+        Args:
+            key: Cache key from get_result_key.
+
+        Returns:
+            Cached result or None if not found.
+        """
+        if not key:
+            return None
+
+        try:
+            cached_data = await self.redis_client.get(key)
+        except Exception as e:
+            logger.error(f"Error getting from cache: {str(e)}")
+            return None
+
+        if cached_data:
+            self.result_hits += 1
+            return json.loads(cached_data)
+        self.result_misses += 1
+        return None
+
+    async def set_results(self, key: Optional[str], results: List[Dict[str, Any]]) -> bool:
+        """Store a retrieval result.
+
+        Args:
+            key: Cache key from get_result_key.
+            results: Retrieved chunks.
+
+        Returns:
+            True if successful, False otherwise.
+        """
+        if not key:
+            return False
+
+        try:
+            await self.redis_client.setex(key, self.result_ttl, json.dumps(results, default=str))
+            return True
+        except Exception as e:
+            logger.error(f"Error storing in cache: {str(e)}")
+            return False
+
+    async def invalidate_collection(self, collection_id: str) -> bool:
+        """Invalidate the cached retrieval results of a collection.
+
+        Args:
+            collection_id: ID of the collection whose documents changed.
+
+        Returns:
+            True if successful, False otherwise.
+        """
+        if not self.redis_client:
+            return False
+
+        # Generation keys never expire: a counter that restarted would make the
+        # results cached under its earlier values valid again
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for scope in (str(collection_id), self.ALL_COLLECTIONS):
+                    pipe.incr(self._generation_key(scope))
+                await pipe.execute()
+            self.invalidations += 1
+            return True
+        except Exception as e:
+            logger.error(f"Error invalidating cache for collection {collection_id}: {str(e)}")
+            return False
+
+    def _generation_key(self, scope: str) -> str:
+        return f"{self.GENERATION_PREFIX}:{scope}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the hit, miss and eviction counters of the caches.
+
+        Returns:
+            Counters for the query-embedding and retrieval-result caches.
+        """
+        return {
+            "query_embeddings": {
+                "size": len(self.embeddings),
+                "max_size": self.embeddings.max_size,
+                "local_hits": self.embeddings.hits,
+                "redis_hits": self.redis_embedding_hits,
+                "misses": self.embeddings.misses - self.redis_embedding_hits,
+                "evictions": self.embeddings.evictions
+            },
+            "retrieval_results": {
+                "enabled": self.redis_client is not None,
+                "hits": self.result_hits,
+                "misses": self.result_misses,
+                "invalidations": self.invalidations
+            }
+        }
+
+
+@lru_cache()
+def get_retrieval_cache() -> RetrievalCache:
+    """
+    Get the retrieval cache shared by the process.
+
+    Returns:
+        RetrievalCache using Redis when RAG_CACHE_REDIS_ENABLED is set
+    """
+    settings = get_settings()
+    redis_client = None
+    if settings.RAG_CACHE_REDIS_ENABLED:
+        redis_client = redis.from_url(settings.REDIS_URL, socket_connect_timeout=1)
+    return RetrievalCache(
+        redis_client=redis_client,
+        local_size=settings.RAG_QUERY_EMBEDDING_CACHE_SIZE,
+        embedding_ttl=settings.RAG_QUERY_EMBEDDING_CACHE_TTL,
+        result_ttl=settings.RAG_RETRIEVAL_CACHE_TTL
+    )
@@ -4,11 +4,17 @@ Chunking service for the RAG module.
 This module provides functionality for chunking text into smaller pieces.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Pattern, Tuple
 import re
 
 from app.core.logger import logger
 
+PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
+SENTENCE_SEPARATOR = re.compile(r'(?<=[.!?])\s+')
+
+# Characters before a fixed-size chunk boundary searched for whitespace to break at
+BREAK_WINDOW = 20
+
 
 class ChunkingService:
     """Service for chunking text."""
@@ -22,264 +28,253 @@ class ChunkingService:
         metadata: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """Chunk text into smaller pieces.
-        
+
         Args:
             text: Text to chunk.
             chunk_size: Size of each chunk in characters.
             chunk_overlap: Overlap between chunks in characters.
             chunking_strategy: Strategy to use for chunking.
             metadata: Optional metadata to include with each chunk.
-            
+
         Returns:
             List of chunks with content, chunk index, and metadata.
-            
+
         Raises:
             ValueError: If the chunking strategy is not supported.
         """
         if not text:
             return []
-        
+
+        return list(self.iter_chunks([text], chunk_size, chunk_overlap, chunking_strategy, metadata))
+
+    def iter_chunks(
+        self,
+        segments: Iterable[str],
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        chunking_strategy: str = "fixed_size",
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Chunk text that arrives in segments, e.g. one page or block of rows at a time.
+
+        Chunks may span segment boundaries, and the overlap between chunks is
+        carried across them, so the chunks are the same as chunking the
+        concatenated text. Only the text of the chunk being built is kept, so
+        memory does not grow with the size of the document.
+
+        Args:
+            segments: Consecutive pieces of the text to chunk.
+            chunk_size: Size of each chunk in characters.
+            chunk_overlap: Overlap between chunks in characters.
+            chunking_strategy: Strategy to use for chunking.
+            metadata: Optional metadata to include with each chunk.
+
+        Returns:
+            Iterator of chunks with content, chunk index, and metadata.
+
+        Raises:
+            ValueError: If the chunking strategy is not supported.
+        """
         if chunking_strategy == "fixed_size":
-            return self._chunk_fixed_size(text, chunk_size, chunk_overlap, metadata)
+            return self._chunk_fixed_size(segments, chunk_size, chunk_overlap, metadata)
         elif chunking_strategy == "paragraph":
-            return self._chunk_paragraph(text, chunk_size, chunk_overlap, metadata)
+            return self._chunk_by_units(segments, PARAGRAPH_SEPARATOR, "\n\n", chunk_size, metadata)
         elif chunking_strategy == "sentence":
-            return self._chunk_sentence(text, chunk_size, chunk_overlap, metadata)
+            return self._chunk_by_units(segments, SENTENCE_SEPARATOR, " ", chunk_size, metadata)
         else:
             raise ValueError(f"Unsupported chunking strategy: {chunking_strategy}")
 
     def _chunk_fixed_size(
         self,
-        text: str,
+        segments: Iterable[str],
         chunk_size: int,
         chunk_overlap: int,
         metadata: Optional[Dict[str, Any]] = None
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
         """Chunk text into fixed-size chunks.
-        
+
         Args:
-            text: Text to chunk.
+            segments: Consecutive pieces of the text to chunk.
             chunk_size: Size of each chunk in characters.
             chunk_overlap: Overlap between chunks in characters.
             metadata: Optional metadata to include with each chunk.
-            
+
         Returns:
-            List of chunks with content, chunk index, and metadata.
+            Iterator of chunks with content, chunk index, and metadata.
         """
-        if not text:
-            return []
-        
-        chunks = []
-        start = 0
+        segments = iter(segments)
+        buffer = ""        # Text from buffer_start up to what has been read so far
+        buffer_start = 0
+        start = 0          # Offset of the next chunk
         chunk_index = 0
-        
-        while start < len(text):
-            # Calculate end position
-            end = min(start + chunk_size, len(text))
-            
+        exhausted = False
+
+        while True:
+            read = buffer_start + len(buffer)
+
+            # Read until the next chunk is complete, or there is no more text
+            if not exhausted and start + chunk_size >= read:
+                segment = next(segments, None)
+                if segment is None:
+                    exhausted = True
+                elif segment:
+                    # Drop the text before the next chunk: one copy per segment, not per chunk
+                    buffer = buffer[start - buffer_start:] + segment
+                    buffer_start = start
+                continue
+
+            if start >= read:
+                return
+
+            end = min(start + chunk_size, read)
+
             # If this is not the first chunk and we're not at the end of the text,
             # try to find a good breaking point (whitespace)
-            if start > 0 and end < len(text):
-                # Look for whitespace to break at
-                whitespace_match = re.search(r'\s', text[end-20:end])
-                if whitespace_match:
-                    end = end - 20 + whitespace_match.start() + 1
-            
-            # Extract chunk
-            chunk_text = text[start:end].strip()
-            
+            if start > 0 and end < read:
+                for position in range(max(end - BREAK_WINDOW, start), end):
+                    if buffer[position - buffer_start].isspace():
+                        end = position + 1
+                        break
+
+            chunk_text = buffer[start - buffer_start:end - buffer_start].strip()
+
             # Only add non-empty chunks
             if chunk_text:
-                # Create chunk with metadata
-                chunk = {
-                    'content': chunk_text,
-                    'chunk_index': chunk_index,
-                    'metadata': {
-                        'start_char': start,
-                        'end_char': end
-                    }
-                }
-                
-                # Add additional metadata if provided
-                if metadata:
-                    chunk['metadata'].update(metadata)
-                
-                chunks.append(chunk)
+                yield self._make_chunk(chunk_text, chunk_index, start, end, metadata)
                 chunk_index += 1
-            
+
+            # The chunk reached the end of the text; stepping back by the overlap would repeat it forever
+            if exhausted and end >= read:
+                return
+
             # Move start position for next chunk
-            start = end - chunk_overlap
-            
+            next_start = end - chunk_overlap
+
             # Ensure we're making progress
-            if start >= end:
-                start = end
-        
-        return chunks
+            if next_start >= end:
+                next_start = end
+            start = max(next_start, start + 1)
 
-    def _chunk_paragraph(
+    def _chunk_by_units(
         self,
-        text: str,
+        segments: Iterable[str],
+        separator: Pattern[str],
+        joiner: str,
         chunk_size: int,
-        chunk_overlap: int,
         metadata: Optional[Dict[str, Any]] = None
-    ) -> List[Dict[str, Any]]:
-        """Chunk text by paragraphs.
-        
+    ) -> Iterator[Dict[str, Any]]:
+        """Chunk text by paragraphs or sentences, packing units up to chunk_size.
+
         Args:
-            text: Text to chunk.
+            segments: Consecutive pieces of the text to chunk.
+            separator: Pattern separating units (paragraphs or sentences).
+            joiner: Text joining units within a chunk.
             chunk_size: Maximum size of each chunk in characters.
-            chunk_overlap: Not used in this strategy.
             metadata: Optional metadata to include with each chunk.
-            
+
         Returns:
-            List of chunks with content, chunk index, and metadata.
+            Iterator of chunks with content, chunk index, and metadata.
         """
-        if not text:
-            return []
-        
-        # Split text into paragraphs
-        paragraphs = re.split(r'\n\s*\n', text)
-        
-        chunks = []
-        current_chunk = ""
-        current_start = 0
+        parts: List[str] = []
+        length = 0
+        chunk_start = 0
+        chunk_end = 0
         chunk_index = 0
-        
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
+
+        for unit, offset in self._split_units(segments, separator, chunk_size):
+            content = unit.strip()
+            if not content:
                 continue
-            
-            # If adding this paragraph would exceed the chunk size, start a new chunk
-            if current_chunk and len(current_chunk) + len(paragraph) + 2 > chunk_size:
-                # Create chunk with metadata
-                chunk = {
-                    'content': current_chunk.strip(),
-                    'chunk_index': chunk_index,
-                    'metadata': {
-                        'start_char': current_start,
-                        'end_char': current_start + len(current_chunk)
-                    }
-                }
-                
-                # Add additional metadata if provided
-                if metadata:
-                    chunk['metadata'].update(metadata)
-                
-                chunks.append(chunk)
+            unit_start = offset + len(unit) - len(unit.lstrip())
+
+            # If adding this unit would exceed the chunk size, start a new chunk
+            if parts and length + len(content) + len(joiner) > chunk_size:
+                yield self._make_chunk(joiner.join(parts), chunk_index, chunk_start, chunk_end, metadata)
                 chunk_index += 1
-                
-                # Start a new chunk
-                current_chunk = paragraph
-                current_start = text.find(paragraph, current_start + len(current_chunk))
+                parts = []
+
+            if parts:
+                length += len(joiner) + len(content)
             else:
-                # Add paragraph to current chunk
-                if current_chunk:
-                    current_chunk += "\n\n" + paragraph
-                else:
-                    current_chunk = paragraph
-                    current_start = text.find(paragraph)
-        
+                chunk_start = unit_start
+                length = len(content)
+            parts.append(content)
+            chunk_end = unit_start + len(content)
+
         # Add the last chunk if there's anything left
-        if current_chunk:
-            # Create chunk with metadata
-            chunk = {
-                'content': current_chunk.strip(),
-                'chunk_index': chunk_index,
-                'metadata': {
-                    'start_char': current_start,
-                    'end_char': current_start + len(current_chunk)
-                }
-            }
-            
-            # Add additional metadata if provided
-            if metadata:
-                chunk['metadata'].update(metadata)
-            
-            chunks.append(chunk)
-        
-        return chunks
-
-    def _chunk_sentence(
-        self,
-        text: str,
-        chunk_size: int,
-        chunk_overlap: int,
-        metadata: Optional[Dict[str, Any]] = None
-    ) -> List[Dict[str, Any]]:
-        """Chunk text by sentences.
-        
-        Args:
-            text: Text to chunk.
-            chunk_size: Maximum size of each chunk in characters.
-            chunk_overlap: Not used in this strategy.
-            metadata: Optional metadata to include with each chunk.
-            
-        Returns:
-            List of chunks with content, chunk index, and metadata.
+        if parts:
+            yield self._make_chunk(joiner.join(parts), chunk_index, chunk_start, chunk_end, metadata)
+
+    @staticmethod
+    def _split_units(
+        segments: Iterable[str],
+        separator: Pattern[str],
+        max_unit_size: int
+    ) -> Iterator[Tuple[str, int]]:
+        """Split streamed text on a separator.
+
+        A unit longer than max_unit_size is cut into max_unit_size pieces,
+        counted from the start of the unit, so that a document without
+        separators cannot grow the buffer unbounded and the pieces do not
+        depend on where the segments end. Separators are whitespace, so the
+        trailing whitespace read so far is held back until it is known
+        whether it separates units.
+
+        Yields:
+            (unit, offset of the unit in the text)
         """
-        if not text:
-            return []
-        
-        # Split text into sentences
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        chunks = []
-        current_chunk = ""
-        current_start = 0
-        chunk_index = 0
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
+        max_unit_size = max(1, max_unit_size)
+
+        def cut(unit: str, offset: int) -> Iterator[Tuple[str, int]]:
+            for start in range(0, max(len(unit), 1), max_unit_size):
+                yield unit[start:start + max_unit_size], offset + start
+
+        carry = ""
+        carry_start = 0
+        for segment in segments:
+            if not segment:
                 continue
-            
-            # If adding this sentence would exceed the chunk size, start a new chunk
-            if current_chunk and len(current_chunk) + len(sentence) + 1 > chunk_size:
-                # Create chunk with metadata
-                chunk = {
-                    'content': current_chunk.strip(),
-                    'chunk_index': chunk_index,
-                    'metadata': {
-                        'start_char': current_start,
-                        'end_char': current_start + len(current_chunk)
-                    }
-                }
-                
-                # Add additional metadata if provided
-                if metadata:
-                    chunk['metadata'].update(metadata)
-                
-                chunks.append(chunk)
-                chunk_index += 1
-                
-                # Start a new chunk
-                current_chunk = sentence
-                current_start = text.find(sentence, current_start + len(current_chunk))
-            else:
-                # Add sentence to current chunk
-                if current_chunk:
-                    current_chunk += " " + sentence
-                else:
-                    current_chunk = sentence
-                    current_start = text.find(sentence)
-        
-        # Add the last chunk if there's anything left
-        if current_chunk:
-            # Create chunk with metadata
-            chunk = {
-                'content': current_chunk.strip(),
-                'chunk_index': chunk_index,
-                'metadata': {
-                    'start_char': current_start,
-                    'end_char': current_start + len(current_chunk)
-                }
+            # The carry holds no complete separator, but one may straddle the segments
+            carry += segment
+            # Text before the trailing whitespace cannot be part of a separator that is still incomplete
+            settled = len(carry.rstrip())
+            position = 0
+            while True:
+                match = separator.search(carry, position)
+                # A separator reaching the trailing whitespace may continue in the next segment
+                if not match or match.end() > settled:
+                    break
+                yield from cut(carry[position:match.start()], carry_start + position)
+                position = match.end()
+            while settled - position > max_unit_size:
+                yield carry[position:position + max_unit_size], carry_start + position
+                position += max_unit_size
+            carry = carry[position:]
+            carry_start += position
+
+        if carry:
+            yield from cut(carry, carry_start)
+
+    @staticmethod
+    def _make_chunk(
+        content: str,
+        chunk_index: int,
+        start: int,
+        end: int,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Create a chunk with its position and the additional metadata."""
+        chunk = {
+            'content': content,
+            'chunk_index': chunk_index,
+            'metadata': {
+                'start_char': start,
+                'end_char': end
             }
-            
-            # Add additional metadata if provided
-            if metadata:
-                chunk['metadata'].update(metadata)
-            
-            chunks.append(chunk)
-        
-        return chunks
\ No newline at end of file
+        }
+
+        # Add additional metadata if provided
+        if metadata:
+            chunk['metadata'].update(metadata)
+
+        return chunk
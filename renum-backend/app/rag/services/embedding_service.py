@@ -4,24 +4,57 @@ Embedding service for the RAG module.
 This module provides functionality for generating and managing embeddings.
 """
 
-from typing import List, Dict, Any, Optional, Union
+import asyncio
+import hashlib
+import random
+import unicodedata
+from collections import deque
+from typing import AsyncIterable, AsyncIterator, Deque, List, Dict, Any, Optional, Union
 import numpy as np
 
 from app.core.logger import logger
 from app.core.config import get_settings
+from app.rag.repositories.document_repository import DocumentRepository
+
+# Inputs per request accepted by each provider
+PROVIDER_BATCH_SIZES = {
+    "openai": 2048,
+    "cohere": 96
+}
 
 
 class EmbeddingService:
     """Service for generating and managing embeddings."""
 
-    def __init__(self, model_name: str = None):
+    def __init__(
+        self,
+        model_name: str = None,
+        document_repository: DocumentRepository = None,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        max_backoff: float = 30.0
+    ):
         """Initialize the embedding service.
         
         Args:
             model_name: Name of the embedding model to use.
+            document_repository: Repository used to store and reuse embeddings.
+            batch_size: Texts per provider request. Defaults to the provider maximum.
+            max_concurrency: Provider requests in flight. Defaults to RAG_EMBEDDING_MAX_CONCURRENCY.
+            max_retries: Retries of a rate-limited request. Defaults to RAG_EMBEDDING_MAX_RETRIES.
+            max_backoff: Upper bound in seconds of the backoff between retries.
         """
-        self.model_name = model_name or get_settings().default_embedding_model
+        settings = get_settings()
+        self.model_name = model_name or settings.default_embedding_model
+        self.document_repository = document_repository or DocumentRepository()
         self._initialize_client()
+        self.batch_size = batch_size or PROVIDER_BATCH_SIZES.get(self.client_type, 100)
+        self.max_concurrency = max_concurrency or settings.RAG_EMBEDDING_MAX_CONCURRENCY
+        self.max_retries = settings.RAG_EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        self.max_backoff = max_backoff
+        # Shared by every batch of this service, so concurrent callers stay within the limit
+        self._request_slots = asyncio.Semaphore(self.max_concurrency)
 
     def _initialize_client(self):
         """Initialize the embedding client based on the model name."""
@@ -45,14 +78,37 @@ class EmbeddingService:
             self.client = None
             self.client_type = None
 
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """Hash of the normalized text, used to reuse embeddings of unchanged chunks.
+        
+        Args:
+            text: Text to hash.
+            
+        Returns:
+            Hex SHA-256 of the text with Unicode normalized to NFC and whitespace collapsed.
+        """
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    async def generate_embeddings(
+        self,
+        texts: List[str],
+        reuse_stored: bool = True
+    ) -> List[List[float]]:
         """Generate embeddings for a list of texts.
         
+        Texts whose normalized content already has a stored embedding for this
+        model are not sent to the provider, and duplicates within the input are
+        embedded once. The rest is split into provider-sized batches that run
+        concurrently, off the event loop.
+        
         Args:
             texts: List of texts to generate embeddings for.
+            reuse_stored: Whether to reuse embeddings stored for identical content.
             
         Returns:
-            List of embeddings.
+            List of embeddings, one per text, or an empty list on failure.
         """
         if not texts:
             return []
@@ -62,25 +118,130 @@ class EmbeddingService:
             return []
         
         try:
-            if self.client_type == "openai":
-                response = self.client.embeddings.create(
-                    model=self.model_name,
-                    input=texts
-                )
-                return [item.embedding for item in response.data]
-            elif self.client_type == "cohere":
-                response = self.client.embed(
-                    texts=texts,
-                    model=self.model_name
-                )
-                return response.embeddings
-            else:
-                logger.error(f"Unsupported client type: {self.client_type}")
-                return []
+            hashes = [self.content_hash(text) for text in texts]
+            known: Dict[str, List[float]] = {}
+            if reuse_stored:
+                try:
+                    known = await self.document_repository.get_embeddings_by_content_hash(
+                        list(set(hashes)), self.model_name
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not look up stored embeddings, embedding all texts: {str(e)}")
+            
+            # One provider call per distinct unknown text
+            pending: Dict[str, str] = {}
+            for content_hash, text in zip(hashes, texts):
+                if content_hash not in known and content_hash not in pending:
+                    pending[content_hash] = text
+            
+            pending_hashes = list(pending)
+            batch_embeddings = await self._gather_batches(
+                [list(pending.values())[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+            )
+            known.update(zip(pending_hashes, (e for batch in batch_embeddings for e in batch)))
+            
+            logger.info(
+                f"Embedded {len(pending)} of {len(texts)} texts with {self.model_name} "
+                f"({len(texts) - len(pending)} reused)"
+            )
+            return [known[content_hash] for content_hash in hashes]
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             return []
 
+    async def stream_embeddings(
+        self,
+        text_batches: AsyncIterable[List[str]]
+    ) -> AsyncIterator[List[List[float]]]:
+        """Embed batches of texts as they are produced.
+        
+        Up to max_concurrency batches are embedded at the same time while the
+        producer keeps going; results are yielded in input order. Stored
+        embeddings are reused as in generate_embeddings.
+        
+        Args:
+            text_batches: Batches of texts, e.g. chunks of a document being read.
+            
+        Yields:
+            The embeddings of each batch, in order.
+            
+        Raises:
+            RuntimeError: If a batch could not be embedded.
+        """
+        in_flight: Deque[asyncio.Task] = deque()
+        try:
+            async for texts in text_batches:
+                in_flight.append(asyncio.create_task(self.generate_embeddings(texts)))
+                while len(in_flight) >= self.max_concurrency or (in_flight and in_flight[0].done()):
+                    yield self._batch_result(await in_flight.popleft())
+            while in_flight:
+                yield self._batch_result(await in_flight.popleft())
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    @staticmethod
+    def _batch_result(embeddings: List[List[float]]) -> List[List[float]]:
+        if not embeddings:
+            raise RuntimeError("Failed to generate embeddings for batch")
+        return embeddings
+
+    async def _gather_batches(self, batches: List[List[str]]) -> List[List[List[float]]]:
+        """Embed batches concurrently, at most max_concurrency at a time."""
+        async def run(batch: List[str]) -> List[List[float]]:
+            async with self._request_slots:
+                return await self._embed_batch_with_retry(batch)
+        
+        return await asyncio.gather(*(run(batch) for batch in batches))
+
+    async def _embed_batch_with_retry(self, texts: List[str]) -> List[List[float]]:
+        """Embed one provider-sized batch, backing off on rate limits and server errors."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.to_thread(self._embed_batch, texts)
+            except Exception as e:
+                status_code = self._error_status_code(e)
+                retryable = status_code == 429 or (status_code is not None and status_code >= 500)
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = self._retry_after(e) or min(self.max_backoff, 2 ** attempt) * (0.5 + random.random())
+                logger.warning(
+                    f"Embedding batch of {len(texts)} failed with status {status_code} "
+                    f"(attempt {attempt + 1}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Blocking provider call for one batch; runs in a worker thread."""
+        if self.client_type == "openai":
+            response = self.client.embeddings.create(
+                model=self.model_name,
+                input=texts
+            )
+            return [item.embedding for item in response.data]
+        elif self.client_type == "cohere":
+            response = self.client.embed(
+                texts=texts,
+                model=self.model_name
+            )
+            return response.embeddings
+        raise ValueError(f"Unsupported client type: {self.client_type}")
+
+    @staticmethod
+    def _error_status_code(error: Exception) -> Optional[int]:
+        status_code = getattr(error, "status_code", None)
+        if status_code is None:
+            status_code = getattr(getattr(error, "response", None), "status_code", None)
+        return status_code if isinstance(status_code, int) else None
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        try:
+            return float(headers.get("retry-after")) if headers and headers.get("retry-after") else None
+        except (TypeError, ValueError):
+            return None
+
     async def store_embeddings(
         self,
         chunk_ids: List[str],
@@ -100,24 +261,8 @@ class EmbeddingService:
             return False
         
         try:
-            from app.core.database import get_db_client
-            client = await get_db_client()
-            
-            # Store embeddings in batches
-            batch_size = 100
-            for i in range(0, len(chunk_ids), batch_size):
-                batch_chunk_ids = chunk_ids[i:i+batch_size]
-                batch_embeddings = embeddings[i:i+batch_size]
-                
-                # Update chunks with embeddings
-                for j, (chunk_id, embedding) in enumerate(zip(batch_chunk_ids, batch_embeddings)):
-                    await client.rpc(
-                        'update_chunk_embedding',
-                        {
-                            'p_chunk_id': chunk_id,
-                            'p_embedding': embedding
-                        }
-                    ).execute()
+            # One RPC per batch instead of one per chunk
+            await self.document_repository.update_chunk_embeddings(chunk_ids, embeddings)
             
             return True
         except Exception as e:
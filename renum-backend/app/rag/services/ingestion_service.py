@@ -7,8 +7,11 @@ This module provides functionality for ingesting documents from various sources.
 import uuid
 import json
 import asyncio
+import codecs
+import csv
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple, Union
+from typing import AsyncIterator, BinaryIO, Deque, Dict, Any, Iterator, List, Optional, Tuple, Union
 import httpx
 import io
 import tempfile
@@ -16,6 +19,8 @@ import os
 
 from app.core.logger import logger
 from app.core.database import get_db_client
+from app.core.config import get_settings
+from app.rag.services.cache_service import get_retrieval_cache
 from app.rag.services.chunking_service import ChunkingService
 from app.rag.services.embedding_service import EmbeddingService
 from app.rag.repositories.processing_job_repository import ProcessingJobRepository
@@ -56,7 +61,7 @@ class IngestionCoordinator:
         self,
         source_type: str,
         collection_id: str,
-        content: Union[bytes, str],
+        content: Union[bytes, str, BinaryIO],
         metadata: Dict[str, Any]
     ) -> str:
         """Process a document from a source.
@@ -64,7 +69,8 @@ class IngestionCoordinator:
         Args:
             source_type: Type of source (file, url, text).
             collection_id: ID of the collection to add the document to.
-            content: Content of the document.
+            content: Content of the document. Files may be passed as an open
+                binary file, which is read incrementally and closed when done.
             metadata: Metadata for the document.
             
         Returns:
@@ -115,6 +121,7 @@ class IngestionCoordinator:
         asyncio.create_task(self._process_document_async(
             job_id=job_id,
             document_id=document_id,
+            collection_id=collection_id,
             source_type=source_type,
             content=content,
             metadata=metadata
@@ -126,8 +133,9 @@ class IngestionCoordinator:
         self,
         job_id: str,
         document_id: str,
+        collection_id: str,
         source_type: str,
-        content: Union[bytes, str],
+        content: Union[bytes, str, BinaryIO],
         metadata: Dict[str, Any]
     ) -> None:
         """Process a document asynchronously.
@@ -135,6 +143,7 @@ class IngestionCoordinator:
         Args:
             job_id: ID of the processing job.
             document_id: ID of the document.
+            collection_id: ID of the collection the document belongs to.
             source_type: Type of source (file, url, text).
             content: Content of the document.
             metadata: Metadata for the document.
@@ -147,9 +156,9 @@ class IngestionCoordinator:
                 progress=0.1
             )
             
-            # Extract text from source
+            # Open the source as a stream of text segments (pages, row blocks, ...)
             processor = self.processors[source_type]
-            text, extracted_metadata = await processor.extract_text(content, metadata)
+            segments, extracted_metadata = await processor.iter_text(content, metadata)
             
             # Update job progress
             await self.processing_job_repository.update_status(
@@ -158,52 +167,77 @@ class IngestionCoordinator:
                 progress=0.3
             )
             
-            # Chunk text
+            # Extraction -> chunking -> embedding -> storage, one batch of chunks at a time,
+            # so memory stays bounded by the batches in flight rather than the document size
             chunk_size = metadata.get("chunk_size", 1000)
             chunk_overlap = metadata.get("chunk_overlap", 200)
             chunking_strategy = metadata.get("chunking_strategy", "fixed_size")
-            
-            chunks = self.chunking_service.chunk_text(
-                text=text,
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                chunking_strategy=chunking_strategy,
-                metadata=extracted_metadata
+            batch_size = metadata.get("write_batch_size") or get_settings().RAG_CHUNK_WRITE_BATCH_SIZE
+            
+            # Pages or paragraphs, when the extractor knows how many there are
+            segment_total = extracted_metadata.get("page_count") or extracted_metadata.get("paragraph_count")
+            segments_read = 0
+            
+            def counted(source: Iterator[str]) -> Iterator[str]:
+                nonlocal segments_read
+                for segment in source:
+                    segments_read += 1
+                    yield segment
+            
+            chunk_batches = self._iter_batches(
+                self.chunking_service.iter_chunks(
+                    counted(segments),
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                    chunking_strategy=chunking_strategy,
+                    metadata=extracted_metadata
+                ),
+                batch_size
             )
-            
-            # Update job progress
-            await self.processing_job_repository.update_status(
-                job_id=job_id,
-                status="processing",
-                progress=0.5
-            )
-            
-            # Generate embeddings
-            texts = [chunk["content"] for chunk in chunks]
-            embeddings = await self.embedding_service.generate_embeddings(texts)
-            
-            # Update job progress
-            await self.processing_job_repository.update_status(
-                job_id=job_id,
-                status="processing",
-                progress=0.7
-            )
-            
-            # Store chunks and embeddings
-            chunk_ids = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                chunk_id = str(uuid.uuid4())
-                chunk_ids.append(chunk_id)
+            pending: Deque[List[Dict[str, Any]]] = deque()
+            
+            async def text_batches() -> AsyncIterator[List[str]]:
+                while True:
+                    # Extraction and chunking are CPU-bound; keep them off the event loop
+                    batch = await asyncio.to_thread(next, chunk_batches, None)
+                    if batch is None:
+                        return
+                    pending.append(batch)
+                    yield [chunk["content"] for chunk in batch]
+            
+            chunk_count = 0
+            async for embeddings in self.embedding_service.stream_embeddings(text_batches()):
+                batch = pending.popleft()
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"Failed to generate embeddings for {len(batch)} chunks")
                 
-                # Store chunk in database
-                await self.document_repository.create_chunk(
-                    chunk_id=chunk_id,
-                    document_id=document_id,
-                    content=chunk["content"],
-                    chunk_index=chunk["chunk_index"],
-                    metadata=chunk["metadata"],
-                    embedding=embedding
+                await self.document_repository.create_chunks(
+                    [
+                        {
+                            "id": str(uuid.uuid4()),
+                            "document_id": document_id,
+                            "content": chunk["content"],
+                            "chunk_index": chunk["chunk_index"],
+                            "metadata": chunk["metadata"],
+                            "embedding": embedding,
+                            "content_hash": self.embedding_service.content_hash(chunk["content"]),
+                            "embedding_model": self.embedding_service.model_name
+                        }
+                        for chunk, embedding in zip(batch, embeddings)
+                    ],
+                    batch_size=batch_size
                 )
+                chunk_count += len(batch)
+                
+                # Update job progress
+                if segment_total:
+                    await self.processing_job_repository.update_status(
+                        job_id=job_id,
+                        status="processing",
+                        progress=0.3 + 0.6 * min(1.0, segments_read / segment_total)
+                    )
+            
+            logger.info(f"Stored {chunk_count} chunks for document {document_id}")
             
             # Update job progress
             await self.processing_job_repository.update_status(
@@ -241,6 +275,25 @@ class IngestionCoordinator:
                 progress=0.0,
                 error_message=str(e)
             )
+        finally:
+            # Chunks may have been stored even if processing failed later on
+            await get_retrieval_cache().invalidate_collection(collection_id)
+            
+            # Uploads may arrive as spooled temporary files
+            if hasattr(content, "close"):
+                content.close()
+
+    @staticmethod
+    def _iter_batches(items: Iterator[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Group an iterator into lists of up to batch_size items."""
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
     async def get_processing_status(self, job_id: str) -> Dict[str, Any]:
         """Get the status of a processing job.
@@ -255,11 +308,19 @@ class IngestionCoordinator:
 
 
 class FileProcessor:
-    """Processor for file sources."""
+    """Processor for file sources.
+    
+    iter_text yields the text of a file in segments (a PDF page, a DOCX
+    paragraph, a block of CSV rows or of decoded text) so that large files
+    never have to exist as one string. extract_text joins those segments.
+    """
+
+    # Approximate size of the text segments yielded for unstructured input
+    SEGMENT_SIZE = 64 * 1024
 
     async def extract_text(
         self,
-        content: bytes,
+        content: Union[bytes, BinaryIO],
         metadata: Dict[str, Any]
     ) -> Tuple[str, Dict[str, Any]]:
         """Extract text from a file.
@@ -274,234 +335,329 @@ class FileProcessor:
         Raises:
             ValueError: If the file type is not supported.
         """
+        segments, extracted_metadata = await self.iter_text(content, metadata)
+        return "".join(segments).strip(), extracted_metadata
+
+    async def iter_text(
+        self,
+        content: Union[bytes, BinaryIO],
+        metadata: Dict[str, Any]
+    ) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Extract text from a file as a stream of segments.
+        
+        Args:
+            content: Content of the file, as bytes or a seekable binary file.
+            metadata: Metadata for the file.
+            
+        Returns:
+            Tuple of an iterator over the text segments and the extracted metadata.
+            
+        Raises:
+            ValueError: If the file type is not supported.
+        """
+        stream = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
         file_type = metadata.get("file_type", "")
         
+        # Opening a file parses it (PDF, DOCX, JSON) or reads it once to count
+        # lines/rows (TXT, CSV), so it runs off the event loop
         if "pdf" in file_type.lower():
-            return await self._extract_text_from_pdf(content, metadata)
+            return await asyncio.to_thread(self._iter_text_from_pdf, stream, metadata)
         elif "word" in file_type.lower() or "docx" in file_type.lower():
-            return await self._extract_text_from_docx(content, metadata)
+            return await asyncio.to_thread(self._iter_text_from_docx, stream, metadata)
         elif "text" in file_type.lower() or "txt" in file_type.lower():
-            return await self._extract_text_from_txt(content, metadata)
+            return await asyncio.to_thread(self._iter_text_from_txt, stream, metadata)
         elif "csv" in file_type.lower():
-            return await self._extract_text_from_csv(content, metadata)
+            return await asyncio.to_thread(self._iter_text_from_csv, stream, metadata)
         elif "json" in file_type.lower():
-            return await self._extract_text_from_json(content, metadata)
+            return await asyncio.to_thread(self._iter_text_from_json, stream, metadata)
         elif "html" in file_type.lower() or "htm" in file_type.lower():
-            return await self._extract_text_from_html(content, metadata)
+            text, extracted_metadata = await self._extract_text_from_html(stream.read(), metadata)
+            return iter([text]), extracted_metadata
         else:
             raise ValueError(f"Unsupported file type: {file_type}")
 
-    async def _extract_text_from_pdf(
+    def _iter_decoded(self, stream: BinaryIO, errors: str = "ignore") -> Iterator[str]:
+        """Decode a binary stream as UTF-8, SEGMENT_SIZE bytes at a time.
+        
+        Args:
+            stream: Binary stream to decode.
+            errors: Error handling scheme of the decoder.
+            
+        Returns:
+            Iterator of decoded text segments.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors=errors)
+        while True:
+            block = stream.read(self.SEGMENT_SIZE)
+            if not block:
+                break
+            text = decoder.decode(block)
+            if text:
+                yield text
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text
+
+    def _fallback(self, stream: BinaryIO, metadata: Dict[str, Any]) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Treat the file as plain text when it cannot be parsed."""
+        stream.seek(0)
+        return self._iter_decoded(stream), metadata
+
+    def _iter_text_from_pdf(
         self,
-        content: bytes,
+        stream: BinaryIO,
         metadata: Dict[str, Any]
-    ) -> Tuple[str, Dict[str, Any]]:
-        """Extract text from a PDF file.
+    ) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Extract text from a PDF file, page by page.
         
         Args:
-            content: Content of the PDF file.
+            stream: Content of the PDF file.
             metadata: Metadata for the PDF file.
             
         Returns:
-            Tuple of extracted text and metadata.
+            Tuple of an iterator over the page texts and the extracted metadata.
         """
         try:
             import pypdf
             
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(content)
-                temp_file_path = temp_file.name
+            pdf_reader = pypdf.PdfReader(stream)
             
-            try:
-                # Extract text from PDF
-                pdf_reader = pypdf.PdfReader(temp_file_path)
-                
-                # Extract metadata
-                pdf_metadata = pdf_reader.metadata
-                extracted_metadata = {
-                    "title": pdf_metadata.get("/Title", metadata.get("name", "")),
-                    "author": pdf_metadata.get("/Author", ""),
-                    "subject": pdf_metadata.get("/Subject", ""),
-                    "creator": pdf_metadata.get("/Creator", ""),
-                    "producer": pdf_metadata.get("/Producer", ""),
-                    "page_count": len(pdf_reader.pages)
-                }
-                
-                # Extract text
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n\n"
-                
-                return text.strip(), extracted_metadata
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
-                
+            # Extract metadata
+            pdf_metadata = pdf_reader.metadata
+            extracted_metadata = {
+                "title": pdf_metadata.get("/Title", metadata.get("name", "")),
+                "author": pdf_metadata.get("/Author", ""),
+                "subject": pdf_metadata.get("/Subject", ""),
+                "creator": pdf_metadata.get("/Creator", ""),
+                "producer": pdf_metadata.get("/Producer", ""),
+                "page_count": len(pdf_reader.pages)
+            }
         except ImportError:
             logger.warning("pypdf not installed. Using fallback method for PDF extraction.")
-            return content.decode("utf-8", errors="ignore"), metadata
+            return self._fallback(stream, metadata)
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {str(e)}")
-            return content.decode("utf-8", errors="ignore"), metadata
+            return self._fallback(stream, metadata)
+        
+        def pages() -> Iterator[str]:
+            for page in pdf_reader.pages:
+                yield (page.extract_text() or "") + "\n\n"
+        
+        return pages(), extracted_metadata
 
-    async def _extract_text_from_docx(
+    def _iter_text_from_docx(
         self,
-        content: bytes,
+        stream: BinaryIO,
         metadata: Dict[str, Any]
-    ) -> Tuple[str, Dict[str, Any]]:
-        """Extract text from a DOCX file.
+    ) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Extract text from a DOCX file, paragraph by paragraph.
         
         Args:
-            content: Content of the DOCX file.
+            stream: Content of the DOCX file.
             metadata: Metadata for the DOCX file.
             
         Returns:
-            Tuple of extracted text and metadata.
+            Tuple of an iterator over the paragraph texts and the extracted metadata.
         """
         try:
             import docx
             
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_file:
-                temp_file.write(content)
-                temp_file_path = temp_file.name
+            doc = docx.Document(stream)
             
-            try:
-                # Extract text from DOCX
-                doc = docx.Document(temp_file_path)
-                
-                # Extract metadata
-                core_properties = doc.core_properties
-                extracted_metadata = {
-                    "title": core_properties.title or metadata.get("name", ""),
-                    "author": core_properties.author or "",
-                    "subject": core_properties.subject or "",
-                    "paragraph_count": len(doc.paragraphs)
-                }
-                
-                # Extract text
-                text = ""
-                for paragraph in doc.paragraphs:
-                    text += paragraph.text + "\n\n"
-                
-                return text.strip(), extracted_metadata
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
-                
+            # Extract metadata
+            core_properties = doc.core_properties
+            extracted_metadata = {
+                "title": core_properties.title or metadata.get("name", ""),
+                "author": core_properties.author or "",
+                "subject": core_properties.subject or "",
+                "paragraph_count": len(doc.paragraphs)
+            }
         except ImportError:
             logger.warning("python-docx not installed. Using fallback method for DOCX extraction.")
-            return content.decode("utf-8", errors="ignore"), metadata
+            return self._fallback(stream, metadata)
         except Exception as e:
             logger.error(f"Error extracting text from DOCX: {str(e)}")
-            return content.decode("utf-8", errors="ignore"), metadata
+            return self._fallback(stream, metadata)
+        
+        def paragraphs() -> Iterator[str]:
+            for paragraph in doc.paragraphs:
+                yield paragraph.text + "\n\n"
+        
+        return paragraphs(), extracted_metadata
 
-    async def _extract_text_from_txt(
+    def _iter_text_from_txt(
         self,
-        content: bytes,
+        stream: BinaryIO,
         metadata: Dict[str, Any]
-    ) -> Tuple[str, Dict[str, Any]]:
-        """Extract text from a TXT file.
+    ) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Extract text from a TXT file, in blocks.
         
         Args:
-            content: Content of the TXT file.
+            stream: Content of the TXT file.
             metadata: Metadata for the TXT file.
             
         Returns:
-            Tuple of extracted text and metadata.
+            Tuple of an iterator over the text blocks and the extracted metadata.
         """
         try:
-            text = content.decode("utf-8")
+            # Count lines in a first pass; this also validates the encoding
+            line_count = 1
+            char_count = 0
+            for text in self._iter_decoded(stream, errors="strict"):
+                line_count += text.count("\n")
+                char_count += len(text)
+            stream.seek(0)
             
             # Extract metadata
             extracted_metadata = {
                 "title": metadata.get("name", ""),
-                "line_count": text.count("\n") + 1,
-                "char_count": len(text)
+                "line_count": line_count,
+                "char_count": char_count
             }
             
-            return text, extracted_metadata
+            return self._iter_decoded(stream), extracted_metadata
         except Exception as e:
             logger.error(f"Error extracting text from TXT: {str(e)}")
-            return content.decode("utf-8", errors="ignore"), metadata
+            return self._fallback(stream, metadata)
 
-    async def _extract_text_from_csv(
+    def _iter_text_from_csv(
         self,
-        content: bytes,
+        stream: BinaryIO,
         metadata: Dict[str, Any]
-    ) -> Tuple[str, Dict[str, Any]]:
-        """Extract text from a CSV file.
+    ) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Extract text from a CSV file, in blocks of rows.
         
         Args:
-            content: Content of the CSV file.
+            stream: Content of the CSV file.
             metadata: Metadata for the CSV file.
             
         Returns:
-            Tuple of extracted text and metadata.
+            Tuple of an iterator over the row blocks and the extracted metadata.
         """
         try:
-            import csv
-            import io
-            
-            # Decode content
-            text_io = io.StringIO(content.decode("utf-8"))
-            
-            # Read CSV
-            reader = csv.reader(text_io)
-            rows = list(reader)
+            # Count rows in a first pass; this also validates the encoding
+            row_count = 0
+            column_count = 0
+            for row in self._iter_csv_rows(stream):
+                if row_count == 0:
+                    column_count = len(row)
+                row_count += 1
+            stream.seek(0)
             
             # Extract metadata
             extracted_metadata = {
                 "title": metadata.get("name", ""),
-                "row_count": len(rows),
-                "column_count": len(rows[0]) if rows else 0
+                "row_count": row_count,
+                "column_count": column_count
             }
-            
-            # Convert to text
-            text = ""
-            for row in rows:
-                text += " | ".join(row) + "\n"
-            
-            return text, extracted_metadata
         except Exception as e:
             logger.error(f"Error extracting text from CSV: {str(e)}")
-            return content.decode("utf-8", errors="ignore"), metadata
+            return self._fallback(stream, metadata)
+        
+        def row_blocks() -> Iterator[str]:
+            lines = []
+            size = 0
+            for row in self._iter_csv_rows(stream):
+                line = " | ".join(row) + "\n"
+                lines.append(line)
+                size += len(line)
+                if size >= self.SEGMENT_SIZE:
+                    yield "".join(lines)
+                    lines = []
+                    size = 0
+            if lines:
+                yield "".join(lines)
+        
+        return row_blocks(), extracted_metadata
 
-    async def _extract_text_from_json(
+    @staticmethod
+    def _iter_csv_rows(stream: BinaryIO) -> Iterator[List[str]]:
+        """Read CSV rows from a binary stream without decoding it all at once."""
+        text_io = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        try:
+            yield from csv.reader(text_io)
+        finally:
+            # Leave the underlying stream open for the next pass
+            text_io.detach()
+
+    def _iter_text_from_json(
         self,
-        content: bytes,
+        stream: BinaryIO,
         metadata: Dict[str, Any]
-    ) -> Tuple[str, Dict[str, Any]]:
+    ) -> Tuple[Iterator[str], Dict[str, Any]]:
         """Extract text from a JSON file.
         
+        The parsed document has to be held in memory, but its pretty-printed
+        text is produced incrementally.
+        
         Args:
-            content: Content of the JSON file.
+            stream: Content of the JSON file.
             metadata: Metadata for the JSON file.
             
         Returns:
-            Tuple of extracted text and metadata.
+            Tuple of an iterator over the text segments and the extracted metadata.
         """
         try:
-            # Decode content
-            json_str = content.decode("utf-8")
-            
             # Parse JSON
-            json_data = json.loads(json_str)
+            json_data = json.load(stream)
             
             # Extract metadata
             extracted_metadata = {
                 "title": metadata.get("name", ""),
                 "json_type": type(json_data).__name__
             }
-            
-            # Convert to text
-            text = json.dumps(json_data, indent=2)
-            
-            return text, extracted_metadata
         except Exception as e:
             logger.error(f"Error extracting text from JSON: {str(e)}")
-            return content.decode("utf-8", errors="ignore"), metadata
+            return self._fallback(stream, metadata)
+        
+        def encoded() -> Iterator[str]:
+            parts = []
+            size = 0
+            for part in json.JSONEncoder(indent=2).iterencode(json_data):
+                parts.append(part)
+                size += len(part)
+                if size >= self.SEGMENT_SIZE:
+                    yield "".join(parts)
+                    parts = []
+                    size = 0
+            if parts:
+                yield "".join(parts)
+        
+        return encoded(), extracted_metadata
+
+    async def _extract_text_from_pdf(
+        self,
+        content: bytes,
+        metadata: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Extract text from a PDF file.
+        
+        Args:
+            content: Content of the PDF file.
+            metadata: Metadata for the PDF file.
+            
+        Returns:
+            Tuple of extracted text and metadata.
+        """
+        segments, extracted_metadata = self._iter_text_from_pdf(io.BytesIO(content), metadata)
+        return "".join(segments).strip(), extracted_metadata
+
+    async def _extract_text_from_json(
+        self,
+        content: bytes,
+        metadata: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Extract text from a JSON file.
+        
+        Args:
+            content: Content of the JSON file.
+            metadata: Metadata for the JSON file.
+            
+        Returns:
+            Tuple of extracted text and metadata.
+        """
+        segments, extracted_metadata = self._iter_text_from_json(io.BytesIO(content), metadata)
+        return "".join(segments), extracted_metadata
 
     async def _extract_text_from_html(
         self,
@@ -581,6 +737,25 @@ class URLProcessor:
             logger.error(f"Error extracting text from URL: {str(e)}")
             return f"Failed to extract text from URL: {url}", metadata
 
+    async def iter_text(
+        self,
+        url: str,
+        metadata: Dict[str, Any]
+    ) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Extract text from a URL as a stream of segments.
+        
+        Fetched pages are returned whole, so this is a single segment.
+        
+        Args:
+            url: URL to extract text from.
+            metadata: Metadata for the URL.
+            
+        Returns:
+            Tuple of an iterator over the text segments and the extracted metadata.
+        """
+        text, extracted_metadata = await self.extract_text(url, metadata)
+        return iter([text]), extracted_metadata
+
     async def _extract_text_with_firecrawl(
         self,
         url: str,
@@ -728,4 +903,21 @@ class TextProcessor:
             "char_count": len(text)
         }
         
-        return text, extracted_metadata
\ No newline at end of file
+        return text, extracted_metadata
+
+    async def iter_text(
+        self,
+        text: str,
+        metadata: Dict[str, Any]
+    ) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Extract text from raw text as a stream of segments.
+        
+        Args:
+            text: Raw text.
+            metadata: Metadata for the text.
+            
+        Returns:
+            Tuple of an iterator over the text segments and the extracted metadata.
+        """
+        text, extracted_metadata = await self.extract_text(text, metadata)
+        return iter([text]), extracted_metadata
@@ -12,6 +12,7 @@ import redis.asyncio as redis
 
 from app.core.logger import logger
 from app.core.database import get_db_client
+from app.rag.services.cache_service import RetrievalCache, get_retrieval_cache
 from app.rag.services.embedding_service import EmbeddingService
 
 
@@ -22,18 +23,23 @@ class RetrievalService:
         self,
         embedding_service: EmbeddingService = None,
         redis_client: redis.Redis = None,
-        cache_ttl: int = 600  # 10 minutes
+        cache_ttl: int = 600,  # 10 minutes
+        cache: RetrievalCache = None
     ):
         """Initialize the retrieval service.
         
         Args:
             embedding_service: Embedding service for generating query embeddings.
-            redis_client: Redis client for caching.
-            cache_ttl: Time-to-live for cache entries in seconds.
+            redis_client: Redis client for caching. Without one, the cache
+                shared by the process is used.
+            cache_ttl: Time-to-live for cached results in seconds, when a
+                Redis client is given.
+            cache: Query-embedding and result cache to use instead.
         """
         self.embedding_service = embedding_service or EmbeddingService()
-        self.redis_client = redis_client
-        self.cache_ttl = cache_ttl
+        if cache is None:
+            cache = RetrievalCache(redis_client, result_ttl=cache_ttl) if redis_client else get_retrieval_cache()
+        self.cache = cache
 
     async def retrieve_relevant_chunks(
         self,
@@ -58,16 +64,19 @@ class RetrievalService:
         if not query:
             return []
         
+        model_name = self.embedding_service.model_name
+        
         # Check cache if enabled
-        if use_cache and self.redis_client:
-            cache_key = self._get_cache_key(query, collection_ids, top_k, filters)
-            cached_result = await self._get_from_cache(cache_key)
+        cache_key = None
+        if use_cache:
+            cache_key = await self.cache.get_result_key(model_name, query, collection_ids, top_k, filters)
+            cached_result = await self.cache.get_results(cache_key)
             if cached_result:
                 logger.debug(f"Cache hit for query: {query}")
                 return cached_result
         
-        # Generate embedding for the query
-        query_embedding = await self.embedding_service.generate_embeddings([query])
+        # Generate embedding for the query, unless it was asked before
+        query_embedding = await self._get_query_embedding(query, use_cache)
         if not query_embedding:
             logger.error("Failed to generate embedding for query")
             return []
@@ -87,7 +96,7 @@ class RetrievalService:
             result = await client.rpc(
                 'search_embeddings',
                 {
-                    'p_query_embedding': query_embedding[0],
+                    'p_query_embedding': query_embedding,
                     'p_top_k': top_k,
                     **filter_params
                 }
@@ -118,14 +127,47 @@ class RetrievalService:
                 chunks.append(chunk)
             
             # Cache the result if enabled
-            if use_cache and self.redis_client:
-                await self._store_in_cache(cache_key, chunks)
+            if use_cache:
+                await self.cache.set_results(cache_key, chunks)
             
             return chunks
         except Exception as e:
             logger.error(f"Error retrieving relevant chunks: {str(e)}")
             return []
 
+    async def _get_query_embedding(self, query: str, use_cache: bool = True) -> Optional[List[float]]:
+        """Get the embedding of a query, from the cache when possible.
+        
+        Args:
+            query: Query text.
+            use_cache: Whether to use cache.
+            
+        Returns:
+            Embedding of the query or None if it could not be generated.
+        """
+        model_name = self.embedding_service.model_name
+        if use_cache:
+            embedding = await self.cache.get_query_embedding(model_name, query)
+            if embedding is not None:
+                return embedding
+        
+        # Queries rarely match stored chunk content, so skip that lookup
+        embeddings = await self.embedding_service.generate_embeddings([query], reuse_stored=False)
+        if not embeddings:
+            return None
+        
+        if use_cache:
+            await self.cache.set_query_embedding(model_name, query, embeddings[0])
+        return embeddings[0]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get the hit, miss and eviction counters of the retrieval caches.
+        
+        Returns:
+            Cache counters.
+        """
+        return self.cache.get_stats()
+
     async def track_chunk_usage(
         self,
         chunk_ids: List[str],
@@ -163,83 +205,3 @@ class RetrievalService:
         except Exception as e:
             logger.error(f"Error tracking chunk usage: {str(e)}")
             return False
-
-    async def _get_from_cache(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
-        """Get result from cache.
-        
-        Args:
-            cache_key: Cache key.
-            
-        Returns:
-            Cached result or None if not found.
-        """
-        if not self.redis_client:
-            return None
-        
-        try:
-            cached_data = await self.redis_client.get(cache_key)
-            if cached_data:
-                return json.loads(cached_data)
-            return None
-        except Exception as e:
-            logger.error(f"Error getting from cache: {str(e)}")
-            return None
-
-    async def _store_in_cache(self, cache_key: str, data: List[Dict[str, Any]]) -> bool:
-        """Store result in cache.
-        
-        Args:
-            cache_key: Cache key.
-            data: Data to store.
-            
-        Returns:
-            True if successful, False otherwise.
-        """
-        if not self.redis_client:
-            return False
-        
-        try:
-            await self.redis_client.setex(
-                cache_key,
-                self.cache_ttl,
-                json.dumps(data)
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Error storing in cache: {str(e)}")
-            return False
-
-    def _get_cache_key(
-        self,
-        query: Optional[str],
-        collection_ids: Optional[List[str]],
-        top_k: int,
-        filters: Optional[Dict[str, Any]]
-    ) -> str:
-        """Generate a cache key.
-        
-        Args:
-            query: Query text.
-            collection_ids: List of collection IDs.
-            top_k: Number of chunks to retrieve.
-            filters: Additional filters.
-            
-        Returns:
-            Cache key.
-        """
-        key_parts = ["rag"]
-        
-        if query:
-            key_parts.append(f"q:{query}")
-        
-        if collection_ids:
-            key_parts.append(f"c:{','.join(sorted(collection_ids))}")
-        
-        key_parts.append(f"k:{top_k}")
-        
-        if filters:
-            # Sort filter keys for consistent cache keys
-            sorted_filters = json.dumps(filters, sort_keys=True)
-            key_parts.append(f"f:{sorted_filters}")
-        
-        return ":".join(key_parts)
\ No newline at end of file
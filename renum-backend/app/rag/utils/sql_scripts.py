@@ -351,6 +351,32 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Embedding column used by search_embeddings and the bulk chunk writes
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS embedding VECTOR;
+
+-- Normalized content hash and model of the embedding, used to reuse embeddings on re-ingestion
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+CREATE INDEX IF NOT EXISTS idx_document_chunks_model_content_hash
+    ON document_chunks (embedding_model, content_hash);
+
+-- Function to set the embeddings of many chunks in one call
+-- p_embeddings: [{"chunk_id": "...", "embedding": [...]}, ...]
+CREATE OR REPLACE FUNCTION update_chunk_embeddings(p_embeddings JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER;
+BEGIN
+    UPDATE document_chunks dc
+    SET embedding = (e->>'embedding')::VECTOR
+    FROM jsonb_array_elements(p_embeddings) AS e
+    WHERE dc.id = (e->>'chunk_id')::UUID;
+    
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Function to search embeddings
 CREATE OR REPLACE FUNCTION search_embeddings(
     p_query_embedding VECTOR,
@@ -265,6 +265,7 @@ class TeamExecutionRepository:
             # Adiciona timestamps conforme o status
             if status == ExecutionStatus.RUNNING:
                 update_data["started_at"] = datetime.now().isoformat()
+                update_data["heartbeat_at"] = update_data["started_at"]
             elif status in [ExecutionStatus.COMPLETED, ExecutionStatus.FAILED, ExecutionStatus.CANCELLED]:
                 update_data["completed_at"] = datetime.now().isoformat()
             
@@ -284,6 +285,78 @@ class TeamExecutionRepository:
             logger.error(f"Failed to update execution status {execution_id}: {str(e)}")
             return False
     
+    async def transition_execution_status(
+        self,
+        execution_id: UUID,
+        user_id: UUID,
+        from_statuses: List[ExecutionStatus],
+        status: ExecutionStatus,
+        stale_before: Optional[datetime] = None
+    ) -> bool:
+        """
+        Atualiza o status de uma execução somente se ele for um dos status esperados.
+        
+        A verificação e a atualização são feitas em um único UPDATE condicional,
+        de modo que, entre vários workers ou instâncias, apenas um consegue
+        fazer a transição.
+        
+        Args:
+            execution_id: ID da execução
+            user_id: ID do usuário
+            from_statuses: Status em que a execução deve estar
+            status: Novo status
+            stale_before: Se informado, também aceita uma execução "running" cujo
+                último heartbeat é anterior a este instante (worker encerrado)
+        
+        Returns:
+            True se a execução estava em um dos status esperados e foi atualizada
+        """
+        try:
+            query = self.db.table('renum_team_executions') \
+                .update({"status": status.value}) \
+                .eq('execution_id', str(execution_id)) \
+                .eq('user_id', str(user_id))
+            
+            statuses = ",".join(s.value for s in from_statuses)
+            if stale_before is not None:
+                query = query.or_(
+                    f"status.in.({statuses}),"
+                    f"and(status.eq.{ExecutionStatus.RUNNING.value},heartbeat_at.lt.{stale_before.isoformat()})"
+                )
+            else:
+                query = query.in_('status', [s.value for s in from_statuses])
+            
+            result = await query.execute()
+            
+            return bool(result.data)
+        
+        except Exception as e:
+            logger.error(f"Failed to transition execution status {execution_id}: {str(e)}")
+            return False
+    
+    async def touch_execution(self, execution_id: UUID) -> bool:
+        """
+        Renova o heartbeat de uma execução em andamento.
+        
+        Args:
+            execution_id: ID da execução
+        
+        Returns:
+            True se a atualização foi bem-sucedida
+        """
+        try:
+            await self.db.table('renum_team_executions') \
+                .update({"heartbeat_at": datetime.now().isoformat()}) \
+                .eq('execution_id', str(execution_id)) \
+                .eq('status', ExecutionStatus.RUNNING.value) \
+                .execute()
+            
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to renew heartbeat of execution {execution_id}: {str(e)}")
+            return False
+    
     async def update_execution_plan(
         self, 
         execution_id: UUID, 
@@ -502,14 +575,16 @@ class TeamExecutionRepository:
                 "step_order": step_order,
                 "status": ExecutionStatus.PENDING.value,
                 "input_data": {},
+                "output_data": None,
+                "error_message": None,
                 "context_snapshot": {},
                 "individual_cost_metrics": {},
                 "individual_usage_metrics": {},
                 "api_keys_snapshot": {}
             }
             
-            # Insere no banco de dados
-            await self.db.table('renum_team_agent_executions').insert(agent_execution).execute()
+            # Insere no banco de dados, reiniciando o registro de um passo repetido ao retomar a execução
+            await self.db.table('renum_team_agent_executions').upsert(agent_execution).execute()
             
             return True
             
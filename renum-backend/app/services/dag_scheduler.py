@@ -0,0 +1,345 @@
+"""
+Escalonador de planos de execução baseado em grafo de dependências.
+
+Este módulo deriva o grafo de dependências de uma equipe a partir da
+configuração de entrada de cada agente (agent_result e combined), valida que
+o grafo não tem ciclos e executa cada passo assim que todas as suas entradas
+estiverem prontas, respeitando um limite de passos simultâneos. Ao final,
+informa o caminho crítico, isto é, a cadeia de passos dependentes que
+determinou o tempo total da execução.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Grafo de dependências: passo -> passos dos quais ele depende
+DependencyGraph = Dict[str, List[str]]
+
+
+class DependencyCycleError(ValueError):
+    """O grafo de dependências contém um ciclo."""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"Ciclo de dependências entre agentes: {' -> '.join(cycle)}")
+
+
+def _get(config: Any, name: str) -> Any:
+    if isinstance(config, dict):
+        return config.get(name)
+    return getattr(config, name, None)
+
+
+def input_dependencies(input_config: Any) -> List[str]:
+    """
+    Obtém os agentes dos quais uma configuração de entrada depende.
+
+    Args:
+        input_config: Configuração de entrada do agente (InputSource ou dict)
+
+    Returns:
+        IDs dos agentes cujos resultados são lidos, sem repetições
+    """
+    if input_config is None:
+        return []
+
+    source = _get(input_config, "source")
+    source = getattr(source, "value", source)
+    dependencies = []
+
+    if source == "agent_result":
+        agent_id = _get(input_config, "agent_id")
+        if agent_id:
+            dependencies.append(agent_id)
+
+    elif source == "combined":
+        for source_info in _get(input_config, "sources") or []:
+            if source_info.get("type") == "agent_result" and source_info.get("agent_id"):
+                dependencies.append(source_info["agent_id"])
+
+    return list(dict.fromkeys(dependencies))
+
+
+def build_dependency_graph(agents: Iterable[Tuple[str, Any]]) -> DependencyGraph:
+    """
+    Monta e valida o grafo de dependências de uma equipe.
+
+    Args:
+        agents: Pares (agent_id, configuração de entrada)
+
+    Returns:
+        Grafo de dependências, na ordem em que os agentes foram informados
+
+    Raises:
+        ValueError: Se um agente aparece duas vezes ou depende de um agente fora da equipe
+        DependencyCycleError: Se as dependências formam um ciclo
+    """
+    graph: DependencyGraph = {}
+    for agent_id, input_config in agents:
+        if agent_id in graph:
+            raise ValueError(f"Agente {agent_id} aparece mais de uma vez no workflow")
+        graph[agent_id] = input_dependencies(input_config)
+
+    for agent_id, dependencies in graph.items():
+        for dependency in dependencies:
+            if dependency not in graph:
+                raise ValueError(f"Agente {agent_id} depende do agente {dependency}, que não faz parte do workflow")
+
+    topological_order(graph)
+    return graph
+
+
+def topological_order(graph: DependencyGraph) -> List[str]:
+    """
+    Ordena os passos de forma que cada um venha depois das suas dependências.
+
+    Args:
+        graph: Grafo de dependências
+
+    Returns:
+        Passos em ordem topológica, estável em relação à ordem do grafo
+
+    Raises:
+        DependencyCycleError: Se as dependências formam um ciclo
+    """
+    pending = {step: len(dependencies) for step, dependencies in graph.items()}
+    dependents = _dependents(graph)
+    ready = [step for step, count in pending.items() if count == 0]
+    order = []
+
+    while ready:
+        step = ready.pop(0)
+        order.append(step)
+        for dependent in dependents[step]:
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                ready.append(dependent)
+
+    if len(order) < len(graph):
+        raise DependencyCycleError(_find_cycle(graph, {step for step, count in pending.items() if count > 0}))
+    return order
+
+
+def critical_path(graph: DependencyGraph, durations: Optional[Dict[str, float]] = None) -> Tuple[List[str], float]:
+    """
+    Calcula a cadeia de dependências mais longa do grafo.
+
+    Args:
+        graph: Grafo de dependências
+        durations: Duração de cada passo (None para contar 1 por passo)
+
+    Returns:
+        Passos do caminho crítico, do primeiro ao último, e sua duração total
+    """
+    default = 1.0 if durations is None else 0.0
+    durations = durations or {}
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+
+    for step in topological_order(graph):
+        start, previous[step] = 0.0, None
+        for dependency in graph[step]:
+            if finish[dependency] > start:
+                start, previous[step] = finish[dependency], dependency
+        finish[step] = start + durations.get(step, default)
+
+    if not finish:
+        return [], 0.0
+
+    step = max(finish, key=finish.get)
+    total = finish[step]
+    path = []
+    while step is not None:
+        path.append(step)
+        step = previous[step]
+    return path[::-1], total
+
+
+def _dependents(graph: DependencyGraph) -> Dict[str, List[str]]:
+    dependents: Dict[str, List[str]] = {step: [] for step in graph}
+    for step, dependencies in graph.items():
+        for dependency in dependencies:
+            dependents[dependency].append(step)
+    return dependents
+
+
+def _find_cycle(graph: DependencyGraph, candidates: Set[str]) -> List[str]:
+    # Todo passo não ordenado tem uma dependência não ordenada; seguindo-as, algum passo se repete
+    step = next(iter(step for step in graph if step in candidates))
+    path: List[str] = []
+    seen: Dict[str, int] = {}
+    while step not in seen:
+        seen[step] = len(path)
+        path.append(step)
+        step = next(dependency for dependency in graph[step] if dependency in candidates)
+    return path[seen[step]:] + [step]
+
+
+@dataclass
+class StepTiming:
+    """Tempos de um passo, em segundos desde o início da execução do plano."""
+    ready_at: float
+    started_at: float
+    finished_at: float
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+    @property
+    def queued(self) -> float:
+        """Tempo em que o passo esteve pronto esperando por uma vaga."""
+        return self.started_at - self.ready_at
+
+
+@dataclass
+class DAGRunResult:
+    """Resultado da execução de um grafo de passos."""
+    success: bool
+    completed: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    timings: Dict[str, StepTiming] = field(default_factory=dict)
+    critical_path: List[str] = field(default_factory=list)
+    critical_path_duration: float = 0.0
+    wall_clock: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumo serializável da execução, para o contexto e eventos."""
+        return {
+            "success": self.success,
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "critical_path": self.critical_path,
+            "critical_path_duration": round(self.critical_path_duration, 3),
+            "wall_clock": round(self.wall_clock, 3),
+            "steps": {
+                step: {
+                    "duration": round(timing.duration, 3),
+                    "queued": round(timing.queued, 3),
+                    "started_at": round(timing.started_at, 3),
+                }
+                for step, timing in self.timings.items()
+            },
+        }
+
+
+class DAGScheduler:
+    """Executa os passos de um grafo de dependências assim que suas entradas ficam prontas."""
+
+    def __init__(
+        self,
+        graph: DependencyGraph,
+        max_concurrency: Optional[int] = None,
+        fail_fast: bool = True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Inicializa o escalonador.
+
+        Args:
+            graph: Grafo de dependências (validado aqui)
+            max_concurrency: Máximo de passos em execução ao mesmo tempo (None para sem limite)
+            fail_fast: Se True, nenhum passo novo é iniciado depois de uma falha
+            clock: Relógio usado para medir os tempos dos passos
+        """
+        self.order = topological_order(graph)
+        self.graph = graph
+        self.max_concurrency = max_concurrency if max_concurrency and max_concurrency > 0 else len(graph) or 1
+        self.fail_fast = fail_fast
+        self.clock = clock
+        self._dependents = _dependents(graph)
+
+        # Entre passos prontos, começa pelos que têm mais trabalho dependente pela frente
+        remaining: Dict[str, int] = {}
+        for step in reversed(self.order):
+            remaining[step] = 1 + max((remaining[d] for d in self._dependents[step]), default=0)
+        position = {step: i for i, step in enumerate(graph)}
+        self._priority = {step: (-remaining[step], position[step]) for step in graph}
+
+    async def run(self, execute: Callable[[str], Awaitable[bool]]) -> DAGRunResult:
+        """
+        Executa o grafo.
+
+        Um passo que falha (retorna False ou lança exceção) faz com que todos os
+        passos que dependem dele, direta ou indiretamente, sejam pulados.
+
+        Args:
+            execute: Função que executa um passo e retorna True em caso de sucesso
+
+        Returns:
+            Resultado da execução, com os tempos de cada passo e o caminho crítico
+        """
+        result = DAGRunResult(success=True)
+        origin = self.clock()
+        pending = {step: len(dependencies) for step, dependencies in self.graph.items()}
+        ready_at = {step: 0.0 for step, count in pending.items() if count == 0}
+        ready = sorted(ready_at, key=self._priority.get)
+        running: Dict[asyncio.Task, Tuple[str, float]] = {}
+        stopped = False
+
+        try:
+            while ready or running:
+                while ready and not stopped and len(running) < self.max_concurrency:
+                    step = ready.pop(0)
+                    task = asyncio.create_task(self._run_step(execute, step))
+                    running[task] = (step, self.clock() - origin)
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                finished_at = self.clock() - origin
+                for task in done:
+                    step, started_at = running.pop(task)
+                    result.timings[step] = StepTiming(ready_at[step], started_at, finished_at)
+
+                    if task.result():
+                        result.completed.append(step)
+                        for dependent in self._dependents[step]:
+                            pending[dependent] -= 1
+                            if pending[dependent] == 0:
+                                ready_at[dependent] = finished_at
+                                ready.append(dependent)
+                        ready.sort(key=self._priority.get)
+                    else:
+                        # Os dependentes nunca ficam prontos e acabam pulados
+                        result.failed.append(step)
+                        stopped = stopped or self.fail_fast
+        finally:
+            for task in running:
+                task.cancel()
+
+        result.skipped = [step for step in self.order if step not in result.timings]
+        result.success = not result.failed and not result.skipped
+        result.wall_clock = self.clock() - origin
+        result.critical_path, result.critical_path_duration = self._critical_path(result.timings)
+        return result
+
+    async def _run_step(self, execute: Callable[[str], Awaitable[bool]], step: str) -> bool:
+        try:
+            return bool(await execute(step))
+        except Exception as e:
+            logger.error(f"Step {step} raised an error: {str(e)}", exc_info=True)
+            return False
+
+    def _critical_path(self, timings: Dict[str, StepTiming]) -> Tuple[List[str], float]:
+        if not timings:
+            return [], 0.0
+        # O passo que terminou por último e, a partir dele, a dependência que o liberou
+        step = max(timings, key=lambda s: timings[s].finished_at)
+        path = [step]
+        while True:
+            dependencies = [d for d in self.graph[step] if d in timings]
+            if not dependencies:
+                break
+            step = max(dependencies, key=lambda d: timings[d].finished_at)
+            path.append(step)
+        path.reverse()
+        return path, sum(timings[s].duration for s in path)
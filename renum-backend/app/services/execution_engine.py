@@ -6,9 +6,10 @@ responsável por criar e executar planos de execução com base nas definições
 """
 
 import logging
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Set, Tuple
 from uuid import UUID
 import asyncio
+import time
 from datetime import datetime
 
 from app.models.team_models import (
@@ -20,12 +21,16 @@ from app.models.team_models import (
     AgentCondition,
     ExecutionStatus
 )
+from app.core.config import get_settings
 # from app.repositories.team_execution_repository import TeamExecutionRepository
 from app.services.suna_api_client import SunaApiClient
 from app.services.team_context_manager import TeamContextManager
 from app.services.team_message_bus import TeamMessageBus
 from app.services.api_key_manager import ApiKeyManager
 from app.services.websocket_manager import WebSocketManager
+from app.services.dag_scheduler import DAGScheduler, build_dependency_graph, critical_path
+from app.services.execution_scheduler import execution_scheduler
+from app.services.step_result_cache import StepResultCache, content_hash
 # from app.services.notification_service import notification_service
 
 logger = logging.getLogger(__name__)
@@ -41,7 +46,8 @@ class ExecutionEngine:
         context_manager: TeamContextManager,
         message_bus: TeamMessageBus,
         api_key_manager: ApiKeyManager,
-        websocket_manager: WebSocketManager = None
+        websocket_manager: WebSocketManager = None,
+        step_cache: Optional[StepResultCache] = None
     ):
         """
         Inicializa o motor de execução.
@@ -53,6 +59,7 @@ class ExecutionEngine:
             message_bus: Sistema de mensagens entre agentes
             api_key_manager: Gerenciador de API keys
             websocket_manager: Gerenciador de WebSocket para eventos em tempo real
+            step_cache: Cache de resultados de passos (padrão: no Redis do contexto compartilhado)
         """
         self.execution_repository = execution_repository
         self.suna_client = suna_client
@@ -60,6 +67,20 @@ class ExecutionEngine:
         self.message_bus = message_bus
         self.api_key_manager = api_key_manager
         self.websocket_manager = websocket_manager
+        
+        settings = get_settings()
+        if step_cache is None and settings.TEAM_STEP_CACHE_ENABLED:
+            step_cache = StepResultCache(getattr(context_manager, "redis", None), settings.TEAM_STEP_CACHE_TTL)
+        self.step_cache = step_cache
+        
+        # Execuções que ignoram o cache de resultados de passos
+        self._step_cache_bypass: Set[str] = set()
+        
+        # Usuário de cada execução em andamento, que separa os resultados em cache
+        self._execution_users: Dict[str, str] = {}
+        
+        # Passos já concluídos das execuções retomadas
+        self._completed_steps: Dict[str, Set[str]] = {}
     
     async def create_execution_plan(
         self, 
@@ -93,6 +114,8 @@ class ExecutionEngine:
                     agent_id=agent_config.agent_id,
                     step_order=i,
                     input_config=agent_config.input,
+                    cache_results=agent_config.cache_results,
+                    cache_ttl=agent_config.cache_ttl,
                     dependencies=[sorted_agents[i-1].agent_id] if i > 0 else []
                 )
                 steps.append(step)
@@ -108,6 +131,8 @@ class ExecutionEngine:
                     agent_id=agent_config.agent_id,
                     step_order=i,
                     input_config=agent_config.input,
+                    cache_results=agent_config.cache_results,
+                    cache_ttl=agent_config.cache_ttl,
                     dependencies=[]
                 )
                 steps.append(step)
@@ -122,6 +147,8 @@ class ExecutionEngine:
                     agent_id=agent_config.agent_id,
                     step_order=i,
                     input_config=agent_config.input,
+                    cache_results=agent_config.cache_results,
+                    cache_ttl=agent_config.cache_ttl,
                     conditions=agent_config.conditions,
                     dependencies=[]  # Dependências são determinadas em tempo de execução
                 )
@@ -140,6 +167,8 @@ class ExecutionEngine:
                     agent_id=agent_config.agent_id,
                     step_order=i,
                     input_config=input_config,
+                    cache_results=agent_config.cache_results,
+                    cache_ttl=agent_config.cache_ttl,
                     dependencies=[sorted_agents[i-1].agent_id] if i > 0 else []
                 )
                 steps.append(step)
@@ -148,6 +177,28 @@ class ExecutionEngine:
                 if i > 0:
                     dependencies[agent_config.agent_id] = [sorted_agents[i-1].agent_id]
         
+        elif workflow_type == WorkflowType.DAG:
+            # Dependências derivadas das entradas de cada agente (agent_result, combined)
+            dependencies = build_dependency_graph(
+                (agent_config.agent_id, agent_config.input) for agent_config in workflow_def.agents
+            )
+            
+            for i, agent_config in enumerate(workflow_def.agents):
+                step = ExecutionStep(
+                    agent_id=agent_config.agent_id,
+                    step_order=i,
+                    input_config=agent_config.input,
+                    cache_results=agent_config.cache_results,
+                    cache_ttl=agent_config.cache_ttl,
+                    dependencies=dependencies[agent_config.agent_id]
+                )
+                steps.append(step)
+        
+        # Em um DAG, a duração depende do número de passos no caminho crítico
+        num_agents = len(steps)
+        if workflow_type == WorkflowType.DAG:
+            num_agents = len(critical_path(dependencies)[0])
+        
         # Cria o plano de execução
         execution_plan = ExecutionPlan(
             execution_id=execution_id,
@@ -155,7 +206,7 @@ class ExecutionEngine:
             workflow_type=workflow_type,
             steps=steps,
             dependencies=dependencies,
-            estimated_duration=self._estimate_duration(workflow_type, len(steps))
+            estimated_duration=self._estimate_duration(workflow_type, num_agents)
         )
         
         # Salva o plano no banco de dados
@@ -167,31 +218,46 @@ class ExecutionEngine:
         self, 
         execution_id: UUID,
         team_config: TeamConfig,
-        initial_prompt: str
+        initial_prompt: str,
+        execution_config: Optional[Dict[str, Any]] = None,
+        resume: bool = False
     ) -> bool:
         """
         Executa um plano de execução.
         
+        Cada passo concluído é registrado na execução do agente e seguido de um
+        snapshot do contexto. Ao retomar uma execução (resume=True), o contexto
+        é restaurado a partir do snapshot mais recente, os passos concluídos não
+        são executados novamente e o plano continua a partir do primeiro passo
+        incompleto.
+        
         Args:
             execution_id: ID da execução
             team_config: Configuração da equipe
             initial_prompt: Prompt inicial
+            execution_config: Configurações da execução ("bypass_step_cache" executa
+                todos os agentes mesmo que haja resultados em cache)
+            resume: Se True, retoma uma execução interrompida ou que falhou
             
         Returns:
             True se a execução foi bem-sucedida
         """
+        if (execution_config or {}).get("bypass_step_cache"):
+            self._step_cache_bypass.add(str(execution_id))
+        self._execution_users[str(execution_id)] = str(team_config.user_id)
+        
         # Atualiza o status da execução para "running"
         await self.execution_repository.update_execution_status(execution_id, ExecutionStatus.RUNNING)
         
         # Emite evento de início de execução
         await self._emit_execution_event(
             execution_id,
-            "execution_started",
+            "execution_resumed" if resume else "execution_started",
             {
                 "status": "running",
                 "team_id": str(team_config.team_id),
                 "workflow_type": team_config.workflow_definition.type.value,
-                "message": "Execução iniciada"
+                "message": "Execução retomada" if resume else "Execução iniciada"
             },
             team_config.user_id
         )
@@ -212,13 +278,14 @@ class ExecutionEngine:
                 }
             )
             
-            # Inicializa o contexto compartilhado
-            await self.context_manager.create_context(execution_id, {
-                "initial_prompt": initial_prompt,
-                "team_id": str(team_config.team_id),
-                "execution_id": str(execution_id),
-                "workflow_type": execution_plan.workflow_type.value
-            })
+            # Inicializa o contexto compartilhado, ou o restaura ao retomar a execução
+            if resume:
+                await self._restore_checkpoint(execution_id, execution_plan, initial_prompt, team_config)
+            else:
+                await self.context_manager.create_context(
+                    execution_id,
+                    self._initial_context(execution_id, execution_plan, initial_prompt, team_config)
+                )
             
             # Obtém as API keys do usuário
             user_api_keys = await self.api_key_manager.get_user_api_keys(team_config.user_id)
@@ -232,6 +299,15 @@ class ExecutionEngine:
                 success = await self._execute_conditional_plan(execution_id, execution_plan, initial_prompt, user_api_keys, team_config.user_id)
             elif execution_plan.workflow_type == WorkflowType.PIPELINE:
                 success = await self._execute_pipeline_plan(execution_id, execution_plan, initial_prompt, user_api_keys, team_config.user_id)
+            elif execution_plan.workflow_type == WorkflowType.DAG:
+                success = await self._execute_dag_plan(
+                    execution_id,
+                    execution_plan,
+                    initial_prompt,
+                    user_api_keys,
+                    team_config.user_id,
+                    max_concurrency=team_config.workflow_definition.config.get("max_concurrency")
+                )
             else:
                 raise ValueError(f"Unsupported workflow type: {execution_plan.workflow_type}")
             
@@ -283,7 +359,75 @@ class ExecutionEngine:
                 team_config.user_id
             )
             
-            return False    
+            return False
+        
+        finally:
+            self._step_cache_bypass.discard(str(execution_id))
+            self._execution_users.pop(str(execution_id), None)
+            self._completed_steps.pop(str(execution_id), None)
+    
+    def _initial_context(
+        self,
+        execution_id: UUID,
+        execution_plan: ExecutionPlan,
+        initial_prompt: str,
+        team_config: TeamConfig
+    ) -> Dict[str, Any]:
+        """Variáveis com que o contexto compartilhado de uma execução começa."""
+        return {
+            "initial_prompt": initial_prompt,
+            "team_id": str(team_config.team_id),
+            "execution_id": str(execution_id),
+            "workflow_type": execution_plan.workflow_type.value
+        }
+    
+    async def _restore_checkpoint(
+        self,
+        execution_id: UUID,
+        execution_plan: ExecutionPlan,
+        initial_prompt: str,
+        team_config: TeamConfig
+    ):
+        """
+        Restaura o estado de uma execução a ser retomada.
+        
+        O contexto volta ao snapshot mais recente, criado ao concluir o último
+        passo. Se não houver snapshot, o contexto ainda no Redis é mantido ou
+        recriado. Os resultados dos passos concluídos, registrados nas execuções
+        dos agentes, são sempre regravados no contexto.
+        
+        Args:
+            execution_id: ID da execução
+            execution_plan: Plano de execução
+            initial_prompt: Prompt inicial
+            team_config: Configuração da equipe
+        """
+        if not await self.context_manager.restore_latest_snapshot(execution_id):
+            try:
+                await self.context_manager.get_context(execution_id)
+            except ValueError:
+                await self.context_manager.create_context(
+                    execution_id,
+                    self._initial_context(execution_id, execution_plan, initial_prompt, team_config)
+                )
+        
+        agent_executions = await self.execution_repository.list_agent_executions(execution_id)
+        completed = {
+            agent_execution.agent_id: agent_execution.output_data
+            for agent_execution in agent_executions
+            if agent_execution.status == ExecutionStatus.COMPLETED
+        }
+        if completed:
+            await self.context_manager.update_context(
+                execution_id,
+                {f"agent_{agent_id}_result": result for agent_id, result in completed.items()},
+                "system"
+            )
+        self._completed_steps[str(execution_id)] = set(completed)
+        
+        logger.info(
+            f"Resuming execution {execution_id}: {len(completed)} of {len(execution_plan.steps)} steps already completed"
+        )
    
     async def _execute_sequential_plan(
         self, 
@@ -496,6 +640,92 @@ class ExecutionEngine:
         
         return True
     
+    async def _execute_dag_plan(
+        self, 
+        execution_id: UUID,
+        execution_plan: ExecutionPlan,
+        initial_prompt: str,
+        user_api_keys: Dict[str, str],
+        user_id: str,
+        max_concurrency: Optional[int] = None
+    ) -> bool:
+        """
+        Executa um plano como grafo de dependências.
+        
+        Cada agente inicia assim que os agentes dos quais ele depende terminam,
+        com no máximo max_concurrency agentes em execução ao mesmo tempo. Se um
+        agente falha, nenhum agente novo é iniciado e os que dependem dele são
+        marcados como pulados.
+        
+        Args:
+            execution_id: ID da execução
+            execution_plan: Plano de execução
+            initial_prompt: Prompt inicial
+            user_api_keys: API keys do usuário
+            max_concurrency: Máximo de agentes simultâneos (padrão: TEAM_DAG_MAX_CONCURRENCY)
+            
+        Returns:
+            True se a execução foi bem-sucedida
+        """
+        logger.info(f"Executing DAG plan for execution {execution_id}")
+        
+        steps = {step.agent_id: step for step in sorted(execution_plan.steps, key=lambda s: s.step_order)}
+        scheduler = DAGScheduler(
+            {agent_id: step.dependencies for agent_id, step in steps.items()},
+            max_concurrency=max_concurrency or get_settings().TEAM_DAG_MAX_CONCURRENCY
+        )
+        total_steps = len(steps)
+        finished = 0
+        
+        async def execute(agent_id: str) -> bool:
+            nonlocal finished
+            success = await self._execute_step(execution_id, steps[agent_id], initial_prompt, user_api_keys)
+            finished += 1
+            
+            # Emite evento de progresso
+            await self._emit_execution_event(
+                execution_id,
+                "execution_progress",
+                {
+                    "status": "running",
+                    "progress": int((finished / total_steps) * 100),
+                    "current_step": f"Agente {agent_id} {'concluído' if success else 'falhou'}",
+                    "step_number": finished,
+                    "total_steps": total_steps
+                }
+            )
+            return success
+        
+        result = await scheduler.run(execute)
+        
+        for agent_id in result.skipped:
+            await self.execution_repository.update_agent_execution(
+                execution_id,
+                agent_id,
+                status=ExecutionStatus.SKIPPED
+            )
+        
+        summary = result.to_dict()
+        await self.context_manager.set_variable(execution_id, "dag_schedule", summary, "system")
+        await self._emit_execution_event(
+            execution_id,
+            "critical_path",
+            {
+                "status": "running",
+                "critical_path": summary["critical_path"],
+                "critical_path_duration": summary["critical_path_duration"],
+                "wall_clock": summary["wall_clock"],
+                "message": f"Caminho crítico: {' -> '.join(result.critical_path)}"
+            }
+        )
+        
+        logger.info(
+            f"DAG execution {execution_id} finished in {result.wall_clock:.1f}s, "
+            f"critical path {' -> '.join(result.critical_path)} ({result.critical_path_duration:.1f}s), "
+            f"failed: {result.failed}, skipped: {result.skipped}"
+        )
+        return result.success
+    
     async def _execute_step(
         self, 
         execution_id: UUID,
@@ -516,6 +746,23 @@ class ExecutionEngine:
             True se a execução foi bem-sucedida
         """
         agent_id = step.agent_id
+        
+        # Passos concluídos antes da execução ser retomada não são executados de novo
+        if agent_id in self._completed_steps.get(str(execution_id), ()):
+            logger.info(f"Skipping completed step for agent {agent_id} in resumed execution {execution_id}")
+            await self._emit_step_event(
+                execution_id,
+                agent_id,
+                "step_completed",
+                {
+                    "status": "completed",
+                    "step_order": step.step_order,
+                    "restored": True,
+                    "message": f"Agente {agent_id} já concluído antes da retomada"
+                }
+            )
+            return True
+        
         logger.info(f"Executing step for agent {agent_id} in execution {execution_id}")
         
         try:
@@ -545,49 +792,91 @@ class ExecutionEngine:
                 }
             )
             
-            # Prepara o prompt para o agente
-            prompt = await self._prepare_agent_prompt(execution_id, step, initial_prompt)
-            
-            # Cria uma thread no Suna Core
-            thread_id = await self.suna_client.create_thread()
-            
-            # Importa a integração com o ThreadManager
-            from app.services.thread_manager_integration import TeamThreadManagerIntegration
-            from app.core.dependencies import get_team_context_manager, get_team_message_bus
+            # Prepara o prompt para o agente, registrando as variáveis de contexto lidas
+            inputs: Dict[str, Any] = {}
+            prompt = await self._prepare_agent_prompt(execution_id, step, initial_prompt, inputs)
             
-            # Cria a integração com o ThreadManager
-            context_manager = await get_team_context_manager()
-            message_bus = await get_team_message_bus()
-            thread_manager_integration = TeamThreadManagerIntegration(context_manager, message_bus)
+            # Reutiliza o resultado de uma execução anterior do mesmo agente com as mesmas entradas
+            cache_key = await self._step_cache_key(execution_id, step, prompt, inputs)
+            cached = None
+            if cache_key and str(execution_id) not in self._step_cache_bypass:
+                cached = await self.step_cache.get(cache_key)
             
-            # Obtém o ThreadManager do Suna Core
-            from agentpress.thread_manager import ThreadManager
-            
-            # Cria um ThreadManager estendido com funcionalidades de equipe
-            thread_manager = await thread_manager_integration.create_team_thread_manager(
-                ThreadManager,
-                execution_id,
-                agent_id
-            )
-            
-            # Executa o agente no Suna Core com o ThreadManager estendido
-            suna_agent_run_id = await self.suna_client.execute_agent_with_thread_manager(
-                agent_id,
-                thread_id,
-                prompt,
-                user_api_keys,
-                thread_manager
-            )
-            
-            # Atualiza o ID da execução no Suna Core
-            await self.execution_repository.update_agent_execution(
-                execution_id,
-                agent_id,
-                suna_agent_run_id=UUID(suna_agent_run_id)
-            )
+            if cached:
+                result = cached["result"]
+                await self.execution_repository.update_agent_execution(
+                    execution_id,
+                    agent_id,
+                    input_data={"step_cache_key": cache_key},
+                    individual_usage_metrics={
+                        "cache_hit": True,
+                        "cached_from_execution_id": cached["execution_id"],
+                        "time_saved_seconds": cached["execution_time"],
+                        "tokens_saved": cached["tokens"],
+                        "cost_saved_usd": cached["cost_usd"]
+                    }
+                )
+                logger.info(
+                    f"Reused cached result of agent {agent_id} in execution {execution_id} "
+                    f"(saved {cached['execution_time']:.1f}s, {cached['tokens']} tokens)"
+                )
             
-            # Aguarda a conclusão do agente
-            result = await self.suna_client.wait_for_agent_completion(suna_agent_run_id)
+            else:
+                started_at = time.monotonic()
+                
+                # Aguarda uma das vagas globais de agentes em execução no Suna Core
+                async with execution_scheduler.agent_slot():
+                    # Cria uma thread no Suna Core
+                    thread_id = await self.suna_client.create_thread()
+                    
+                    # Importa a integração com o ThreadManager
+                    from app.services.thread_manager_integration import TeamThreadManagerIntegration
+                    from app.core.dependencies import get_team_context_manager, get_team_message_bus
+                    
+                    # Cria a integração com o ThreadManager
+                    context_manager = await get_team_context_manager()
+                    message_bus = await get_team_message_bus()
+                    thread_manager_integration = TeamThreadManagerIntegration(context_manager, message_bus)
+                    
+                    # Obtém o ThreadManager do Suna Core
+                    from agentpress.thread_manager import ThreadManager
+                    
+                    # Cria um ThreadManager estendido com funcionalidades de equipe
+                    thread_manager = await thread_manager_integration.create_team_thread_manager(
+                        ThreadManager,
+                        execution_id,
+                        agent_id
+                    )
+                    
+                    # Executa o agente no Suna Core com o ThreadManager estendido
+                    suna_agent_run_id = await self.suna_client.execute_agent_with_thread_manager(
+                        agent_id,
+                        thread_id,
+                        prompt,
+                        user_api_keys,
+                        thread_manager
+                    )
+                    
+                    # Atualiza o ID da execução no Suna Core
+                    await self.execution_repository.update_agent_execution(
+                        execution_id,
+                        agent_id,
+                        suna_agent_run_id=UUID(suna_agent_run_id)
+                    )
+                    
+                    # Aguarda a conclusão do agente
+                    result = await self.suna_client.wait_for_agent_completion(suna_agent_run_id)
+                
+                if cache_key:
+                    usage = await self._get_step_usage(suna_agent_run_id)
+                    await self.step_cache.set(
+                        cache_key,
+                        result,
+                        str(execution_id),
+                        time.monotonic() - started_at,
+                        usage,
+                        ttl=step.cache_ttl
+                    )
             
             # Atualiza o resultado da execução do agente
             await self.execution_repository.update_agent_execution(
@@ -605,6 +894,9 @@ class ExecutionEngine:
                 agent_id
             )
             
+            # Checkpoint do contexto, a partir do qual a execução pode ser retomada
+            await self.context_manager.checkpoint(execution_id, agent_id)
+            
             # Emite evento de conclusão do passo
             await self._emit_step_event(
                 execution_id,
@@ -614,6 +906,7 @@ class ExecutionEngine:
                     "status": "completed",
                     "step_order": step.step_order,
                     "result": result,
+                    "cached": bool(cached),
                     "message": f"Agente {agent_id} executado com sucesso"
                 }
             )
@@ -647,11 +940,72 @@ class ExecutionEngine:
             
             return False
     
+    async def _step_cache_key(
+        self,
+        execution_id: UUID,
+        step: ExecutionStep,
+        prompt: str,
+        inputs: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        Obtém a chave de cache de um passo.
+        
+        Args:
+            execution_id: ID da execução
+            step: Passo a ser executado
+            prompt: Prompt preparado para o agente
+            inputs: Variáveis de contexto lidas para montar o prompt
+            
+        Returns:
+            Chave do resultado, ou None se o passo não usa o cache
+        """
+        if not step.cache_results or not self.step_cache or not self.step_cache.enabled:
+            return None
+        
+        # Resultados nunca são compartilhados entre usuários
+        user_id = self._execution_users.get(str(execution_id))
+        if not user_id:
+            return None
+        
+        # Uma nova versão do agente invalida os resultados anteriores
+        try:
+            agent = await self.suna_client.get_agent_details(step.agent_id)
+        except Exception as e:
+            logger.warning(f"Could not get version of agent {step.agent_id}, not caching its result: {str(e)}")
+            return None
+        agent_version = agent.get("current_version_id") or agent.get("updated_at") or content_hash(agent)
+        
+        return self.step_cache.build_key(user_id, step.agent_id, str(agent_version), prompt, inputs)
+    
+    async def _get_step_usage(self, suna_agent_run_id: str) -> Dict[str, Any]:
+        """
+        Obtém as métricas de uso de uma execução de agente, para registrar a economia dos acertos de cache.
+        
+        Args:
+            suna_agent_run_id: ID da execução no Suna Core
+            
+        Returns:
+            Métricas de uso, ou um dicionário vazio se não estiverem disponíveis
+        """
+        try:
+            return await self.suna_client.get_usage_metrics(suna_agent_run_id)
+        except Exception as e:
+            logger.warning(f"Could not get usage metrics of agent run {suna_agent_run_id}: {str(e)}")
+            return {}
+    
+    async def _read_input(self, execution_id: UUID, key: str, inputs: Optional[Dict[str, Any]]) -> Any:
+        """Lê uma variável de contexto, registrando-a em inputs."""
+        value = await self.context_manager.get_variable(execution_id, key)
+        if inputs is not None:
+            inputs[key] = value
+        return value
+    
     async def _prepare_agent_prompt(
         self, 
         execution_id: UUID,
         step: ExecutionStep,
-        initial_prompt: str
+        initial_prompt: str,
+        inputs: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Prepara o prompt para um agente com base na configuração de entrada.
@@ -660,6 +1014,7 @@ class ExecutionEngine:
             execution_id: ID da execução
             step: Passo a ser executado
             initial_prompt: Prompt inicial
+            inputs: Dicionário que recebe as variáveis de contexto lidas (opcional)
             
         Returns:
             Prompt para o agente
@@ -676,7 +1031,7 @@ class ExecutionEngine:
             if not agent_id:
                 raise ValueError(f"agent_id is required for input source {source}")
             
-            result = await self.context_manager.get_variable(execution_id, f"agent_{agent_id}_result")
+            result = await self._read_input(execution_id, f"agent_{agent_id}_result", inputs)
             if not result:
                 raise ValueError(f"Result for agent {agent_id} not found in context")
             
@@ -699,7 +1054,7 @@ class ExecutionEngine:
                 source_agent_id = source_info.get("agent_id")
                 
                 if source_type == "agent_result" and source_agent_id:
-                    result = await self.context_manager.get_variable(execution_id, f"agent_{source_agent_id}_result")
+                    result = await self._read_input(execution_id, f"agent_{source_agent_id}_result", inputs)
                     if result:
                         if isinstance(result, dict) and "result" in result:
                             combined_results.append(result["result"])
@@ -715,7 +1070,7 @@ class ExecutionEngine:
             if not variable_name:
                 raise ValueError(f"variable_name is required for input source {source}")
             
-            value = await self.context_manager.get_variable(execution_id, variable_name)
+            value = await self._read_input(execution_id, variable_name, inputs)
             if value is None:
                 raise ValueError(f"Variable {variable_name} not found in context")
             
@@ -859,6 +1214,22 @@ class ExecutionEngine:
             if last_step.agent_id in agent_results:
                 final_result = agent_results[last_step.agent_id]
         
+        elif execution_plan.workflow_type == WorkflowType.DAG:
+            # O resultado final vem dos agentes dos quais nenhum outro depende
+            required = {dependency for step in execution_plan.steps for dependency in step.dependencies}
+            final_agents = [step.agent_id for step in execution_plan.steps if step.agent_id not in required]
+            if len(final_agents) == 1:
+                final_result = agent_results.get(final_agents[0], {})
+            else:
+                final_result = {
+                    "agent_results": {
+                        agent_id: agent_results[agent_id]
+                        for agent_id in final_agents
+                        if agent_id in agent_results
+                    },
+                    "summary": "DAG execution completed"
+                }
+        
         # Atualiza o resultado final da execução
         await self.execution_repository.update_execution_result(execution_id, final_result)
     
@@ -974,6 +1345,10 @@ class ExecutionEngine:
             # Execução condicional: estimativa conservadora
             return int(num_agents * base_time_per_agent * 0.7)
         
+        elif workflow_type == WorkflowType.DAG:
+            # Execução em grafo: num_agents é o número de agentes no caminho crítico
+            return num_agents * base_time_per_agent
+        
         else:
             return num_agents * base_time_per_agent
     
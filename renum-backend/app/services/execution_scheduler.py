@@ -0,0 +1,425 @@
+"""
+Escalonador global de execuções de equipes.
+
+Este módulo implementa o escalonador que decide quando cada execução de equipe
+começa. As execuções entram em filas por usuário e são despachadas para um
+conjunto limitado de workers por enfileiramento justo ponderado (WFQ): cada
+usuário recebe uma fração da capacidade proporcional ao seu peso, medida pelo
+custo das execuções (número de agentes), de modo que poucas equipes grandes
+não impeçam as execuções dos demais usuários. Dentro da fila de um usuário, as
+execuções de maior prioridade saem primeiro.
+
+O escalonador também limita quantos agentes estão em execução no Suna Core ao
+mesmo tempo, somando todas as execuções, e recusa novas execuções quando a
+fila excede os limites configurados.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de tempos de espera mantidos para as métricas
+WAIT_TIME_SAMPLES = 1000
+
+
+class ExecutionAdmissionError(ValueError):
+    """A execução foi recusada porque a fila excedeu os limites configurados."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+@dataclass
+class Admission:
+    """Resultado da admissão de uma execução no escalonador."""
+    execution_id: str
+    started: bool
+    position: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"execution_id": self.execution_id, "started": self.started, "position": self.position}
+
+
+@dataclass
+class QueuedExecution:
+    """Execução aguardando um worker."""
+    execution_id: str
+    user_id: str
+    run: Callable[[], Awaitable[Any]]
+    priority: int
+    cost: float
+    seq: int
+    enqueued_at: float
+    on_dropped: Optional[Callable[[], Awaitable[Any]]] = None
+
+
+@dataclass
+class _UserQueue:
+    """Fila e estado de justiça de um usuário."""
+    weight: float = 1.0
+    # Tempo virtual em que termina o último serviço concedido ao usuário
+    finish: float = 0.0
+    running: int = 0
+    heap: List[Any] = field(default_factory=list)
+
+    def head(self) -> QueuedExecution:
+        return self.heap[0][2]
+
+
+class ExecutionScheduler:
+    """Despacha execuções de equipes para um conjunto limitado de workers."""
+
+    def __init__(
+        self,
+        workers: int,
+        max_running_per_user: int,
+        max_queue_depth: int,
+        max_queued_per_user: int,
+        max_agent_runs: int,
+        user_weights: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Inicializa o escalonador.
+
+        Args:
+            workers: Máximo de execuções em andamento ao mesmo tempo
+            max_running_per_user: Máximo de execuções em andamento por usuário
+            max_queue_depth: Máximo de execuções aguardando na fila, somando todos os usuários
+            max_queued_per_user: Máximo de execuções aguardando na fila por usuário
+            max_agent_runs: Máximo de agentes em execução no Suna Core ao mesmo tempo
+            user_weights: Peso de cada usuário na divisão dos workers (padrão: 1)
+            clock: Relógio usado para medir os tempos de espera
+        """
+        self.workers = max(1, workers)
+        self.max_running_per_user = max(1, max_running_per_user)
+        self.max_queue_depth = max_queue_depth
+        self.max_queued_per_user = max_queued_per_user
+        self.max_agent_runs = max(1, max_agent_runs)
+        self.user_weights = dict(user_weights or {})
+        self.clock = clock
+
+        self._users: Dict[str, _UserQueue] = {}
+        self._queued: Dict[str, QueuedExecution] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._virtual_time = 0.0
+        self._seq = 0
+        self._agent_slots: Optional[asyncio.Semaphore] = None
+        self._agent_runs = 0
+
+        self._wait_times: Deque[float] = deque(maxlen=WAIT_TIME_SAMPLES)
+        self._run_times: Deque[float] = deque(maxlen=WAIT_TIME_SAMPLES)
+        self.stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "started": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0
+        }
+
+    def submit(
+        self,
+        execution_id: str,
+        user_id: str,
+        run: Callable[[], Awaitable[Any]],
+        priority: int = 0,
+        cost: float = 1.0,
+        on_dropped: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Admission:
+        """
+        Admite uma execução, iniciando-a assim que houver um worker disponível.
+
+        Args:
+            execution_id: ID da execução
+            user_id: ID do usuário que iniciou a execução
+            run: Função que executa a equipe
+            priority: Prioridade da execução em relação às outras execuções do mesmo usuário
+            cost: Custo da execução na divisão justa (por exemplo, o número de agentes)
+            on_dropped: Função chamada se o encerramento descartar a execução ainda na fila
+
+        Returns:
+            Admissão, indicando se a execução começou ou sua posição na fila
+
+        Raises:
+            ExecutionAdmissionError: Se a fila global ou a fila do usuário estiver cheia
+        """
+        self.check_admission(user_id)
+
+        user = self._users.setdefault(user_id, _UserQueue())
+        user.weight = self.user_weights.get(user_id, 1.0)
+        if not user.heap:
+            # Um usuário que volta a ter fila não acumula crédito pelo tempo em que ficou ocioso
+            user.finish = max(user.finish, self._virtual_time)
+
+        self._seq += 1
+        entry = QueuedExecution(
+            execution_id=execution_id,
+            user_id=user_id,
+            run=run,
+            priority=priority,
+            cost=max(cost, 1.0),
+            seq=self._seq,
+            enqueued_at=self.clock(),
+            on_dropped=on_dropped
+        )
+        heapq.heappush(user.heap, (-priority, entry.seq, entry))
+        self._queued[execution_id] = entry
+        self.stats["submitted"] += 1
+
+        self._dispatch()
+
+        if execution_id in self._running:
+            return Admission(execution_id=execution_id, started=True)
+
+        position = self.queue_position(execution_id)
+        logger.info(f"Execution {execution_id} of user {user_id} queued at position {position}")
+        return Admission(execution_id=execution_id, started=False, position=position)
+
+    def check_admission(self, user_id: str):
+        """
+        Verifica se uma nova execução do usuário seria admitida.
+
+        Args:
+            user_id: ID do usuário
+
+        Raises:
+            ExecutionAdmissionError: Se a fila global ou a fila do usuário estiver cheia
+        """
+        user = self._users.get(user_id)
+        # Execuções que começariam imediatamente não ocupam a fila
+        if len(self._running) < self.workers and (user is None or user.running < self.max_running_per_user):
+            return
+
+        if len(self._queued) >= self.max_queue_depth:
+            self.stats["rejected"] += 1
+            logger.warning(f"Rejecting execution of user {user_id}: queue is full ({len(self._queued)} waiting)")
+            raise ExecutionAdmissionError(
+                f"Execution queue is full ({self.max_queue_depth} executions waiting), try again later",
+                retry_after=self._estimated_wait(len(self._queued))
+            )
+
+        if user is not None and len(user.heap) >= self.max_queued_per_user:
+            self.stats["rejected"] += 1
+            logger.warning(f"Rejecting execution of user {user_id}: {len(user.heap)} executions already waiting")
+            raise ExecutionAdmissionError(
+                f"Maximum number of queued executions ({self.max_queued_per_user}) reached",
+                retry_after=self._estimated_wait(len(user.heap))
+            )
+
+    def is_active(self, execution_id: str) -> bool:
+        """
+        Verifica se uma execução está na fila ou em andamento neste processo.
+
+        Args:
+            execution_id: ID da execução
+
+        Returns:
+            True se a execução está na fila ou em andamento
+        """
+        return execution_id in self._queued or execution_id in self._running
+
+    def cancel(self, execution_id: str) -> bool:
+        """
+        Remove da fila uma execução que ainda não começou.
+
+        Args:
+            execution_id: ID da execução
+
+        Returns:
+            True se a execução estava na fila
+        """
+        entry = self._queued.pop(execution_id, None)
+        if entry is None:
+            return False
+
+        user = self._users[entry.user_id]
+        user.heap = [item for item in user.heap if item[2].execution_id != execution_id]
+        heapq.heapify(user.heap)
+        if not user.heap and not user.running:
+            del self._users[entry.user_id]
+        self.stats["cancelled"] += 1
+        return True
+
+    def queue_position(self, execution_id: str) -> int:
+        """
+        Estima a posição de uma execução na fila, pela ordem em que seria despachada.
+
+        Args:
+            execution_id: ID da execução
+
+        Returns:
+            Posição a partir de 1, ou 0 se a execução não está na fila
+        """
+        if execution_id not in self._queued:
+            return 0
+        for position, entry in enumerate(self._dispatch_order(), start=1):
+            if entry.execution_id == execution_id:
+                return position
+        return 0
+
+    @asynccontextmanager
+    async def agent_slot(self) -> AsyncIterator[None]:
+        """
+        Reserva uma das vagas globais de agentes em execução no Suna Core.
+
+        Todos os planos (sequenciais, paralelos e em grafo) passam por estas
+        vagas, de modo que o total de agentes em execução não depende de
+        quantos passos cada plano inicia ao mesmo tempo.
+        """
+        if self._agent_slots is None:
+            self._agent_slots = asyncio.Semaphore(self.max_agent_runs)
+
+        async with self._agent_slots:
+            self._agent_runs += 1
+            try:
+                yield
+            finally:
+                self._agent_runs -= 1
+
+    def _dispatch(self):
+        """Inicia execuções da fila enquanto houver workers disponíveis."""
+        while len(self._running) < self.workers:
+            user = self._next_user()
+            if user is None:
+                return
+
+            _, _, entry = heapq.heappop(user.heap)
+            del self._queued[entry.execution_id]
+
+            user.finish += entry.cost / user.weight
+            self._virtual_time = max(self._virtual_time, user.finish - entry.cost / user.weight)
+            user.running += 1
+
+            self._wait_times.append(self.clock() - entry.enqueued_at)
+            self.stats["started"] += 1
+            self._running[entry.execution_id] = asyncio.create_task(self._run(entry))
+
+    def _next_user(self) -> Optional[_UserQueue]:
+        # Usuário cuja próxima execução termina primeiro no tempo virtual; o número de
+        # usuários com fila é pequeno, então uma busca linear basta
+        best, best_key = None, None
+        for user in self._users.values():
+            if not user.heap or user.running >= self.max_running_per_user:
+                continue
+            entry = user.head()
+            key = (user.finish + entry.cost / user.weight, entry.seq)
+            if best_key is None or key < best_key:
+                best, best_key = user, key
+        return best
+
+    def _dispatch_order(self) -> List[QueuedExecution]:
+        # Simula o despacho sem limite de workers para ordenar a fila
+        finish = {user_id: user.finish for user_id, user in self._users.items()}
+        heads = {user_id: sorted(user.heap) for user_id, user in self._users.items() if user.heap}
+        order = []
+        while heads:
+            user_id = min(
+                heads,
+                key=lambda u: (finish[u] + heads[u][0][2].cost / self._users[u].weight, heads[u][0][2].seq)
+            )
+            _, _, entry = heads[user_id].pop(0)
+            finish[user_id] += entry.cost / self._users[user_id].weight
+            order.append(entry)
+            if not heads[user_id]:
+                del heads[user_id]
+        return order
+
+    async def _run(self, entry: QueuedExecution):
+        started_at = self.clock()
+        try:
+            await entry.run()
+            self.stats["completed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Execution {entry.execution_id} failed in scheduler: {str(e)}", exc_info=True)
+        finally:
+            self._run_times.append(self.clock() - started_at)
+            self._running.pop(entry.execution_id, None)
+            user = self._users[entry.user_id]
+            user.running -= 1
+            if not user.heap and not user.running:
+                # Ao voltar, o usuário recomeça do tempo virtual atual
+                del self._users[entry.user_id]
+
+        # Uma execução cancelada pelo encerramento não libera a próxima
+        self._dispatch()
+
+    def _estimated_wait(self, queued_ahead: int) -> Optional[float]:
+        if not self._run_times:
+            return None
+        average_run = sum(self._run_times) / len(self._run_times)
+        return round(average_run * (queued_ahead + 1) / self.workers, 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtém as métricas do escalonador.
+
+        Returns:
+            Profundidade da fila, execuções em andamento, tempos de espera e contadores
+        """
+        wait_times = sorted(self._wait_times)
+        p95 = wait_times[min(len(wait_times) - 1, int(len(wait_times) * 0.95))] if wait_times else 0.0
+        return {
+            **self.stats,
+            "running": len(self._running),
+            "workers": self.workers,
+            "queue_depth": len(self._queued),
+            "queue_depth_by_user": {
+                user_id: len(user.heap) for user_id, user in self._users.items() if user.heap
+            },
+            "agent_runs": self._agent_runs,
+            "max_agent_runs": self.max_agent_runs,
+            "wait_time_avg": round(sum(wait_times) / len(wait_times), 3) if wait_times else 0.0,
+            "wait_time_p95": round(p95, 3),
+            "wait_time_max": round(wait_times[-1], 3) if wait_times else 0.0
+        }
+
+    async def shutdown(self):
+        """
+        Cancela as execuções em andamento e esvazia a fila.
+
+        As execuções descartadas da fila são informadas por on_dropped, para
+        que não fiquem registradas como pendentes depois do encerramento.
+        """
+        dropped = [self._queued[execution_id] for execution_id in list(self._queued)]
+        for entry in dropped:
+            self.cancel(entry.execution_id)
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for entry in dropped:
+            if entry.on_dropped is None:
+                continue
+            try:
+                await entry.on_dropped()
+            except Exception as e:
+                logger.error(f"Error releasing dropped execution {entry.execution_id}: {str(e)}")
+
+
+def _create_execution_scheduler() -> ExecutionScheduler:
+    settings = get_settings()
+    return ExecutionScheduler(
+        workers=settings.TEAM_EXECUTION_WORKERS,
+        max_running_per_user=settings.MAX_CONCURRENT_EXECUTIONS,
+        max_queue_depth=settings.TEAM_EXECUTION_MAX_QUEUE_DEPTH,
+        max_queued_per_user=settings.TEAM_EXECUTION_MAX_QUEUED_PER_USER,
+        max_agent_runs=settings.TEAM_AGENT_MAX_CONCURRENCY,
+        user_weights=settings.TEAM_EXECUTION_USER_WEIGHTS
+    )
+
+
+# Instância global do escalonador
+execution_scheduler = _create_execution_scheduler()
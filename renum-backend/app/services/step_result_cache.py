@@ -0,0 +1,132 @@
+"""
+Cache de resultados de passos de equipes.
+
+Este módulo implementa o cache dos resultados de agentes em passos marcados
+como determinísticos. A chave combina o usuário dono da execução, o agente e a
+sua versão no Suna Core, o hash do prompt preparado e o hash de cada variável
+de contexto lida para montá-lo, de modo que qualquer mudança no agente ou nas
+entradas produz uma chave nova e o resultado antigo apenas expira. Resultados
+nunca são compartilhados entre usuários, mesmo de um agente compartilhado.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(value: Any) -> str:
+    """
+    Calcula o hash SHA-256 de um valor serializável em JSON.
+
+    Args:
+        value: Texto ou valor serializável
+
+    Returns:
+        Hash hexadecimal do valor
+    """
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class StepResultCache:
+    """Resultados de passos de equipes guardados no Redis."""
+
+    KEY_PREFIX = "team_step_cache"
+
+    def __init__(self, redis_client, default_ttl: int = 172800):
+        """
+        Inicializa o cache.
+
+        Args:
+            redis_client: Cliente Redis (None desativa o cache)
+            default_ttl: Tempo de vida padrão dos resultados em segundos
+        """
+        self.redis = redis_client
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.redis is not None
+
+    def build_key(self, user_id: str, agent_id: str, agent_version: str, prompt: str, inputs: Dict[str, Any]) -> str:
+        """
+        Monta a chave de um passo.
+
+        Args:
+            user_id: ID do usuário dono da execução
+            agent_id: ID do agente
+            agent_version: Versão do agente no Suna Core
+            prompt: Prompt preparado para o agente
+            inputs: Variáveis de contexto lidas para montar o prompt
+
+        Returns:
+            Chave do resultado no Redis
+        """
+        input_hashes = {name: content_hash(value) for name, value in inputs.items()}
+        digest = content_hash({"prompt": content_hash(prompt), "inputs": input_hashes})
+        return f"{self.KEY_PREFIX}:{user_id}:{agent_id}:{agent_version}:{digest}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém o resultado guardado para uma chave.
+
+        Args:
+            key: Chave do passo
+
+        Returns:
+            Entrada com o resultado e o custo da execução original, ou None
+        """
+        try:
+            cached_data = await self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Error reading step result cache: {str(e)}")
+            return None
+
+        if not cached_data:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(cached_data)
+
+    async def set(
+        self,
+        key: str,
+        result: Dict[str, Any],
+        execution_id: str,
+        execution_time: float,
+        usage: Optional[Dict[str, Any]] = None,
+        ttl: Optional[int] = None
+    ) -> None:
+        """
+        Guarda o resultado de um passo.
+
+        Args:
+            key: Chave do passo
+            result: Resultado do agente
+            execution_id: ID da execução que produziu o resultado
+            execution_time: Duração da execução do agente em segundos
+            usage: Métricas de uso da execução (tokens e custo)
+            ttl: Tempo de vida em segundos (padrão: default_ttl)
+        """
+        usage = usage or {}
+        entry = {
+            "result": result,
+            "execution_id": execution_id,
+            "execution_time": execution_time,
+            "tokens": usage.get("tokens_input", 0) + usage.get("tokens_output", 0),
+            "cost_usd": usage.get("cost_usd", 0.0),
+            "cached_at": datetime.now().isoformat()
+        }
+
+        try:
+            await self.redis.set(key, json.dumps(entry, default=str), ex=ttl or self.default_ttl)
+        except Exception as e:
+            logger.warning(f"Error writing step result cache: {str(e)}")
@@ -6,14 +6,30 @@ permitindo a execução de agentes individuais e o gerenciamento de suas execuç
 """
 
 import aiohttp
+import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, List, Union
+import time
+from typing import Dict, Any, Optional, List, Union, AsyncIterator, Tuple
 from uuid import UUID
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Status finais de uma execução de agente
+AGENT_RUN_TERMINAL_STATUSES = {"completed", "failed", "stopped", "error"}
+
+# Status do stream que encerram a execução e podem ser usados como resultado
+AGENT_RUN_STREAM_FINAL_STATUSES = {"completed", "failed", "stopped"}
+
+# Status com que o stream se encerra sem informar o resultado da execução: falhas
+# do próprio stream ("error") e sinais de controle, confirmados pela consulta de status
+AGENT_RUN_STREAM_END_STATUSES = {"error", "END_STREAM", "ERROR", "STOP"}
+
+# Tempo máximo sem nenhum dado no stream antes de reconectar
+AGENT_RUN_STREAM_READ_TIMEOUT = 300
+AGENT_RUN_STREAM_MAX_RECONNECTS = 3
+
 
 class SunaApiError(Exception):
     """Exceção para erros na comunicação com a API do Suna Core."""
@@ -382,19 +398,82 @@ class SunaApiClient:
         
         return response.get("messages", [])
     
+    async def stream_agent_run(
+        self,
+        agent_run_id: str,
+        last_event_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[Optional[str], Dict[str, Any]]]:
+        """
+        Recebe as respostas de uma execução de agente pelo stream SSE do Suna Core.
+        
+        O stream envia as respostas já produzidas e depois as novas, à medida
+        que são publicadas, e termina com uma mensagem de status final.
+        
+        Args:
+            agent_run_id: ID da execução do agente
+            last_event_id: ID do último evento recebido, para retomar o stream após ele
+            
+        Yields:
+            Pares (ID do evento, resposta)
+            
+        Raises:
+            SunaApiError: Se ocorrer um erro na comunicação com a API
+        """
+        await self._ensure_session()
+        
+        params = {"last_event_id": last_event_id} if last_event_id else None
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=AGENT_RUN_STREAM_READ_TIMEOUT)
+        
+        try:
+            async with self.session.get(
+                f"{self.base_url}/api/agent-run/{agent_run_id}/stream",
+                params=params,
+                headers={**self._headers, "Accept": "text/event-stream"},
+                timeout=timeout
+            ) as response:
+                if response.status >= 400:
+                    error_text = await response.text()
+                    raise SunaApiError(f"Suna API returned {response.status}: {error_text}")
+                
+                event_id, data_lines = None, []
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").rstrip("\r\n")
+                    if line.startswith("id:"):
+                        event_id = line[3:].strip()
+                    elif line.startswith("data:"):
+                        data_lines.append(line[5:].strip())
+                    elif not line and data_lines:
+                        try:
+                            yield event_id, json.loads("\n".join(data_lines))
+                        except json.JSONDecodeError:
+                            logger.warning(f"Ignoring malformed event in stream of agent run {agent_run_id}")
+                        event_id, data_lines = None, []
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise SunaApiError(f"Agent run stream failed: {str(e) or type(e).__name__}")
+    
     async def wait_for_agent_completion(
         self, 
         agent_run_id: str, 
-        polling_interval: float = 1.0,
-        timeout: Optional[int] = None
+        polling_interval: float = 0.5,
+        timeout: Optional[int] = None,
+        max_polling_interval: float = 5.0,
+        use_stream: bool = True
     ) -> Dict[str, Any]:
         """
         Aguarda a conclusão de uma execução de agente.
         
+        A conclusão é detectada pelo stream da execução, que entrega as respostas
+        e o status final assim que são publicados. Se o stream falhar ou cair
+        sem que a execução continue em andamento, o status é consultado
+        periodicamente, com intervalo crescente.
+        
         Args:
             agent_run_id: ID da execução do agente
-            polling_interval: Intervalo entre verificações de status (em segundos)
+            polling_interval: Intervalo inicial entre verificações de status, se o stream falhar (em segundos)
             timeout: Timeout em segundos (None para aguardar indefinidamente)
+            max_polling_interval: Intervalo máximo entre verificações de status (em segundos)
+            use_stream: Se False, usa apenas a verificação periódica de status
             
         Returns:
             Resultado final da execução
@@ -402,38 +481,158 @@ class SunaApiClient:
         Raises:
             SunaApiError: Se ocorrer um erro na execução ou timeout
         """
-        import asyncio
-        start_time = datetime.now()
+        start_time = time.monotonic()
+        
+        async def wait() -> Dict[str, Any]:
+            if use_stream:
+                result = await self._wait_for_completion_via_stream(agent_run_id, start_time)
+                if result is not None:
+                    return result
+                logger.warning(f"Falling back to polling for agent run {agent_run_id}")
+            return await self._wait_for_completion_via_polling(
+                agent_run_id, start_time, polling_interval, max_polling_interval
+            )
         
-        while True:
-            status_data = await self.get_agent_run_status(agent_run_id)
-            status = status_data.get("status")
+        if not timeout:
+            return await wait()
+        
+        try:
+            return await asyncio.wait_for(wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await self.stop_agent_run(agent_run_id)
+            raise SunaApiError(f"Agent execution timed out after {timeout} seconds")
+    
+    async def _wait_for_completion_via_stream(
+        self,
+        agent_run_id: str,
+        start_time: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Aguarda o status final de uma execução pelo stream, reconectando se ele cair.
+        
+        Um status de erro do stream indica uma falha do próprio stream, não da
+        execução, e não é usado como resultado. Se o stream cair, ele só é
+        reaberto enquanto a consulta de status indicar que a execução continua
+        em andamento.
+        
+        Returns:
+            Resultado final da execução, ou None se o resultado deve ser obtido pela consulta periódica de status
+        """
+        responses = []
+        last_event_id = None
+        
+        for attempt in range(AGENT_RUN_STREAM_MAX_RECONNECTS + 1):
+            final_status = None
+            try:
+                async for event_id, response in self.stream_agent_run(agent_run_id, last_event_id):
+                    if event_id:
+                        last_event_id = event_id
+                    
+                    if response.get("type") == "status":
+                        status = response.get("status")
+                        if status in AGENT_RUN_STREAM_FINAL_STATUSES:
+                            final_status = response
+                            break
+                        if status in AGENT_RUN_STREAM_END_STATUSES:
+                            logger.warning(
+                                f"Stream of agent run {agent_run_id} ended with status {status}: "
+                                f"{response.get('message', '')}"
+                            )
+                            return None
+                    
+                    responses.append(response)
             
-            if status == "completed":
-                # Execução concluída com sucesso
-                responses = await self.get_agent_run_responses(agent_run_id)
-                return {
-                    "status": "completed",
-                    "responses": responses,
-                    "execution_time": (datetime.now() - start_time).total_seconds()
-                }
+            except SunaApiError as e:
+                logger.warning(f"Stream of agent run {agent_run_id} failed (attempt {attempt + 1}): {str(e)}")
             
-            elif status == "failed":
-                # Execução falhou
-                error_message = status_data.get("error", "Unknown error")
-                raise SunaApiError(f"Agent execution failed: {error_message}")
+            if final_status is not None:
+                return self._completion_result(final_status, responses, start_time)
             
-            elif status == "stopped":
-                # Execução foi interrompida
-                raise SunaApiError("Agent execution was stopped")
+            # O stream caiu; se a execução já terminou, o resultado vem da consulta de status
+            try:
+                status_data = await self.get_agent_run_status(agent_run_id)
+            except SunaApiError as e:
+                logger.warning(f"Failed to get status of agent run {agent_run_id}: {str(e)}")
+                return None
+            if status_data.get("status") in AGENT_RUN_TERMINAL_STATUSES:
+                return await self._result_from_status(agent_run_id, status_data, start_time)
             
-            # Verifica timeout
-            if timeout and (datetime.now() - start_time).total_seconds() > timeout:
-                await self.stop_agent_run(agent_run_id)
-                raise SunaApiError(f"Agent execution timed out after {timeout} seconds")
+            # Sem um ID para retomar, reconectar repetiria as respostas já recebidas
+            if last_event_id is None:
+                responses = []
+        
+        return None
+    
+    async def _wait_for_completion_via_polling(
+        self,
+        agent_run_id: str,
+        start_time: float,
+        polling_interval: float,
+        max_polling_interval: float
+    ) -> Dict[str, Any]:
+        """
+        Aguarda o status final de uma execução consultando-o com intervalo crescente.
+        
+        Returns:
+            Resultado final da execução
+        """
+        interval = polling_interval
+        
+        while True:
+            status_data = await self.get_agent_run_status(agent_run_id)
+            status = status_data.get("status")
+            
+            if status in AGENT_RUN_TERMINAL_STATUSES:
+                return await self._result_from_status(agent_run_id, status_data, start_time)
             
             # Aguarda antes da próxima verificação
-            await asyncio.sleep(polling_interval)
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, max_polling_interval)
+    
+    async def _result_from_status(
+        self,
+        agent_run_id: str,
+        status_data: Dict[str, Any],
+        start_time: float
+    ) -> Dict[str, Any]:
+        """
+        Monta o resultado de uma execução a partir do status final obtido pela consulta de status.
+        
+        Raises:
+            SunaApiError: Se a execução falhou ou foi interrompida
+        """
+        responses = await self.get_agent_run_responses(agent_run_id) if status_data.get("status") == "completed" else []
+        return self._completion_result(status_data, responses, start_time)
+    
+    def _completion_result(
+        self,
+        status_data: Dict[str, Any],
+        responses: List[Dict[str, Any]],
+        start_time: float
+    ) -> Dict[str, Any]:
+        """
+        Monta o resultado de uma execução a partir do seu status final.
+        
+        Raises:
+            SunaApiError: Se a execução falhou ou foi interrompida
+        """
+        status = status_data.get("status")
+        
+        if status == "completed":
+            # Execução concluída com sucesso
+            return {
+                "status": "completed",
+                "responses": responses,
+                "execution_time": time.monotonic() - start_time
+            }
+        
+        elif status == "stopped":
+            # Execução foi interrompida
+            raise SunaApiError("Agent execution was stopped")
+        
+        # Execução falhou
+        error_message = status_data.get("error") or status_data.get("message") or "Unknown error"
+        raise SunaApiError(f"Agent execution failed: {error_message}")
     
     async def get_usage_metrics(self, agent_run_id: str) -> Dict[str, Any]:
         """
@@ -3,12 +3,19 @@ Gerenciador de contexto compartilhado para equipes de agentes.
 
 Este módulo fornece funcionalidades para gerenciar o contexto compartilhado entre
 agentes de uma equipe, incluindo armazenamento, versionamento e notificações de mudanças.
+
+Cada contexto é um hash Redis em que cada variável ocupa um campo próprio
+(`var:<chave>`, valor em JSON), ao lado dos campos `version`, `metadata`,
+`updated_at` e `last_updated_by`. Escritas são feitas por um script Lua que
+altera os campos, incrementa a versão e publica as mudanças em uma única ida
+ao servidor, de modo que agentes concorrentes não sobrescrevem as variáveis
+uns dos outros.
 """
 
 import json
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List, AsyncIterator
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 from datetime import datetime
 from uuid import UUID
 
@@ -16,6 +23,76 @@ from app.models.team_models import TeamContext, ContextChange
 
 logger = logging.getLogger(__name__)
 
+# Prefixo dos campos de variáveis no hash do contexto
+VARIABLE_FIELD_PREFIX = "var:"
+
+# Altera variáveis de um contexto, incrementa a versão e publica as mudanças.
+#
+# KEYS[1]: hash do contexto
+# ARGV[1]: canal de mudanças
+# ARGV[2]: timestamp ISO da alteração
+# ARGV[3]: ID do agente
+# ARGV[4..]: quádruplas (campo, chave, operação, valor JSON), com operação
+#            "set" (define), "del" (remove) ou "append" (adiciona o valor ao
+#            fim da lista JSON armazenada no campo)
+#
+# Retorna nil se o contexto não existir; caso contrário {versão, valores
+# anteriores...}, na ordem das quádruplas (nil para "append").
+UPDATE_VARIABLES_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local result = {0}
+local changed = false
+for i = 4, #ARGV, 4 do
+    local field, key, op, value = ARGV[i], ARGV[i + 1], ARGV[i + 2], ARGV[i + 3]
+    local previous = redis.call('HGET', KEYS[1], field)
+    if op == 'append' then
+        result[#result + 1] = false
+        local items = previous and string.match(previous, '^%s*%[(.-)%s*%]%s*$')
+        if previous and previous ~= 'null' and not items then
+            return redis.error_reply('ERR variable ' .. key .. ' is not a list')
+        end
+        if items and string.find(items, '%S') then
+            value = '[' .. items .. ', ' .. value .. ']'
+        else
+            value = '[' .. value .. ']'
+        end
+        previous = false
+    else
+        result[#result + 1] = previous
+    end
+    if op == 'del' then
+        if previous then
+            redis.call('HDEL', KEYS[1], field)
+            value = 'null'
+        end
+    else
+        redis.call('HSET', KEYS[1], field, value)
+    end
+    if op ~= 'del' or previous then
+        changed = true
+        redis.call('PUBLISH', ARGV[1], '{"key":' .. cjson.encode(key)
+            .. ',"value":' .. value
+            .. ',"previous_value":' .. (previous or 'null')
+            .. ',"changed_by":' .. cjson.encode(ARGV[3])
+            .. ',"timestamp":' .. cjson.encode(ARGV[2]) .. '}')
+    end
+end
+if changed then
+    result[1] = redis.call('HINCRBY', KEYS[1], 'version', 1)
+    redis.call('HSET', KEYS[1], 'updated_at', ARGV[2], 'last_updated_by', ARGV[3])
+else
+    result[1] = tonumber(redis.call('HGET', KEYS[1], 'version') or 1)
+end
+return result
+"""
+
+
+def _decode(value: Any) -> Any:
+    """Converte respostas em bytes do Redis para str."""
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
 
 class TeamContextManager:
     """Gerenciador de contexto compartilhado para equipes de agentes."""
@@ -33,6 +110,14 @@ class TeamContextManager:
         self.context_key_prefix = "team_context:"
         self.context_changes_channel = "team_context_changes:"
         self.snapshot_interval = 10  # Número de alterações antes de criar um snapshot
+        self.context_ttl = 86400  # 24 horas
+        self._update_script = None
+    
+    def _get_update_script(self):
+        """Registra o script de atualização no primeiro uso."""
+        if self._update_script is None:
+            self._update_script = self.redis.register_script(UPDATE_VARIABLES_SCRIPT)
+        return self._update_script
     
     async def create_context(self, execution_id: str, initial_data: Optional[Dict[str, Any]] = None) -> TeamContext:
         """
@@ -61,18 +146,20 @@ class TeamContextManager:
             version=1
         )
         
-        # Armazena no Redis
-        await self.redis.hset(
+        # Armazena no Redis com TTL (24 horas) em uma única transação
+        pipeline = self.redis.pipeline(transaction=True)
+        pipeline.delete(context_key)
+        pipeline.hset(
             context_key,
             mapping={
-                "variables": json.dumps(context.variables),
                 "metadata": json.dumps(context.metadata),
-                "version": context.version
+                "version": context.version,
+                "updated_at": context.metadata["updated_at"],
+                **self._variable_fields(context.variables)
             }
         )
-        
-        # Define TTL (24 horas)
-        await self.redis.expire(context_key, 86400)
+        pipeline.expire(context_key, self.context_ttl)
+        await pipeline.execute()
         
         logger.info(f"Created new context for execution {execution_id}")
         
@@ -97,18 +184,12 @@ class TeamContextManager:
         """
         context_key = f"{self.context_key_prefix}{execution_id}"
         
-        # Verifica se o contexto existe
-        if not await self.redis.exists(context_key):
+        # Obtém todos os campos do contexto de uma vez
+        fields = {_decode(field): value for field, value in (await self.redis.hgetall(context_key)).items()}
+        if not fields:
             raise ValueError(f"Context for execution {execution_id} not found")
         
-        # Obtém dados do Redis
-        variables = await self.redis.hget(context_key, "variables")
-        metadata = await self.redis.hget(context_key, "metadata")
-        version = int(await self.redis.hget(context_key, "version") or 1)
-        
-        # Converte de JSON
-        variables_dict = json.loads(variables) if variables else {}
-        metadata_dict = json.loads(metadata) if metadata else {}
+        variables_dict, metadata_dict, version = self._parse_context_fields(fields)
         
         # Cria objeto TeamContext
         return TeamContext(
@@ -120,6 +201,114 @@ class TeamContextManager:
             version=version
         )
     
+    @staticmethod
+    def _parse_context_fields(fields: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], int]:
+        """
+        Converte os campos do hash de um contexto.
+        
+        Args:
+            fields: Campos do hash, com nomes já decodificados
+            
+        Returns:
+            Tupla com variáveis, metadados e versão
+        """
+        # Contextos criados antes das variáveis por campo guardam um único blob
+        variables = json.loads(fields["variables"]) if fields.get("variables") else {}
+        for field, value in fields.items():
+            if field.startswith(VARIABLE_FIELD_PREFIX):
+                variables[field[len(VARIABLE_FIELD_PREFIX):]] = json.loads(value)
+        
+        version = int(fields.get("version") or 1)
+        metadata = json.loads(fields["metadata"]) if fields.get("metadata") else {}
+        metadata["version"] = version
+        if fields.get("updated_at"):
+            metadata["updated_at"] = _decode(fields["updated_at"])
+        if fields.get("last_updated_by"):
+            metadata["last_updated_by"] = _decode(fields["last_updated_by"])
+        
+        return variables, metadata, version
+    
+    @staticmethod
+    def _variable_fields(variables: Dict[str, Any]) -> Dict[str, str]:
+        """Campos do hash que armazenam as variáveis."""
+        return {f"{VARIABLE_FIELD_PREFIX}{key}": json.dumps(value) for key, value in variables.items()}
+    
+    def _update_args(
+        self,
+        execution_id: str,
+        updates: Dict[str, Any],
+        agent_id: str,
+        operation: str = "set"
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Monta as chaves e argumentos do script de atualização.
+        
+        Args:
+            execution_id: ID da execução
+            updates: Variáveis a alterar (chave -> valor)
+            agent_id: ID do agente que faz a alteração
+            operation: "set", "del" ou "append"
+            
+        Returns:
+            Tupla com KEYS e ARGV do script
+        """
+        args = [
+            f"{self.context_changes_channel}{execution_id}",
+            datetime.now().isoformat(),
+            agent_id
+        ]
+        for key, value in updates.items():
+            args.extend([f"{VARIABLE_FIELD_PREFIX}{key}", key, operation, json.dumps(value)])
+        return [f"{self.context_key_prefix}{execution_id}"], args
+    
+    async def _update_variables(
+        self,
+        execution_id: str,
+        updates: Dict[str, Any],
+        agent_id: str,
+        operation: str = "set"
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Altera variáveis do contexto atomicamente.
+        
+        Args:
+            execution_id: ID da execução
+            updates: Variáveis a alterar (chave -> valor)
+            agent_id: ID do agente que faz a alteração
+            operation: "set", "del" ou "append"
+            
+        Returns:
+            Tupla com a nova versão e os valores anteriores das variáveis
+            
+        Raises:
+            ValueError: Se o contexto não existir
+        """
+        keys, args = self._update_args(execution_id, updates, agent_id, operation)
+        result = await self._get_update_script()(keys=keys, args=args)
+        return self._parse_update_result(execution_id, updates, result)
+    
+    @staticmethod
+    def _parse_update_result(
+        execution_id: str,
+        updates: Dict[str, Any],
+        result: Optional[List[Any]]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Converte o retorno do script de atualização."""
+        if not result:
+            raise ValueError(f"Context for execution {execution_id} not found")
+        
+        previous_values = {
+            key: json.loads(previous) if previous is not None else None
+            for key, previous in zip(updates, result[1:])
+        }
+        return int(result[0]), previous_values
+    
+    async def _maybe_snapshot(self, execution_id: str, version: int, agent_id: Optional[str] = None) -> None:
+        """Cria um snapshot a cada snapshot_interval versões."""
+        if self.db and version % self.snapshot_interval == 0:
+            variables = await self.get_all_variables(execution_id)
+            await self._create_snapshot(execution_id, variables, version, agent_id)
+    
     async def set_variable(
         self, 
         execution_id: str, 
@@ -131,67 +320,32 @@ class TeamContextManager:
         """
         Define uma variável no contexto compartilhado.
         
+        A variável, a versão e a notificação de mudança são gravadas
+        atomicamente em uma única ida ao Redis.
+        
         Args:
             execution_id: ID da execução
             key: Chave da variável
             value: Valor da variável
             agent_id: ID do agente que está definindo a variável
             ttl: Tempo de vida da variável em segundos (opcional)
+            
+        Raises:
+            ValueError: Se o contexto não existir
         """
         context_key = f"{self.context_key_prefix}{execution_id}"
         
-        # Verifica se o contexto existe
-        if not await self.redis.exists(context_key):
-            raise ValueError(f"Context for execution {execution_id} not found")
-        
-        # Obtém o contexto atual
-        context = await self.get_context(execution_id)
-        
-        # Obtém o valor anterior (se existir)
-        previous_value = context.variables.get(key)
-        
-        # Atualiza a variável
-        context.variables[key] = value
-        context.version += 1
-        context.updated_at = datetime.now()
-        context.metadata["updated_at"] = context.updated_at.isoformat()
-        context.metadata["version"] = context.version
-        context.metadata["last_updated_by"] = agent_id
-        
-        # Atualiza no Redis
-        await self.redis.hset(
-            context_key,
-            mapping={
-                "variables": json.dumps(context.variables),
-                "metadata": json.dumps(context.metadata),
-                "version": context.version
-            }
-        )
+        version, _ = await self._update_variables(execution_id, {key: value}, agent_id)
         
         # Se TTL for especificado, define para a variável específica
         if ttl:
             variable_key = f"{context_key}:var:{key}"
             await self.redis.set(variable_key, json.dumps(value), ex=ttl)
         
-        # Publica mudança no canal
-        change = ContextChange(
-            key=key,
-            value=value,
-            previous_value=previous_value,
-            changed_by=agent_id,
-            timestamp=datetime.now()
-        )
-        
-        await self.redis.publish(
-            f"{self.context_changes_channel}{execution_id}",
-            json.dumps(change.dict())
-        )
-        
         logger.debug(f"Set variable {key} in context {execution_id} by agent {agent_id}")
         
         # Verifica se deve criar snapshot
-        if context.version % self.snapshot_interval == 0 and self.db:
-            await self._create_snapshot(execution_id, context.variables, context.version, agent_id)
+        await self._maybe_snapshot(execution_id, version, agent_id)
     
     async def get_variable(self, execution_id: str, key: str) -> Any:
         """
@@ -203,18 +357,30 @@ class TeamContextManager:
             
         Returns:
             Valor da variável ou None se não existir
+            
+        Raises:
+            ValueError: Se o contexto não existir
         """
         context_key = f"{self.context_key_prefix}{execution_id}"
-        
-        # Verifica se existe uma variável com TTL específico
         variable_key = f"{context_key}:var:{key}"
-        if await self.redis.exists(variable_key):
-            value_json = await self.redis.get(variable_key)
-            return json.loads(value_json)
         
-        # Caso contrário, obtém do contexto geral
-        context = await self.get_context(execution_id)
-        return context.variables.get(key)
+        # Lê a variável com TTL específico e o campo da variável em uma única ida
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.get(variable_key)
+        pipeline.hget(context_key, f"{VARIABLE_FIELD_PREFIX}{key}")
+        pipeline.exists(context_key)
+        ttl_value, value, exists = await pipeline.execute()
+        
+        if ttl_value is not None:
+            return json.loads(ttl_value)
+        if not exists:
+            raise ValueError(f"Context for execution {execution_id} not found")
+        if value is not None:
+            return json.loads(value)
+        
+        # Contextos criados antes das variáveis por campo guardam um único blob
+        legacy_variables = await self.redis.hget(context_key, "variables")
+        return json.loads(legacy_variables).get(key) if legacy_variables else None
     
     async def get_all_variables(self, execution_id: str) -> Dict[str, Any]:
         """
@@ -230,16 +396,16 @@ class TeamContextManager:
         
         # Obtém variáveis com TTL específico
         context_key = f"{self.context_key_prefix}{execution_id}"
-        ttl_keys = await self.redis.keys(f"{context_key}:var:*")
+        ttl_keys = [_decode(key) async for key in self.redis.scan_iter(match=f"{context_key}:var:*")]
         
         # Cria uma cópia das variáveis do contexto
         variables = context.variables.copy()
         
         # Adiciona variáveis com TTL
-        for key in ttl_keys:
-            var_name = key.split(":")[-1]
-            value_json = await self.redis.get(key)
-            variables[var_name] = json.loads(value_json)
+        if ttl_keys:
+            for key, value_json in zip(ttl_keys, await self.redis.mget(ttl_keys)):
+                if value_json is not None:
+                    variables[key[len(f"{context_key}:var:"):]] = json.loads(value_json)
         
         return variables
     
@@ -251,55 +417,18 @@ class TeamContextManager:
             execution_id: ID da execução
             key: Chave da variável
             agent_id: ID do agente que está removendo a variável
+            
+        Raises:
+            ValueError: Se o contexto não existir
         """
         context_key = f"{self.context_key_prefix}{execution_id}"
         variable_key = f"{context_key}:var:{key}"
         
         # Remove variável com TTL específico, se existir
-        if await self.redis.exists(variable_key):
-            await self.redis.delete(variable_key)
-        
-        # Obtém o contexto atual
-        context = await self.get_context(execution_id)
-        
-        # Verifica se a variável existe no contexto geral
-        if key not in context.variables:
-            return
+        await self.redis.delete(variable_key)
         
-        # Obtém o valor anterior
-        previous_value = context.variables.get(key)
-        
-        # Remove a variável
-        del context.variables[key]
-        context.version += 1
-        context.updated_at = datetime.now()
-        context.metadata["updated_at"] = context.updated_at.isoformat()
-        context.metadata["version"] = context.version
-        context.metadata["last_updated_by"] = agent_id
-        
-        # Atualiza no Redis
-        await self.redis.hset(
-            context_key,
-            mapping={
-                "variables": json.dumps(context.variables),
-                "metadata": json.dumps(context.metadata),
-                "version": context.version
-            }
-        )
-        
-        # Publica mudança no canal
-        change = ContextChange(
-            key=key,
-            value=None,
-            previous_value=previous_value,
-            changed_by=agent_id,
-            timestamp=datetime.now()
-        )
-        
-        await self.redis.publish(
-            f"{self.context_changes_channel}{execution_id}",
-            json.dumps(change.dict())
-        )
+        # Remove o campo; o script não altera a versão se a variável não existir
+        await self._update_variables(execution_id, {key: None}, agent_id, operation="del")
         
         logger.debug(f"Deleted variable {key} from context {execution_id} by agent {agent_id}")
     
@@ -311,65 +440,42 @@ class TeamContextManager:
             execution_id: ID da execução
             updates: Dicionário com as atualizações (chave -> valor)
             agent_id: ID do agente que está atualizando o contexto
+            
+        Raises:
+            ValueError: Se o contexto não existir
         """
-        context_key = f"{self.context_key_prefix}{execution_id}"
-        
-        # Verifica se o contexto existe
-        if not await self.redis.exists(context_key):
-            raise ValueError(f"Context for execution {execution_id} not found")
-        
-        # Obtém o contexto atual
-        context = await self.get_context(execution_id)
+        if not updates:
+            return
         
-        # Armazena valores anteriores para notificações
-        previous_values = {}
-        for key in updates:
-            previous_values[key] = context.variables.get(key)
+        version, _ = await self._update_variables(execution_id, updates, agent_id)
         
-        # Atualiza as variáveis
-        context.variables.update(updates)
-        context.version += 1
-        context.updated_at = datetime.now()
-        context.metadata["updated_at"] = context.updated_at.isoformat()
-        context.metadata["version"] = context.version
-        context.metadata["last_updated_by"] = agent_id
+        logger.debug(f"Updated {len(updates)} variables in context {execution_id} by agent {agent_id}")
         
-        # Atualiza no Redis usando pipeline para eficiência
-        pipeline = self.redis.pipeline()
+        # Verifica se deve criar snapshot
+        await self._maybe_snapshot(execution_id, version, agent_id)
+    
+    async def append_to_variable(self, execution_id: str, key: str, item: Any, agent_id: str) -> None:
+        """
+        Adiciona um item a uma variável do tipo lista.
         
-        # Atualiza o contexto principal
-        pipeline.hset(
-            context_key,
-            mapping={
-                "variables": json.dumps(context.variables),
-                "metadata": json.dumps(context.metadata),
-                "version": context.version
-            }
-        )
+        O item é anexado no servidor, sem ler a lista, de modo que itens
+        adicionados ao mesmo tempo por outros agentes não se perdem.
         
-        # Publica mudanças no canal
-        for key, value in updates.items():
-            change = ContextChange(
-                key=key,
-                value=value,
-                previous_value=previous_values.get(key),
-                changed_by=agent_id,
-                timestamp=datetime.now()
-            )
+        Args:
+            execution_id: ID da execução
+            key: Chave da variável
+            item: Item a adicionar
+            agent_id: ID do agente que está adicionando o item
             
-            pipeline.publish(
-                f"{self.context_changes_channel}{execution_id}",
-                json.dumps(change.dict())
-            )
-        
-        # Executa o pipeline
-        await pipeline.execute()
+        Raises:
+            ValueError: Se o contexto não existir
+        """
+        version, _ = await self._update_variables(execution_id, {key: item}, agent_id, operation="append")
         
-        logger.debug(f"Updated {len(updates)} variables in context {execution_id} by agent {agent_id}")
+        logger.debug(f"Appended to variable {key} in context {execution_id} by agent {agent_id}")
         
         # Verifica se deve criar snapshot
-        if context.version % self.snapshot_interval == 0 and self.db:
-            await self._create_snapshot(execution_id, context.variables, context.version, agent_id)
+        await self._maybe_snapshot(execution_id, version, agent_id)
     
     async def subscribe_to_changes(self, execution_id: str) -> AsyncIterator[ContextChange]:
         """
@@ -449,6 +555,55 @@ class TeamContextManager:
             logger.error(f"Failed to get context history: {str(e)}")
             return []
     
+    async def checkpoint(self, execution_id: str, agent_id: Optional[str] = None) -> None:
+        """
+        Cria imediatamente um snapshot do contexto.
+        
+        Usado ao concluir cada passo de uma execução, para que ela possa ser
+        retomada a partir do estado deixado pelo último passo concluído.
+        
+        Args:
+            execution_id: ID da execução
+            agent_id: ID do agente cujo passo foi concluído
+        """
+        if not self.db:
+            return
+        
+        context_key = f"{self.context_key_prefix}{execution_id}"
+        variables = await self.get_all_variables(execution_id)
+        version = int(await self.redis.hget(context_key, "version") or 1)
+        await self._create_snapshot(execution_id, variables, version, agent_id)
+    
+    async def restore_latest_snapshot(self, execution_id: str) -> bool:
+        """
+        Restaura o contexto a partir do snapshot mais recente.
+        
+        Args:
+            execution_id: ID da execução
+            
+        Returns:
+            True se a restauração foi bem-sucedida
+        """
+        if not self.db:
+            return False
+        
+        try:
+            result = await self.db.table('renum_team_context_snapshots') \
+                .select('*') \
+                .eq('execution_id', str(execution_id)) \
+                .order('snapshot_at', desc=True) \
+                .limit(1) \
+                .execute()
+            
+            if not result.data:
+                return False
+            
+            return await self._restore_snapshot(execution_id, result.data[0])
+            
+        except Exception as e:
+            logger.error(f"Failed to restore context from latest snapshot: {str(e)}")
+            return False
+    
     async def restore_context_from_snapshot(self, execution_id: str, snapshot_at: datetime) -> bool:
         """
         Restaura o contexto a partir de um snapshot.
@@ -474,8 +629,24 @@ class TeamContextManager:
             if not result.data:
                 return False
             
-            snapshot = result.data[0]
+            return await self._restore_snapshot(execution_id, result.data[0])
+            
+        except Exception as e:
+            logger.error(f"Failed to restore context from snapshot: {str(e)}")
+            return False
+    
+    async def _restore_snapshot(self, execution_id: str, snapshot: Dict[str, Any]) -> bool:
+        """
+        Substitui o contexto no Redis pelo conteúdo de um snapshot.
+        
+        Args:
+            execution_id: ID da execução
+            snapshot: Linha do snapshot no banco de dados
             
+        Returns:
+            True se a restauração foi bem-sucedida
+        """
+        try:
             # Restaura o contexto no Redis
             context_key = f"{self.context_key_prefix}{execution_id}"
             
@@ -487,16 +658,22 @@ class TeamContextManager:
                 "restored_at": datetime.now().isoformat()
             }
             
-            await self.redis.hset(
+            # Substitui todos os campos, inclusive variáveis criadas depois do snapshot
+            pipeline = self.redis.pipeline(transaction=True)
+            pipeline.delete(context_key)
+            pipeline.hset(
                 context_key,
                 mapping={
-                    "variables": json.dumps(snapshot['context_data']),
                     "metadata": json.dumps(metadata),
-                    "version": snapshot['version']
+                    "version": snapshot['version'],
+                    "updated_at": metadata["updated_at"],
+                    **self._variable_fields(snapshot['context_data'])
                 }
             )
+            pipeline.expire(context_key, self.context_ttl)
+            await pipeline.execute()
             
-            logger.info(f"Restored context {execution_id} from snapshot at {snapshot_at}")
+            logger.info(f"Restored context {execution_id} from snapshot at {snapshot['snapshot_at']}")
             return True
             
         except Exception as e:
@@ -539,11 +716,6 @@ class TeamContextManager:
         
         # Adiciona a mensagem ao contexto
         try:
-            context = await self.get_context(execution_id)
-            
-            # Adiciona à lista de mensagens no contexto
-            messages = context.variables.get('messages', [])
-            
             # Formata a mensagem
             message = {
                 'type': type,
@@ -552,16 +724,12 @@ class TeamContextManager:
                 'timestamp': datetime.now().isoformat()
             }
             
-            messages.append(message)
-            
-            # Atualiza o contexto
-            await self.set_variable(execution_id, 'messages', messages, agent_id)
+            # Adiciona à lista de mensagens no contexto sem perder mensagens de outros agentes
+            await self.append_to_variable(execution_id, 'messages', message, agent_id)
             
             # Se for uma mensagem de ferramenta, adiciona ao histórico de ferramentas
             if type == 'tool_call' or type == 'tool':
-                tool_history = context.variables.get('tool_history', [])
-                tool_history.append(message)
-                await self.set_variable(execution_id, 'tool_history', tool_history, agent_id)
+                await self.append_to_variable(execution_id, 'tool_history', message, agent_id)
             
         except ValueError:
             # Contexto não existe, ignora
@@ -573,60 +741,28 @@ class TeamContextManager:
         """
         Atualiza múltiplos contextos em lote.
         
+        Todas as atualizações são enviadas em uma única transação (MULTI/EXEC);
+        atualizações de contextos inexistentes são ignoradas.
+        
         Args:
             updates: Lista de atualizações, cada uma com execution_id, key, value, agent_id
         """
-        pipeline = self.redis.pipeline()
+        if not updates:
+            return
         
-        for update in updates:
-            execution_id = update['execution_id']
-            key = update['key']
-            value = update['value']
-            agent_id = update['agent_id']
-            
-            context_key = f"{self.context_key_prefix}{execution_id}"
-            
-            # Obtém o contexto atual (não podemos usar pipeline para isso)
-            try:
-                context = await self.get_context(execution_id)
-                
-                # Atualiza a variável
-                context.variables[key] = value
-                context.version += 1
-                context.updated_at = datetime.now()
-                context.metadata["updated_at"] = context.updated_at.isoformat()
-                context.metadata["version"] = context.version
-                context.metadata["last_updated_by"] = agent_id
-                
-                # Adiciona ao pipeline
-                pipeline.hset(
-                    context_key,
-                    mapping={
-                        "variables": json.dumps(context.variables),
-                        "metadata": json.dumps(context.metadata),
-                        "version": context.version
-                    }
-                )
-                
-                # Publica mudança no canal
-                change = ContextChange(
-                    key=key,
-                    value=value,
-                    previous_value=context.variables.get(key),
-                    changed_by=agent_id,
-                    timestamp=datetime.now()
-                )
-                
-                pipeline.publish(
-                    f"{self.context_changes_channel}{execution_id}",
-                    json.dumps(change.dict())
+        script = self._get_update_script()
+        async with self.redis.pipeline(transaction=True) as pipeline:
+            for update in updates:
+                keys, args = self._update_args(
+                    update['execution_id'], {update['key']: update['value']}, update['agent_id']
                 )
-                
-            except ValueError:
-                # Contexto não existe, ignora
-                continue
+                await script(keys=keys, args=args, client=pipeline)
+            
+            # Executa o pipeline
+            results = await pipeline.execute()
         
-        # Executa o pipeline
-        await pipeline.execute()
+        for update, result in zip(updates, results):
+            if result:
+                await self._maybe_snapshot(update['execution_id'], int(result[0]), update['agent_id'])
         
-        logger.debug(f"Batch updated {len(updates)} context variables")
\ No newline at end of file
+        logger.debug(f"Batch updated {len(updates)} context variables")
@@ -6,12 +6,12 @@ coordenar a execução de equipes, gerenciar o ciclo de vida das execuções e
 coletar métricas de uso e custo.
 """
 
-import logging
 import asyncio
+import logging
 import json
 from typing import Dict, Any, Optional, List, AsyncIterator
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.services.websocket_manager import websocket_manager
 
@@ -30,10 +30,14 @@ from app.services.suna_api_client import SunaApiClient
 from app.services.team_context_manager import TeamContextManager
 from app.services.team_message_bus import TeamMessageBus
 from app.services.api_key_manager import ApiKeyManager
+from app.services.execution_scheduler import execution_scheduler
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Status persistidos a partir dos quais uma execução pode ser retomada
+RESUMABLE_STATUSES = [ExecutionStatus.FAILED, ExecutionStatus.CANCELLED]
+
 
 class TeamOrchestrator:
     """Orquestrador de equipes de agentes."""
@@ -80,6 +84,12 @@ class TeamOrchestrator:
         """
         Inicia a execução de uma equipe.
         
+        A execução é entregue ao escalonador global, que a inicia assim que
+        houver um worker disponível e o usuário estiver abaixo do seu limite de
+        execuções simultâneas. Até lá, a execução permanece pendente na fila.
+        A prioridade informada em execution_config ordena as execuções do
+        próprio usuário.
+        
         Args:
             user_id: ID do usuário
             execution_data: Dados da execução
@@ -89,27 +99,55 @@ class TeamOrchestrator:
             
         Raises:
             ValueError: Se a equipe não existir ou o usuário não tiver acesso
+            ExecutionAdmissionError: Se a fila de execuções excedeu os limites configurados
         """
-        # Verifica o limite de execuções concorrentes
-        active_count = await self._count_active_executions(user_id)
-        if active_count >= self.settings.MAX_CONCURRENT_EXECUTIONS:
-            raise ValueError(f"Maximum number of concurrent executions ({self.settings.MAX_CONCURRENT_EXECUTIONS}) reached")
-        
-        # Cria a execução
-        execution_response = await self.execution_repository.create_execution(user_id, execution_data)
-        execution_id = execution_response.execution_id
+        # Recusa a execução antes de criá-la se a fila estiver cheia
+        execution_scheduler.check_admission(str(user_id))
         
         # Obtém a configuração da equipe
         team_config = await self.team_repository.get_team_config(execution_data.team_id, user_id)
         if not team_config:
             raise ValueError(f"Team {execution_data.team_id} not found or access denied")
         
-        # Inicia a execução em background
-        asyncio.create_task(self._execute_team_background(
-            execution_id,
-            team_config,
-            execution_data.initial_prompt
-        ))
+        # Cria a execução
+        execution_response = await self.execution_repository.create_execution(user_id, execution_data)
+        execution_id = execution_response.execution_id
+        
+        execution_config = execution_data.execution_config or {}
+        try:
+            admission = execution_scheduler.submit(
+                str(execution_id),
+                str(user_id),
+                lambda: self._execute_team_background(
+                    execution_id,
+                    team_config,
+                    execution_data.initial_prompt,
+                    execution_config
+                ),
+                priority=int(execution_config.get("priority", 0)),
+                cost=len(team_config.workflow_definition.agents),
+                on_dropped=lambda: self._mark_interrupted(execution_id)
+            )
+        except ValueError as e:
+            # A fila encheu enquanto a execução era criada
+            await self.execution_repository.update_execution_status(
+                execution_id,
+                ExecutionStatus.CANCELLED,
+                error_message=str(e)
+            )
+            raise
+        
+        if not admission.started:
+            await websocket_manager.broadcast(
+                execution_id,
+                {
+                    "type": "status_update",
+                    "data": {
+                        "status": ExecutionStatus.PENDING.value,
+                        "queue_position": admission.position
+                    }
+                }
+            )
         
         return execution_response
     
@@ -117,7 +155,9 @@ class TeamOrchestrator:
         self, 
         execution_id: UUID,
         team_config: Any,
-        initial_prompt: str
+        initial_prompt: str,
+        execution_config: Optional[Dict[str, Any]] = None,
+        resume: bool = False
     ):
         """
         Executa uma equipe em background.
@@ -126,6 +166,8 @@ class TeamOrchestrator:
             execution_id: ID da execução
             team_config: Configuração da equipe
             initial_prompt: Prompt inicial
+            execution_config: Configurações específicas desta execução
+            resume: Se True, retoma a execução a partir dos passos já concluídos
         """
         # Registra a execução como ativa
         self.active_executions[str(execution_id)] = {
@@ -151,9 +193,16 @@ class TeamOrchestrator:
                 }
             )
         
+        heartbeat = asyncio.create_task(self._heartbeat(execution_id))
         try:
             # Executa a equipe
-            await self.execution_engine.execute_plan(execution_id, team_config, initial_prompt)
+            await self.execution_engine.execute_plan(
+                execution_id,
+                team_config,
+                initial_prompt,
+                execution_config,
+                resume=resume
+            )
             
             # Coleta métricas de uso e custo
             await self._collect_metrics(execution_id)
@@ -175,6 +224,12 @@ class TeamOrchestrator:
                     }
                 )
             
+        except asyncio.CancelledError:
+            # Encerramento do worker: a execução fica cancelada e pode ser retomada depois
+            logger.warning(f"Execution {execution_id} interrupted before completion")
+            await self._mark_interrupted(execution_id)
+            raise
+        
         except Exception as e:
             logger.error(f"Error executing team {team_config.team_id} (execution {execution_id}): {str(e)}", exc_info=True)
             
@@ -197,9 +252,102 @@ class TeamOrchestrator:
                 )
         
         finally:
+            heartbeat.cancel()
             # Remove a execução da lista de ativas
             self.active_executions.pop(str(execution_id), None)
     
+    async def _heartbeat(self, execution_id: UUID):
+        """Renova o heartbeat da execução enquanto ela está em andamento neste worker."""
+        while True:
+            await asyncio.sleep(self.settings.TEAM_EXECUTION_HEARTBEAT_INTERVAL)
+            await self.execution_repository.touch_execution(execution_id)
+    
+    async def _mark_interrupted(self, execution_id: UUID):
+        """Marca como cancelada uma execução interrompida pelo encerramento do worker."""
+        await self.execution_repository.update_execution_status(
+            execution_id,
+            ExecutionStatus.CANCELLED,
+            error_message="Execution interrupted by worker shutdown"
+        )
+    
+    async def resume_execution(self, execution_id: UUID, user_id: UUID) -> bool:
+        """
+        Retoma uma execução que falhou ou foi interrompida.
+        
+        Uma execução interrompida pelo encerramento do worker fica cancelada.
+        Uma execução que continua "running" só pode ser retomada se seu worker
+        deixou de renovar o heartbeat há mais de TEAM_EXECUTION_LEASE_SECONDS.
+        
+        Os passos já concluídos não são executados novamente: o contexto é
+        restaurado a partir do último checkpoint e a execução continua a partir
+        do primeiro passo incompleto.
+        
+        Args:
+            execution_id: ID da execução
+            user_id: ID do usuário
+            
+        Returns:
+            True se a execução foi enviada para ser retomada, False se não existir
+            
+        Raises:
+            ValueError: Se a execução já foi concluída ou ainda está em andamento
+            ExecutionAdmissionError: Se a fila de execuções excedeu os limites configurados
+        """
+        execution = await self.execution_repository.get_execution(execution_id, user_id)
+        if not execution:
+            return False
+        
+        if execution['status'] == ExecutionStatus.COMPLETED.value:
+            raise ValueError(f"Execution {execution_id} already completed")
+        if execution_scheduler.is_active(str(execution_id)) or execution['status'] not in (
+            RESUMABLE_STATUSES + [ExecutionStatus.RUNNING]
+        ):
+            raise ValueError(f"Execution {execution_id} is already running")
+        
+        team_config = await self.team_repository.get_team_config(UUID(str(execution['team_id'])), user_id)
+        if not team_config:
+            raise ValueError(f"Team {execution['team_id']} not found or access denied")
+        
+        # A execução pode estar rodando em outro worker ou instância: apenas quem
+        # conseguir movê-la de failed/cancelled (ou de running com o heartbeat
+        # expirado) para pending pode retomá-la
+        previous_status = ExecutionStatus(execution['status'])
+        claimed = await self.execution_repository.transition_execution_status(
+            execution_id,
+            user_id,
+            RESUMABLE_STATUSES,
+            ExecutionStatus.PENDING,
+            stale_before=datetime.now() - timedelta(seconds=self.settings.TEAM_EXECUTION_LEASE_SECONDS)
+        )
+        if not claimed:
+            raise ValueError(f"Execution {execution_id} is already running")
+        
+        try:
+            execution_scheduler.submit(
+                str(execution_id),
+                str(user_id),
+                lambda: self._execute_team_background(
+                    execution_id,
+                    team_config,
+                    execution['initial_prompt'],
+                    resume=True
+                ),
+                cost=len(team_config.workflow_definition.agents),
+                on_dropped=lambda: self._mark_interrupted(execution_id)
+            )
+        except ValueError:
+            # Devolve a execução ao status anterior para que possa ser retomada depois
+            await self.execution_repository.transition_execution_status(
+                execution_id,
+                user_id,
+                [ExecutionStatus.PENDING],
+                previous_status
+            )
+            raise
+        
+        logger.info(f"Resuming execution {execution_id} of user {user_id}")
+        return True
+    
     async def get_execution_status(
         self, 
         execution_id: UUID, 
@@ -250,6 +398,15 @@ class TeamOrchestrator:
         if not execution:
             return False
         
+        # Uma execução que ainda aguarda na fila é apenas removida dela
+        if execution['status'] == ExecutionStatus.PENDING.value and execution_scheduler.cancel(str(execution_id)):
+            await self.execution_repository.update_execution_status(
+                execution_id,
+                ExecutionStatus.CANCELLED,
+                error_message="Execution cancelled by user"
+            )
+            return True
+        
         # Verifica se a execução está em andamento
         if execution['status'] != ExecutionStatus.RUNNING.value:
             return False
@@ -403,19 +560,6 @@ class TeamOrchestrator:
         # Não é necessário fazer nada aqui, a limpeza é feita no método subscribe_to_execution_updates
         pass
     
-    async def _count_active_executions(self, user_id: UUID) -> int:
-        """
-        Conta o número de execuções ativas do usuário.
-        
-        Args:
-            user_id: ID do usuário
-            
-        Returns:
-            Número de execuções ativas
-        """
-        user_id_str = str(user_id)
-        return sum(1 for execution in self.active_executions.values() if execution["user_id"] == user_id_str)
-    
     async def _collect_metrics(self, execution_id: UUID):
         """
         Coleta métricas de uso e custo de uma execução.
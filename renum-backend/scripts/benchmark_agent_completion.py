@@ -0,0 +1,139 @@
+"""
+Benchmark for waiting on agent runs in SunaApiClient.
+
+Runs a ten-step pipeline against a local stand-in for the Suna Core API.
+Each step starts an agent run that takes a random 0.2-1.5 s and then waits
+for it to finish in one of three ways:
+
+    polling   - get_agent_run_status every second, then get_agent_run_responses
+                (the previous wait_for_agent_completion)
+    backoff   - wait_for_agent_completion(use_stream=False): polling from
+                0.5 s with exponential backoff
+    stream    - wait_for_agent_completion(): the run's SSE stream, resolved
+                on its final status message
+
+Reports the end-to-end latency of the pipeline, the time lost between a run
+finishing and the step noticing it, and the number of requests made.
+
+Usage:
+    python scripts/benchmark_agent_completion.py [--steps 10] [--seed 7]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from aiohttp import web
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from app.services.suna_api_client import SunaApiClient, SunaApiError  # noqa: E402
+
+
+class FakeSuna:
+    """Agent runs that finish after a fixed duration, exposed like the Suna Core API."""
+
+    def __init__(self):
+        self.runs = {}
+        self.requests = 0
+
+    def start(self, duration: float) -> str:
+        run_id = str(uuid.uuid4())
+        self.runs[run_id] = {"ends_at": time.monotonic() + duration, "done": asyncio.Event()}
+        asyncio.get_running_loop().call_later(duration, self.runs[run_id]["done"].set)
+        return run_id
+
+    def status(self, run_id: str) -> str:
+        return "completed" if self.runs[run_id]["done"].is_set() else "running"
+
+    @web.middleware
+    async def count_requests(self, request, handler):
+        self.requests += 1
+        return await handler(request)
+
+    async def get_status(self, request):
+        return web.json_response({"status": self.status(request.match_info["run_id"])})
+
+    async def get_responses(self, request):
+        return web.json_response({"responses": [{"type": "assistant", "content": "done"}]})
+
+    async def get_stream(self, request):
+        run = self.runs[request.match_info["run_id"]]
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(f"id: 1-0\ndata: {json.dumps({'type': 'status', 'status': 'running'})}\n\n".encode())
+        await run["done"].wait()
+        await response.write(f"id: 2-0\ndata: {json.dumps({'type': 'assistant', 'content': 'done'})}\n\n".encode())
+        await response.write(f"id: 3-0\ndata: {json.dumps({'type': 'status', 'status': 'completed'})}\n\n".encode())
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.count_requests])
+        app.router.add_get("/api/agent-run/{run_id}", self.get_status)
+        app.router.add_get("/api/agent-run/{run_id}/responses", self.get_responses)
+        app.router.add_get("/api/agent-run/{run_id}/stream", self.get_stream)
+        return app
+
+
+async def wait_by_polling(client: SunaApiClient, run_id: str) -> dict:
+    # The previous wait_for_agent_completion
+    while True:
+        status = await client.get_agent_run_status(run_id)
+        if status.get("status") == "completed":
+            return {"status": "completed", "responses": await client.get_agent_run_responses(run_id)}
+        if status.get("status") in ("failed", "stopped"):
+            raise SunaApiError(status.get("status"))
+        await asyncio.sleep(1.0)
+
+
+async def run_pipeline(label: str, suna: FakeSuna, client: SunaApiClient, durations, wait) -> None:
+    requests_before = suna.requests
+    overhead = 0.0
+    start = time.monotonic()
+    for duration in durations:
+        run_id = suna.start(duration)
+        result = await wait(client, run_id)
+        assert result["status"] == "completed" and result["responses"]
+        overhead += time.monotonic() - suna.runs[run_id]["ends_at"]
+    total = time.monotonic() - start
+    print(f"{label:<10} {total:7.2f} s end-to-end  {overhead:6.2f} s waiting after runs finished  "
+          f"{suna.requests - requests_before:4d} requests")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=10, help="Steps in the pipeline")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the run durations")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    durations = [rng.uniform(0.2, 1.5) for _ in range(args.steps)]
+    print(f"{args.steps}-step pipeline, agent runs take {sum(durations):.2f} s in total\n")
+
+    suna = FakeSuna()
+    runner = web.AppRunner(suna.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = SunaApiClient(f"http://127.0.0.1:{port}")
+
+    try:
+        await run_pipeline("polling", suna, client, durations, wait_by_polling)
+        await run_pipeline("backoff", suna, client, durations,
+                           lambda c, run_id: c.wait_for_agent_completion(run_id, use_stream=False))
+        await run_pipeline("stream", suna, client, durations,
+                           lambda c, run_id: c.wait_for_agent_completion(run_id))
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark for the memory use of RAG document ingestion.
+
+Extracts and chunks synthetic TXT and CSV files (100MB by default) in two ways:
+
+    buffered   - the whole file is read into memory, extracted to one string
+                 and chunked into one list (the previous pipeline)
+    streaming  - the file is read through FileProcessor.iter_text and chunked
+                 with ChunkingService.iter_chunks, one segment at a time
+
+Embedding and storage are left out: the ingestion pipeline hands them bounded
+batches of chunks either way. Each run happens in its own process so that its
+peak RSS can be measured independently.
+
+Usage:
+    python scripts/benchmark_ingestion_memory.py [--size-mb 100] [--chunk-size 1000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+FILE_TYPES = {
+    "txt": "text/plain",
+    "csv": "text/csv",
+}
+
+WORDS = [
+    "agent", "team", "document", "collection", "embedding", "retrieval", "context",
+    "workflow", "execution", "knowledge", "vector", "query", "result", "memory",
+]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generate_file(path: Path, file_type: str, size_mb: int) -> None:
+    """Write a synthetic file of roughly size_mb megabytes."""
+    rng = random.Random(42)
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if file_type == "csv":
+            f.write("id,name,category,description\n")
+        row = 0
+        while written < target:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24)))
+            if file_type == "csv":
+                line = f"{row},item {row},{rng.choice(WORDS)},\"{sentence}.\"\n"
+            else:
+                line = sentence.capitalize() + ".\n" + ("\n" if rng.random() < 0.2 else "")
+            f.write(line)
+            written += len(line)
+            row += 1
+
+
+def run_worker(mode: str, file_type: str, path: str, chunk_size: int, chunk_overlap: int) -> dict:
+    """Extract and chunk one file, reporting peak RSS and throughput."""
+    from app.rag.services.chunking_service import ChunkingService
+    from app.rag.services.ingestion_service import FileProcessor
+
+    processor = FileProcessor()
+    chunking_service = ChunkingService()
+    metadata = {"name": os.path.basename(path), "file_type": FILE_TYPES[file_type]}
+    baseline_mb = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == "buffered":
+        with open(path, "rb") as f:
+            content = f.read()
+        text, extracted_metadata = asyncio.run(processor.extract_text(content, metadata))
+        chunks = chunking_service.chunk_text(text, chunk_size, chunk_overlap, "fixed_size", extracted_metadata)
+        chunk_count = len(chunks)
+    else:
+        with open(path, "rb") as f:
+            segments, extracted_metadata = asyncio.run(processor.iter_text(f, metadata))
+            chunk_count = 0
+            for _ in chunking_service.iter_chunks(segments, chunk_size, chunk_overlap, "fixed_size", extracted_metadata):
+                chunk_count += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "chunks": chunk_count,
+        "seconds": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline_mb,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=100, help="Size of each synthetic file")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--worker", nargs=3, metavar=("MODE", "TYPE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # The services read their settings on import; no external service is contacted
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+    if args.worker:
+        mode, file_type, path = args.worker
+        print(json.dumps(run_worker(mode, file_type, path, args.chunk_size, args.chunk_overlap)))
+        return
+
+    print(f"{args.size_mb}MB files, chunk_size={args.chunk_size}, chunk_overlap={args.chunk_overlap}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for file_type in FILE_TYPES:
+            path = Path(tmp_dir) / f"synthetic.{file_type}"
+            generate_file(path, file_type, args.size_mb)
+            size_mb = path.stat().st_size / (1024 * 1024)
+            for mode in ("buffered", "streaming"):
+                output = subprocess.run(
+                    [sys.executable, __file__, "--chunk-size", str(args.chunk_size),
+                     "--chunk-overlap", str(args.chunk_overlap), "--worker", mode, file_type, str(path)],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"{file_type:<4} {mode:<10} {result['chunks']:8d} chunks  "
+                      f"{size_mb / result['seconds']:6.1f} MB/s  "
+                      f"peak RSS {result['peak_rss_mb']:7.1f} MB "
+                      f"(+{result['peak_rss_mb'] - result['baseline_rss_mb']:.1f} MB over imports)")
+
+
+if __name__ == "__main__":
+    main()
@@ -33,9 +33,13 @@ CREATE TABLE IF NOT EXISTS renum_team_executions (
     api_keys_used JSONB DEFAULT '{}', -- Registro das API keys utilizadas
     started_at TIMESTAMP WITH TIME ZONE,
     completed_at TIMESTAMP WITH TIME ZONE,
+    heartbeat_at TIMESTAMP WITH TIME ZONE, -- Renovado pelo worker enquanto a execução está em andamento
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Bancos criados antes da coluna heartbeat_at
+ALTER TABLE renum_team_executions ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE;
+
 -- Log de execução de agentes individuais na equipe
 CREATE TABLE IF NOT EXISTS renum_team_agent_executions (
     execution_id UUID REFERENCES renum_team_executions(execution_id) ON DELETE CASCADE,
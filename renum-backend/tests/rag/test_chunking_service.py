@@ -0,0 +1,93 @@
+"""
+Tests for the chunking service.
+
+This module contains tests for chunking text that arrives in segments with
+ChunkingService.iter_chunks.
+"""
+
+import random
+
+import pytest
+
+from app.rag.services.chunking_service import ChunkingService
+
+
+def split_randomly(text, seed):
+    """Split text into segments of random length."""
+    rng = random.Random(seed)
+    segments = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 300)
+        segments.append(text[position:position + size])
+        position += size
+    return segments
+
+
+@pytest.fixture
+def text():
+    """Text with paragraphs, sentences and words."""
+    rng = random.Random(0)
+    words = ["alpha", "beta", "gamma", "delta", "epsilon"]
+    paragraphs = []
+    for _ in range(40):
+        sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(3, 15))).capitalize() + "."
+                     for _ in range(rng.randint(1, 6))]
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+@pytest.mark.parametrize("chunking_strategy", ["fixed_size", "paragraph", "sentence"])
+def test_iter_chunks_does_not_depend_on_segmentation(text, chunking_strategy):
+    """Chunks are the same however the text is split into segments."""
+    service = ChunkingService()
+    expected = service.chunk_text(text, chunk_size=300, chunk_overlap=50, chunking_strategy=chunking_strategy)
+
+    for seed in range(5):
+        chunks = list(service.iter_chunks(
+            split_randomly(text, seed), chunk_size=300, chunk_overlap=50, chunking_strategy=chunking_strategy
+        ))
+        assert chunks == expected
+
+
+def test_fixed_size_chunking_stops_at_end_of_text():
+    """The last chunk is produced once, even with an overlap."""
+    chunks = ChunkingService().chunk_text("word " * 100, chunk_size=120, chunk_overlap=40)
+
+    assert chunks[-1]["metadata"]["end_char"] == 500
+    assert sum(1 for chunk in chunks if chunk["metadata"]["end_char"] == 500) == 1
+
+
+def test_paragraph_chunking_splits_oversized_paragraph():
+    """A paragraph without separators is split instead of buffered whole."""
+    chunks = list(ChunkingService().iter_chunks(["x" * 1000] * 10, chunk_size=500, chunking_strategy="paragraph"))
+
+    assert "".join(chunk["content"] for chunk in chunks) == "x" * 10000
+    assert max(len(chunk["content"]) for chunk in chunks) <= 1000
+
+
+@pytest.mark.parametrize("chunking_strategy", ["paragraph", "sentence"])
+def test_oversized_units_are_cut_the_same_however_the_text_is_split(chunking_strategy):
+    """A unit longer than the chunk size is cut even when a segment ends right after it."""
+    service = ChunkingService()
+    text = "a" * 250 + "\n\n" + "b. " * 50 + "\n\n" + "c" * 99 + "! \n \n" + "d"
+
+    expected = service.chunk_text(text, chunk_size=100, chunking_strategy=chunking_strategy)
+    assert max(len(chunk["content"]) for chunk in expected) <= 100
+
+    for cut in [250, 251, 252, len(text) - 5, len(text) - 3]:
+        chunks = list(service.iter_chunks(
+            [text[:cut], text[cut:]], chunk_size=100, chunking_strategy=chunking_strategy
+        ))
+        assert chunks == expected
+
+
+def test_fixed_size_chunks_smaller_than_the_break_window():
+    """Chunks do not depend on segmentation when they are shorter than the whitespace search."""
+    service = ChunkingService()
+    text = "ab cd\nef gh. ij\n\nkl mn op " * 20
+
+    expected = service.chunk_text(text, chunk_size=8, chunk_overlap=2)
+    for seed in range(5):
+        chunks = list(service.iter_chunks(split_randomly(text, seed), chunk_size=8, chunk_overlap=2))
+        assert chunks == expected
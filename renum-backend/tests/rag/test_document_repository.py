@@ -0,0 +1,105 @@
+"""
+Tests for the bulk chunk writes of the document repository.
+
+This module contains tests for DocumentRepository.create_chunks and
+DocumentRepository.update_chunk_embeddings.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.rag.repositories.document_repository import DocumentRepository
+
+
+def make_chunks(count):
+    """Build chunks ready for create_chunks."""
+    return [
+        {
+            "id": f"chunk-{i}",
+            "document_id": "doc-1",
+            "content": f"content {i}",
+            "chunk_index": i,
+            "metadata": {},
+            "embedding": [0.1, 0.2]
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def mock_db_client():
+    """Mock the database client used by the repository."""
+    client = MagicMock()
+    client.table.return_value.upsert.return_value.execute = AsyncMock(return_value=MagicMock(data=[{}]))
+    client.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=1))
+    with patch("app.rag.repositories.document_repository.get_db_client", AsyncMock(return_value=client)):
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    """Skip the retry backoff."""
+    with patch("app.rag.repositories.document_repository.asyncio.sleep", AsyncMock()):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_create_chunks_writes_one_request_per_batch(mock_db_client):
+    """Chunks are written with one upsert per batch and progress is reported per batch."""
+    progress = []
+
+    async def on_batch(written, total):
+        progress.append((written, total))
+
+    written = await DocumentRepository().create_chunks(
+        make_chunks(250), batch_size=100, max_retries=0, on_batch=on_batch
+    )
+
+    assert written == 250
+    upsert = mock_db_client.table.return_value.upsert
+    assert [len(call.args[0]) for call in upsert.call_args_list] == [100, 100, 50]
+    assert upsert.call_args_list[0].args[0][0]["embedding"] == [0.1, 0.2]
+    assert progress == [(100, 250), (200, 250), (250, 250)]
+
+
+@pytest.mark.asyncio
+async def test_create_chunks_retries_failed_batch(mock_db_client):
+    """A failed batch is retried and the following batches are still written."""
+    execute = mock_db_client.table.return_value.upsert.return_value.execute
+    execute.side_effect = [MagicMock(data=[{}]), Exception("timeout"), MagicMock(data=[{}])]
+
+    written = await DocumentRepository().create_chunks(make_chunks(20), batch_size=10, max_retries=2)
+
+    assert written == 20
+    assert execute.await_count == 3
+    upsert = mock_db_client.table.return_value.upsert
+    assert upsert.call_args_list[1].args[0] == upsert.call_args_list[2].args[0]
+
+
+@pytest.mark.asyncio
+async def test_create_chunks_raises_after_retries(mock_db_client):
+    """A batch that keeps failing stops the write."""
+    execute = mock_db_client.table.return_value.upsert.return_value.execute
+    execute.side_effect = Exception("database unavailable")
+
+    with pytest.raises(Exception, match="database unavailable"):
+        await DocumentRepository().create_chunks(make_chunks(20), batch_size=10, max_retries=2)
+
+    assert execute.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_update_chunk_embeddings_uses_bulk_rpc(mock_db_client):
+    """Embeddings are sent with one RPC per batch."""
+    chunk_ids = [f"chunk-{i}" for i in range(5)]
+    embeddings = [[float(i)] for i in range(5)]
+
+    written = await DocumentRepository().update_chunk_embeddings(chunk_ids, embeddings, batch_size=2, max_retries=0)
+
+    assert written == 5
+    calls = mock_db_client.rpc.call_args_list
+    assert [call.args[0] for call in calls] == ["update_chunk_embeddings"] * 3
+    assert calls[0].args[1] == {"p_embeddings": [
+        {"chunk_id": "chunk-0", "embedding": [0.0]},
+        {"chunk_id": "chunk-1", "embedding": [1.0]}
+    ]}
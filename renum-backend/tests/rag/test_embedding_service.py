@@ -0,0 +1,121 @@
+"""
+Tests for the embedding service.
+
+This module contains tests for batching, rate-limit retries and the reuse of
+stored embeddings in EmbeddingService.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.rag.services.embedding_service import EmbeddingService
+
+
+class RateLimitError(Exception):
+    """Provider error carrying an HTTP status code."""
+
+    status_code = 429
+
+
+def fake_embeddings_response(texts):
+    """OpenAI-style response embedding each text as [len(text)]."""
+    return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(text))]) for text in texts])
+
+
+@pytest.fixture
+def document_repository():
+    """Repository without any stored embeddings."""
+    repository = AsyncMock()
+    repository.get_embeddings_by_content_hash.return_value = {}
+    return repository
+
+
+@pytest.fixture
+def embedding_service(document_repository):
+    """Embedding service with a mocked OpenAI client."""
+    with patch.object(EmbeddingService, "_initialize_client"):
+        service = EmbeddingService(
+            model_name="text-embedding-3-small",
+            document_repository=document_repository,
+            batch_size=2,
+            max_concurrency=2,
+            max_retries=2
+        )
+    service.client = MagicMock()
+    service.client.embeddings.create.side_effect = lambda model, input: fake_embeddings_response(input)
+    service.client_type = "openai"
+    return service
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    """Skip the retry backoff."""
+    with patch("app.rag.services.embedding_service.asyncio.sleep", AsyncMock()):
+        yield
+
+
+def test_content_hash_normalizes_whitespace():
+    """Whitespace differences do not change the content hash."""
+    assert EmbeddingService.content_hash("hello   world\n") == EmbeddingService.content_hash(" hello world")
+    assert EmbeddingService.content_hash("hello world") != EmbeddingService.content_hash("hello there")
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_splits_into_batches(embedding_service):
+    """Texts are sent in provider-sized batches and returned in order."""
+    embeddings = await embedding_service.generate_embeddings(["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert embeddings == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    batches = [call.kwargs["input"] for call in embedding_service.client.embeddings.create.call_args_list]
+    assert sorted(batches) == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_reuses_stored_and_duplicate_content(embedding_service, document_repository):
+    """Only content without a stored embedding is sent, and only once."""
+    document_repository.get_embeddings_by_content_hash.return_value = {
+        EmbeddingService.content_hash("stored"): [42.0]
+    }
+
+    embeddings = await embedding_service.generate_embeddings(["stored", "new", "new ", "stored"])
+
+    assert embeddings == [[42.0], [3.0], [3.0], [42.0]]
+    embedding_service.client.embeddings.create.assert_called_once_with(
+        model="text-embedding-3-small", input=["new"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_retries_rate_limited_batch(embedding_service):
+    """A 429 is retried with backoff."""
+    embedding_service.client.embeddings.create.side_effect = [
+        RateLimitError("slow down"),
+        fake_embeddings_response(["a"])
+    ]
+
+    embeddings = await embedding_service.generate_embeddings(["a"])
+
+    assert embeddings == [[1.0]]
+    assert embedding_service.client.embeddings.create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_does_not_retry_client_errors(embedding_service):
+    """Errors other than rate limits and server errors fail immediately."""
+    embedding_service.client.embeddings.create.side_effect = ValueError("bad input")
+
+    assert await embedding_service.generate_embeddings(["a"]) == []
+    assert embedding_service.client.embeddings.create.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_embeddings_yields_batches_in_order(embedding_service):
+    """Streamed batches come back in the order they were produced."""
+    async def batches():
+        for batch in (["a"], ["bb", "ccc"], ["dddd"]):
+            yield batch
+
+    results = [embeddings async for embeddings in embedding_service.stream_embeddings(batches())]
+
+    assert results == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
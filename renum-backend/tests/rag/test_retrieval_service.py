@@ -0,0 +1,160 @@
+"""
+Tests for the retrieval caches.
+
+This module contains tests for the query-embedding cache, the retrieval-result
+cache and its per-collection invalidation.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.rag.services.cache_service import LRUCache, RetrievalCache
+from app.rag.services.retrieval_service import RetrievalService
+
+
+class InMemoryRedis:
+    """The few Redis commands used by RetrievalCache, backed by a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.commands = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                return False
+
+            def incr(self, key):
+                self.commands.append(key)
+
+            async def execute(self):
+                for key in self.commands:
+                    redis.data[key] = int(redis.data.get(key) or 0) + 1
+
+        return Pipeline()
+
+
+SEARCH_RESULT = [{
+    "chunk_id": "chunk-1",
+    "document_id": "doc-1",
+    "content": "content",
+    "chunk_index": 0,
+    "metadata": {},
+    "similarity": 0.9,
+    "created_at": "2025-01-01T00:00:00",
+    "document_name": "Document",
+    "source_type": "text",
+    "collection_id": "col-1",
+    "collection_name": "Collection"
+}]
+
+
+@pytest.fixture
+def mock_db_client():
+    """Mock the database client used by the retrieval service."""
+    client = MagicMock()
+    client.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=SEARCH_RESULT))
+    with patch("app.rag.services.retrieval_service.get_db_client", AsyncMock(return_value=client)):
+        yield client
+
+
+@pytest.fixture
+def embedding_service():
+    """Embedding service returning a fixed embedding."""
+    service = MagicMock()
+    service.model_name = "text-embedding-3-small"
+    service.generate_embeddings = AsyncMock(return_value=[[0.1, 0.2]])
+    return service
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """The least recently used entry is evicted and counted."""
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_skips_embedding_api(mock_db_client, embedding_service):
+    """A query asked again with other parameters reuses its embedding."""
+    cache = RetrievalCache(redis_client=None)
+    service = RetrievalService(embedding_service=embedding_service, cache=cache)
+
+    await service.retrieve_relevant_chunks("What is RAG?", collection_ids=["col-1"], top_k=5)
+    chunks = await service.retrieve_relevant_chunks("What  is RAG? ", top_k=10)
+
+    assert chunks[0]["id"] == "chunk-1"
+    embedding_service.generate_embeddings.assert_awaited_once()
+    assert mock_db_client.rpc.call_count == 2
+    assert service.get_cache_stats()["query_embeddings"]["local_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_is_shared_through_redis():
+    """An embedding stored by one process is found by another."""
+    redis = InMemoryRedis()
+    await RetrievalCache(redis).set_query_embedding("model", "question", [1.0])
+
+    other = RetrievalCache(redis)
+    assert await other.get_query_embedding("model", "question") == [1.0]
+    assert other.get_stats()["query_embeddings"]["redis_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_results_are_invalidated_per_collection(mock_db_client, embedding_service):
+    """Changing a collection invalidates its results but not those of other collections."""
+    cache = RetrievalCache(redis_client=InMemoryRedis())
+    service = RetrievalService(embedding_service=embedding_service, cache=cache)
+
+    for collection_id in ("col-1", "col-2"):
+        await service.retrieve_relevant_chunks("question", collection_ids=[collection_id])
+    assert mock_db_client.rpc.call_count == 2
+
+    await cache.invalidate_collection("col-1")
+    for collection_id in ("col-1", "col-2"):
+        await service.retrieve_relevant_chunks("question", collection_ids=[collection_id])
+
+    assert mock_db_client.rpc.call_count == 3
+    assert cache.get_stats()["retrieval_results"]["hits"] == 1
+    embedding_service.generate_embeddings.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_invalidated_results_do_not_come_back():
+    """Collection generations never expire, so they cannot restart and revive old results."""
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis()
+    cache = RetrievalCache(redis_client=redis, result_ttl=60)
+
+    stale_key = await cache.get_result_key("model", "question", ["col-1"], 5, None)
+    await cache.set_results(stale_key, SEARCH_RESULT)
+    await cache.invalidate_collection("col-1")
+
+    for scope in ("col-1", RetrievalCache.ALL_COLLECTIONS):
+        assert await redis.ttl(cache._generation_key(scope)) == -1
+
+    key = await cache.get_result_key("model", "question", ["col-1"], 5, None)
+    assert key != stale_key
+    assert await cache.get_results(key) is None
@@ -0,0 +1,177 @@
+"""
+Testes para o escalonador de planos baseado em grafo de dependências.
+
+Este módulo contém testes para a derivação e validação do grafo a partir das
+entradas dos agentes, para a execução com limite de concorrência e para o
+cálculo do caminho crítico.
+"""
+
+import asyncio
+
+import pytest
+
+from app.models.team_models import InputSource, WorkflowAgent, WorkflowDefinition, WorkflowType
+from app.services.dag_scheduler import (
+    DAGScheduler,
+    DependencyCycleError,
+    build_dependency_graph,
+    critical_path,
+    input_dependencies,
+)
+
+
+def agent_result(agent_id):
+    return InputSource(source="agent_result", agent_id=agent_id)
+
+
+def combined(*agent_ids):
+    return InputSource(source="combined", sources=[{"type": "agent_result", "agent_id": a} for a in agent_ids])
+
+
+INITIAL = InputSource(source="initial_prompt")
+
+
+def eight_agent_team():
+    """Oito agentes com apenas duas dependências reais."""
+    return build_dependency_graph([
+        ("research", INITIAL),
+        ("a", INITIAL),
+        ("b", INITIAL),
+        ("c", INITIAL),
+        ("d", INITIAL),
+        ("e", INITIAL),
+        ("summary", agent_result("research")),
+        ("report", combined("summary", "a")),
+    ])
+
+
+def test_input_dependencies():
+    assert input_dependencies(INITIAL) == []
+    assert input_dependencies(agent_result("a")) == ["a"]
+    assert input_dependencies(combined("a", "b", "a")) == ["a", "b"]
+    assert input_dependencies({"source": "agent_result", "agent_id": "x"}) == ["x"]
+
+
+def test_rejects_cycles_and_unknown_agents():
+    with pytest.raises(DependencyCycleError) as error:
+        build_dependency_graph([("a", agent_result("c")), ("b", agent_result("a")), ("c", agent_result("b"))])
+    assert error.value.cycle[0] == error.value.cycle[-1]
+    assert set(error.value.cycle) == {"a", "b", "c"}
+
+    with pytest.raises(DependencyCycleError):
+        build_dependency_graph([("a", agent_result("a"))])
+
+    with pytest.raises(ValueError):
+        build_dependency_graph([("a", agent_result("missing"))])
+
+
+def test_dag_workflow_definition_is_validated():
+    with pytest.raises(ValueError):
+        WorkflowDefinition(
+            type=WorkflowType.DAG,
+            agents=[
+                WorkflowAgent(agent_id="a", input=agent_result("b")),
+                WorkflowAgent(agent_id="b", input=agent_result("a")),
+            ],
+        )
+
+
+def test_critical_path_of_the_plan():
+    path, length = critical_path(eight_agent_team())
+    assert path == ["research", "summary", "report"]
+    assert length == 3
+
+    path, length = critical_path(eight_agent_team(), {"a": 10, "summary": 1, "research": 1, "report": 1})
+    assert path == ["a", "report"]
+    assert length == 11
+
+
+@pytest.mark.asyncio
+async def test_starts_steps_as_soon_as_their_inputs_are_ready():
+    graph = eight_agent_team()
+    events = []
+    release = {step: asyncio.Event() for step in graph}
+
+    async def execute(step):
+        events.append(("start", step))
+        await release[step].wait()
+        events.append(("end", step))
+        return True
+
+    run = asyncio.create_task(DAGScheduler(graph).run(execute))
+    await asyncio.sleep(0.01)
+    # Todos os agentes sem dependências começam juntos
+    assert {step for _, step in events} == {"research", "a", "b", "c", "d", "e"}
+
+    release["research"].set()
+    await asyncio.sleep(0.01)
+    assert ("start", "summary") in events
+    assert ("start", "report") not in events
+
+    release["summary"].set()
+    await asyncio.sleep(0.01)
+    assert ("start", "report") not in events
+    release["a"].set()
+    await asyncio.sleep(0.01)
+    assert ("start", "report") in events
+
+    for event in release.values():
+        event.set()
+    result = await run
+    assert result.success
+    assert sorted(result.completed) == sorted(graph)
+
+
+@pytest.mark.asyncio
+async def test_respects_the_concurrency_cap():
+    graph = eight_agent_team()
+    running = 0
+    peak = 0
+
+    async def execute(step):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return True
+
+    result = await DAGScheduler(graph, max_concurrency=2).run(execute)
+    assert result.success
+    assert peak == 2
+    # Com vagas limitadas, o início do caminho crítico tem prioridade
+    first = sorted(result.timings, key=lambda step: result.timings[step].started_at)[:2]
+    assert "research" in first
+
+
+@pytest.mark.asyncio
+async def test_failure_skips_dependents():
+    graph = eight_agent_team()
+
+    async def execute(step):
+        await asyncio.sleep(0)
+        if step == "research":
+            raise RuntimeError("boom")
+        return True
+
+    result = await DAGScheduler(graph, fail_fast=False).run(execute)
+    assert not result.success
+    assert result.failed == ["research"]
+    assert result.skipped == ["summary", "report"]
+    assert {"a", "b", "c", "d", "e"} <= set(result.completed)
+
+
+@pytest.mark.asyncio
+async def test_reports_the_critical_path_of_the_run():
+    graph = eight_agent_team()
+    durations = {"research": 0.03, "summary": 0.03, "a": 0.01, "report": 0.01}
+
+    async def execute(step):
+        await asyncio.sleep(durations.get(step, 0.005))
+        return True
+
+    result = await DAGScheduler(graph).run(execute)
+    assert result.critical_path == ["research", "summary", "report"]
+    assert result.critical_path_duration == pytest.approx(0.07, abs=0.03)
+    assert result.wall_clock < sum(durations.values()) + 0.005 * 4
+    assert result.to_dict()["critical_path"] == ["research", "summary", "report"]
@@ -0,0 +1,227 @@
+"""
+Testes para o escalonador global de execuções de equipes.
+
+Este módulo contém testes para o limite de workers, a divisão justa entre
+usuários, as prioridades, a admissão de execuções e o limite global de
+agentes em execução.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.execution_scheduler import ExecutionAdmissionError, ExecutionScheduler
+
+
+SCHEDULERS = []
+
+
+def make_scheduler(**kwargs):
+    options = dict(workers=2, max_running_per_user=2, max_queue_depth=100, max_queued_per_user=100, max_agent_runs=10)
+    options.update(kwargs)
+    scheduler = ExecutionScheduler(**options)
+    SCHEDULERS.append(scheduler)
+    return scheduler
+
+
+@pytest.fixture(autouse=True)
+async def shutdown_schedulers():
+    """Cancela as execuções que os testes deixaram em andamento."""
+    yield
+    while SCHEDULERS:
+        await SCHEDULERS.pop().shutdown()
+
+
+class Executions:
+    """Execuções controladas pelo teste, que registram a ordem em que começaram."""
+
+    def __init__(self):
+        self.started = []
+        self.release = {}
+
+    def run(self, name):
+        self.release[name] = asyncio.Event()
+
+        async def run():
+            self.started.append(name)
+            await self.release[name].wait()
+
+        return run
+
+    async def finish(self, name):
+        self.release[name].set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_bounds_running_executions():
+    scheduler = make_scheduler(workers=2, max_running_per_user=1)
+    executions = Executions()
+
+    assert scheduler.submit("a1", "alice", executions.run("a1")).started
+    # Alice já está no seu limite; a execução aguarda na fila em vez de ser recusada
+    admission = scheduler.submit("a2", "alice", executions.run("a2"))
+    assert not admission.started and admission.position == 1
+    assert scheduler.submit("b1", "bob", executions.run("b1")).started
+    assert not scheduler.submit("c1", "carol", executions.run("c1")).started
+
+    await asyncio.sleep(0)
+    assert executions.started == ["a1", "b1"]
+    assert scheduler.get_stats()["queue_depth"] == 2
+
+    # Carol ainda não foi atendida e passa à frente da segunda execução de alice
+    await executions.finish("a1")
+    assert executions.started == ["a1", "b1", "c1"]
+    assert scheduler.get_stats()["running"] == 2
+
+
+@pytest.mark.asyncio
+async def test_large_backlog_does_not_starve_other_users():
+    scheduler = make_scheduler(workers=1, max_running_per_user=1)
+    executions = Executions()
+
+    scheduler.submit("blocker", "carol", executions.run("blocker"))
+    for i in range(6):
+        scheduler.submit(f"a{i}", "alice", executions.run(f"a{i}"), cost=5)
+    scheduler.submit("b0", "bob", executions.run("b0"))
+    scheduler.submit("b1", "bob", executions.run("b1"))
+
+    for name in ["blocker", "a0", "a1", "a2", "a3"]:
+        await asyncio.sleep(0)
+        await executions.finish(executions.started[-1])
+
+    # As execuções pequenas de bob não esperam o backlog inteiro de alice
+    assert executions.started.index("b1") < executions.started.index("a2")
+
+
+@pytest.mark.asyncio
+async def test_weights_divide_the_workers():
+    scheduler = make_scheduler(workers=1, max_running_per_user=1, user_weights={"alice": 2.0})
+    executions = Executions()
+
+    scheduler.submit("blocker", "carol", executions.run("blocker"))
+    for i in range(6):
+        scheduler.submit(f"a{i}", "alice", executions.run(f"a{i}"))
+        scheduler.submit(f"b{i}", "bob", executions.run(f"b{i}"))
+
+    for _ in range(7):
+        await asyncio.sleep(0)
+        await executions.finish(executions.started[-1])
+
+    dispatched = executions.started[1:7]
+    assert sum(name.startswith("a") for name in dispatched) == 4
+    assert sum(name.startswith("b") for name in dispatched) == 2
+
+
+@pytest.mark.asyncio
+async def test_priority_orders_the_executions_of_a_user():
+    scheduler = make_scheduler(workers=1, max_running_per_user=1)
+    executions = Executions()
+
+    scheduler.submit("first", "alice", executions.run("first"))
+    scheduler.submit("low", "alice", executions.run("low"))
+    scheduler.submit("high", "alice", executions.run("high"), priority=5)
+    assert scheduler.queue_position("high") == 1
+    assert scheduler.queue_position("low") == 2
+
+    await asyncio.sleep(0)
+    await executions.finish("first")
+    assert executions.started == ["first", "high"]
+
+
+@pytest.mark.asyncio
+async def test_rejects_executions_when_the_queue_is_full():
+    scheduler = make_scheduler(workers=1, max_running_per_user=1, max_queue_depth=3, max_queued_per_user=2)
+    executions = Executions()
+
+    scheduler.submit("a0", "alice", executions.run("a0"))
+    scheduler.submit("a1", "alice", executions.run("a1"))
+    scheduler.submit("a2", "alice", executions.run("a2"))
+    with pytest.raises(ExecutionAdmissionError):
+        scheduler.submit("a3", "alice", executions.run("a3"))
+
+    scheduler.submit("b0", "bob", executions.run("b0"))
+    with pytest.raises(ExecutionAdmissionError):
+        scheduler.submit("c0", "carol", executions.run("c0"))
+
+    stats = scheduler.get_stats()
+    assert stats["rejected"] == 2
+    assert stats["queue_depth"] == 3
+    assert stats["queue_depth_by_user"] == {"alice": 2, "bob": 1}
+
+
+@pytest.mark.asyncio
+async def test_cancel_removes_queued_execution():
+    scheduler = make_scheduler(workers=1)
+    executions = Executions()
+
+    scheduler.submit("a0", "alice", executions.run("a0"))
+    scheduler.submit("a1", "alice", executions.run("a1"))
+    scheduler.submit("a2", "alice", executions.run("a2"))
+    assert scheduler.cancel("a1")
+    assert not scheduler.cancel("a0")
+
+    await asyncio.sleep(0)
+    await executions.finish("a0")
+    assert executions.started == ["a0", "a2"]
+    assert scheduler.get_stats()["cancelled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_execution_releases_its_worker():
+    scheduler = make_scheduler(workers=1)
+    executions = Executions()
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    scheduler.submit("failing", "alice", fail)
+    scheduler.submit("next", "alice", executions.run("next"))
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert executions.started == ["next"]
+    stats = scheduler.get_stats()
+    assert stats["failed"] == 1
+    assert stats["wait_time_max"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_agent_slots_bound_agents_across_executions():
+    scheduler = make_scheduler(max_agent_runs=3)
+    running = 0
+    peak = 0
+
+    async def agent():
+        nonlocal running, peak
+        async with scheduler.agent_slot():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(agent() for _ in range(10)))
+    assert peak == 3
+    assert scheduler.get_stats()["agent_runs"] == 0
+
+
+@pytest.mark.asyncio
+async def test_shutdown_reports_dropped_executions():
+    scheduler = make_scheduler(workers=1)
+    executions = Executions()
+    dropped = []
+
+    async def on_dropped(name):
+        dropped.append(name)
+
+    scheduler.submit("a1", "alice", executions.run("a1"), on_dropped=lambda: on_dropped("a1"))
+    scheduler.submit("a2", "alice", executions.run("a2"), on_dropped=lambda: on_dropped("a2"))
+    await asyncio.sleep(0)
+
+    await scheduler.shutdown()
+
+    # Só a execução que ainda aguardava na fila é descartada; a que estava em andamento é cancelada
+    assert dropped == ["a2"]
+    assert executions.started == ["a1"]
+    assert scheduler.get_stats()["running"] == 0
@@ -0,0 +1,126 @@
+"""
+Testes para o cache de resultados de passos de equipes.
+
+Este módulo contém testes para a montagem das chaves a partir do agente, do
+prompt e das entradas, e para a leitura e escrita dos resultados no Redis,
+executados contra o fakeredis no lugar de um servidor Redis.
+"""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services.step_result_cache import StepResultCache
+
+
+@pytest.fixture
+def cache():
+    """
+    Cache sobre um Redis local em memória.
+    Returns:
+        StepResultCache: Cache de resultados
+    """
+    return StepResultCache(fakeredis.FakeAsyncRedis(), default_ttl=60)
+
+
+def test_key_depends_on_agent_prompt_and_inputs(cache):
+    inputs = {"agent_research_result": {"result": "dados"}}
+    key = cache.build_key("user-1", "summary", "v1", "Resuma", inputs)
+
+    assert key == cache.build_key("user-1", "summary", "v1", "Resuma", {"agent_research_result": {"result": "dados"}})
+    assert key.startswith("team_step_cache:user-1:summary:v1:")
+    assert key != cache.build_key("user-1", "summary", "v2", "Resuma", inputs)
+    assert key != cache.build_key("user-1", "summary", "v1", "Resuma em uma frase", inputs)
+    assert key != cache.build_key("user-1", "summary", "v1", "Resuma", {"agent_research_result": {"result": "outros"}})
+    assert key != cache.build_key("user-1", "summary", "v1", "Resuma", {})
+
+
+@pytest.mark.asyncio
+async def test_users_never_share_results(cache):
+    inputs = {"agent_research_result": {"result": "dados"}}
+    alice_key = cache.build_key("alice", "shared-agent", "v1", "Resuma", inputs)
+    bob_key = cache.build_key("bob", "shared-agent", "v1", "Resuma", inputs)
+    assert alice_key != bob_key
+
+    await cache.set(alice_key, {"status": "completed", "responses": [{"content": "dados de alice"}]}, "execution-1", 1.0)
+
+    assert await cache.get(bob_key) is None
+    assert (await cache.get(alice_key))["execution_id"] == "execution-1"
+
+
+@pytest.mark.asyncio
+async def test_stores_result_with_its_cost(cache):
+    key = cache.build_key("user-1", "summary", "v1", "Resuma", {})
+    assert await cache.get(key) is None
+
+    await cache.set(
+        key,
+        {"status": "completed", "responses": [{"content": "ok"}]},
+        "execution-1",
+        12.5,
+        {"tokens_input": 1000, "tokens_output": 200, "cost_usd": 0.02}
+    )
+
+    entry = await cache.get(key)
+    assert entry["result"]["responses"] == [{"content": "ok"}]
+    assert entry["execution_id"] == "execution-1"
+    assert entry["execution_time"] == 12.5
+    assert entry["tokens"] == 1200
+    assert entry["cost_usd"] == 0.02
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_results_expire(cache):
+    key = cache.build_key("user-1", "summary", "v1", "Resuma", {})
+
+    await cache.set(key, {"status": "completed"}, "execution-1", 1.0)
+    assert 0 < await cache.redis.ttl(key) <= 60
+
+    await cache.set(key, {"status": "completed"}, "execution-1", 1.0, ttl=3600)
+    assert 60 < await cache.redis.ttl(key) <= 3600
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_are_cache_misses():
+    class BrokenRedis:
+        async def get(self, key):
+            raise ConnectionError("redis down")
+
+        async def set(self, *args, **kwargs):
+            raise ConnectionError("redis down")
+
+    cache = StepResultCache(BrokenRedis())
+    key = cache.build_key("user-1", "summary", "v1", "Resuma", {})
+
+    await cache.set(key, {"status": "completed"}, "execution-1", 1.0)
+    assert await cache.get(key) is None
+    assert not StepResultCache(None).enabled
+
+
+@pytest.mark.asyncio
+async def test_engine_keys_results_by_the_user_of_the_execution(cache):
+    from unittest.mock import AsyncMock
+    from uuid import uuid4
+
+    from app.models.team_models import ExecutionStep
+    from app.services.execution_engine import ExecutionEngine
+
+    # O construtor do motor depende de serviços externos; só o necessário para montar a chave é preparado
+    engine = ExecutionEngine.__new__(ExecutionEngine)
+    engine.step_cache = cache
+    engine.suna_client = AsyncMock()
+    engine.suna_client.get_agent_details.return_value = {"current_version_id": "v1"}
+    engine._execution_users = {}
+
+    step = ExecutionStep(agent_id="shared-agent", cache_results=True)
+    alice_execution, bob_execution = uuid4(), uuid4()
+    engine._execution_users[str(alice_execution)] = "alice"
+    engine._execution_users[str(bob_execution)] = "bob"
+
+    alice_key = await engine._step_cache_key(alice_execution, step, "Resuma", {})
+    bob_key = await engine._step_cache_key(bob_execution, step, "Resuma", {})
+
+    assert alice_key.startswith("team_step_cache:alice:shared-agent:v1:")
+    assert bob_key.startswith("team_step_cache:bob:shared-agent:v1:")
+    assert await engine._step_cache_key(uuid4(), step, "Resuma", {}) is None
@@ -142,16 +142,17 @@ async def test_wait_for_agent_completion_success():
     # Mock para get_agent_run_status
     client.get_agent_run_status = AsyncMock(return_value={"status": "completed"})
     
-    # Mock para get_agent_run_results
-    client.get_agent_run_results = AsyncMock(return_value={"result": "success"})
+    # Mock para get_agent_run_responses
+    client.get_agent_run_responses = AsyncMock(return_value=[{"type": "assistant", "content": "success"}])
     
     # Act
-    result = await client.wait_for_agent_completion("test-run-id")
+    result = await client.wait_for_agent_completion("test-run-id", use_stream=False)
     
     # Assert
-    assert result == {"result": "success"}
+    assert result["status"] == "completed"
+    assert result["responses"] == [{"type": "assistant", "content": "success"}]
     client.get_agent_run_status.assert_called_once()
-    client.get_agent_run_results.assert_called_once()
+    client.get_agent_run_responses.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -164,7 +165,123 @@ async def test_wait_for_agent_completion_failure():
     client.get_agent_run_status = AsyncMock(return_value={"status": "failed", "error": "Test error"})
     
     # Act & Assert
-    with pytest.raises(SunaApiError):
-        await client.wait_for_agent_completion("test-run-id")
+    with pytest.raises(SunaApiError, match="Test error"):
+        await client.wait_for_agent_completion("test-run-id", use_stream=False)
+    
+    client.get_agent_run_status.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_wait_for_agent_completion_via_stream():
+    """Testa a detecção da conclusão pelo stream da execução, sem consultar o status."""
+    # Arrange
+    client = SunaApiClient("http://localhost:8000")
+    
+    async def stream(agent_run_id, last_event_id=None):
+        yield "1-0", {"type": "assistant", "content": "resultado"}
+        yield "2-0", {"type": "status", "status": "completed"}
+    
+    client.stream_agent_run = stream
+    client.get_agent_run_status = AsyncMock()
     
-    client.get_agent_run_status.assert_called_once()
\ No newline at end of file
+    # Act
+    result = await client.wait_for_agent_completion("test-run-id")
+    
+    # Assert
+    assert result["status"] == "completed"
+    assert result["responses"] == [{"type": "assistant", "content": "resultado"}]
+    client.get_agent_run_status.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_agent_completion_stream_resumes_after_last_event():
+    """Testa a reconexão do stream a partir do último evento recebido."""
+    # Arrange
+    client = SunaApiClient("http://localhost:8000")
+    calls = []
+    
+    async def stream(agent_run_id, last_event_id=None):
+        calls.append(last_event_id)
+        if len(calls) == 1:
+            yield "1-0", {"type": "assistant", "content": "parte 1"}
+            raise SunaApiError("connection reset")
+        yield "2-0", {"type": "assistant", "content": "parte 2"}
+        yield "3-0", {"type": "status", "status": "completed"}
+    
+    client.stream_agent_run = stream
+    client.get_agent_run_status = AsyncMock(return_value={"status": "running"})
+    
+    # Act
+    result = await client.wait_for_agent_completion("test-run-id")
+    
+    # Assert
+    assert calls == [None, "1-0"]
+    assert [r["content"] for r in result["responses"]] == ["parte 1", "parte 2"]
+    client.get_agent_run_status.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_agent_completion_stream_failure_falls_back_to_polling():
+    """Testa o uso da consulta de status quando o stream não está disponível."""
+    # Arrange
+    client = SunaApiClient("http://localhost:8000")
+    
+    async def stream(agent_run_id, last_event_id=None):
+        raise SunaApiError("Suna API returned 404")
+        yield
+    
+    client.stream_agent_run = stream
+    # O stream só é reaberto enquanto a execução está em andamento
+    client.get_agent_run_status = AsyncMock(side_effect=[
+        {"status": "running"}, {"status": "running"}, {"status": "running"}, {"status": "running"},
+        {"status": "running"}, {"status": "completed"}
+    ])
+    client.get_agent_run_responses = AsyncMock(return_value=[{"type": "assistant", "content": "ok"}])
+    
+    # Act
+    with patch("asyncio.sleep", new=AsyncMock()) as sleep:
+        result = await client.wait_for_agent_completion("test-run-id", polling_interval=0.5)
+    
+    # Assert
+    assert result["responses"] == [{"type": "assistant", "content": "ok"}]
+    assert client.get_agent_run_status.call_count == 6
+    sleep.assert_called_once_with(0.5)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_agent_completion_stream_error_falls_back_to_polling():
+    """Testa que um status de erro do stream é confirmado pela consulta de status."""
+    # Arrange
+    client = SunaApiClient("http://localhost:8000")
+    
+    async def stream(agent_run_id, last_event_id=None):
+        yield "1-0", {"type": "assistant", "content": "parte 1"}
+        yield None, {"type": "status", "status": "error", "message": "Stream failed: redis timeout"}
+    
+    client.stream_agent_run = stream
+    client.get_agent_run_status = AsyncMock(side_effect=[{"status": "running"}, {"status": "completed"}])
+    client.get_agent_run_responses = AsyncMock(return_value=[{"type": "assistant", "content": "ok"}])
+    
+    # Act
+    with patch("asyncio.sleep", new=AsyncMock()):
+        result = await client.wait_for_agent_completion("test-run-id")
+    
+    # Assert
+    assert result["status"] == "completed"
+    assert result["responses"] == [{"type": "assistant", "content": "ok"}]
+    assert client.get_agent_run_status.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_wait_for_agent_completion_stream_reports_failure():
+    """Testa o erro quando o stream termina com status de falha."""
+    # Arrange
+    client = SunaApiClient("http://localhost:8000")
+    
+    async def stream(agent_run_id, last_event_id=None):
+        yield None, {"type": "status", "status": "failed", "message": "Tool error"}
+    
+    client.stream_agent_run = stream
+    
+    # Act & Assert
+    with pytest.raises(SunaApiError, match="Tool error"):
+        await client.wait_for_agent_completion("test-run-id")
@@ -0,0 +1,204 @@
+"""
+Testes para o gerenciador de contexto compartilhado.
+
+Este módulo contém testes para as atualizações atômicas de variáveis do
+TeamContextManager, executados contra o fakeredis (com suporte a Lua) no lugar
+de um servidor Redis.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app.services.team_context_manager import TeamContextManager
+
+
+EXECUTION_ID = "6f1b7c1e-0000-4000-8000-000000000001"
+
+
+@pytest.fixture
+def redis_client():
+    """
+    Redis local em memória.
+    Returns:
+        FakeAsyncRedis: Cliente Redis em memória
+    """
+    return fakeredis.FakeAsyncRedis()
+
+
+@pytest.fixture
+async def context_manager(redis_client):
+    """
+    Gerenciador de contexto com um contexto já criado.
+    Returns:
+        TeamContextManager: Gerenciador de contexto
+    """
+    manager = TeamContextManager(redis_client)
+    await manager.create_context(EXECUTION_ID, {"initial": True})
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_set_variable_writes_single_field(context_manager, redis_client):
+    """Testa que cada variável é armazenada em um campo próprio e a versão é incrementada."""
+    await context_manager.set_variable(EXECUTION_ID, "plan", {"steps": [1, 2]}, "agent-1")
+
+    context_key = f"team_context:{EXECUTION_ID}"
+    assert json.loads(await redis_client.hget(context_key, "var:plan")) == {"steps": [1, 2]}
+    assert await context_manager.get_variable(EXECUTION_ID, "plan") == {"steps": [1, 2]}
+
+    context = await context_manager.get_context(EXECUTION_ID)
+    assert context.variables == {"initial": True, "plan": {"steps": [1, 2]}}
+    assert context.version == 2
+    assert context.metadata["last_updated_by"] == "agent-1"
+
+
+@pytest.mark.asyncio
+async def test_set_variable_missing_context(context_manager):
+    """Testa que definir uma variável em um contexto inexistente falha."""
+    with pytest.raises(ValueError):
+        await context_manager.set_variable("00000000-0000-4000-8000-000000000000", "key", 1, "agent-1")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_set_variable_keeps_every_update(context_manager):
+    """Testa que agentes concorrentes não perdem as atualizações uns dos outros."""
+    agents, writes = 20, 25
+
+    async def agent(agent_index):
+        for write in range(writes):
+            await context_manager.set_variable(EXECUTION_ID, f"agent_{agent_index}", write, f"agent-{agent_index}")
+
+    await asyncio.gather(*(agent(i) for i in range(agents)))
+
+    context = await context_manager.get_context(EXECUTION_ID)
+    assert all(context.variables[f"agent_{i}"] == writes - 1 for i in range(agents))
+    assert context.version == 1 + agents * writes
+
+
+@pytest.mark.asyncio
+async def test_concurrent_messages_are_all_appended(context_manager):
+    """Testa que mensagens adicionadas ao mesmo tempo por vários agentes não se perdem."""
+    await asyncio.gather(*(
+        context_manager.add_message_to_context(
+            "thread-1", "text", f"message {i}", execution_id=EXECUTION_ID, agent_id=f"agent-{i % 5}"
+        )
+        for i in range(100)
+    ))
+
+    messages = await context_manager.get_variable(EXECUTION_ID, "messages")
+    assert sorted(message["content"] for message in messages) == sorted(f"message {i}" for i in range(100))
+
+
+@pytest.mark.asyncio
+async def test_batch_update_context_skips_missing_contexts(context_manager):
+    """Testa que a atualização em lote aplica todas as mudanças em uma transação."""
+    await context_manager.batch_update_context([
+        {"execution_id": EXECUTION_ID, "key": "a", "value": 1, "agent_id": "agent-1"},
+        {"execution_id": "00000000-0000-4000-8000-000000000000", "key": "a", "value": 1, "agent_id": "agent-1"},
+        {"execution_id": EXECUTION_ID, "key": "b", "value": [2], "agent_id": "agent-2"},
+    ])
+
+    assert await context_manager.get_all_variables(EXECUTION_ID) == {"initial": True, "a": 1, "b": [2]}
+    assert (await context_manager.get_context(EXECUTION_ID)).version == 3
+
+
+@pytest.mark.asyncio
+async def test_delete_variable_publishes_change(context_manager, redis_client):
+    """Testa que remover uma variável publica a mudança com o valor anterior."""
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(f"team_context_changes:{EXECUTION_ID}")
+    await pubsub.get_message(timeout=1)
+
+    await context_manager.delete_variable(EXECUTION_ID, "initial", "agent-1")
+
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+    change = json.loads(message["data"])
+    assert change["key"] == "initial"
+    assert change["value"] is None
+    assert change["previous_value"] is True
+    assert await context_manager.get_variable(EXECUTION_ID, "initial") is None
+    await pubsub.aclose()
+
+
+class InMemorySnapshotTable:
+    """Tabela de snapshots em memória, com o subconjunto de consultas usado pelo gerenciador."""
+
+    def __init__(self):
+        self.rows = []
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._insert = None
+
+    def table(self, name):
+        assert name == "renum_team_context_snapshots"
+        self._filters, self._order, self._limit, self._insert = [], None, None, None
+        return self
+
+    def insert(self, row):
+        self._insert = row
+        return self
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    async def execute(self):
+        if self._insert is not None:
+            self.rows.append(json.loads(json.dumps(self._insert)))
+            return type("Result", (), {"data": [self._insert]})
+        rows = [row for row in self.rows if all(row[c] == v for c, v in self._filters)]
+        if self._order:
+            rows.sort(key=lambda row: row[self._order[0]], reverse=self._order[1])
+        return type("Result", (), {"data": rows[:self._limit] if self._limit else rows})
+
+
+@pytest.mark.asyncio
+async def test_resumes_from_latest_checkpoint(redis_client):
+    """Testa que o contexto volta ao checkpoint do último passo concluído."""
+    db = InMemorySnapshotTable()
+    manager = TeamContextManager(redis_client, db)
+    await manager.create_context(EXECUTION_ID, {"initial": True})
+
+    await manager.set_variable(EXECUTION_ID, "agent_a_result", {"result": "a"}, "a")
+    await manager.checkpoint(EXECUTION_ID, "a")
+    await manager.set_variable(EXECUTION_ID, "agent_b_result", {"result": "b"}, "b")
+    await manager.checkpoint(EXECUTION_ID, "b")
+
+    # O passo seguinte falha depois de escrever no contexto
+    await manager.set_variable(EXECUTION_ID, "partial", "lixo", "c")
+    assert len(db.rows) == 3
+    assert db.rows[-1]["created_by_agent"] == "b"
+
+    assert await manager.restore_latest_snapshot(EXECUTION_ID)
+    context = await manager.get_context(EXECUTION_ID)
+    assert context.variables == {"initial": True, "agent_a_result": {"result": "a"}, "agent_b_result": {"result": "b"}}
+    assert context.version == 3
+
+    await redis_client.flushall()
+    assert await manager.restore_latest_snapshot(EXECUTION_ID)
+    assert await manager.get_variable(EXECUTION_ID, "agent_b_result") == {"result": "b"}
+
+
+@pytest.mark.asyncio
+async def test_restore_without_snapshots(context_manager):
+    """Testa que sem banco de dados ou snapshots nada é restaurado."""
+    await context_manager.checkpoint(EXECUTION_ID, "a")
+    assert not await context_manager.restore_latest_snapshot(EXECUTION_ID)
+    assert not await TeamContextManager(context_manager.redis, InMemorySnapshotTable()).restore_latest_snapshot(EXECUTION_ID)
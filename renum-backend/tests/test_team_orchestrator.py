@@ -5,10 +5,14 @@ Este módulo contém testes para o orquestrador de equipes,
 verificando a execução e monitoramento de equipes.
 """
 
+import asyncio
+from datetime import datetime
+
 import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
-from uuid import UUID
+from unittest.mock import ANY, AsyncMock, patch, MagicMock
+from uuid import UUID, uuid4
 
+from app.services.execution_scheduler import ExecutionScheduler
 from app.services.team_orchestrator import TeamOrchestrator
 from app.models.team_models import (
     TeamExecutionCreate,
@@ -266,4 +270,210 @@ async def test_stop_execution_success():
     execution_repository.update_agent_execution.assert_called_once()
     execution_repository.update_execution_status.assert_called_with(
         execution_id, ExecutionStatus.CANCELLED, error_message="Execution cancelled by user"
-    )
\ No newline at end of file
+    )
+
+def make_resume_orchestrator(status: str, claimed: bool = True) -> TeamOrchestrator:
+    orchestrator = TeamOrchestrator.__new__(TeamOrchestrator)
+    orchestrator.settings = MagicMock(TEAM_EXECUTION_LEASE_SECONDS=120)
+    orchestrator.execution_repository = MagicMock()
+    orchestrator.execution_repository.get_execution = AsyncMock(return_value={
+        "execution_id": "00000000-0000-0000-0000-000000000001",
+        "team_id": "00000000-0000-0000-0000-000000000002",
+        "status": status,
+        "initial_prompt": "Test prompt"
+    })
+    orchestrator.execution_repository.transition_execution_status = AsyncMock(return_value=claimed)
+    team_config = MagicMock()
+    team_config.workflow_definition.agents = [MagicMock()]
+    orchestrator.team_repository = MagicMock()
+    orchestrator.team_repository.get_team_config = AsyncMock(return_value=team_config)
+    return orchestrator
+
+
+@pytest.mark.asyncio
+async def test_resume_execution_rejects_executions_persisted_as_pending():
+    orchestrator = make_resume_orchestrator(ExecutionStatus.PENDING.value)
+    execution_id = UUID("00000000-0000-0000-0000-000000000001")
+    user_id = UUID("00000000-0000-0000-0000-000000000003")
+
+    with patch("app.services.team_orchestrator.execution_scheduler") as scheduler:
+        scheduler.is_active.return_value = False
+        with pytest.raises(ValueError, match="already running"):
+            await orchestrator.resume_execution(execution_id, user_id)
+
+    scheduler.submit.assert_not_called()
+    orchestrator.execution_repository.transition_execution_status.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resume_execution_claims_the_execution_before_scheduling_it():
+    orchestrator = make_resume_orchestrator(ExecutionStatus.FAILED.value)
+    execution_id = UUID("00000000-0000-0000-0000-000000000001")
+    user_id = UUID("00000000-0000-0000-0000-000000000003")
+
+    with patch("app.services.team_orchestrator.execution_scheduler") as scheduler:
+        scheduler.is_active.return_value = False
+        assert await orchestrator.resume_execution(execution_id, user_id) is True
+
+    orchestrator.execution_repository.transition_execution_status.assert_awaited_once_with(
+        execution_id,
+        user_id,
+        [ExecutionStatus.FAILED, ExecutionStatus.CANCELLED],
+        ExecutionStatus.PENDING,
+        stale_before=ANY
+    )
+    scheduler.submit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_resume_execution_rejects_running_execution_with_a_live_heartbeat():
+    # O UPDATE condicional não aceita a execução: seu worker ainda renova o heartbeat
+    orchestrator = make_resume_orchestrator(ExecutionStatus.RUNNING.value, claimed=False)
+    execution_id = UUID("00000000-0000-0000-0000-000000000001")
+    user_id = UUID("00000000-0000-0000-0000-000000000003")
+
+    with patch("app.services.team_orchestrator.execution_scheduler") as scheduler:
+        scheduler.is_active.return_value = False
+        with pytest.raises(ValueError, match="already running"):
+            await orchestrator.resume_execution(execution_id, user_id)
+
+    scheduler.submit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resume_execution_claims_running_execution_of_a_dead_worker():
+    orchestrator = make_resume_orchestrator(ExecutionStatus.RUNNING.value)
+    execution_id = UUID("00000000-0000-0000-0000-000000000001")
+    user_id = UUID("00000000-0000-0000-0000-000000000003")
+
+    with patch("app.services.team_orchestrator.execution_scheduler") as scheduler:
+        scheduler.is_active.return_value = False
+        assert await orchestrator.resume_execution(execution_id, user_id) is True
+
+    stale_before = orchestrator.execution_repository.transition_execution_status.await_args.kwargs["stale_before"]
+    assert (datetime.now() - stale_before).total_seconds() == pytest.approx(120, abs=5)
+    scheduler.submit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_resume_execution_is_not_scheduled_when_another_instance_claimed_it():
+    orchestrator = make_resume_orchestrator(ExecutionStatus.FAILED.value, claimed=False)
+    execution_id = UUID("00000000-0000-0000-0000-000000000001")
+    user_id = UUID("00000000-0000-0000-0000-000000000003")
+
+    with patch("app.services.team_orchestrator.execution_scheduler") as scheduler:
+        scheduler.is_active.return_value = False
+        with pytest.raises(ValueError, match="already running"):
+            await orchestrator.resume_execution(execution_id, user_id)
+
+    scheduler.submit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resume_execution_releases_the_claim_when_admission_fails():
+    orchestrator = make_resume_orchestrator(ExecutionStatus.CANCELLED.value)
+    execution_id = UUID("00000000-0000-0000-0000-000000000001")
+    user_id = UUID("00000000-0000-0000-0000-000000000003")
+
+    with patch("app.services.team_orchestrator.execution_scheduler") as scheduler:
+        scheduler.is_active.return_value = False
+        scheduler.submit.side_effect = ValueError("queue full")
+        with pytest.raises(ValueError, match="queue full"):
+            await orchestrator.resume_execution(execution_id, user_id)
+
+    orchestrator.execution_repository.transition_execution_status.assert_awaited_with(
+        execution_id,
+        user_id,
+        [ExecutionStatus.PENDING],
+        ExecutionStatus.CANCELLED
+    )
+
+
+class FakeExecutionRepository:
+    """Repositório de execuções em memória, com o UPDATE condicional do banco."""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def create_execution(self, user_id, execution_data):
+        execution_id = uuid4()
+        self.rows[execution_id] = {
+            "execution_id": str(execution_id),
+            "team_id": str(execution_data.team_id),
+            "user_id": str(user_id),
+            "status": ExecutionStatus.PENDING.value,
+            "initial_prompt": execution_data.initial_prompt
+        }
+        return MagicMock(execution_id=execution_id)
+
+    async def get_execution(self, execution_id, user_id):
+        return dict(self.rows[execution_id])
+
+    async def get_execution_status(self, execution_id, user_id):
+        return None
+
+    async def update_execution_status(self, execution_id, status, error_message=None):
+        self.rows[execution_id]["status"] = status.value
+        return True
+
+    async def transition_execution_status(self, execution_id, user_id, from_statuses, status, stale_before=None):
+        if self.rows[execution_id]["status"] not in [s.value for s in from_statuses]:
+            return False
+        self.rows[execution_id]["status"] = status.value
+        return True
+
+    async def touch_execution(self, execution_id):
+        return True
+
+
+@pytest.mark.asyncio
+async def test_execution_interrupted_by_shutdown_can_be_resumed():
+    scheduler = ExecutionScheduler(
+        workers=1, max_running_per_user=1, max_queue_depth=10, max_queued_per_user=10, max_agent_runs=10
+    )
+    user_id = UUID("00000000-0000-0000-0000-000000000003")
+    team_config = MagicMock()
+    team_config.workflow_definition.agents = [MagicMock()]
+    resumed = asyncio.Event()
+
+    async def execute_plan(execution_id, team_config, initial_prompt, execution_config=None, resume=False):
+        if resume:
+            resumed.set()
+            return
+        await asyncio.Event().wait()
+
+    orchestrator = TeamOrchestrator.__new__(TeamOrchestrator)
+    orchestrator.settings = MagicMock(TEAM_EXECUTION_HEARTBEAT_INTERVAL=30, TEAM_EXECUTION_LEASE_SECONDS=120)
+    orchestrator.active_executions = {}
+    orchestrator.execution_repository = FakeExecutionRepository()
+    orchestrator.team_repository = MagicMock()
+    orchestrator.team_repository.get_team_config = AsyncMock(return_value=team_config)
+    orchestrator.execution_engine = MagicMock()
+    orchestrator.execution_engine.execute_plan = execute_plan
+    orchestrator._collect_metrics = AsyncMock()
+    execution_data = TeamExecutionCreate(
+        team_id=UUID("00000000-0000-0000-0000-000000000002"),
+        initial_prompt="Test prompt"
+    )
+
+    with patch("app.services.team_orchestrator.execution_scheduler", scheduler), \
+            patch("app.services.team_orchestrator.websocket_manager") as websocket_manager:
+        websocket_manager.broadcast = AsyncMock()
+        running = (await orchestrator.execute_team(user_id, execution_data)).execution_id
+        queued = (await orchestrator.execute_team(user_id, execution_data)).execution_id
+        await asyncio.sleep(0)
+        assert orchestrator.execution_repository.rows[running]["status"] == ExecutionStatus.RUNNING.value
+        assert orchestrator.execution_repository.rows[queued]["status"] == ExecutionStatus.PENDING.value
+
+        await scheduler.shutdown()
+
+        # Nenhuma das duas fica presa como running/pending depois do encerramento
+        assert orchestrator.execution_repository.rows[running]["status"] == ExecutionStatus.CANCELLED.value
+        assert orchestrator.execution_repository.rows[queued]["status"] == ExecutionStatus.CANCELLED.value
+
+        assert await orchestrator.resume_execution(running, user_id) is True
+        await asyncio.wait_for(resumed.wait(), timeout=1)
+        while scheduler.get_stats()["running"]:
+            await asyncio.sleep(0)
+
+    assert orchestrator.execution_repository.rows[running]["status"] == ExecutionStatus.COMPLETED.value